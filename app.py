@@ -1,94 +1,734 @@
+import argparse
+import os
+import shlex
 import sys
-from siem_core.csv_handler import load_csv_to_memory, query_data, display_data
+import time
+from contextlib import nullcontext
+from itertools import islice
+# Commands import the siem_core modules they use in their own branch of
+# run_command, so a batch run or a server client only loads what it needs.
+from siem_core import perf
+from siem_core.session import Session
 
-# Global variables to store data
-original_data = []
-current_data = []
+# Number of rows 'head' and 'tail' show by default.
+DEFAULT_PAGE_ROWS = 10
+# Seconds between checks of the loaded file in 'follow'.
+DEFAULT_FOLLOW_INTERVAL = 1.0
+# Rows 'stream' writes at a time in a batch run.
+STREAM_BLOCK_ROWS = 4096
 
-def main():
+# The loaded data, the current query result over it and the results 'undo'
+# can go back to.
+session = Session()
+# What each command cost; shown by 'perf'.
+recorder = perf.PerfRecorder()
+
+def split_options(args_str: str) -> tuple[str, dict]:
     """
-    Main function to run the command-line interface.
+    Splits trailing `--name[=value]` options off a command's argument string.
+
+    The remaining text is returned unchanged, so file paths may contain spaces.
+
+    Returns:
+        A tuple of (remaining arguments, {option name: value or True}).
     """
-    global original_data, current_data
+    tokens = args_str.split()
+    options = {}
+    while tokens and tokens[-1].startswith("--"):
+        name, _, value = tokens.pop()[2:].partition("=")
+        options[name] = value or True
+    if not options:
+        return args_str, options
+    return " ".join(tokens), options
 
-    while True:
-        print("\nSIEM Core CLI")
-        print("Commands:")
-        print("  load <file_path>     - Loads data from a CSV file.")
-        print("  query <column> <value> - Queries the current data.")
-        print("  display              - Displays the current data.")
-        print("  reset                - Resets current data to the original loaded data.")
-        print("  exit                 - Exits the application.")
+def show(data, offset: int = 0, limit: int | None = None, session: Session = session):
+    """Displays rows, or writes them to the session's output in a batch run."""
+    if session.output is None:
+        from siem_core.csv_handler import display_data
+        display_data(data, offset, limit)
+    else:
+        session.output.write(data, offset, limit)
+
+def run_command(command: str, args_str: str, session: Session = session,
+                recorder: perf.PerfRecorder = recorder) -> bool:
+    """
+    Runs one command with its argument string.
 
+    `session` and `recorder` default to the CLI's own; a server passes
+    those of the client that sent the command.
+
+    Returns:
+        False if the CLI should exit, True otherwise.
+    """
+    if command == "load":
+        if not args_str:
+            print("Error: Missing file path for 'load' command.")
+            return True
+        from siem_core.compressed import detect_compression
+        from siem_core.csv_handler import load_csv_mapped, load_csv_to_table
+        from siem_core.dataset import is_multi_file, load_csv_files
+        from siem_core.follow import CSVFollower
+        from siem_core.sidecar import DEFAULT_CACHE_DIR
+        from siem_core.typed import parse_column_types
+        file_path, options = split_options(args_str)
+        index_columns = options.get("index")
+        index_columns = index_columns.split(",") if isinstance(index_columns, str) else None
+        trigram_columns = options.get("trigram")
+        if trigram_columns is True:
+            print("Error: '--trigram' requires column names, e.g. --trigram=URL,User_Agent.")
+            return True
+        trigram_columns = trigram_columns.split(",") if trigram_columns else None
         try:
-            raw_input = input("> ").strip()
-            if not raw_input:
-                continue
+            workers = int(options["workers"]) if "workers" in options else None
+        except ValueError:
+            print("Error: '--workers' must be a number.")
+            return True
+        column_types = options.get("types")
+        if isinstance(column_types, str):
+            try:
+                column_types = parse_column_types(column_types)
+            except ValueError as e:
+                print(f"Error: {e}")
+                return True
+        elif column_types:
+            column_types = "infer"
+        else:
+            column_types = None
+        new_time_column = options.get("time")
+        if new_time_column is True:
+            print("Error: '--time' requires a column name, e.g. --time=Timestamp.")
+            return True
+        if options.get("mmap") and (index_columns or trigram_columns or column_types or new_time_column):
+            print("Error: '--index', '--trigram', '--types' and '--time' cannot be combined with '--mmap'.")
+            return True
+        multi_file = is_multi_file(file_path)
+        if multi_file and trigram_columns:
+            print("Error: '--trigram' indexes a single file, not a glob pattern or directory.")
+            return True
+        if options.get("mmap") and multi_file:
+            print("Error: '--mmap' loads a single file, not a glob pattern or directory.")
+            return True
+        cache_dir = None if options.get("no-cache") else DEFAULT_CACHE_DIR
+        session.save_indexes()
 
-            parts = raw_input.split(maxsplit=1) # Split command from arguments
-            command = parts[0].lower()
-            args_str = parts[1] if len(parts) > 1 else ""
+        def load_data():
+            if options.get("mmap"):
+                return load_csv_mapped(file_path, cache_dir=cache_dir), None
+            if multi_file:
+                return load_csv_files(file_path, index_columns=index_columns, workers=workers,
+                                      cache_dir=cache_dir, column_types=column_types,
+                                      time_column=new_time_column)
+            # A last record still being written is left for 'follow', except on a server,
+            # where the loaded rows are shared and cannot be followed.
+            return load_csv_to_table(file_path, index_columns=index_columns, workers=workers,
+                                     cache_dir=cache_dir, column_types=column_types,
+                                     time_column=new_time_column, trigram_columns=trigram_columns,
+                                     complete_records_only=session.shared_tables is None), None
 
-        except EOFError: # Handle Ctrl+D as exit
-            print("\nExiting...")
-            break
-        except KeyboardInterrupt: # Handle Ctrl+C as exit
-            print("\nExiting...")
-            break
+        try:
+            shared = False
+            with perf.phase("load"):
+                if session.shared_tables is None:
+                    data, scanned = load_data()
+                else:
+                    # '--workers' and '--no-cache' change how the data is read, not what is loaded.
+                    key = tuple(sorted((name, value) for name, value in options.items()
+                                       if name not in ("workers", "no-cache")))
+                    (data, scanned), shared = session.shared_tables.load(file_path, key, load_data)
+            perf.count(rows_returned=len(data))
+            # Mapped files are read in place and cannot grow with the file; compressed files
+            # cannot be read from where they ended; shared tables are read by other clients.
+            followable = not (options.get("mmap") or multi_file or session.shared_tables is not None
+                              or detect_compression(file_path))
+            # Following starts right after the last record loaded, not at the current end of the file.
+            follower = CSVFollower(file_path, data.source_end) if followable else None
+            session.set_loaded(data, file_path, cache_dir, column_types, new_time_column, follower)
+            if shared:
+                print(f"Using the {len(data)} rows from {file_path} already loaded on the server.")
+            elif multi_file:
+                # Files are read when a query needs them; only their metadata is loaded now.
+                print(f"Opened {len(data.files)} files with {len(data)} rows from {file_path} "
+                      f"(metadata built for {scanned}).")
+            else:
+                print(f"Successfully loaded {len(data)} rows from {file_path}.")
+                if follower is not None and not follower.caught_up():
+                    print(f"Records written to {file_path} after its last complete one are left for 'follow'.")
+        except FileNotFoundError:
+            print(f"Error: File not found at '{file_path}'.")
+        except ValueError as e:
+            print(f"Error loading CSV: {e}")
+        except Exception as e:
+            print(f"An unexpected error occurred during load: {e}")
 
-        if command == "load":
-            if not args_str:
-                print("Error: Missing file path for 'load' command.")
-                continue
-            file_path = args_str
+    elif command == "query":
+        if not session.original_data:
+            print("Error: No data loaded. Use 'load <file_path>' first.")
+            return True
+
+        query_parts = args_str.split(maxsplit=1)
+        if len(query_parts) < 2:
+            print("Error: 'query' command requires <column> and <value> arguments.")
+            print("Usage: query <column_name> <value_to_search>")
+            return True
+        from siem_core.csv_handler import query_data
+        from siem_core.dataset import narrow
+        from siem_core.query_lang import Condition
+
+        column_name, value = query_parts[0], query_parts[1]
+        with perf.phase("query"):
+            session.filter(("query", column_name, value),
+                           lambda data: query_data(narrow(data, Condition(column_name, "=", value)),
+                                                   column_name, value))
+        perf.count(rows_returned=len(session.current_data))
+        print(f"Query executed. {len(session.current_data)} rows match the criteria.")
+        if not session.current_data:
+             print(f"(No results for '{column_name}' = '{value}' in the current view. Use 'reset' to see all loaded data again)")
+
+
+    elif command in ("where", "explain"):
+        if not session.original_data:
+            print("Error: No data loaded. Use 'load <file_path>' first.")
+            return True
+        if not args_str:
+            print(f"Error: '{command}' command requires a filter expression.")
+            print(f"Usage: {command} <column> = <value> [AND|OR ...]")
+            return True
+        from siem_core.dataset import FileSet, narrow
+        from siem_core.query_lang import QueryPlan, QuerySyntaxError, parse_query
+        try:
+            node = parse_query(args_str)
+        except QuerySyntaxError as e:
+            print(f"Error: {e}")
+            return True
+        if command == "explain":
+            # Only shows the plan; the current data is left as it is.
+            data = session.current_data
+            if isinstance(data, FileSet):
+                files = data.candidates(node)
+                print(f"Files: {len(files)} of {len(data.files)} may match; the rest are skipped.")
+                data = data.load(files)
+            with perf.phase("query"):
+                plan = QueryPlan(data, node, session.scan_pool)
+                perf.count(rows_returned=len(plan.execute()))
+            print(plan.explain())
+            return True
+        with perf.phase("query"):
+            session.filter(("where", str(node)), lambda data: QueryPlan(narrow(data, node), node, session.scan_pool).execute())
+        perf.count(rows_returned=len(session.current_data))
+        print(f"Query executed. {len(session.current_data)} rows match the criteria.")
+        if not session.current_data:
+            print("(No results in the current view. Use 'reset' to see all loaded data again)")
+
+    elif command == "window":
+        if not session.original_data:
+            print("Error: No data loaded. Use 'load <file_path>' first.")
+            return True
+        from siem_core.dataset import narrow
+        from siem_core.time_index import parse_time, time_window
+        try:
+            bounds = dict(token.partition("=")[::2] for token in shlex.split(args_str))
+        except ValueError as e:
+            print(f"Error: {e}")
+            return True
+        if not bounds or not set(bounds) <= {"earliest", "latest"}:
+            print("Error: 'window' command requires earliest=<time> and/or latest=<time>.")
+            print("Usage: window earliest=-24h latest=now")
+            return True
+        if session.time_column not in session.original_data.fieldnames:
+            print(f"Error: Column '{session.time_column}' not found. Use 'load <file_path> --time=<col>'.")
+            return True
+        try:
+            # Relative times are resolved once, so the cached result matches what was asked for.
+            now = time.time()
+            earliest, latest = (parse_time(bounds[name], now) if name in bounds else None
+                                for name in ("earliest", "latest"))
+        except ValueError as e:
+            print(f"Error: {e}")
+            return True
+        column = session.time_column
+        with perf.phase("query"):
+            session.filter(("window", column, earliest, latest),
+                           lambda data: time_window(narrow(data, time_column=column, earliest=earliest,
+                                                           latest=latest),
+                                                    earliest, latest, column=column))
+        perf.count(rows_returned=len(session.current_data))
+        print(f"Query executed. {len(session.current_data)} rows match the criteria.")
+        if not session.current_data:
+            print("(No results in the current view. Use 'reset' to see all loaded data again)")
+
+    elif command in ("stats", "top"):
+        if not session.original_data:
+            print("Error: No data loaded. Use 'load <file_path>' first.")
+            return True
+        from siem_core.dataset import narrow
+        from siem_core.stats import StatsSyntaxError, parse_stats, stats, top_values
+        spec, options = split_options(args_str)
+        # Summaries never change the current data; --all summarizes everything that was loaded.
+        data = session.original_data if options.get("all") else session.current_data
+        if command == "stats":
             try:
-                original_data = load_csv_to_memory(file_path)
-                current_data = list(original_data) # Make a copy
-                print(f"Successfully loaded {len(original_data)} rows from {file_path}.")
-            except FileNotFoundError:
-                print(f"Error: File not found at '{file_path}'.")
-            except ValueError as e:
-                print(f"Error loading CSV: {e}")
-            except Exception as e:
-                print(f"An unexpected error occurred during load: {e}")
+                aggregates, by = parse_stats(spec)
+            except StatsSyntaxError as e:
+                print(f"Error: {e}")
+                print("Usage: stats count, sum(<col>), min(<col>), max(<col>), dc(<col>) [by <col>,...] [--all]")
+                return True
+            with perf.phase("query"):
+                if session.scan_pool is not None:
+                    summary = session.scan_pool.stats(narrow(data), aggregates, by)
+                else:
+                    summary = stats(narrow(data), aggregates, by)
+            perf.count(rows_returned=len(summary))
+            show(summary, session=session)
+            return True
+        columns = spec.replace(",", " ").split()
+        limit = DEFAULT_PAGE_ROWS
+        if columns and columns[0].isdigit():
+            limit = int(columns.pop(0))
+        if not columns:
+            print("Error: 'top' command requires at least one column.")
+            print("Usage: top [<n>] <col>[,<col>...] [--all]")
+            return True
+        with perf.phase("query"):
+            summary = top_values(narrow(data), columns, limit)
+        perf.count(rows_returned=len(summary))
+        show(summary, session=session)
 
-        elif command == "query":
-            if not original_data:
-                print("Error: No data loaded. Use 'load <file_path>' first.")
-                continue
+    elif command == "lookup":
+        if not session.original_data:
+            print("Error: No data loaded. Use 'load <file_path>' first.")
+            return True
+        from siem_core.dataset import narrow
+        from siem_core.lookup import DEFAULT_LOOKUP_BUDGET, enrich
+        lookup_args, options = split_options(args_str)
+        tokens = lookup_args.split()
+        keywords = [token.upper() for token in tokens]
+        output = None
+        if "OUTPUT" in keywords:
+            position = keywords.index("OUTPUT")
+            output = " ".join(tokens[position + 1:]).replace(",", " ").split()
+            tokens, keywords = tokens[:position], keywords[:position]
+        column = None
+        if len(tokens) == 4 and keywords[2] == "AS":
+            column = tokens[3]
+            tokens = tokens[:2]
+        try:
+            megabytes = float(options.get("budget", DEFAULT_LOOKUP_BUDGET / (1024 * 1024)))
+        except ValueError:
+            megabytes = 0
+        if len(tokens) != 2 or output == [] or megabytes <= 0:
+            print("Error: 'lookup' command requires <file_path> and <key> arguments.")
+            print("Usage: lookup <file_path> <key> [AS <column>] [OUTPUT <col>[,<col>...]] [--budget=<megabytes>]")
+            return True
+        file_path, key = tokens
+        try:
+            with perf.phase("query"):
+                enriched, lookup, matched, cached = enrich(narrow(session.current_data), file_path, key, output,
+                                                           column, int(megabytes * 1024 * 1024),
+                                                           cache=session.lookups)
+        except FileNotFoundError:
+            print(f"Error: File not found at '{file_path}'.")
+            return True
+        except ValueError as e:
+            print(f"Error: {e}")
+            return True
+        # The enriched rows are a new table; 'undo' and 'reset' go back to the loaded data.
+        session.apply(enriched)
+        perf.count(rows_returned=len(enriched))
+        if cached:
+            how = "cached hash table reused"
+        elif lookup.spilled:
+            how = f"partitioned into {len(lookup.partitions)} spill files"
+        elif lookup.restricted:
+            how = "hash table built on the keys of the current rows"
+        else:
+            how = "hash table built"
+        print(f"Lookup added {', '.join(lookup.output) or 'no columns'} to {len(enriched)} rows; "
+              f"{matched} matched ({how}).")
 
-            query_parts = args_str.split(maxsplit=1)
-            if len(query_parts) < 2:
-                print("Error: 'query' command requires <column> and <value> arguments.")
-                print("Usage: query <column_name> <value_to_search>")
-                continue
+    elif command in ("sort", "dedup"):
+        if not session.original_data:
+            print("Error: No data loaded. Use 'load <file_path>' first.")
+            return True
+        from siem_core.dataset import narrow
+        from siem_core.sort import DEFAULT_SORT_BUDGET, dedup_rows, sort_rows
+        spec, options = split_options(args_str)
+        tokens = spec.replace(",", " ").split() if command == "dedup" else spec.split()
+        try:
+            megabytes = float(options.get("budget", DEFAULT_SORT_BUDGET / (1024 * 1024)))
+        except ValueError:
+            megabytes = 0
+        descending, limit = False, None
+        if command == "sort":
+            keywords = [token.lower() for token in tokens]
+            if keywords[-2:-1] == ["limit"] and tokens[-1].isdigit():
+                limit = int(tokens[-1])
+                tokens, keywords = tokens[:-2], keywords[:-2]
+            if keywords[-1:] in (["asc"], ["desc"]):
+                descending = keywords[-1] == "desc"
+                tokens = tokens[:-1]
+        if megabytes <= 0 or not tokens or (command == "sort" and len(tokens) != 1):
+            if command == "sort":
+                print("Error: 'sort' command requires one column, optionally followed by asc|desc and limit <n>.")
+                print("Usage: sort <column> [asc|desc] [limit <n>] [--budget=<megabytes>]")
+            else:
+                print("Error: 'dedup' command requires at least one column.")
+                print("Usage: dedup <col>[,<col>...] [--budget=<megabytes>]")
+            return True
+        budget = int(megabytes * 1024 * 1024)
+        try:
+            with perf.phase("query"):
+                if command == "sort":
+                    result, strategy, runs = sort_rows(narrow(session.current_data), tokens[0], descending, limit,
+                                                       budget)
+                else:
+                    result, partitions = dedup_rows(narrow(session.current_data), tokens, budget)
+        except ValueError as e:
+            print(f"Error: {e}")
+            return True
+        # Sorted rows are a new table and deduplication depends on the row order, so neither result is
+        # cached; 'undo' and 'reset' go back as usual.
+        session.apply(result)
+        perf.count(rows_returned=len(result))
+        if command == "sort":
+            how = {"top-k": f"top {limit} kept in a heap", "memory": "sorted in memory",
+                   "external": f"{runs} sorted runs spilled to disk and merged"}[strategy]
+            print(f"Sorted {len(result)} rows by {tokens[0]}{' descending' if descending else ''} ({how}).")
+        else:
+            spilled = f"; spilled to {partitions} partitions" if partitions > 1 else ""
+            print(f"Dedup kept {len(result)} rows with distinct {', '.join(tokens)}{spilled}.")
 
-            column_name, value = query_parts[0], query_parts[1]
-            current_data = query_data(current_data, column_name, value)
-            print(f"Query executed. {len(current_data)} rows match the criteria.")
-            if not current_data:
-                 print(f"(No results for '{column_name}' = '{value}' in the current view. Use 'reset' to see all loaded data again)")
+    elif command == "stream":
+        stream_args, options = split_options(args_str)
+        stream_parts = stream_args.split()
+        if not stream_parts or len(stream_parts) % 2 == 0:
+            print("Error: 'stream' command requires <file_path> and <column> <value> pairs.")
+            print("Usage: stream <file_path> [<column> <value>]... [--count]")
+            return True
+        from siem_core.stream import stream_count, stream_query
+        file_path = stream_parts[0]
+        conditions = list(zip(stream_parts[1::2], stream_parts[2::2]))
+        try:
+            if options.get("count"):
+                matched = stream_count(file_path, conditions)
+            elif session.output is not None:
+                # Batch runs write the matches in blocks, so memory stays constant.
+                matches = stream_query(file_path, conditions)
+                matched = 0
+                while True:
+                    block = list(islice(matches, STREAM_BLOCK_ROWS))
+                    # Even no matches is this command's result.
+                    if block or not matched:
+                        session.output.write(block, continued=matched > 0)
+                    matched += len(block)
+                    if not block:
+                        break
+            else:
+                matched = 0
+                for row in stream_query(file_path, conditions):
+                    if matched == 0:
+                        print("\t".join(str(header) for header in row))
+                        print("-" * (len(row) * 10))
+                    print("\t".join(str(value) for value in row.values()))
+                    matched += 1
+            perf.count(rows_returned=matched)
+            print(f"Stream search finished. {matched} rows match the criteria.")
+        except FileNotFoundError:
+            print(f"Error: File not found at '{file_path}'.")
+        except ValueError as e:
+            print(f"Error reading CSV: {e}")
 
+    elif command == "follow":
+        if not session.original_data:
+            print("Error: No data loaded. Use 'load <file_path>' first.")
+            return True
+        if session.shared_tables is not None:
+            print("Error: 'follow' is not available on a server, where loaded data is shared with other clients.")
+            return True
+        rest, options = split_options(args_str)
+        try:
+            interval = float(options.get("interval", DEFAULT_FOLLOW_INTERVAL))
+        except ValueError:
+            interval = -1
+        if rest or interval <= 0:
+            print("Error: 'follow' takes only '--interval=<seconds>' and '--once'.")
+            print("Usage: follow [--interval=<seconds>] [--once]")
+            return True
+        if not options.get("once"):
+            print(f"Following {session.loaded_path} every {interval:g}s. Press Ctrl+C to stop.")
+        try:
+            while True:
+                with perf.phase("load"):
+                    new_rows = session.follow()
+                if len(new_rows) or options.get("once"):
+                    print(f"{len(new_rows)} new rows; {len(session.original_data)} loaded, "
+                          f"{len(session.current_data)} in the current view.")
+                with perf.phase("query"):
+                    watch_matches = session.check_watches(new_rows)
+                for expression, matches in watch_matches:
+                    print(f"Watch '{expression}' matched {len(matches)} new rows:")
+                    show(matches, 0, DEFAULT_PAGE_ROWS, session)
+                if options.get("once"):
+                    break
+                time.sleep(interval)
+        except KeyboardInterrupt:
+            print("\nStopped following.")
+        except FileNotFoundError:
+            print(f"Error: File not found at '{session.loaded_path}'.")
+        except ValueError as e:
+            print(f"Error: {e}")
 
-        elif command == "display":
-            if not original_data: # Check if any data has ever been loaded
-                print("Error: No data loaded. Use 'load <file_path>' first.")
-                continue
-            display_data(current_data)
+    elif command == "watch":
+        if not args_str:
+            if not session.watches:
+                print("No standing queries. Add one with 'watch <expression>'.")
+            for number, (expression, _) in enumerate(session.watches, start=1):
+                print(f"{number}. {expression}")
+            return True
+        from siem_core.query_lang import QuerySyntaxError
+        try:
+            session.add_watch(args_str)
+        except QuerySyntaxError as e:
+            print(f"Error: {e}")
+            return True
+        print(f"Watching for new rows matching '{args_str}' (number {len(session.watches)}).")
 
-        elif command == "reset":
-            if not original_data:
-                print("Error: No data loaded to reset. Use 'load <file_path>' first.")
-                continue
-            current_data = list(original_data) # Reset to a fresh copy of original
-            print("Data view has been reset to the original loaded data.")
+    elif command == "unwatch":
+        if not args_str.isdigit() or not session.remove_watch(int(args_str)):
+            print(f"Error: No standing query number '{args_str}'. Use 'watch' to list them.")
+            return True
+        print(f"Removed standing query {args_str}.")
+
+    elif command in ("display", "head", "tail"):
+        if not session.original_data: # Check if any data has ever been loaded
+            print("Error: No data loaded. Use 'load <file_path>' first.")
+            return True
+        numbers = args_str.split()
+        max_numbers = 2 if command == "display" else 1
+        if len(numbers) > max_numbers or not all(number.isdigit() for number in numbers):
+            usage = "display [<offset>] [<limit>]" if command == "display" else f"{command} [<rows>]"
+            print(f"Error: '{command}' takes at most {max_numbers} non-negative number(s).")
+            print(f"Usage: {usage}")
+            return True
+        numbers = [int(number) for number in numbers]
+        if command == "display":
+            offset = numbers[0] if numbers else 0
+            limit = numbers[1] if len(numbers) > 1 else None
+        else:
+            limit = numbers[0] if numbers else DEFAULT_PAGE_ROWS
+            offset = 0 if command == "head" else max(len(session.current_data) - limit, 0)
+        show(session.current_data, offset, limit, session)
+
+    elif command == "reset":
+        if not session.original_data:
+            print("Error: No data loaded to reset. Use 'load <file_path>' first.")
+            return True
+        session.reset() # Tables are never modified by queries, so this only switches views
+        print("Data view has been reset to the original loaded data.")
+
+    elif command == "undo":
+        if not session.original_data:
+            print("Error: No data loaded. Use 'load <file_path>' first.")
+            return True
+        if not session.undo():
+            print("Error: Nothing to undo.")
+            return True
+        print(f"Undone. The current view has {len(session.current_data)} rows.")
+
+    elif command == "cache":
+        cache_args = args_str.split()
+        if cache_args == ["clear"]:
+            session.results.clear()
+            session.lookups.clear()
+            print("Query result and lookup table caches cleared.")
+            return True
+        if cache_args[:1] == ["limit"]:
+            try:
+                megabytes = float(cache_args[1]) if len(cache_args) == 2 else -1
+            except ValueError:
+                megabytes = -1
+            if megabytes < 0:
+                print("Error: 'cache limit' requires a size in megabytes.")
+                print("Usage: cache limit <megabytes>")
+                return True
+            session.results.set_budget(int(megabytes * 1024 * 1024))
+        elif cache_args:
+            print(f"Error: Unknown 'cache' argument '{cache_args[0]}'.")
+            print("Usage: cache [clear | limit <megabytes>]")
+            return True
+        cache_stats = session.results.stats()
+        print(f"Query result cache: {cache_stats['entries']} results, {cache_stats['bytes']} of "
+              f"{cache_stats['budget']} bytes, {cache_stats['hits']} hits, {cache_stats['misses']} misses.")
+        lookup_stats = session.lookups.stats()
+        print(f"Lookup table cache: {lookup_stats['entries']} tables, {lookup_stats['bytes']} of "
+              f"{lookup_stats['budget']} bytes, {lookup_stats['hits']} hits, {lookup_stats['misses']} misses.")
+
+    elif command == "perf":
+        perf_args = args_str.split()
+        if perf_args == ["clear"]:
+            recorder.history.clear()
+            print("Performance history cleared.")
+        elif perf_args[:1] == ["memory"] and perf_args[1:] in (["on"], ["off"]):
+            recorder.set_memory_tracing(perf_args[1] == "on")
+            print(f"Memory tracing is {perf_args[1]}.")
+        elif perf_args[:1] == ["log"] and len(perf_args) == 2:
+            path = None if perf_args[1] == "off" else perf_args[1]
+            try:
+                recorder.set_log(path)
+            except OSError as e:
+                print(f"Error: Cannot write the metrics log: {e}")
+                return True
+            print("Metrics log disabled." if path is None else f"Appending the metrics of each command to {path}.")
+        elif perf_args == ["summary"]:
+            show(recorder.summary(), session=session)
+        elif len(perf_args) <= 1 and all(arg.isdigit() for arg in perf_args):
+            show(recorder.rows(int(perf_args[0]) if perf_args else DEFAULT_PAGE_ROWS), session=session)
+        else:
+            print("Error: Unknown 'perf' arguments.")
+            print("Usage: perf [<n> | summary | clear | memory on|off | log <path>|off]")
+
+    elif command == "profile":
+        profile_parts = args_str.split(maxsplit=1)
+        if not profile_parts or profile_parts[0].lower() == "profile":
+            print("Error: 'profile' requires another command to run, e.g. profile where Port = 443.")
+            print("Usage: profile <command> [<arguments>]")
+            return True
+        running, report = perf.profile(run_command, profile_parts[0].lower(),
+                                       profile_parts[1] if len(profile_parts) > 1 else "", session, recorder)
+        print(f"\nTop {perf.PROFILE_TOP_ENTRIES} functions by cumulative time:")
+        print(report.strip("\n"))
+        return running
+
+    elif command == "parallel":
+        parallel_args = args_str.split()
+        if parallel_args == ["off"]:
+            session.set_scan_pool(None)
+            print("Parallel scans are off; all scans run in this process.")
+            return True
+        valid = parallel_args == ["on"] or (len(parallel_args) == 1 and parallel_args[0].isdigit()
+                                             and int(parallel_args[0]) > 0)
+        if parallel_args and not valid:
+            print("Error: 'parallel' takes 'on', 'off' or a number of workers.")
+            print("Usage: parallel [on | off | <workers>]")
+            return True
+        if parallel_args:
+            from siem_core.parallel_scan import ScanPool
+            workers = (os.cpu_count() or 1) if parallel_args == ["on"] else int(parallel_args[0])
+            session.set_scan_pool(ScanPool(workers))
+        pool = session.scan_pool
+        if pool is None:
+            print("Parallel scans are off. Use 'parallel on' to run large scans in worker processes.")
+        else:
+            print(f"Parallel scans are on: filters and stats over at least {pool.min_rows} rows run on "
+                  f"{pool.workers} worker processes ({pool.nbytes} bytes of data shared).")
+
+    elif command == "exit":
+        print("Exiting...")
+        session.close()
+        return False
+
+    else:
+        print(f"Error: Unknown command '{command}'. Type one of the listed commands.")
+    return True
+
+def run_line(line: str, session: Session = session, recorder: perf.PerfRecorder = recorder) -> bool:
+    """
+    Runs one line of input (a command and its arguments), recording what it cost.
+
+    Returns:
+        False if the CLI should exit, True otherwise.
+    """
+    parts = line.split(maxsplit=1) # Split command from arguments
+    command = parts[0].lower()
+    args_str = parts[1] if len(parts) > 1 else ""
+    # The 'perf' command itself is not recorded, so its listings only show other commands.
+    recording = nullcontext() if command == "perf" else recorder.command(line)
+    with recording:
+        return run_command(command, args_str, session, recorder)
+
+def serve(host: str, port: int, max_clients: int, max_concurrent: int):
+    """
+    Runs a server that shares loaded data between the clients started with '--connect', until Ctrl+C.
+    """
+    # Imported here, so the interactive and batch modes start faster.
+    import asyncio
+    from siem_core.server import QueryServer
+
+    async def run():
+        server = QueryServer(run_line, host, port, max_clients=max_clients, max_concurrent=max_concurrent)
+        await server.start()
+        print(f"Serving on {host}:{server.port} (at most {max_clients} clients, "
+              f"{max_concurrent} commands at a time). Press Ctrl+C to stop.")
+        try:
+            await server.serve_forever()
+        finally:
+            await server.close()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        print("\nServer stopped.")
+    except OSError as e:
+        print(f"Error: Cannot serve on {host}:{port}: {e}")
+
+def main(client: "ServerClient | None" = None):
+    """
+    Main function to run the command-line interface.
+
+    With a `client`, every command runs in the client's session on a server.
+    """
+    while True:
+        print("\nSIEM Core CLI")
+        print("Commands:")
+        print("  load <file_path> [--index=<col>,...] [--types[=<col>:<type>,...]] [--time=<col>] [--workers=<n>]")
+        print("       [--trigram=<col>,...] [--mmap] [--no-cache]")
+        print("                       - Loads data from a CSV file, or all files matching a glob or in a directory.")
+        print("  query <column> <value> - Queries the current data.")
+        print("  where <expression>   - Filters the current data, e.g. Protocol = TCP AND Port IN (80, 443)")
+        print("                         or URL LIKE *evil.com* (also CONTAINS <text>, MATCHES <regex>).")
+        print("  explain <expression> - Shows how a 'where' filter is run and the rows each step touched.")
+        print("  window [earliest=<time>] [latest=<time>] - Keeps the current rows inside a time window.")
+        print("  stats <aggregates> [by <col>,...] [--all] - Summarizes the current data, e.g. count, dc(Source_IP) by Protocol.")
+        print("  top [<n>] <col>[,<col>...] [--all] - Shows the most common values of columns in the current data.")
+        print("  lookup <file_path> <key> [AS <col>] [OUTPUT <col>,...] [--budget=<megabytes>]")
+        print("                       - Adds the columns of matching rows of another CSV to the current data.")
+        print("  sort <col> [asc|desc] [limit <n>] [--budget=<megabytes>] - Sorts the current data on a column.")
+        print("  dedup <col>[,<col>...] [--budget=<megabytes>] - Keeps the first row of each distinct value(s).")
+        print("  stream <file_path> [<column> <value>]... [--count] - Searches a CSV without loading it.")
+        print("  follow [--interval=<seconds>] [--once] - Adds rows appended to the loaded file until Ctrl+C.")
+        print("  watch [<expression>] - Lists standing queries, or adds one that 'follow' reports matches of.")
+        print("  unwatch <n>          - Removes standing query number <n>.")
+        print("  display [<offset>] [<limit>] - Displays the current data, or <limit> rows from <offset> on.")
+        print("  head [<rows>] / tail [<rows>] - Displays the first or last rows of the current data (default 10).")
+        print("  reset                - Resets current data to the original loaded data.")
+        print("  undo                 - Goes back to the data before the last query or reset.")
+        print("  cache [clear | limit <megabytes>] - Shows, clears or resizes the query result cache.")
+        print("  perf [<n> | summary | clear | memory on|off | log <path>|off]")
+        print("                       - Shows the time, rows, bytes and memory of recent commands, or configures recording.")
+        print("  profile <command>    - Runs one command under cProfile and shows its hot spots.")
+        print("  parallel [on | off | <workers>] - Runs large filters and stats in worker processes over shared memory.")
+        print("  exit                 - Exits the application.")
 
-        elif command == "exit":
-            print("Exiting...")
+        try:
+            raw_input = input("> ").strip()
+            if not raw_input:
+                continue
+        except (EOFError, KeyboardInterrupt): # Handle Ctrl+D and Ctrl+C as exit
+            print("\nExiting...")
+            if client is None:
+                session.close() # A server closes the session when the client disconnects
             break
 
+        if client is None:
+            running = run_line(raw_input)
         else:
-            print(f"Error: Unknown command '{command}'. Type one of the listed commands.")
+            try:
+                output, running = client.run(raw_input)
+            except (OSError, ValueError) as e:
+                print(f"Error: Lost the connection to the server: {e}")
+                break
+            print(output, end="")
+        if not running:
+            break
 
 if __name__ == '__main__':
     # Check if siem_core is importable, otherwise guide user
@@ -99,4 +739,54 @@ if __name__ == '__main__':
         print("Please ensure that the 'siem_core' directory is in your Python path,")
         print("or that you are running this script from the project's root directory.")
         sys.exit(1)
-    main()
+    parser = argparse.ArgumentParser(description="SIEM Core CLI.")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument("--serve", action="store_true",
+                      help="Run a server whose clients share the data they load.")
+    mode.add_argument("--connect", action="store_true",
+                      help="Run the CLI against a server started with --serve.")
+    mode.add_argument("--batch", metavar="PIPELINE",
+                      help="Run commands separated by '|' without prompting, e.g. 'load x.csv | stats count'.")
+    mode.add_argument("--script", metavar="PATH",
+                      help="Run the commands in a file (one command or pipeline per line) without prompting.")
+    parser.add_argument("--format", choices=("csv", "jsonl"), default="csv",
+                        help="Output format of --batch and --script (default csv).")
+    # The server defaults are filled in below, so the server module is only imported when it is used.
+    parser.add_argument("--host", help="Server address.")
+    parser.add_argument("--port", type=int, help="Server port.")
+    parser.add_argument("--max-clients", type=int, help="Clients a server accepts at once.")
+    parser.add_argument("--max-concurrent", type=int, help="Commands a server runs at once.")
+    arguments = parser.parse_args()
+    if arguments.serve or arguments.connect:
+        from siem_core.server import (DEFAULT_HOST, DEFAULT_MAX_CLIENTS, DEFAULT_MAX_CONCURRENT, DEFAULT_PORT,
+                                       ServerClient)
+        for name, default in (("host", DEFAULT_HOST), ("port", DEFAULT_PORT), ("max_clients", DEFAULT_MAX_CLIENTS),
+                              ("max_concurrent", DEFAULT_MAX_CONCURRENT)):
+            if getattr(arguments, name) is None:
+                setattr(arguments, name, default)
+    if arguments.batch is not None or arguments.script is not None:
+        from siem_core.batch import read_script, run_batch, split_pipeline
+        try:
+            commands = (split_pipeline(arguments.batch) if arguments.batch is not None
+                        else read_script(arguments.script))
+        except FileNotFoundError:
+            print(f"Error: Script not found at '{arguments.script}'.", file=sys.stderr)
+            sys.exit(1)
+        except ValueError as e:
+            print(f"Error: {e}", file=sys.stderr)
+            sys.exit(1)
+        sys.exit(run_batch(commands, run_line, session, arguments.format))
+    elif arguments.serve:
+        serve(arguments.host, arguments.port, arguments.max_clients, arguments.max_concurrent)
+    elif arguments.connect:
+        try:
+            server_client = ServerClient(arguments.host, arguments.port)
+        except OSError as e:
+            print(f"Error: Cannot connect to a server at {arguments.host}:{arguments.port}: {e}")
+            sys.exit(1)
+        try:
+            main(server_client)
+        finally:
+            server_client.close()
+    else:
+        main()
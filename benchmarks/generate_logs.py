@@ -0,0 +1,202 @@
+"""
+Generates synthetic firewall-style CSV logs for benchmarking.
+
+Usage:
+    python benchmarks/generate_logs.py <output.csv> [--rows=N] [--schema=narrow|wide] [--seed=N]
+
+The same arguments always produce the same file. IP addresses follow Zipf
+distributions (a few hosts produce most of the traffic), protocols and ports
+are skewed towards the common ones, and timestamps increase over the covered
+span except for a few events logged late, so the data is mostly but not
+strictly in time order.
+Rows are generated and written in batches, so any row count fits in memory.
+"""
+import argparse
+import calendar
+import csv
+import random
+import sys
+import time
+from itertools import accumulate, islice
+
+NARROW_FIELDS = ('Source_IP', 'Destination_IP', 'Protocol', 'Port', 'Timestamp')
+WIDE_FIELDS = NARROW_FIELDS + ('Action', 'Bytes_Sent', 'Bytes_Received', 'Duration_ms', 'Rule', 'Interface',
+                               'Country', 'User', 'Severity', 'Message')
+SCHEMAS = {'narrow': NARROW_FIELDS, 'wide': WIDE_FIELDS}
+
+DEFAULT_START = '2023-10-26T00:00:00Z'
+DEFAULT_SPAN_SECONDS = 24 * 3600
+
+_BATCH_ROWS = 10000
+# Hosts behind the firewall and hosts on the internet, each Zipf-distributed.
+_INTERNAL_HOSTS = 2000
+_EXTERNAL_HOSTS = 50000
+_INTERNAL_SHARE = 0.7
+_ZIPF_EXPONENT = 1.1
+_PROTOCOLS = (('TCP', 70), ('UDP', 25), ('ICMP', 5))
+_PORTS = ((443, 40), (80, 15), (53, 12), (22, 5), (25, 3), (3389, 3), (8080, 3), (123, 3), (445, 2),
+          (993, 2), (1433, 1), (3306, 1))
+# Share of connections to an ephemeral port instead of a well-known one.
+_EPHEMERAL_SHARE = 0.1
+# Share of events logged late, by up to _MAX_DELAY_SECONDS.
+_LATE_SHARE = 0.05
+_MAX_DELAY_SECONDS = 5
+_ACTIONS = (('allow', 85), ('deny', 12), ('drop', 3))
+_SEVERITIES = (('info', 80), ('low', 12), ('medium', 6), ('high', 2))
+_COUNTRIES = ('US', 'DE', 'GB', 'FR', 'NL', 'CN', 'RU', 'BR', 'IN', 'JP')
+_INTERFACES = ('eth0', 'eth1', 'wan0', 'vpn0')
+
+
+def _zipf_weights(count: int, exponent: float = _ZIPF_EXPONENT) -> list[float]:
+    return list(accumulate(1 / rank ** exponent for rank in range(1, count + 1)))
+
+
+def _weighted(pairs) -> tuple[list, list]:
+    values, weights = zip(*pairs)
+    return list(values), list(accumulate(weights))
+
+
+class LogGenerator:
+    """
+    Produces rows of one schema from a seeded random generator.
+
+    Every column of a batch is drawn with one `random.choices` call, which
+    keeps generation fast enough for files of tens of millions of rows.
+    """
+
+    def __init__(self, schema: str = 'narrow', seed: int = 0, start: str = DEFAULT_START,
+                 span_seconds: float = DEFAULT_SPAN_SECONDS, rows: int = 1):
+        """
+        Raises:
+            ValueError: If the schema is unknown or the start time is invalid.
+        """
+        if schema not in SCHEMAS:
+            raise ValueError(f"Unknown schema '{schema}'. Expected one of: {', '.join(SCHEMAS)}.")
+        self.fieldnames = SCHEMAS[schema]
+        self.rng = random.Random(seed)
+        try:
+            self.start = calendar.timegm(time.strptime(start, '%Y-%m-%dT%H:%M:%SZ'))
+        except ValueError:
+            raise ValueError(f"Invalid start time '{start}'; expected YYYY-MM-DDTHH:MM:SSZ.")
+        self.step = span_seconds / max(rows, 1)
+        self.position = 0
+        # Host pools are shuffled so that the busiest hosts are spread over the address space.
+        self.internal = [f'10.{i >> 16 & 255}.{i >> 8 & 255}.{i & 255}'
+                         for i in self.rng.sample(range(1, 1 << 20), _INTERNAL_HOSTS)]
+        self.external = [f'{self.rng.randrange(1, 224)}.{self.rng.randrange(256)}.{self.rng.randrange(256)}.'
+                         f'{self.rng.randrange(1, 255)}' for _ in range(_EXTERNAL_HOSTS)]
+        # One pool of both, weighted so internal hosts get _INTERNAL_SHARE of the picks.
+        self.hosts = self.internal + self.external
+        internal_weights = _zipf_weights(_INTERNAL_HOSTS)
+        external_weights = _zipf_weights(_EXTERNAL_HOSTS)
+        inside = _INTERNAL_SHARE / internal_weights[-1]
+        outside = (1 - _INTERNAL_SHARE) / external_weights[-1]
+        self.host_weights = ([weight * inside for weight in internal_weights]
+                             + [_INTERNAL_SHARE + weight * outside for weight in external_weights])
+        on_time = round((1 - _LATE_SHARE) * 100)
+        self.delays = [0] * on_time + [-(1 + i % _MAX_DELAY_SECONDS) for i in range(100 - on_time)]
+        self.users = [f'user{i:04d}' for i in range(500)]
+        self.user_weights = _zipf_weights(len(self.users))
+        self.rules = [f'rule-{i}' for i in range(100, 300)]
+        self.rule_weights = _zipf_weights(len(self.rules))
+        self.protocols = _weighted(_PROTOCOLS)
+        self.ports = _weighted(_PORTS)
+        self.actions = _weighted(_ACTIONS)
+        self.severities = _weighted(_SEVERITIES)
+        self.country_weights = _zipf_weights(len(_COUNTRIES))
+        self._formatted_second = None
+        self._formatted = None
+
+    def _timestamp(self, seconds: float) -> str:
+        second = int(seconds)
+        if second != self._formatted_second:
+            self._formatted_second = second
+            self._formatted = time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(second))
+        return self._formatted
+
+    def batch(self, count: int) -> list[tuple[str, ...]]:
+        """Returns the next `count` rows."""
+        rng = self.rng
+        sources = rng.choices(self.hosts, cum_weights=self.host_weights, k=count)
+        destinations = rng.choices(self.hosts, cum_weights=self.host_weights, k=count)
+        protocols = rng.choices(self.protocols[0], cum_weights=self.protocols[1], k=count)
+        ports = rng.choices(self.ports[0], cum_weights=self.ports[1], k=count)
+        ports = ['' if protocol == 'ICMP' else str(rng.randrange(1024, 65536) if rng.random() < _EPHEMERAL_SHARE
+                                                    else port)
+                 for protocol, port in zip(protocols, ports)]
+        first = self.position
+        self.position += count
+        start, step, timestamp = self.start, self.step, self._timestamp
+        times = [timestamp(start + (first + offset) * step + delay)
+                 for offset, delay in enumerate(rng.choices(self.delays, k=count))]
+        columns = [sources, destinations, protocols, ports, times]
+        if len(self.fieldnames) > len(NARROW_FIELDS):
+            actions = rng.choices(self.actions[0], cum_weights=self.actions[1], k=count)
+            sent = [str(int(rng.lognormvariate(7, 2))) for _ in range(count)]
+            received = [str(int(rng.lognormvariate(8, 2.5))) for _ in range(count)]
+            durations = [str(int(rng.expovariate(1 / 250))) for _ in range(count)]
+            rules = rng.choices(self.rules, cum_weights=self.rule_weights, k=count)
+            interfaces = rng.choices(_INTERFACES, k=count)
+            countries = rng.choices(_COUNTRIES, cum_weights=self.country_weights, k=count)
+            users = rng.choices(self.users, cum_weights=self.user_weights, k=count)
+            severities = rng.choices(self.severities[0], cum_weights=self.severities[1], k=count)
+            # Free text with commas and quotes exercises CSV quoting.
+            messages = [f'{action} {protocol} from {source}, rule "{rule}"' for action, protocol, source, rule
+                        in zip(actions, protocols, sources, rules)]
+            columns += [actions, sent, received, durations, rules, interfaces, countries, users, severities,
+                        messages]
+        return list(zip(*columns))
+
+    def rows(self, count: int):
+        """Yields `count` rows, generated in batches."""
+        remaining = count
+        while remaining > 0:
+            size = min(remaining, _BATCH_ROWS)
+            yield from self.batch(size)
+            remaining -= size
+
+
+def write_logs(file_path: str, rows: int, schema: str = 'narrow', seed: int = 0, start: str = DEFAULT_START,
+               span_seconds: float = DEFAULT_SPAN_SECONDS) -> int:
+    """
+    Writes a synthetic log file.
+
+    Returns:
+        The number of rows written.
+
+    Raises:
+        ValueError: If the schema is unknown or the start time is invalid.
+    """
+    generator = LogGenerator(schema, seed, start, span_seconds, rows)
+    with open(file_path, 'w', newline='') as csvfile:
+        writer = csv.writer(csvfile, lineterminator='\n')
+        writer.writerow(generator.fieldnames)
+        generated = generator.rows(rows)
+        while batch := list(islice(generated, _BATCH_ROWS)):
+            writer.writerows(batch)
+    return rows
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Generate a synthetic firewall log CSV.")
+    parser.add_argument('output', help="Path of the CSV file to write.")
+    parser.add_argument('--rows', type=int, default=1_000_000, help="Number of rows (default 1000000).")
+    parser.add_argument('--schema', choices=sorted(SCHEMAS), default='narrow',
+                        help="'narrow' (5 columns, like data/sample.csv) or 'wide' (15 columns).")
+    parser.add_argument('--seed', type=int, default=0, help="Random seed; the same seed gives the same file.")
+    parser.add_argument('--start', default=DEFAULT_START, help="Time of the first row, YYYY-MM-DDTHH:MM:SSZ.")
+    parser.add_argument('--hours', type=float, default=DEFAULT_SPAN_SECONDS / 3600,
+                        help="Hours covered by the timestamps (default 24).")
+    args = parser.parse_args(argv)
+    started = time.perf_counter()
+    try:
+        rows = write_logs(args.output, args.rows, args.schema, args.seed, args.start, args.hours * 3600)
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    print(f"Wrote {rows} rows to {args.output} in {time.perf_counter() - started:.1f}s.")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,253 @@
+"""
+Measures load, query and display performance on synthetic (or given) logs.
+
+Usage:
+    python benchmarks/run_benchmarks.py [--rows=N] [--schema=narrow|wide] [--data=<csv>] [--repeat=N]
+                                        [--baseline=<json>] [--save=<json>] [--tolerance=<fraction>]
+
+Reports load throughput (rows/s) and peak RSS per loader, latency
+percentiles per query, and display throughput. Each load runs in a fresh
+process, so its peak RSS is not inflated by earlier work. With --baseline,
+every metric is compared with a saved run and the ones that got worse by
+more than the tolerance are flagged; the exit status is then 1.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import redirect_stdout
+
+# Add project root to sys.path to allow direct import of siem_core
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, project_root)
+
+try:
+    import resource
+except ImportError: # Not available on Windows; peak RSS is then not reported
+    resource = None
+
+from benchmarks.generate_logs import SCHEMAS, write_logs
+from siem_core.csv_handler import display_data, load_csv_mapped, load_csv_to_memory, load_csv_to_table, query_data
+from siem_core.query_lang import run_query
+from siem_core.stats import parse_stats, stats, top_values
+from siem_core.time_index import parse_event_time, time_window
+
+DEFAULT_ROWS = 1_000_000
+DEFAULT_REPEAT = 20
+# Throughput is the best of this many runs, which filters out most noise.
+BEST_OF = 3
+# A metric that got worse by more than this fraction of the baseline is a regression.
+DEFAULT_TOLERANCE = 0.2
+# Latencies that changed by less than this are never flagged, however large the ratio.
+NOISE_FLOOR_MS = 1.0
+PERCENTILES = (50, 95, 99)
+
+# Loaders measured in worker processes: load_csv_to_memory, load_csv_to_table
+# (plain, with inferred column types, and restoring a snapshot) and load_csv_mapped.
+LOADERS = ('memory', 'table', 'table_types', 'snapshot', 'mmap')
+
+
+def peak_rss_mb() -> float | None:
+    """Returns this process's peak resident set size in MB, or None where it cannot be read."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes.
+    return peak / (1024 * 1024 if sys.platform == 'darwin' else 1024)
+
+
+def run_loader(name: str, file_path: str, cache_dir: str) -> dict:
+    """Loads a file with one of LOADERS and returns its row count, time and peak RSS."""
+    if name == 'snapshot':
+        # Take the snapshot first, so the timed load restores it.
+        load_csv_to_table(file_path, cache_dir=cache_dir, workers=1)
+    started = time.perf_counter()
+    if name == 'memory':
+        data = load_csv_to_memory(file_path, workers=1)
+    elif name == 'mmap':
+        data = load_csv_mapped(file_path)
+    else:
+        data = load_csv_to_table(file_path, workers=1, column_types='infer' if name == 'table_types' else None,
+                                 cache_dir=cache_dir if name == 'snapshot' else None)
+    seconds = time.perf_counter() - started
+    return {'rows': len(data), 'seconds': seconds, 'peak_rss_mb': peak_rss_mb()}
+
+
+def measure_load(name: str, file_path: str, cache_dir: str) -> dict:
+    """Runs `run_loader` in a fresh interpreter."""
+    output = subprocess.run([sys.executable, os.path.abspath(__file__), '--worker', name, file_path, cache_dir],
+                            check=True, capture_output=True, text=True).stdout
+    return json.loads(output)
+
+
+def percentile(samples: list[float], percent: float) -> float:
+    """Returns the nearest-rank percentile of the samples."""
+    ordered = sorted(samples)
+    rank = max(1, -(-len(ordered) * percent // 100))
+    return ordered[int(rank) - 1]
+
+
+def time_calls(function, repeat: int) -> list[float]:
+    """Returns the duration in seconds of each of `repeat` calls."""
+    durations = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        durations.append(time.perf_counter() - started)
+    return durations
+
+
+def query_workload(table, rows: list[dict]) -> dict:
+    """
+    Returns the queries to time, by name.
+
+    Values are taken from the data: the busiest source address, addresses of
+    middling and no traffic, and a one-hour window in the middle of the data.
+    """
+    busiest = top_values(table, ['Source_IP'], 50)
+    hot, warm = busiest[0]['Source_IP'], busiest[-1]['Source_IP']
+    destinations = [row['Destination_IP'] for row in top_values(table, ['Destination_IP'], 3)]
+    times = [parse_event_time(table[position]['Timestamp']) for position in (0, len(table) - 1)]
+    middle = (times[0] + times[1]) / 2
+    earliest, latest = middle - 1800, middle + 1800
+    tcp = query_data(table, 'Protocol', 'TCP')
+    by_protocol = parse_stats('count, dc(Destination_IP) by Protocol')
+    return {
+        'query_list_hot_ip': lambda: query_data(rows, 'Source_IP', hot),
+        'query_hot_ip': lambda: query_data(table, 'Source_IP', hot),
+        'query_warm_ip': lambda: query_data(table, 'Source_IP', warm),
+        'query_missing_ip': lambda: query_data(table, 'Source_IP', '203.0.113.254'),
+        'query_chained': lambda: query_data(tcp, 'Source_IP', warm),
+        'where_and': lambda: run_query(table, 'Protocol = TCP AND Port = 443'),
+        'where_in': lambda: run_query(table, f"Destination_IP IN ({', '.join(destinations)})"),
+        'where_cidr_range': lambda: run_query(table, 'Source_IP CIDR 10.0.0.0/8 AND Port > 1024'),
+        'window_hour': lambda: time_window(table, earliest, latest),
+        'stats_by_protocol': lambda: stats(table, *by_protocol),
+        'top_source_ip': lambda: top_values(table, ['Source_IP'], 10),
+    }
+
+
+def run_benchmarks(file_path: str, repeat: int = DEFAULT_REPEAT, log=print) -> dict:
+    """
+    Runs all benchmarks on a CSV file with the generator's columns.
+
+    Returns:
+        {'rows': ..., 'metrics': {name: {'value', 'unit', 'better'}}}, where
+        'better' is 'higher' or 'lower'.
+    """
+    metrics = {}
+
+    def record(name: str, value, unit: str, better: str):
+        if value is None:
+            return
+        metrics[name] = {'value': value, 'unit': unit, 'better': better}
+        log(f"  {name:<40} {value:>14.3f} {unit}")
+
+    log(f"Loading (best of {BEST_OF}):")
+    with tempfile.TemporaryDirectory() as cache_dir:
+        for name in LOADERS:
+            runs = [measure_load(name, file_path, cache_dir) for _ in range(BEST_OF)]
+            record(f'load.{name}.rows_per_s', max(run['rows'] / run['seconds'] for run in runs), 'rows/s', 'higher')
+            record(f'load.{name}.peak_rss_mb', runs[0]['peak_rss_mb'], 'MB', 'lower')
+
+    table = load_csv_to_table(file_path, cache_dir=None, workers=1)
+    rows = load_csv_to_memory(file_path, workers=1)
+    log(f"Queries ({repeat} runs each; the first run builds indexes):")
+    for name, query in query_workload(table, rows).items():
+        durations = time_calls(query, repeat)
+        for percent in PERCENTILES:
+            record(f'{name}.p{percent}_ms', percentile(durations, percent) * 1000, 'ms', 'lower')
+
+    log(f"Display (full renders best of {BEST_OF}):")
+    with open(os.devnull, 'w') as sink, redirect_stdout(sink):
+        # Full renders write every row; a page should cost the same at any size.
+        full = min(time_calls(lambda: display_data(table), BEST_OF))
+        full_list = min(time_calls(lambda: display_data(rows), BEST_OF))
+        page = time_calls(lambda: display_data(table, len(table) // 2, 10), repeat)
+    record('display.table.rows_per_s', len(table) / full, 'rows/s', 'higher')
+    record('display.list.rows_per_s', len(rows) / full_list, 'rows/s', 'higher')
+    record('display.page.p50_ms', percentile(page, 50) * 1000, 'ms', 'lower')
+    return {'rows': len(table), 'metrics': metrics}
+
+
+def compare(results: dict, baseline: dict, tolerance: float = DEFAULT_TOLERANCE) -> list[dict]:
+    """
+    Compares the metrics of two runs.
+
+    Returns:
+        One entry per metric present in both runs, with the baseline value,
+        the relative change and whether it is a regression: worse by more
+        than `tolerance`, and for latencies also by at least NOISE_FLOOR_MS.
+    """
+    comparisons = []
+    for name, metric in results['metrics'].items():
+        base = baseline.get('metrics', {}).get(name)
+        if base is None or not base['value']:
+            continue
+        change = (metric['value'] - base['value']) / base['value']
+        worse = -change if metric['better'] == 'higher' else change
+        noise = metric['unit'] == 'ms' and abs(metric['value'] - base['value']) < NOISE_FLOOR_MS
+        comparisons.append({'name': name, 'value': metric['value'], 'baseline': base['value'], 'change': change,
+                            'regression': worse > tolerance and not noise})
+    return comparisons
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark loading, querying and displaying SIEM logs.")
+    parser.add_argument('--rows', type=int, default=DEFAULT_ROWS, help="Rows to generate (default 1000000).")
+    parser.add_argument('--schema', choices=sorted(SCHEMAS), default='narrow', help="Schema of generated data.")
+    parser.add_argument('--seed', type=int, default=0, help="Seed of generated data.")
+    parser.add_argument('--data', help="Benchmark this CSV file (with the generator's columns) instead.")
+    parser.add_argument('--repeat', type=int, default=DEFAULT_REPEAT, help="Runs per query (default 20).")
+    parser.add_argument('--baseline', help="Compare with the results saved in this JSON file.")
+    parser.add_argument('--save', help="Save the results to this JSON file.")
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help="Relative slowdown flagged as a regression (default 0.2).")
+    parser.add_argument('--worker', nargs=3, metavar=('LOADER', 'FILE', 'CACHE_DIR'), help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+    if args.worker:
+        print(json.dumps(run_loader(*args.worker)))
+        return 0
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        file_path = args.data
+        if file_path is None:
+            file_path = os.path.join(data_dir, f'{args.schema}-{args.rows}.csv')
+            print(f"Generating {args.rows} {args.schema} rows (seed {args.seed})...")
+            write_logs(file_path, args.rows, args.schema, args.seed)
+        results = run_benchmarks(file_path, args.repeat)
+    results.update(schema=None if args.data else args.schema, seed=None if args.data else args.seed,
+                   data=args.data, python=platform.python_version(), platform=platform.platform(),
+                   cpus=os.cpu_count(), date=time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()))
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"Results saved to {args.save}.")
+    if not args.baseline:
+        return 0
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    if (baseline.get('rows'), baseline.get('schema')) != (results['rows'], results['schema']):
+        print(f"Warning: the baseline ran on {baseline.get('rows')} {baseline.get('schema')} rows; "
+              f"results may not be comparable.")
+    comparisons = compare(results, baseline, args.tolerance)
+    print(f"\nCompared with {args.baseline} (tolerance {args.tolerance:.0%}):")
+    for entry in comparisons:
+        flag = "  REGRESSION" if entry['regression'] else ""
+        print(f"  {entry['name']:<40} {entry['baseline']:>14.3f} -> {entry['value']:>14.3f} "
+              f"({entry['change']:+.1%}){flag}")
+    regressions = [entry['name'] for entry in comparisons if entry['regression']]
+    if regressions:
+        print(f"{len(regressions)} regression(s): {', '.join(regressions)}")
+        return 1
+    print("No regressions.")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
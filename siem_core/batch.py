@@ -0,0 +1,141 @@
+import io
+import sys
+from contextlib import redirect_stdout
+
+from siem_core.csv_handler import export_data
+
+# Formats batch runs can write their results in.
+OUTPUT_FORMATS = ('csv', 'jsonl')
+# Messages starting with these mean a command failed.
+_ERROR_PREFIXES = ('Error', 'An unexpected error')
+
+
+def split_pipeline(text: str) -> list[str]:
+    """
+    Splits a pipeline such as `load x.csv | where Port = 443 | stats count` into its commands.
+
+    A '|' inside single or double quotes (e.g. in a MATCHES regex) does not
+    split, and a backslash inside quotes escapes the next character.
+
+    Raises:
+        ValueError: If a quote is not closed or a command is empty.
+    """
+    commands = []
+    current = []
+    quote = None
+    escaped = False
+    for char in text:
+        if escaped:
+            escaped = False
+        elif quote is not None:
+            if char == '\\':
+                escaped = True
+            elif char == quote:
+                quote = None
+        elif char in ('"', "'"):
+            quote = char
+        elif char == '|':
+            commands.append(''.join(current).strip())
+            current = []
+            continue
+        current.append(char)
+    if quote is not None:
+        raise ValueError(f'Unclosed {quote} in the pipeline.')
+    commands.append(''.join(current).strip())
+    if not all(commands):
+        raise ValueError('The pipeline has an empty command.')
+    return commands
+
+
+def read_script(path: str) -> list[str]:
+    """
+    Reads the commands of a batch script.
+
+    Each line holds a command or a pipeline of them; blank lines and lines
+    starting with '#' are skipped.
+
+    Raises:
+        FileNotFoundError: If the script does not exist.
+        ValueError: If a line is not a valid pipeline.
+    """
+    commands = []
+    with open(path, encoding='utf-8') as f:
+        for number, line in enumerate(f, start=1):
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            try:
+                commands.extend(split_pipeline(line))
+            except ValueError as e:
+                raise ValueError(f'{path}, line {number}: {e}') from None
+    return commands
+
+
+class BatchOutput:
+    """
+    Where a batch run writes the data its commands produce.
+
+    Set as a session's `output`, it takes the place of the tabular display:
+    every result is written to `out` in `output_format` as soon as it is
+    produced. `tables` counts the results written; rows written with
+    `continued` extend the last one.
+    """
+
+    def __init__(self, out, output_format: str = 'csv'):
+        if output_format not in OUTPUT_FORMATS:
+            raise ValueError(f"Unknown output format '{output_format}'; use {' or '.join(OUTPUT_FORMATS)}.")
+        self.out = out
+        self.output_format = output_format
+        self.tables = 0
+
+    def write(self, data, offset: int = 0, limit: int | None = None, continued: bool = False):
+        export_data(data, self.out, self.output_format, offset, limit, header=not continued)
+        if not continued:
+            self.tables += 1
+
+
+def run_batch(commands: list[str], run_line, session, output_format: str = 'csv', out=None, messages=None) -> int:
+    """
+    Runs commands one after another without prompting, for scheduled jobs.
+
+    Data the commands display (e.g. 'stats', 'top' or 'head') is written to
+    `out` in `output_format`; the messages they print go to `messages`. If
+    no command wrote any data, the current data is written at the end, so
+    `load x.csv | where Port = 443` outputs the matching rows. The run stops
+    at the first command that fails, or at 'exit'.
+
+    Args:
+        commands: The command lines to run.
+        run_line: Runs one command line in a session; returns False to exit.
+        session: The session the commands work on.
+        output_format: 'csv' or 'jsonl'.
+        out: Stream for the data; defaults to sys.stdout.
+        messages: Stream for messages; defaults to sys.stderr.
+
+    Returns:
+        The exit status: 0 if every command succeeded, 1 otherwise.
+    """
+    out = sys.stdout if out is None else out
+    messages = sys.stderr if messages is None else messages
+    session.output = BatchOutput(out, output_format)
+    try:
+        for line in commands:
+            printed = io.StringIO()
+            try:
+                with redirect_stdout(printed):
+                    running = run_line(line, session)
+            except Exception as e:
+                printed.write(f'Error: {line!r} failed: {e}\n')
+                running = None
+            messages.write(printed.getvalue())
+            messages.flush()
+            if running is None or any(text.startswith(_ERROR_PREFIXES) for text in printed.getvalue().splitlines()):
+                return 1
+            if not running:
+                return 0
+        if session.output.tables == 0 and session.original_data:
+            session.output.write(session.current_data)
+        return 0
+    finally:
+        session.output = None
+        session.close()
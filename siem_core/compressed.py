@@ -0,0 +1,193 @@
+import bz2
+import io
+import lzma
+import queue
+import threading
+import zlib
+
+# Leading bytes of each supported compression format.
+_MAGIC = ((b'\x1f\x8b', 'gzip'), (b'BZh', 'bz2'), (b'\xfd7zXZ\x00', 'xz'))
+# Compressed bytes the decompression thread reads at a time.
+_READ_BYTES = 256 * 1024
+# Decompressed chunks queued ahead of the parser; bounds the memory used.
+_QUEUE_CHUNKS = 8
+# Buffer size of the text stream the parser reads from.
+_BUFFER_BYTES = 1024 * 1024
+# How long a blocked decompression thread waits before checking whether it was stopped.
+_PUT_TIMEOUT_SECONDS = 0.1
+# File name suffixes of compressed CSV files, for finding them in a directory.
+COMPRESSED_SUFFIXES = ('.gz', '.bz2', '.xz')
+
+
+class DecompressionError(ValueError):
+    """Raised while reading a compressed file whose data is corrupt or cut short."""
+
+
+def detect_compression(file_path: str) -> str | None:
+    """
+    Returns 'gzip', 'bz2' or 'xz' if the file starts with that format's magic bytes, else None.
+
+    Raises:
+        FileNotFoundError: If the file is not found.
+    """
+    with open(file_path, 'rb') as f:
+        head = f.read(6)
+    for magic, kind in _MAGIC:
+        if head.startswith(magic):
+            return kind
+    return None
+
+
+def _decompressor(kind: str):
+    if kind == 'gzip':
+        return zlib.decompressobj(wbits=zlib.MAX_WBITS | 16)
+    if kind == 'bz2':
+        return bz2.BZ2Decompressor()
+    return lzma.LZMADecompressor()
+
+
+class _DecompressingReader(io.RawIOBase):
+    """
+    The decompressed bytes of a file, produced by a background thread.
+
+    The thread reads the compressed file in large blocks and decompresses
+    them into a bounded queue while the reader's consumer parses earlier
+    chunks. zlib, bz2 and lzma release the GIL while they decompress, so
+    the two stages run at the same time even in one process. Files holding
+    several concatenated streams (as `cat a.gz b.gz` makes) are read to the
+    end, and zero bytes padding a gzip file after a member are skipped.
+    Errors raised by the thread are raised again by `readinto`; corrupt or
+    truncated data raises DecompressionError.
+    """
+
+    def __init__(self, file_path: str, kind: str):
+        self._source = open(file_path, 'rb')
+        self._queue = queue.Queue(maxsize=_QUEUE_CHUNKS)
+        self._stop = threading.Event()
+        self._pending = memoryview(b'')
+        self._finished = False
+        self._thread = threading.Thread(target=self._decompress, args=(kind,), daemon=True)
+        self._thread.start()
+
+    def readable(self) -> bool:
+        return True
+
+    def fileno(self) -> int:
+        """Returns the descriptor of the compressed file, so fstat reports its size."""
+        return self._source.fileno()
+
+    def _put(self, item):
+        while not self._stop.is_set():
+            try:
+                self._queue.put(item, timeout=_PUT_TIMEOUT_SECONDS)
+                return
+            except queue.Full:
+                continue
+
+    def _decompress(self, kind: str):
+        try:
+            decompressor = _decompressor(kind)
+            started = False
+            while not self._stop.is_set():
+                data = self._source.read(_READ_BYTES)
+                if not data:
+                    break
+                while data:
+                    if decompressor.eof:
+                        if kind == 'gzip':
+                            # Like gzip(1), skip zero bytes padding the file after a member.
+                            data = data.lstrip(b'\x00')
+                            if not data:
+                                break
+                        decompressor = _decompressor(kind)
+                    started = True
+                    chunk = decompressor.decompress(data)
+                    if chunk:
+                        self._put(chunk)
+                    data = decompressor.unused_data if decompressor.eof else b''
+            if started and not decompressor.eof:
+                raise DecompressionError(f'{kind} data ends before its end-of-stream marker')
+            self._put(b'')
+        except (OSError, EOFError, zlib.error, lzma.LZMAError) as e:
+            self._put(DecompressionError(f'Corrupt {kind} data: {e}'))
+        except Exception as e:
+            self._put(e)
+
+    def readinto(self, buffer) -> int:
+        while not self._pending:
+            if self._finished:
+                return 0
+            item = self._queue.get()
+            if isinstance(item, Exception):
+                self._finished = True
+                raise item
+            if not item:
+                self._finished = True
+                return 0
+            self._pending = memoryview(item)
+        size = min(len(buffer), len(self._pending))
+        buffer[:size] = self._pending[:size]
+        self._pending = self._pending[size:]
+        return size
+
+    def close(self):
+        if not self.closed:
+            self._stop.set()
+            self._thread.join()
+            self._source.close()
+        super().close()
+
+
+class _PrefixReader(io.RawIOBase):
+    """The first `end` bytes of a file, which may be growing past them."""
+
+    def __init__(self, file_path: str, end: int):
+        self._source = open(file_path, 'rb', buffering=0)
+        self._remaining = end
+
+    def readable(self) -> bool:
+        return True
+
+    def fileno(self) -> int:
+        return self._source.fileno()
+
+    def readinto(self, buffer) -> int:
+        if self._remaining <= 0:
+            return 0
+        with memoryview(buffer) as view:
+            size = self._source.readinto(view[:self._remaining])
+        self._remaining -= size
+        return size
+
+    def close(self):
+        if not self.closed:
+            self._source.close()
+        super().close()
+
+
+def open_csv(file_path: str, end: int | None = None):
+    """
+    Opens a CSV file for reading as text, decompressing it if it is compressed.
+
+    Plain files are opened as usual. gzip, bz2 and xz files, recognized by
+    their magic bytes rather than their names, are decompressed by a
+    background thread while the caller reads.
+
+    Reading a corrupt or truncated compressed file raises
+    DecompressionError, a ValueError.
+
+    Args:
+        file_path: The path to the CSV file.
+        end: Read only the first `end` bytes of a plain file; None reads
+            to the end. Ignored for compressed files.
+
+    Raises:
+        FileNotFoundError: If the file is not found.
+    """
+    kind = detect_compression(file_path)
+    if kind is None:
+        if end is not None:
+            return io.TextIOWrapper(io.BufferedReader(_PrefixReader(file_path, end), _BUFFER_BYTES), newline='')
+        return open(file_path, mode='r', newline='')
+    raw = _DecompressingReader(file_path, kind)
+    return io.TextIOWrapper(io.BufferedReader(raw, _BUFFER_BYTES), newline='')
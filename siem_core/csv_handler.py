@@ -1,11 +1,34 @@
 import csv
-
-def load_csv_to_memory(file_path: str) -> list[dict]:
+import json
+import os
+import sys
+from itertools import chain, islice
+
+from siem_core.index import DEFAULT_INDEX_BUDGET, IndexManager
+from siem_core.mmap_backend import MappedCSV
+from siem_core.parallel_loader import find_records_end, parse_parallel
+from siem_core import perf
+from siem_core.compressed import detect_compression, open_csv
+from siem_core.snapshot import load_snapshot, save_snapshot, update_snapshot
+from siem_core.table import ColumnarTable, TableView
+from siem_core.typed import apply_types
+
+# display_data sizes its columns from at most this many rows of the page, and
+# cuts values longer than DISPLAY_MAX_WIDTH characters.
+_WIDTH_SAMPLE_ROWS = 200
+DISPLAY_MAX_WIDTH = 40
+# display_data writes its output in batches of this many rows.
+_WRITE_BATCH_ROWS = 1000
+
+def load_csv_to_memory(file_path: str, workers: int | None = 1) -> list[dict]:
     """
     Loads a CSV file into a list of dictionaries.
 
     Args:
         file_path: The path to the CSV file.
+        workers: Number of processes used to parse the file; None uses all
+            CPUs. Small files are always parsed in the calling process, and
+            the result is the same either way.
 
     Returns:
         A list of dictionaries, where each dictionary represents a row
@@ -16,7 +39,11 @@ def load_csv_to_memory(file_path: str) -> list[dict]:
         ValueError: If the CSV file is invalid or improperly formatted.
     """
     try:
-        with open(file_path, mode='r', newline='') as csvfile:
+        if workers != 1:
+            data = parse_parallel(file_path, workers=workers)
+            if data is not None:
+                return data
+        with open_csv(file_path) as csvfile:
             reader = csv.DictReader(csvfile)
             data = [row for row in reader]
             if not data and reader.fieldnames is None: # Check for empty or invalid CSV
@@ -27,51 +54,292 @@ def load_csv_to_memory(file_path: str) -> list[dict]:
     except Exception as e: # Catch other potential CSV parsing errors
         raise ValueError(f"Error parsing CSV file at {file_path}: {e}")
 
-def query_data(data: list[dict], column_name: str, value: str) -> list[dict]:
+def load_csv_to_table(file_path: str, index_columns: list[str] | None = None,
+                      index_budget: int = DEFAULT_INDEX_BUDGET, workers: int | None = 1,
+                      cache_dir: str | None = None,
+                      column_types: str | dict[str, str] | None = None,
+                      time_column: str | None = None,
+                      trigram_columns: list[str] | None = None,
+                      complete_records_only: bool = False) -> ColumnarTable:
+    """
+    Loads a CSV file into a columnar, dictionary-encoded table.
+
+    This is the memory-efficient counterpart of `load_csv_to_memory`: values
+    are stored column by column and repeated values are kept only once. The
+    returned table yields dict-like rows, so it can be passed to `query_data`
+    and `display_data` like a list of dictionaries.
+
+    The table gets an IndexManager that builds a hash index for a column the
+    first time `query_data` filters on it.
+
+    With `column_types`, columns holding IPv4 addresses, integers or
+    timestamps are stored as integer arrays (see `typed.apply_types`), which
+    lets range and CIDR conditions compare integers and use sorted indexes.
+
+    With `time_column`, the time index `time_index.time_window` uses for
+    that column is built right away instead of on the first window query.
+
+    With a `cache_dir`, the table (and the indexes built while loading) is
+    restored from a binary snapshot when the CSV file has not changed since
+    the snapshot was taken, which skips CSV parsing entirely. Otherwise the
+    file is parsed and a fresh snapshot is written.
+
+    With `complete_records_only`, a last record that is still being written
+    (no final newline yet, or an open quoted field) is not loaded, and the
+    table's `source_end` is the offset just after the last record it holds,
+    where a `follow.CSVFollower` can take over.
+
+    Args:
+        file_path: The path to the CSV file.
+        index_columns: Columns to index right away instead of on first query.
+        index_budget: Memory budget in bytes for the table's indexes.
+        workers: Number of processes used to parse the file; None uses all
+            CPUs. Small files are always parsed in the calling process.
+        cache_dir: Directory for snapshots; None disables them.
+        column_types: 'infer' to type every column whose values allow it, a
+            {column name: type name} mapping of columns to type, or None to
+            keep all columns as strings.
+        time_column: Column whose time index to build while loading.
+        trigram_columns: Columns whose substring, wildcard and regex
+            searches may build and use a trigram index.
+        complete_records_only: Leave out a last record without its newline.
+            Ignored for compressed files.
+
+    Returns:
+        A ColumnarTable holding the CSV rows.
+
+    Raises:
+        FileNotFoundError: If the CSV file is not found.
+        ValueError: If the CSV file is invalid or improperly formatted, if
+            an index or time column does not exist, or if a declared column
+            type does not fit the column's values.
+    """
+    table = None
+    if cache_dir is not None:
+        table = load_snapshot(file_path, cache_dir, index_budget=index_budget, column_types=column_types,
+                              complete_records_only=complete_records_only)
+    from_snapshot = table is not None
+    if not from_snapshot:
+        end = None
+        try:
+            with perf.phase('parse'):
+                if complete_records_only and not detect_compression(file_path):
+                    end = find_records_end(file_path)
+                table = parse_parallel(file_path, workers=workers, as_table=True, end=end) if workers != 1 else None
+                if table is None:
+                    with open_csv(file_path, end=end) as csvfile:
+                        reader = csv.reader(csvfile)
+                        fieldnames = next(reader, None)
+                        if fieldnames is None:
+                            raise ValueError(f"CSV file at {file_path} is empty or has no headers.")
+                        # Blank lines are skipped, as csv.DictReader does.
+                        table = ColumnarTable.from_rows(fieldnames, (row for row in reader if row)).compact()
+        except FileNotFoundError:
+            raise FileNotFoundError(f"CSV file not found at {file_path}")
+        except Exception as e: # Catch other potential CSV parsing errors
+            raise ValueError(f"Error parsing CSV file at {file_path}: {e}")
+        perf.count(rows_scanned=len(table), bytes_read=os.path.getsize(file_path) if end is None else end)
+        table.source_end = end
+        if column_types is not None:
+            apply_types(table, column_types)
+        table.indexes = IndexManager(table, memory_budget=index_budget)
+
+    try:
+        table.indexes.build(index_columns or [])
+        table.indexes.enable_trigrams(trigram_columns or [])
+    except KeyError as e:
+        raise ValueError(f"Cannot index unknown column {e} in {file_path}")
+    if time_column is not None and table.indexes.time_index(time_column) is None:
+        raise ValueError(f"Cannot index unknown column '{time_column}' in {file_path}")
+    if cache_dir is not None:
+        try:
+            if from_snapshot:
+                update_snapshot(table, file_path, cache_dir, column_types=column_types)
+            else:
+                save_snapshot(table, file_path, cache_dir, column_types=column_types)
+        except OSError:
+            pass # A missing snapshot only costs speed on the next load
+    return table
+
+def load_csv_mapped(file_path: str, field_offsets: bool = False, cache_dir: str | None = None) -> MappedCSV:
+    """
+    Opens a CSV file through a memory map without decoding it.
+
+    Only record (and optionally field) offsets are indexed up front; values
+    are decoded when `query_data` compares them or `display_data` prints them.
+
+    Args:
+        file_path: The path to the CSV file.
+        field_offsets: Also index field offsets within each record.
+        cache_dir: Directory in which the offset index is cached between runs.
+
+    Returns:
+        A MappedCSV over the file.
+
+    Raises:
+        FileNotFoundError: If the CSV file is not found.
+        ValueError: If the CSV file is invalid or improperly formatted.
+    """
+    try:
+        return MappedCSV(file_path, field_offsets=field_offsets, cache_dir=cache_dir)
+    except FileNotFoundError:
+        raise FileNotFoundError(f"CSV file not found at {file_path}")
+    except Exception as e: # Catch other potential CSV parsing errors
+        raise ValueError(f"Error parsing CSV file at {file_path}: {e}")
+
+def query_data(data: list[dict] | ColumnarTable | TableView | MappedCSV, column_name: str,
+               value: str) -> list[dict] | TableView | MappedCSV:
     """
     Queries a list of dictionaries for rows where a specific column matches a given value.
 
     Args:
-        data: A list of dictionaries (e.g., loaded from a CSV).
+        data: A list of dictionaries (e.g., loaded from a CSV), a ColumnarTable,
+            a TableView or a MappedCSV.
         column_name: The name of the column to query.
         value: The value to match in the specified column.
 
     Returns:
-        A new list of dictionaries containing only the matching rows.
-        Returns an empty list if the column_name is not found or no rows match.
+        A new list of dictionaries containing only the matching rows, a
+        TableView of the underlying table for tables and views, or a MappedCSV
+        view for mapped files. Views share the loaded rows, so chained queries
+        only narrow down row ids.
+        Returns an empty result if the column_name is not found or no rows match.
     """
+    if isinstance(data, (ColumnarTable, TableView)):
+        table = data.base
+        column = table.columns.get(column_name)
+        if column is None:
+            return table.select([])
+        if table.indexes is not None:
+            # Building the index reads the whole column; a built one only the matching rows.
+            built = column_name in table.indexes.indexes
+            row_ids = table.indexes.lookup(column_name, value)
+            perf.count(rows_scanned=len(row_ids) if built else len(table))
+            return data.select(row_ids)
+        perf.count(rows_scanned=len(table))
+        return data.select(column.find(value))
+    if isinstance(data, MappedCSV):
+        perf.count(rows_scanned=len(data))
+        return data.take(data.find(column_name, value))
+
+    perf.count(rows_scanned=len(data))
     matching_rows = []
     for row in data:
         if column_name in row and row[column_name] == value:
             matching_rows.append(row)
     return matching_rows
 
-def display_data(data: list[dict]):
+def display_data(data: list[dict] | ColumnarTable | TableView | MappedCSV, offset: int = 0,
+                 limit: int | None = None):
     """
     Displays a list of dictionaries in a basic tabular format.
 
+    Columns are separated by tabs. Only the rows from `offset` up to
+    `offset + limit` are read and rendered, so a page of a very large result
+    is shown at once. Column widths come from the header and the first rows
+    of the page; longer values are cut to DISPLAY_MAX_WIDTH characters.
+    Output is written in large batches rather than line by line.
+
     Args:
-        data: A list of dictionaries to display.
+        data: A list of dictionaries (or a ColumnarTable, TableView or MappedCSV) to display.
+        offset: Position of the first row to show.
+        limit: Number of rows to show; None shows all rows from `offset` on.
+    """
+    with perf.phase('display'):
+        if not data:
+            print("No data to display.")
+            return
+
+        total = len(data)
+        start = min(max(offset, 0), total)
+        end = total if limit is None else min(total, start + max(limit, 0))
+        if start == end:
+            print(f"No rows to display at offset {offset} ({total} rows in total).")
+            return
+        perf.count(rows_scanned=end - start)
+
+        # Assume all dictionaries have the same keys as the first one
+        headers = list(data[0].keys())
+
+        if isinstance(data, (ColumnarTable, TableView)):
+            # Read the columns directly instead of going through Row views.
+            getters = [data.base.columns[header].get for header in headers]
+            row_ids = range(start, end) if data.selection is None else data.selection[start:end]
+            rows = ([str(get(row_id)) for get in getters] for row_id in row_ids)
+        else:
+            # Ensure all header keys are present, print empty string if not
+            rows = ([str(data[row_id].get(header, "")) for header in headers] for row_id in range(start, end))
+        sample = list(islice(rows, _WIDTH_SAMPLE_ROWS))
+        widths = [min(DISPLAY_MAX_WIDTH, max([len(header)] + [len(cells[pos]) for cells in sample]))
+                  for pos, header in enumerate(headers)]
+
+        def line(cells) -> str:
+            return "\t".join(cell if len(cell) <= width else cell[:max(width - 3, 1)] + "..."
+                             for cell, width in zip(cells, widths))
+
+        out = sys.stdout
+        out.write("\t".join(headers) + "\n" + "\t".join("-" * width for width in widths) + "\n")
+        rows = chain(sample, rows)
+        while batch := list(islice(rows, _WRITE_BATCH_ROWS)):
+            out.write("\n".join(map(line, batch)) + "\n")
+        if end - start < total:
+            out.write(f"(rows {start + 1}-{end} of {total})\n")
+        out.flush()
+
+def export_data(data: list[dict] | ColumnarTable | TableView | MappedCSV, out, output_format: str = 'csv',
+                offset: int = 0, limit: int | None = None, header: bool = True) -> int:
     """
-    if not data:
-        print("No data to display.")
-        return
+    Writes rows in a machine-readable format, for batch runs.
 
-    # Assume all dictionaries have the same keys as the first one
-    headers = list(data[0].keys())
+    CSV output starts with a header row, which is all an empty result with
+    known columns writes; JSONL output has one JSON object per row. Missing
+    values are written as empty fields in CSV and as null in JSONL. Rows are
+    read and written in batches as in display_data, and the output is
+    flushed at the end, so a reader sees each result as soon as it is
+    complete.
 
-    # Determine column widths (optional, for better alignment)
-    # For simplicity, we'll use a fixed separator (tab) for now
-    # A more advanced version might calculate max width for each column
+    Args:
+        data: A list of dictionaries (or a ColumnarTable, TableView or MappedCSV) to write.
+        out: A text stream to write to.
+        output_format: 'csv' or 'jsonl'.
+        offset: Position of the first row to write.
+        limit: Number of rows to write; None writes all rows from `offset` on.
+        header: False leaves out the CSV header row, for rows continuing an
+            earlier write.
 
-    # Print headers
-    print("\t".join(headers))
-    print("-" * (len(headers) * 10)) # Simple separator line
+    Returns:
+        The number of rows written.
 
-    # Print rows
-    for row in data:
-        # Ensure all header keys are present, print empty string if not
-        print("\t".join(str(row.get(header, "")) for header in headers))
+    Raises:
+        ValueError: If the output format is unknown.
+    """
+    if output_format not in ('csv', 'jsonl'):
+        raise ValueError(f"Unknown output format '{output_format}'; use csv or jsonl.")
+    with perf.phase('display'):
+        total = len(data) if data else 0
+        start = min(max(offset, 0), total)
+        end = total if limit is None else min(total, start + max(limit, 0))
+        headers = list(data.fieldnames) if hasattr(data, 'fieldnames') else list(data[0].keys()) if data else []
+        perf.count(rows_scanned=end - start)
+
+        if isinstance(data, (ColumnarTable, TableView)):
+            getters = [data.base.columns[header].get for header in headers]
+            row_ids = range(start, end) if data.selection is None else data.selection[start:end]
+            rows = ([get(row_id) for get in getters] for row_id in row_ids)
+        else:
+            rows = ([data[row_id].get(header) for header in headers] for row_id in range(start, end))
+
+        if output_format == 'csv':
+            writer = csv.writer(out, lineterminator='\n')
+            if headers and header:
+                writer.writerow(headers)
+            while batch := list(islice(rows, _WRITE_BATCH_ROWS)):
+                writer.writerows(['' if value is None else value for value in cells] for cells in batch)
+        else:
+            while batch := list(islice(rows, _WRITE_BATCH_ROWS)):
+                out.write(''.join(json.dumps(dict(zip(headers, cells))) + '\n' for cells in batch))
+        out.flush()
+    return end - start
 
 if __name__ == '__main__':
     # --- Test load_csv_to_memory ---
@@ -0,0 +1,516 @@
+import csv
+import glob
+import hashlib
+import os
+import threading
+from array import array
+from bisect import bisect_right
+from collections import OrderedDict
+from itertools import islice
+
+from siem_core.compressed import COMPRESSED_SUFFIXES, DecompressionError, open_csv
+from siem_core.csv_handler import load_csv_to_table
+from siem_core.index import DEFAULT_INDEX_BUDGET, IndexManager
+from siem_core import perf
+from siem_core.sidecar import read_sidecar, sidecar_path, source_signature, write_sidecar
+from siem_core.table import ColumnarTable, DictColumn, StringColumn
+from siem_core.time_index import DEFAULT_TIME_COLUMN, parse_event_time
+from siem_core.typed import TypedColumn
+
+METADATA_SUFFIX = '.meta'
+
+# Columns with at most this many distinct values in a file keep the exact
+# set; larger ones get a Bloom filter.
+_EXACT_VALUE_LIMIT = 64
+# About 1% false positives: ~9.6 bits per value and 7 hash functions.
+_BLOOM_BITS_PER_VALUE = 10
+_BLOOM_HASHES = 7
+# Values the first layer of a LayeredBloomFilter is sized for (a scan batch's
+# worth, 80 KiB). Each later layer holds twice as many with 2 more bits per
+# value, so the layers' false positive rates (about 0.8%, 0.3%, 0.1%, ...)
+# add up to under 1.5%.
+_BLOOM_FIRST_CAPACITY = 65536
+_BLOOM_LAYER_EXTRA_BITS = 2
+# Rows read per batch while scanning a file for its metadata.
+_SCAN_BATCH_ROWS = 65536
+# Loaded files kept in memory for display and later queries.
+_LOADED_FILE_LIMIT = 4
+
+
+class BloomFilter:
+    """
+    A set membership sketch with false positives but no false negatives.
+
+    Values are hashed with BLAKE2b rather than `hash()`, which differs between
+    processes, so filters can be built in worker processes and saved to disk.
+    """
+
+    def __init__(self, bit_count: int, hash_count: int = _BLOOM_HASHES, bits: bytearray | None = None):
+        self.bit_count = bit_count
+        self.hash_count = hash_count
+        self.bits = bits if bits is not None else bytearray((bit_count + 7) // 8)
+
+    @classmethod
+    def from_values(cls, values) -> 'BloomFilter':
+        values = list(values)
+        bloom = cls(max(64, len(values) * _BLOOM_BITS_PER_VALUE))
+        for value in values:
+            bloom.add(value)
+        return bloom
+
+    @staticmethod
+    def hash_pair(value: str) -> tuple[int, int]:
+        """The two hashes a value's bit positions are derived from, in filters of any size."""
+        digest = hashlib.blake2b(value.encode('utf-8'), digest_size=16).digest()
+        return int.from_bytes(digest[:8], 'little'), int.from_bytes(digest[8:], 'little') | 1
+
+    def add_hashed(self, h1: int, h2: int):
+        bits, bit_count = self.bits, self.bit_count
+        for i in range(self.hash_count):
+            position = (h1 + i * h2) % bit_count
+            bits[position >> 3] |= 1 << (position & 7)
+
+    def contains_hashed(self, h1: int, h2: int) -> bool:
+        bits, bit_count = self.bits, self.bit_count
+        for i in range(self.hash_count):
+            position = (h1 + i * h2) % bit_count
+            if not bits[position >> 3] & (1 << (position & 7)):
+                return False
+        return True
+
+    def add(self, value: str):
+        self.add_hashed(*self.hash_pair(value))
+
+    def __contains__(self, value: str) -> bool:
+        return self.contains_hashed(*self.hash_pair(value))
+
+
+class LayeredBloomFilter:
+    """
+    A Bloom filter for a number of values that is not known in advance.
+
+    Values go into the newest layer (a BloomFilter); once it holds as many
+    distinct values as it was sized for, a larger layer is added. A value is
+    contained if any layer contains it.
+    """
+
+    def __init__(self, layers: list[BloomFilter] | None = None):
+        self.layers = layers if layers is not None else []
+        self.capacity = 0
+        self.count = 0
+
+    def _add_layer(self):
+        index = len(self.layers)
+        capacity = _BLOOM_FIRST_CAPACITY << index
+        bits_per_value = _BLOOM_BITS_PER_VALUE + index * _BLOOM_LAYER_EXTRA_BITS
+        # round(bits per value * ln 2) hash functions keep each layer's rate lowest.
+        self.layers.append(BloomFilter(capacity * bits_per_value, round(bits_per_value * 0.693)))
+        self.capacity = capacity
+        self.count = 0
+
+    def add(self, value: str):
+        self.update((value,))
+
+    def update(self, values):
+        """Adds values, skipping any the filter already (possibly falsely) contains."""
+        hash_pair = BloomFilter.hash_pair
+        for value in values:
+            # Each value is hashed once for all layers.
+            h1, h2 = hash_pair(value)
+            for layer in self.layers:
+                if layer.contains_hashed(h1, h2):
+                    break
+            else:
+                if not self.layers or self.count >= self.capacity:
+                    self._add_layer()
+                self.layers[-1].add_hashed(h1, h2)
+                self.count += 1
+
+    def __contains__(self, value: str) -> bool:
+        h1, h2 = BloomFilter.hash_pair(value)
+        return any(layer.contains_hashed(h1, h2) for layer in self.layers)
+
+
+class FileMetadata:
+    """
+    What is known about one CSV file without loading it.
+
+    `rows` counts its records, `time_range` holds the earliest and latest
+    event time in `time_column` (None if no value parses as a time), and
+    `sketches` maps each column to the exact set of its values or, for
+    columns with many distinct values, a LayeredBloomFilter of them.
+    `signature` identifies the file contents the metadata was taken from.
+    """
+
+    def __init__(self, path: str, signature: dict, fieldnames: list[str], rows: int, time_column: str,
+                 time_range: tuple[float, float] | None, sketches: dict):
+        self.path = path
+        self.signature = signature
+        self.fieldnames = fieldnames
+        self.rows = rows
+        self.time_column = time_column
+        self.time_range = time_range
+        self.sketches = sketches
+
+    @classmethod
+    def scan(cls, path: str, time_column: str = DEFAULT_TIME_COLUMN) -> 'FileMetadata':
+        """
+        Reads a whole file to take its metadata.
+
+        Raises:
+            FileNotFoundError: If the file is not found.
+            ValueError: If the file is empty or is not valid CSV.
+        """
+        signature = source_signature(path)
+        try:
+            with open_csv(path) as csvfile:
+                reader = csv.reader(csvfile)
+                fieldnames = next(reader, None)
+                if fieldnames is None:
+                    raise ValueError(f"CSV file at {path} is empty or has no headers.")
+                # Duplicate headers behave like csv.DictReader: the last one wins.
+                positions = {name: pos for pos, name in enumerate(fieldnames)}
+                time_pos = positions.get(time_column)
+                width = len(fieldnames)
+                # Exact sets until they pass _EXACT_VALUE_LIMIT, then Bloom filters,
+                # so only one batch of a high-cardinality column is held at a time.
+                sketches = [set() for _ in range(width)]
+                earliest = latest = None
+                rows = 0
+                records = (row for row in reader if row)
+                while batch := list(islice(records, _SCAN_BATCH_ROWS)):
+                    rows += len(batch)
+                    # Short rows are padded with None, as the loaders do.
+                    batch = [row if len(row) >= width else row + [None] * (width - len(row)) for row in batch]
+                    for pos, column in zip(range(width), zip(*batch)):
+                        values = set(column)
+                        values.discard(None)
+                        if pos == time_pos:
+                            times = [moment for moment in map(parse_event_time, values) if moment is not None]
+                            if times:
+                                earliest = min(times) if earliest is None else min(earliest, min(times))
+                                latest = max(times) if latest is None else max(latest, max(times))
+                        sketch = sketches[pos]
+                        if isinstance(sketch, set):
+                            sketch |= values
+                            if len(sketch) <= _EXACT_VALUE_LIMIT:
+                                continue
+                            values, sketch = sketch, LayeredBloomFilter()
+                            sketches[pos] = sketch
+                        sketch.update(values)
+        except FileNotFoundError:
+            raise FileNotFoundError(f"CSV file not found at {path}")
+        except (csv.Error, UnicodeDecodeError, DecompressionError) as e:
+            raise ValueError(f"Error parsing CSV file at {path}: {e}")
+
+        time_range = (earliest, latest) if earliest is not None else None
+        sketches = {name: frozenset(sketches[pos]) if isinstance(sketches[pos], set) else sketches[pos]
+                    for name, pos in positions.items()}
+        return cls(path, signature, list(positions), rows, time_column, time_range, sketches)
+
+    def may_contain(self, column: str, value: str) -> bool:
+        """Tells whether some row may hold `value` in `column` (never False if one does)."""
+        sketch = self.sketches.get(column)
+        if sketch is None:
+            return False
+        return value in sketch
+
+    def may_match(self, node) -> bool:
+        """
+        Tells whether some row may satisfy a filter expression.
+
+        Equality and IN conditions are checked against the sketches; anything
+        else is assumed to match.
+        """
+        # Filter expressions only exist once query_lang is loaded, so loading a file does not import it.
+        from siem_core.query_lang import And, Condition, Or
+        if isinstance(node, And):
+            return all(self.may_match(child) for child in node.children)
+        if isinstance(node, Or):
+            return any(self.may_match(child) for child in node.children)
+        if isinstance(node, Condition) and node.op == '=':
+            return self.may_contain(node.column, node.value)
+        if isinstance(node, Condition) and node.op == 'in':
+            return any(self.may_contain(node.column, value) for value in node.value)
+        return True
+
+    def may_overlap(self, column: str, earliest: float | None, latest: float | None) -> bool:
+        """Tells whether some row's time in `column` may lie in the window [earliest, latest)."""
+        if column != self.time_column:
+            return True
+        if self.time_range is None:
+            return False
+        first, last = self.time_range
+        return (earliest is None or last >= earliest) and (latest is None or first < latest)
+
+    def save(self, cache_dir: str):
+        """Writes the metadata to a sidecar next to the file's other cache files."""
+        exact, blooms, arrays = {}, {}, []
+        for name, sketch in self.sketches.items():
+            if isinstance(sketch, LayeredBloomFilter):
+                blooms[name] = [[layer.bit_count, layer.hash_count] for layer in sketch.layers]
+                arrays.extend(array('B', layer.bits) for layer in sketch.layers)
+            else:
+                exact[name] = sorted(sketch)
+        header = {'signature': self.signature, 'fieldnames': self.fieldnames, 'rows': self.rows,
+                  'time_column': self.time_column, 'time_range': self.time_range,
+                  'exact': exact, 'bloom_layers': blooms}
+        write_sidecar(sidecar_path(self.path, cache_dir, METADATA_SUFFIX), header, arrays)
+
+    @classmethod
+    def load(cls, path: str, cache_dir: str, time_column: str = DEFAULT_TIME_COLUMN) -> 'FileMetadata | None':
+        """Returns the saved metadata of a file, or None if it is missing or stale."""
+        try:
+            signature = source_signature(path)
+        except OSError:
+            return None
+        sidecar = read_sidecar(sidecar_path(path, cache_dir, METADATA_SUFFIX), signature)
+        if sidecar is None:
+            return None
+        header, arrays = sidecar
+        # Metadata saved before Bloom filters were layered is taken again.
+        if header.get('time_column') != time_column or 'bloom_layers' not in header:
+            return None
+        sketches = {name: frozenset(values) for name, values in header['exact'].items()}
+        arrays = iter(arrays)
+        for name, layers in header['bloom_layers'].items():
+            sketches[name] = LayeredBloomFilter([BloomFilter(bit_count, hash_count, bytearray(next(arrays).tobytes()))
+                                                 for bit_count, hash_count in layers])
+        time_range = tuple(header['time_range']) if header['time_range'] is not None else None
+        return cls(path, signature, header['fieldnames'], header['rows'], time_column, time_range, sketches)
+
+
+def expand_paths(pattern: str) -> list[str]:
+    """
+    Returns the CSV files a `load` argument names, in sorted order.
+
+    A directory stands for the `*.csv` files in it, compressed ones
+    (`*.csv.gz`, `*.csv.bz2`, `*.csv.xz`) included; anything else is a glob
+    pattern (a plain path matches just that file).
+
+    Raises:
+        FileNotFoundError: If nothing matches.
+    """
+    if os.path.isdir(pattern):
+        directory = pattern
+        pattern = os.path.join(directory, '*.csv')
+        candidates = glob.glob(pattern)
+        for suffix in COMPRESSED_SUFFIXES:
+            candidates += glob.glob(os.path.join(directory, '*.csv' + suffix))
+    else:
+        candidates = glob.glob(pattern)
+    paths = sorted(path for path in candidates if os.path.isfile(path))
+    if not paths:
+        raise FileNotFoundError(f"No CSV files match {pattern}")
+    return paths
+
+
+def is_multi_file(path: str) -> bool:
+    """Tells whether a `load` argument is a directory or glob pattern rather than one file."""
+    return os.path.isdir(path) or glob.has_magic(path)
+
+
+def collect_metadata(paths: list[str], time_column: str = DEFAULT_TIME_COLUMN, cache_dir: str | None = None,
+                     workers: int | None = 1) -> tuple[list[FileMetadata], int]:
+    """
+    Returns the metadata of each file, reusing saved metadata of unchanged files.
+
+    Files without valid saved metadata are scanned, in `workers` processes
+    (None uses all CPUs) when there are several, and their metadata is
+    saved to `cache_dir`.
+
+    Returns:
+        The metadata in `paths` order and the number of files scanned.
+
+    Raises:
+        FileNotFoundError: If a file is not found.
+        ValueError: If a file is empty or is not valid CSV.
+    """
+    metadata = {}
+    if cache_dir is not None:
+        for path in paths:
+            saved = FileMetadata.load(path, cache_dir, time_column)
+            if saved is not None:
+                metadata[path] = saved
+    missing = [path for path in paths if path not in metadata]
+    workers = workers or os.cpu_count() or 1
+    if workers > 1 and len(missing) > 1:
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(max_workers=min(workers, len(missing))) as executor:
+            scanned = list(executor.map(FileMetadata.scan, missing, [time_column] * len(missing)))
+    else:
+        scanned = [FileMetadata.scan(path, time_column) for path in missing]
+    for meta in scanned:
+        metadata[meta.path] = meta
+        perf.count(rows_scanned=meta.rows, bytes_read=meta.signature['size'])
+        if cache_dir is not None:
+            try:
+                meta.save(cache_dir)
+            except OSError:
+                pass # Missing metadata only costs a scan on the next load
+    return [metadata[path] for path in paths], len(missing)
+
+
+def _empty_like(column):
+    if column.kind == 'typed':
+        return TypedColumn(column.ctype)
+    return StringColumn() if column.kind == 'string' else DictColumn()
+
+
+def concat_tables(tables: list[ColumnarTable]) -> ColumnarTable:
+    """
+    Returns one table holding the rows of several tables with the same columns, in order.
+
+    A column keeps its encoding when it has the same one in every table, and
+    falls back to dictionary encoding otherwise.
+    """
+    combined = ColumnarTable(tables[0].fieldnames)
+    for name in combined.fieldnames:
+        columns = [table.columns[name] for table in tables]
+        first = columns[0]
+        same = all(column.kind == first.kind and getattr(column, 'ctype', None) == getattr(first, 'ctype', None)
+                   for column in columns)
+        column = _empty_like(first) if same else DictColumn()
+        for part in columns:
+            column.extend(part)
+        combined._replace_column(name, column)
+    combined._num_rows = sum(len(table) for table in tables)
+    return combined.compact()
+
+
+class FileSet:
+    """
+    One logical dataset over many CSV files with the same header.
+
+    Only the metadata of the files (see FileMetadata) is read up front.
+    `candidates` uses it to rule out files that cannot hold rows matching a
+    filter or time window, and `load` reads just the remaining files into
+    one table. Rows can also be read by position (e.g. to display a page),
+    which loads only the files holding them; the most recently loaded files
+    are kept in memory. Files are loaded under a lock, as several threads
+    may read one dataset.
+    """
+
+    def __init__(self, files: list[FileMetadata], load_file, index_budget: int = DEFAULT_INDEX_BUDGET):
+        """
+        Raises:
+            ValueError: If the files do not all have the same header.
+        """
+        self.files = files
+        self.fieldnames = files[0].fieldnames
+        for meta in files:
+            if meta.fieldnames != self.fieldnames:
+                raise ValueError(f"{meta.path} has different columns than {files[0].path}.")
+        self.index_budget = index_budget
+        self._load_file = load_file
+        self._positions = {meta.path: position for position, meta in enumerate(files)}
+        self._starts = []
+        total = 0
+        for meta in files:
+            self._starts.append(total)
+            total += meta.rows
+        self._num_rows = total
+        self._tables = OrderedDict()
+        self._combined = None
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return self._num_rows
+
+    def _table(self, position: int) -> ColumnarTable:
+        path = self.files[position].path
+        with self._lock:
+            table = self._tables.get(path)
+            if table is None:
+                table = self._tables[path] = self._load_file(path)
+                while len(self._tables) > _LOADED_FILE_LIMIT:
+                    self._tables.popitem(last=False)
+            self._tables.move_to_end(path)
+            return table
+
+    def __getitem__(self, row: int):
+        if row < 0:
+            row += self._num_rows
+        if not 0 <= row < self._num_rows:
+            raise IndexError("dataset row index out of range")
+        # Empty files share their start with the next file; bisect_right skips them.
+        position = bisect_right(self._starts, row) - 1
+        return self._table(position)[row - self._starts[position]]
+
+    def __iter__(self):
+        for position in range(len(self.files)):
+            yield from self._table(position)
+
+    def candidates(self, node=None, time_column: str | None = None, earliest: float | None = None,
+                   latest: float | None = None) -> list[FileMetadata]:
+        """Returns the files that may hold rows matching `node` and the time window on `time_column`."""
+        return [meta for meta in self.files
+                if (node is None or meta.may_match(node))
+                and (time_column is None or meta.may_overlap(time_column, earliest, latest))]
+
+    def load(self, files: list[FileMetadata]) -> ColumnarTable:
+        """
+        Returns a table of the rows of the given files.
+
+        A single file's table is returned as loaded (with its indexes); the
+        tables of several files are combined into a new table. The latest
+        combination is kept for reuse.
+        """
+        if not files:
+            return ColumnarTable(self.fieldnames)
+        if len(files) == 1:
+            return self._table(self._positions[files[0].path])
+        key = tuple(meta.path for meta in files)
+        with self._lock:
+            if self._combined is not None and self._combined[0] == key:
+                return self._combined[1]
+            tables = []
+            for path in key:
+                # Files loaded only to be combined are not kept on their own.
+                table = self._tables.get(path)
+                tables.append(table if table is not None else self._load_file(path))
+            combined = concat_tables(tables)
+            combined.indexes = IndexManager(combined, memory_budget=self.index_budget)
+            self._combined = (key, combined)
+            return combined
+
+
+def load_csv_files(pattern: str, index_columns: list[str] | None = None,
+                   index_budget: int = DEFAULT_INDEX_BUDGET, workers: int | None = 1,
+                   cache_dir: str | None = None, column_types: str | dict[str, str] | None = None,
+                   time_column: str | None = None) -> tuple[FileSet, int]:
+    """
+    Opens the CSV files matching a glob pattern or in a directory as one dataset.
+
+    Only the files' metadata is read now (see `collect_metadata`); files are
+    loaded with `load_csv_to_table` and the given options once a query needs
+    them.
+
+    Returns:
+        The dataset and the number of files whose metadata had to be built.
+
+    Raises:
+        FileNotFoundError: If no file matches.
+        ValueError: If a file is not valid CSV or the files' headers differ.
+    """
+    paths = expand_paths(pattern)
+    files, scanned = collect_metadata(paths, time_column or DEFAULT_TIME_COLUMN, cache_dir, workers)
+
+    def load_file(path: str) -> ColumnarTable:
+        return load_csv_to_table(path, index_columns=index_columns, index_budget=index_budget, workers=workers,
+                                 cache_dir=cache_dir, column_types=column_types, time_column=time_column)
+    return FileSet(files, load_file, index_budget), scanned
+
+
+def narrow(data, node=None, time_column: str | None = None, earliest: float | None = None,
+           latest: float | None = None):
+    """
+    Returns `data` itself, or for a FileSet a table of only the files that may match.
+
+    Pass the filter expression and/or time window about to be applied; with
+    neither, all files of a FileSet are loaded.
+    """
+    if not isinstance(data, FileSet):
+        return data
+    with perf.phase('load'):
+        return data.load(data.candidates(node, time_column, earliest, latest))
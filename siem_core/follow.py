@@ -0,0 +1,124 @@
+import csv
+import io
+import locale
+import os
+
+from siem_core import perf
+from siem_core.table import ColumnarTable, DictColumn
+from siem_core.typed import TypedColumn
+
+
+class CSVFollower:
+    """
+    Reads the records appended to a CSV file after a known byte offset.
+
+    `offset` is the position just after the last record already read. Each
+    `read_new` call reads only the bytes appended since then and parses the
+    complete records among them; a record still being written (no final
+    newline yet, or an open quoted field) is left for the next call. The
+    cost of a call therefore depends on the appended bytes, not the size of
+    the file.
+    """
+
+    def __init__(self, file_path: str, offset: int):
+        self.file_path = file_path
+        self.offset = offset
+        self.encoding = locale.getpreferredencoding(False)
+
+    @classmethod
+    def at_end(cls, file_path: str) -> 'CSVFollower':
+        """Returns a follower that reads only what is appended from now on."""
+        return cls(file_path, os.path.getsize(file_path))
+
+    def caught_up(self) -> bool:
+        """Tells whether every complete record of the file has been read."""
+        try:
+            return os.path.getsize(self.file_path) == self.offset
+        except OSError:
+            return False
+
+    def read_new(self) -> list[list[str]]:
+        """
+        Returns the complete records appended since the last call, as lists of fields.
+
+        Raises:
+            FileNotFoundError: If the file no longer exists.
+            ValueError: If the file shrank (it was truncated or replaced), or
+                the appended records are not valid CSV.
+        """
+        size = os.path.getsize(self.file_path)
+        if size < self.offset:
+            raise ValueError(f"{self.file_path} shrank from {self.offset} to {size} bytes; load it again.")
+        if size == self.offset:
+            return []
+        with open(self.file_path, 'rb') as f:
+            f.seek(self.offset)
+            data = f.read(size - self.offset)
+        end = _complete_records_end(data)
+        if end == 0:
+            return []
+        try:
+            with perf.phase('parse'):
+                # Strict parsing rejects malformed records instead of guessing.
+                reader = csv.reader(io.StringIO(data[:end].decode(self.encoding), newline=''), strict=True)
+                rows = [row for row in reader if row]
+        except (csv.Error, UnicodeDecodeError) as e:
+            raise ValueError(f"Error parsing records appended to {self.file_path}: {e}")
+        perf.count(rows_scanned=len(rows), bytes_read=end)
+        self.offset += end
+        return rows
+
+
+def _complete_records_end(data: bytes) -> int:
+    """Returns the length of the longest prefix of `data` made of complete records."""
+    if b'"' not in data:
+        return data.rfind(b'\n') + 1
+    # A newline ends a record only outside quoted fields, i.e. after an even
+    # number of quote characters.
+    end = 0
+    parity = 0
+    cursor = 0
+    while (newline := data.find(b'\n', cursor)) != -1:
+        parity ^= data.count(b'"', cursor, newline) & 1
+        cursor = newline + 1
+        if parity == 0:
+            end = cursor
+    return end
+
+
+def append_rows(table: ColumnarTable, rows) -> range:
+    """
+    Appends parsed records to a loaded table and updates its indexes.
+
+    The new rows are encoded into columns of their own first and then
+    appended column by column. A typed column that cannot store one of the
+    new values is converted back to a dictionary-encoded column (and its
+    indexes are dropped) rather than rejecting the rows.
+
+    Args:
+        table: The table to extend.
+        rows: Records as lists of fields in the table's column order.
+
+    Returns:
+        The row ids of the new rows.
+    """
+    start = len(table)
+    new = ColumnarTable.from_rows(table.fieldnames, rows)
+    if not len(new):
+        return range(start, start)
+    for name, column in list(table.columns.items()):
+        if column.kind != 'typed':
+            continue
+        try:
+            new._replace_column(name, TypedColumn.from_column(new.columns[name], column.ctype))
+        except ValueError:
+            untyped = DictColumn()
+            untyped.extend(column)
+            table._replace_column(name, untyped)
+            if table.indexes is not None:
+                table.indexes.drop(name)
+                table.indexes.time_indexes.pop(name, None)
+    table.extend(new)
+    if table.indexes is not None:
+        table.indexes.extend(start)
+    return range(start, len(table))
@@ -0,0 +1,467 @@
+import sys
+import threading
+from array import array
+from bisect import bisect_left, bisect_right
+from itertools import count
+
+from siem_core.table import ROW_ID_TYPECODE, find_code, intersect_sorted
+from siem_core.time_index import TimeIndex
+
+# Default memory budget for all indexes of one table.
+DEFAULT_INDEX_BUDGET = 256 * 1024 * 1024
+
+# Dictionary columns with at most this many distinct values are indexed with
+# one C-level scan per value instead of one Python-level pass over all rows.
+_SCAN_PER_VALUE_LIMIT = 64
+
+_EMPTY = array(ROW_ID_TYPECODE)
+
+
+class HashIndex:
+    """
+    A value -> row ids hash index over one column.
+
+    Row ids are kept in ascending order in compact arrays, so an equality
+    lookup costs O(matches) once the index is built.
+    """
+
+    def __init__(self, column):
+        self._set_postings(self._build(column))
+
+    @classmethod
+    def from_postings(cls, postings: dict) -> 'HashIndex':
+        """Restores an index from a value -> ascending row ids mapping."""
+        index = cls.__new__(cls)
+        index._set_postings(postings)
+        return index
+
+    def _set_postings(self, postings: dict):
+        self.postings = postings
+        self.nbytes = sys.getsizeof(postings) + sum(
+            sys.getsizeof(value) + sys.getsizeof(row_ids) for value, row_ids in postings.items()
+        )
+
+    @staticmethod
+    def _build(column) -> dict:
+        if column.kind == 'dict':
+            values = column.values
+            if len(values) <= _SCAN_PER_VALUE_LIMIT:
+                return {value: find_code(column.codes, code) for code, value in enumerate(values)}
+            by_code = [array(ROW_ID_TYPECODE) for _ in values]
+            for row_id, code in enumerate(column.codes):
+                by_code[code].append(row_id)
+            return dict(zip(values, by_code))
+
+        postings = {}
+        for row_id in range(len(column)):
+            value = column.get(row_id)
+            row_ids = postings.get(value)
+            if row_ids is None:
+                row_ids = postings[value] = array(ROW_ID_TYPECODE)
+            row_ids.append(row_id)
+        return postings
+
+    def extend(self, column, start: int):
+        """
+        Adds the rows from `start` on, which were appended to `column` after the index was built.
+
+        The postings of the values that occur in the new rows are replaced by
+        longer copies, so arrays returned by `lookup` earlier never change.
+        """
+        if column.kind == 'dict':
+            codes, values = column.codes, column.values
+            new_ids = {}
+            for row_id in range(start, len(codes)):
+                new_ids.setdefault(values[codes[row_id]], []).append(row_id)
+        else:
+            new_ids = {}
+            for row_id in range(start, len(column)):
+                new_ids.setdefault(column.get(row_id), []).append(row_id)
+        postings = self.postings
+        for value, row_ids in new_ids.items():
+            old = postings.get(value)
+            if old is None:
+                self.nbytes += sys.getsizeof(value)
+                old = _EMPTY
+            else:
+                self.nbytes -= sys.getsizeof(old)
+            postings[value] = old + array(ROW_ID_TYPECODE, row_ids)
+            self.nbytes += sys.getsizeof(postings[value])
+
+    def lookup(self, value) -> array:
+        """Returns the ascending row ids holding `value`. The array must not be modified."""
+        return self.postings.get(value, _EMPTY)
+
+    def count(self, value) -> int:
+        return len(self.postings.get(value, _EMPTY))
+
+
+class SortedIndex:
+    """
+    A sorted-array index over one typed column.
+
+    `order` lists the row ids of all non-empty values by ascending value and
+    `keys` holds those values in the same order, so the rows in a value range
+    are found with two binary searches. Equality lookups take the same
+    `lookup`/`count` calls as a HashIndex.
+    """
+
+    def __init__(self, column, order: array | None = None):
+        self.column = column
+        if order is None:
+            values = column.values
+            blanks = column.blanks
+            row_ids = range(len(values))
+            if blanks:
+                row_ids = [row_id for row_id in row_ids if row_id not in blanks]
+            order = array(ROW_ID_TYPECODE, sorted(row_ids, key=values.__getitem__))
+        self._set_order(order)
+
+    def _set_order(self, order: array):
+        values = self.column.values
+        self.order = order
+        self.keys = array(values.typecode, [values[row_id] for row_id in order])
+        self.nbytes = sys.getsizeof(self.order) + sys.getsizeof(self.keys)
+
+    def extend(self, column, start: int):
+        """
+        Adds the rows from `start` on, which were appended to the column after the index was built.
+
+        Rows appended in ascending order of value (as timestamps usually are)
+        are added to the end; otherwise they are merged in with one sort of
+        two sorted runs, which is linear.
+        """
+        values, blanks = column.values, column.blanks
+        new_order = sorted((row_id for row_id in range(start, len(values)) if row_id not in blanks),
+                           key=values.__getitem__)
+        if not new_order:
+            return
+        if not self.keys or values[new_order[0]] >= self.keys[-1]:
+            order = self.order + array(ROW_ID_TYPECODE, new_order)
+            if self.keys.typecode == values.typecode:
+                self.order = order
+                self.keys = self.keys + array(values.typecode, [values[row_id] for row_id in new_order])
+                self.nbytes = sys.getsizeof(self.order) + sys.getsizeof(self.keys)
+                return
+        else:
+            order = array(ROW_ID_TYPECODE, sorted(self.order.tolist() + new_order, key=values.__getitem__))
+        self._set_order(order)
+
+    def _bounds(self, low: int, high: int) -> tuple[int, int]:
+        return bisect_left(self.keys, low), bisect_right(self.keys, high)
+
+    def range(self, intervals) -> array:
+        """Returns the ascending row ids whose value lies in one of the inclusive `(low, high)` intervals."""
+        row_ids = []
+        for low, high in intervals:
+            start, end = self._bounds(low, high)
+            row_ids.extend(self.order[start:end])
+        row_ids.sort()
+        return array(ROW_ID_TYPECODE, row_ids)
+
+    def count_range(self, intervals) -> int:
+        total = 0
+        for low, high in intervals:
+            start, end = self._bounds(low, high)
+            total += end - start
+        return total
+
+    def lookup(self, value) -> array:
+        """Returns the ascending row ids holding `value`."""
+        if value is None or value == '':
+            return self.column.find(value)
+        number = self.column.ctype.parse(value)
+        return _EMPTY if number is None else self.range([(number, number)])
+
+    def count(self, value) -> int:
+        if value is None or value == '':
+            return len(self.column.find(value))
+        number = self.column.ctype.parse(value)
+        return 0 if number is None else self.count_range([(number, number)])
+
+
+def trigrams(text: str) -> set[tuple[int, int, int]]:
+    """Returns the trigrams of `text`: the three-byte sequences of its UTF-8 encoding, as tuples."""
+    data = text.encode('utf-8')
+    return set(zip(data, data[1:], data[2:]))
+
+
+class TrigramIndex:
+    """
+    A trigram -> row ids index over one plain string column.
+
+    Every three-byte sequence of a value's UTF-8 encoding maps to the
+    ascending ids of the rows holding it. A value containing some text
+    holds all of the text's trigrams, so intersecting their postings gives
+    a (usually small) superset of the rows containing it; substring,
+    wildcard and regex conditions only have to check those candidates.
+    """
+
+    def __init__(self, column):
+        self.postings = self._build(column)
+        self._measure()
+
+    @staticmethod
+    def _build(column, start: int = 0) -> dict:
+        postings = {}
+        offsets = column.offsets
+        with memoryview(column.buffer) as buffer:
+            for row_id in range(start, len(column)):
+                value = buffer[offsets[row_id]:offsets[row_id + 1]]
+                for gram in set(zip(value, value[1:], value[2:])):
+                    row_ids = postings.get(gram)
+                    if row_ids is None:
+                        row_ids = postings[gram] = array(ROW_ID_TYPECODE)
+                    row_ids.append(row_id)
+        return postings
+
+    def _measure(self):
+        self.nbytes = sys.getsizeof(self.postings) + sum(
+            sys.getsizeof(gram) + sys.getsizeof(row_ids) for gram, row_ids in self.postings.items()
+        )
+
+    @staticmethod
+    def estimate_nbytes(column) -> int:
+        """Estimates the size of the index of `column` before it is built: a row id per byte of values at most."""
+        return len(column.buffer) * _EMPTY.itemsize
+
+    def extend(self, column, start: int):
+        """
+        Adds the rows from `start` on, which were appended to `column` after the index was built.
+
+        As in HashIndex.extend, postings that grow are replaced by longer
+        copies, so arrays returned by `candidates` earlier never change.
+        """
+        for gram, row_ids in self._build(column, start).items():
+            self.postings[gram] = self.postings.get(gram, _EMPTY) + row_ids
+        self._measure()
+
+    def candidates(self, literals) -> array:
+        """
+        Returns the ascending ids of the rows holding every trigram of every literal.
+
+        Postings are intersected shortest first. The array must not be
+        modified.
+
+        Raises:
+            ValueError: If no literal is three bytes or longer.
+        """
+        grams = set().union(*(trigrams(literal) for literal in literals))
+        if not grams:
+            raise ValueError("A trigram index search needs a literal of at least three bytes.")
+        postings = sorted((self.postings.get(gram, _EMPTY) for gram in grams), key=len)
+        row_ids = postings[0]
+        for other in postings[1:]:
+            if not row_ids:
+                break
+            row_ids = intersect_sorted(row_ids, other)
+        return row_ids
+
+    def max_matches(self, literals) -> int:
+        """Returns the length of the shortest posting of the literals' trigrams, a bound on `candidates`."""
+        return min((len(self.postings.get(gram, _EMPTY)) for literal in literals for gram in trigrams(literal)),
+                   default=0)
+
+
+class IndexManager:
+    """
+    Builds and caches indexes for the columns of one table.
+
+    Typed columns get a SortedIndex, which also answers range queries; all
+    other columns get a HashIndex. An index is built the first time its
+    column is looked up. When the indexes together exceed `memory_budget`
+    bytes, the least-used ones (fewest lookups, then least recently used) are
+    evicted until the rest fit again.
+
+    Time indexes (see `time_index`) count towards the budget but are never
+    evicted; a table rarely has more than one.
+
+    Trigram indexes (see `trigram_index`) are built only for the columns
+    passed to `enable_trigrams`, on their first substring, wildcard or regex
+    search, and are evicted like the other indexes.
+
+    A table can be queried by several threads at once (the clients of a
+    server share loaded tables), so building and evicting indexes is done
+    under a lock; a column's index is built once even if two threads ask
+    for it together.
+    """
+
+    def __init__(self, table, memory_budget: int = DEFAULT_INDEX_BUDGET):
+        self.table = table
+        self.memory_budget = memory_budget
+        self.indexes = {}
+        self.time_indexes = {}
+        self.trigram_indexes = {}
+        # Columns whose searches may build and use a trigram index.
+        self.trigram_columns = set()
+        # Use counts are kept under the column name for an index, and under
+        # (column name, 'trigram') for a trigram index.
+        self._uses = {}
+        self._last_used = {}
+        self._clock = count()
+        self._lock = threading.RLock()
+
+    def get(self, column_name: str) -> HashIndex | SortedIndex | None:
+        """
+        Returns the index for `column_name`, building it if needed.
+
+        Returns None if the table has no such column.
+        """
+        with self._lock:
+            index = self.indexes.get(column_name)
+            if index is None:
+                column = self.table.columns.get(column_name)
+                if column is None:
+                    return None
+                index = SortedIndex(column) if column.kind == 'typed' else HashIndex(column)
+                self.indexes[column_name] = index
+                self._uses[column_name] = 0
+                self._evict(keep=column_name)
+            self._uses[column_name] += 1
+            self._last_used[column_name] = next(self._clock)
+            return index
+
+    def time_index(self, column_name: str) -> TimeIndex | None:
+        """
+        Returns the time index for `column_name`, building it if needed.
+
+        Returns None if the table has no such column.
+        """
+        with self._lock:
+            index = self.time_indexes.get(column_name)
+            if index is None:
+                column = self.table.columns.get(column_name)
+                if column is None:
+                    return None
+                index = self.time_indexes[column_name] = TimeIndex(column)
+                self._evict(keep=None)
+            return index
+
+    def enable_trigrams(self, column_names):
+        """
+        Lets substring, wildcard and regex searches of the given columns build and use trigram indexes.
+
+        Raises:
+            KeyError: If one of the columns does not exist.
+        """
+        for column_name in column_names:
+            if column_name not in self.table.columns:
+                raise KeyError(column_name)
+        with self._lock:
+            self.trigram_columns.update(column_names)
+
+    def trigram_allowed(self, column_name: str) -> bool:
+        """
+        Tells whether `trigram_index` returns an index for `column_name`.
+
+        That takes trigram indexes enabled for the column, a plain string
+        column (a dictionary column is searched one distinct value at a
+        time instead), and an index estimated to fit the memory budget.
+        """
+        if column_name in self.trigram_indexes:
+            return True
+        column = self.table.columns.get(column_name)
+        return (column_name in self.trigram_columns and column is not None and column.kind == 'string'
+                and TrigramIndex.estimate_nbytes(column) <= self.memory_budget)
+
+    def trigram_index(self, column_name: str) -> TrigramIndex | None:
+        """
+        Returns the trigram index for `column_name`, building it if needed.
+
+        Returns None unless `trigram_allowed` says otherwise.
+        """
+        slot = (column_name, 'trigram')
+        with self._lock:
+            index = self.trigram_indexes.get(column_name)
+            if index is None:
+                if not self.trigram_allowed(column_name):
+                    return None
+                index = self.trigram_indexes[column_name] = TrigramIndex(self.table.columns[column_name])
+                self._uses[slot] = 0
+                self._evict(keep=slot)
+            self._uses[slot] += 1
+            self._last_used[slot] = next(self._clock)
+            return index
+
+    def add(self, column_name: str, index: HashIndex | SortedIndex):
+        """Installs an index that was built elsewhere (e.g. restored from a snapshot)."""
+        with self._lock:
+            self.indexes[column_name] = index
+            self._uses.setdefault(column_name, 0)
+            self._evict(keep=column_name)
+
+    def built(self) -> tuple[dict, dict]:
+        """
+        Returns copies of the built indexes and time indexes, by column name.
+
+        The copies are taken under the lock, so they can be iterated over
+        while other threads build or evict indexes.
+        """
+        with self._lock:
+            return dict(self.indexes), dict(self.time_indexes)
+
+    def lookup(self, column_name: str, value) -> array | None:
+        """Returns the row ids where `column_name` equals `value`, or None for an unknown column."""
+        index = self.get(column_name)
+        if index is None:
+            return None
+        return index.lookup(value)
+
+    def build(self, column_names):
+        """
+        Builds indexes for the given columns up front.
+
+        Raises:
+            KeyError: If one of the columns does not exist.
+        """
+        for column_name in column_names:
+            if column_name not in self.table.columns:
+                raise KeyError(column_name)
+            self.get(column_name)
+
+    def drop(self, column_name: str):
+        """Drops the index and the trigram index of `column_name`."""
+        with self._lock:
+            self._discard(column_name)
+            self._discard((column_name, 'trigram'))
+
+    def _discard(self, slot):
+        if isinstance(slot, tuple):
+            self.trigram_indexes.pop(slot[0], None)
+        else:
+            self.indexes.pop(slot, None)
+        self._uses.pop(slot, None)
+        self._last_used.pop(slot, None)
+
+    def extend(self, start: int):
+        """Updates the built indexes (time and trigram indexes too) for rows appended to the table from row `start` on."""
+        with self._lock:
+            for name, index in self.indexes.items():
+                index.extend(self.table.columns[name], start)
+            for name, index in self.time_indexes.items():
+                index.extend(self.table.columns[name], start)
+            for name, index in self.trigram_indexes.items():
+                index.extend(self.table.columns[name], start)
+            self._evict(keep=None)
+
+    @property
+    def nbytes(self) -> int:
+        return (sum(index.nbytes for index in self.indexes.values())
+                + sum(index.nbytes for index in self.time_indexes.values())
+                + sum(index.nbytes for index in self.trigram_indexes.values()))
+
+    def _evict(self, keep):
+        while self.nbytes > self.memory_budget and len(self._uses) > 1:
+            victim = min(
+                (slot for slot in self._uses if slot != keep),
+                key=lambda slot: (self._uses[slot], self._last_used.get(slot, -1)),
+            )
+            self._discard(victim)
+
+    def memory_usage(self) -> dict[str, int]:
+        """Returns the approximate number of bytes used by each built index."""
+        with self._lock:
+            usage = {name: index.nbytes for name, index in self.indexes.items()}
+            usage.update((f"{name} (time)", index.nbytes) for name, index in self.time_indexes.items())
+            usage.update((f"{name} (trigram)", index.nbytes) for name, index in self.trigram_indexes.items())
+            return usage
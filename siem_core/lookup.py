@@ -0,0 +1,316 @@
+import csv
+import marshal
+import math
+import os
+import tempfile
+from array import array
+from operator import itemgetter
+
+from siem_core import perf
+from siem_core.compressed import DecompressionError, detect_compression, open_csv
+from siem_core.index import DEFAULT_INDEX_BUDGET, IndexManager
+from siem_core.sidecar import source_signature
+from siem_core.table import ColumnarTable, DictColumn, TableView
+
+# Memory budget for one lookup hash table, and for the built tables a session keeps.
+DEFAULT_LOOKUP_BUDGET = 64 * 1024 * 1024
+# A hash table of lookup rows takes about this many bytes per byte of CSV it holds
+# (key and value strings, value tuples and dictionary slots).
+_MEMORY_PER_FILE_BYTE = 6
+# Characters read from the start of a lookup file to estimate the length of its rows.
+_SAMPLE_BYTES = 65536
+# A compressed lookup file is assumed to hold this many times its size in CSV.
+_COMPRESSION_RATIO = 10
+# Spilled rows are written to their partition in batches of this many.
+_SPILL_BATCH_ROWS = 10000
+# Partitioned tables use at most this many spill files.
+_MAX_PARTITIONS = 256
+
+
+class LookupTable:
+    """
+    The rows of a lookup CSV file, hashed on its key column.
+
+    Each key maps to the tuple of output values of the first row with that
+    key. A table that fits its memory budget is a single dictionary. A larger
+    one is split by key hash into partitions spilled to temporary files,
+    which `partition` reads back one at a time (a grace hash join); the
+    files are removed when the table is garbage collected. A table built for
+    only some keys (`restricted`) holds just the rows with those keys.
+    """
+
+    def __init__(self, path: str, signature: dict, key: str, output: list[str], partitions: list,
+                 row_nbytes: float, spill_dir: tempfile.TemporaryDirectory | None = None,
+                 restricted: bool = False):
+        self.path = path
+        self.signature = signature
+        self.key = key
+        self.output = output
+        # Dictionaries, or the paths of spilled partitions.
+        self.partitions = partitions
+        self.restricted = restricted
+        self._spill_dir = spill_dir
+        # What the table costs in memory; spilled partitions only cost while one is read.
+        self.nbytes = int(row_nbytes * sum(map(len, partitions))) if spill_dir is None else 0
+
+    @property
+    def spilled(self) -> bool:
+        return self._spill_dir is not None
+
+    def partition(self, number: int) -> dict:
+        """Returns the hash table of one partition, reading it back from disk if it was spilled."""
+        part = self.partitions[number]
+        if not self.spilled:
+            return part
+        table = {}
+        with open(part, 'rb') as f:
+            while True:
+                try:
+                    batch = marshal.load(f)
+                except EOFError:
+                    break
+                for key, values in batch:
+                    # Rows were spilled in file order, so the first one still wins.
+                    table.setdefault(key, values)
+        perf.count(bytes_read=os.path.getsize(part))
+        return table
+
+
+def _row_values(positions: list[int]):
+    """Returns a function picking the values at `positions` out of a row, as a tuple."""
+    if len(positions) == 1:
+        position = positions[0]
+        return lambda row: (row[position],)
+    if not positions:
+        return lambda row: ()
+    return itemgetter(*positions)
+
+
+def _average_row_bytes(path: str) -> float:
+    with open_csv(path) as f:
+        sample = f.read(_SAMPLE_BYTES)
+    return len(sample) / max(sample.count('\n'), 1)
+
+
+def build_lookup(path: str, key: str, output: list[str] | None = None,
+                 memory_budget: int = DEFAULT_LOOKUP_BUDGET, keys=None) -> LookupTable:
+    """
+    Reads a lookup CSV file into a hash table on its `key` column.
+
+    The table's size is estimated from the file size first (compressed
+    files are assumed to expand `_COMPRESSION_RATIO` times). If the whole
+    file does not fit `memory_budget` but the rows with one of `keys` (the
+    distinct keys of the rows to enrich, if given) would, the hash table is
+    built on that smaller side: only those rows are kept while the file is
+    read. Otherwise the rows are partitioned by key hash into spill files,
+    each of which fits the budget.
+
+    Args:
+        path: The lookup CSV file.
+        key: The column to match on.
+        output: The columns to return; None returns all other columns.
+        memory_budget: Bytes the hash table may take in memory.
+        keys: The keys that will be looked up, or None if unknown.
+
+    Raises:
+        FileNotFoundError: If the file is not found.
+        ValueError: If the file is empty or not valid CSV, or the key or an
+            output column does not exist.
+    """
+    try:
+        signature = source_signature(path)
+        csvfile = open_csv(path)
+    except FileNotFoundError:
+        raise FileNotFoundError(f"CSV file not found at {path}")
+    with csvfile, perf.phase('load'):
+        reader = csv.reader(csvfile)
+        try:
+            fieldnames = next(reader, None)
+        except (csv.Error, UnicodeDecodeError, DecompressionError) as e:
+            raise ValueError(f"Error parsing CSV file at {path}: {e}")
+        if fieldnames is None:
+            raise ValueError(f"CSV file at {path} is empty or has no headers.")
+        positions = {name: pos for pos, name in enumerate(fieldnames)}
+        if key not in positions:
+            raise ValueError(f"Column '{key}' not found in {path}.")
+        output = [name for name in positions if name != key] if output is None else list(output)
+        missing = [name for name in output if name not in positions]
+        if missing:
+            raise ValueError(f"Column(s) {', '.join(missing)} not found in {path}.")
+
+        row_bytes = _average_row_bytes(path)
+        row_nbytes = row_bytes * _MEMORY_PER_FILE_BYTE * (len(output) + 1) / len(fieldnames)
+        csv_bytes = signature['size'] * (_COMPRESSION_RATIO if detect_compression(path) else 1)
+        file_rows = csv_bytes / row_bytes
+        restricted = file_rows * row_nbytes > memory_budget and keys is not None
+        if restricted:
+            keys = set(keys)
+        estimate = min(file_rows, len(keys)) * row_nbytes if restricted else file_rows * row_nbytes
+        partition_count = 1
+        if estimate > memory_budget:
+            restricted = False
+            # Twice as many partitions as needed, so uneven ones still fit.
+            partition_count = min(2 * math.ceil(estimate / memory_budget), _MAX_PARTITIONS)
+
+        width = len(fieldnames)
+        key_position = positions[key]
+        values_of = _row_values([positions[name] for name in output])
+
+        def rows():
+            scanned = 0
+            try:
+                for row in reader:
+                    if not row:
+                        continue
+                    scanned += 1
+                    if len(row) < width:
+                        row = row + [None] * (width - len(row))
+                    row_key = row[key_position]
+                    if row_key is not None and (not restricted or row_key in keys):
+                        yield row_key, values_of(row)
+            except (csv.Error, UnicodeDecodeError, DecompressionError) as e:
+                raise ValueError(f"Error parsing CSV file at {path}: {e}")
+            perf.count(rows_scanned=scanned, bytes_read=signature['size'])
+
+        if partition_count == 1:
+            table = {}
+            for row_key, values in rows():
+                table.setdefault(row_key, values)
+            return LookupTable(path, signature, key, output, [table], row_nbytes, restricted=restricted)
+
+        spill_dir = tempfile.TemporaryDirectory(prefix='siem-lookup-')
+        paths = [os.path.join(spill_dir.name, f'{number}.part') for number in range(partition_count)]
+        files = [open(part, 'wb') for part in paths]
+        try:
+            buffers = [[] for _ in paths]
+            for row_key, values in rows():
+                number = hash(row_key) % partition_count
+                buffer = buffers[number]
+                buffer.append((row_key, values))
+                if len(buffer) >= _SPILL_BATCH_ROWS:
+                    marshal.dump(buffer, files[number])
+                    buffer.clear()
+            for buffer, f in zip(buffers, files):
+                if buffer:
+                    marshal.dump(buffer, f)
+        finally:
+            for f in files:
+                f.close()
+        return LookupTable(path, signature, key, output, paths, row_nbytes, spill_dir)
+
+
+def _as_table(data) -> ColumnarTable:
+    """Copies the rows of `data` into a new table that columns can be added to."""
+    if isinstance(data, TableView):
+        return data.materialize()
+    if isinstance(data, ColumnarTable):
+        return data.take(range(len(data)))
+    return ColumnarTable.from_dicts(data)
+
+
+def _probe_keys(column) -> tuple[array, list]:
+    """Returns, for each row of `column`, a code into the returned list of distinct values."""
+    # Columns taken from a larger table share its dictionary, which may hold values no row uses.
+    if column.kind == 'dict' and column.cardinality <= len(column):
+        return column.codes, column.values
+    ids = {}
+    get = column.get
+    codes = array('l', [ids.setdefault(get(row_id), len(ids)) for row_id in range(len(column))])
+    return codes, list(ids)
+
+
+def join_lookup(table: ColumnarTable, column_name: str, lookup: LookupTable) -> int:
+    """
+    Adds the lookup's output columns to `table`, matching `column_name` against its key.
+
+    Every row is kept. Rows without a match get None in new columns; in
+    output columns the table already has, they keep their values.
+
+    Returns:
+        The number of rows that matched.
+    """
+    codes, distinct = _probe_keys(table.columns[column_name])
+    partition_count = len(lookup.partitions)
+    if partition_count == 1:
+        buckets = [range(len(distinct))]
+    else:
+        buckets = [[] for _ in range(partition_count)]
+        for code, value in enumerate(distinct):
+            if value is not None:
+                buckets[hash(value) % partition_count].append(code)
+    # For each distinct key, its position in `matched` or -1.
+    match_of_key = array('l', [-1]) * len(distinct)
+    matched = []
+    for number, bucket in enumerate(buckets):
+        if not bucket:
+            continue
+        part = lookup.partition(number)
+        for code in bucket:
+            values = part.get(distinct[code])
+            if values is not None:
+                match_of_key[code] = len(matched)
+                matched.append(values)
+    matches = array('l', map(match_of_key.__getitem__, codes))
+    perf.count(rows_scanned=len(table))
+
+    for position, name in enumerate(lookup.output):
+        dictionary = DictColumn()
+        for values in matched:
+            dictionary.append(values[position])
+        # Position -1 picks the last code, which stands for no match.
+        dictionary.append(None)
+        by_match = dictionary.codes
+        column = DictColumn(dictionary.values, array(by_match.typecode, map(by_match.__getitem__, matches)))
+        old = table.columns.get(name)
+        if old is not None and name != column_name:
+            merged = DictColumn()
+            for row_id, match in enumerate(matches):
+                merged.append(column.get(row_id) if match >= 0 else old.get(row_id))
+            column = merged
+        if name != column_name:
+            table.add_column(name, column)
+    return len(matches) - matches.count(-1)
+
+
+def enrich(data, path: str, key: str, output: list[str] | None = None, column: str | None = None,
+           memory_budget: int = DEFAULT_LOOKUP_BUDGET, cache=None, index_budget: int = DEFAULT_INDEX_BUDGET):
+    """
+    Joins the rows of `data` with a lookup CSV file on a key.
+
+    The lookup's hash table is taken from `cache` (a ResultCache) while the
+    file is unchanged; tables built for all keys are put there for the next
+    lookup. Spilled tables cost the cache nothing but keep their files.
+
+    Args:
+        data: The rows to enrich: a ColumnarTable, TableView, MappedCSV or list of dictionaries.
+        path: The lookup CSV file.
+        key: The lookup file's key column.
+        output: The lookup columns to add; None adds all other columns.
+        column: The column of `data` matched against the key; defaults to `key`.
+        memory_budget: Bytes the lookup's hash table may take (see `build_lookup`).
+        cache: A ResultCache of built lookup tables, or None.
+        index_budget: Memory budget in bytes for the indexes of the result.
+
+    Returns:
+        A tuple of (a new table with the rows of `data` and the output
+        columns, the LookupTable used, the number of rows that matched, and
+        whether the table came from the cache).
+
+    Raises:
+        FileNotFoundError: If the lookup file is not found.
+        ValueError: If the lookup file is invalid, or a column does not exist.
+    """
+    column = column or key
+    table = _as_table(data)
+    if column not in table.columns:
+        raise ValueError(f"Column '{column}' not found in the current data.")
+    cache_key = (os.path.abspath(path), key, None if output is None else tuple(output))
+    lookup = cache.get(cache_key) if cache is not None else None
+    cached = lookup is not None and lookup.signature == source_signature(path)
+    if not cached:
+        lookup = build_lookup(path, key, output, memory_budget, keys=_probe_keys(table.columns[column])[1])
+        if cache is not None and not lookup.restricted:
+            cache.put(cache_key, lookup, lookup.nbytes)
+    matched = join_lookup(table, column, lookup)
+    table.indexes = IndexManager(table, memory_budget=index_budget)
+    return table, lookup, matched, cached
@@ -0,0 +1,251 @@
+import csv
+import io
+import locale
+import mmap
+from array import array
+from bisect import bisect_right
+
+from siem_core import perf
+from siem_core.compressed import detect_compression
+from siem_core.sidecar import read_sidecar, sidecar_path, source_signature, write_sidecar
+from siem_core.table import ROW_ID_TYPECODE, Row
+
+# Marks a row whose fields cannot be located by offsets (quoted fields or an
+# unexpected number of fields); such rows are parsed with the csv module.
+_NO_OFFSETS = 0xFFFFFFFF
+
+
+class MappedCSV:
+    """
+    A CSV file accessed through a read-only memory map.
+
+    Opening the file only builds an index of record start offsets (and,
+    optionally, of field offsets within each record); field values are decoded
+    when they are read. The mapped pages belong to the OS page cache, so
+    several processes mapping the same file share them, and resident memory
+    stays close to the size of the offset index.
+
+    Like ColumnarTable, the object yields dict-like `Row` views, so it can be
+    passed to `query_data` and `display_data`. Records are expected to end in
+    '\\n' or '\\r\\n'.
+    """
+
+    def __init__(self, file_path: str, field_offsets: bool = False, cache_dir: str | None = None):
+        """
+        Maps a CSV file and indexes its records.
+
+        Args:
+            file_path: The path to the CSV file.
+            field_offsets: Also index the offset of every field, so single
+                fields can be decoded without splitting the whole record.
+            cache_dir: If given, the offset indexes are saved to (and reused
+                from) a sidecar file in this directory while the CSV file is
+                unchanged, which makes reopening a large file almost instant.
+
+        Raises:
+            FileNotFoundError: If the CSV file is not found.
+            ValueError: If the CSV file is empty, has no headers or is compressed.
+        """
+        signature = source_signature(file_path)
+        if detect_compression(file_path):
+            raise ValueError("compressed files cannot be memory-mapped; load it without --mmap")
+        self.file_path = file_path
+        self._encoding = locale.getpreferredencoding(False)
+        if signature['size'] == 0:
+            raise ValueError(f"CSV file at {file_path} is empty or has no headers.")
+        with open(file_path, 'rb') as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._quoted = self._mm.find(b'"') != -1
+
+        header_end = self._record_end(0)
+        header = self._parse(0, header_end)
+        if not header:
+            raise ValueError(f"CSV file at {file_path} is empty or has no headers.")
+        # Duplicate headers behave like csv.DictReader: the last one wins.
+        self.columns = {name: pos for pos, name in enumerate(header)}
+        self.fieldnames = list(self.columns)
+        self._width = len(header)
+        self._cached_row = (-1, None)
+
+        cached = None
+        if cache_dir is not None:
+            index_path = sidecar_path(file_path, cache_dir, '.rows')
+            cached = read_sidecar(index_path, signature)
+            if cached is not None and field_offsets and len(cached[1]) < 2:
+                cached = None
+        if cached is not None:
+            self._starts = cached[1][0]
+            self._offsets = cached[1][1] if field_offsets else None
+        else:
+            self._starts = self._index_records(header_end)
+            self._offsets = self._index_fields() if field_offsets else None
+            perf.count(bytes_read=signature['size'])
+            if cache_dir is not None:
+                arrays = [self._starts] + ([self._offsets] if field_offsets else [])
+                write_sidecar(index_path, {'signature': signature}, arrays)
+
+    def _derive(self, starts: array, offsets: array | None) -> 'MappedCSV':
+        view = MappedCSV.__new__(MappedCSV)
+        view.__dict__.update(self.__dict__)
+        view._starts = starts
+        view._offsets = offsets
+        view._cached_row = (-1, None)
+        return view
+
+    def _record_end(self, start: int) -> int:
+        """Returns the offset just past the record starting at `start`."""
+        mm = self._mm
+        if not self._quoted:
+            newline = mm.find(b'\n', start)
+            return len(mm) if newline == -1 else newline + 1
+        parity = 0
+        cursor = start
+        while True:
+            newline = mm.find(b'\n', cursor)
+            if newline == -1:
+                return len(mm)
+            parity ^= mm[cursor:newline].count(b'"') & 1
+            cursor = newline + 1
+            if parity == 0:
+                return cursor
+
+    def _index_records(self, start: int) -> array:
+        starts = array('Q')
+        size = len(self._mm)
+        mm = self._mm
+        pos = start
+        while pos < size:
+            end = self._record_end(pos)
+            # Blank lines are skipped, as csv.DictReader does.
+            if end - pos > 2 or mm[pos:end].strip(b'\r\n'):
+                starts.append(pos)
+            pos = end
+        return starts
+
+    def _index_fields(self) -> array:
+        """Builds a flat array of `width + 1` field start offsets per record."""
+        offsets = array('I')
+        for start in self._starts:
+            raw = self._content(start)
+            if b'"' in raw or raw.count(b',') != self._width - 1:
+                offsets.append(_NO_OFFSETS)
+                offsets.extend([0] * self._width)
+                continue
+            pos = 0
+            offsets.append(0)
+            for field in raw.split(b','):
+                pos += len(field) + 1
+                offsets.append(pos)
+        return offsets
+
+    def _content(self, start: int) -> bytes:
+        """Returns the raw bytes of the record at `start`, without its line terminator."""
+        raw = self._mm[start:self._record_end(start)]
+        if raw.endswith(b'\r\n'):
+            return raw[:-2]
+        if raw.endswith(b'\n'):
+            return raw[:-1]
+        return raw
+
+    def _parse(self, start: int, end: int) -> list[str]:
+        text = self._mm[start:end].decode(self._encoding)
+        return next(csv.reader(io.StringIO(text, newline='')), [])
+
+    def _fields(self, row_id: int) -> list[str]:
+        cached_id, fields = self._cached_row
+        if cached_id == row_id:
+            return fields
+        start = self._starts[row_id]
+        raw = self._content(start)
+        if b'"' in raw:
+            fields = self._parse(start, self._record_end(start))
+        else:
+            fields = raw.decode(self._encoding).split(',')
+        self._cached_row = (row_id, fields)
+        return fields
+
+    def __len__(self) -> int:
+        return len(self._starts)
+
+    def __getitem__(self, row_id: int) -> Row:
+        if row_id < 0:
+            row_id += len(self._starts)
+        if not 0 <= row_id < len(self._starts):
+            raise IndexError("mapped CSV row index out of range")
+        return Row(self, row_id)
+
+    def __iter__(self):
+        for row_id in range(len(self._starts)):
+            yield Row(self, row_id)
+
+    def value(self, row_id: int, column_name: str):
+        """Decodes a single field; short rows yield None, as with csv.DictReader."""
+        pos = self.columns[column_name]
+        offsets = self._offsets
+        if offsets is not None:
+            base = row_id * (self._width + 1)
+            if offsets[base] != _NO_OFFSETS:
+                start = self._starts[row_id]
+                return self._mm[start + offsets[base + pos]:start + offsets[base + pos + 1] - 1].decode(self._encoding)
+        fields = self._fields(row_id)
+        return fields[pos] if pos < len(fields) else None
+
+    def find(self, column_name: str, value: str) -> array:
+        """
+        Returns the row ids where `column_name` equals `value`.
+
+        Occurrences of the encoded value are located in the mapped file with
+        `mmap.find`, and only the records containing one are decoded and
+        checked. The search then skips to the next record, so each record is
+        checked at most once.
+        """
+        matches = array(ROW_ID_TYPECODE)
+        if column_name not in self.columns or not self._starts:
+            return matches
+        if not value:
+            for row_id in range(len(self._starts)):
+                if self.value(row_id, column_name) == value:
+                    matches.append(row_id)
+            return matches
+        # Quotes inside a quoted field are doubled in the file.
+        needle = value.replace('"', '""').encode(self._encoding)
+        starts = self._starts
+        last = len(starts) - 1
+        mm = self._mm
+        pos = mm.find(needle, starts[0])
+        while pos != -1:
+            row_id = bisect_right(starts, pos) - 1
+            if self.value(row_id, column_name) == value:
+                matches.append(row_id)
+            if row_id >= last:
+                break
+            pos = mm.find(needle, starts[row_id + 1])
+        return matches
+
+    def take(self, row_ids) -> 'MappedCSV':
+        """Returns a view of the given rows over the same mapping."""
+        row_ids = list(row_ids)
+        starts = array('Q', [self._starts[row_id] for row_id in row_ids])
+        offsets = None
+        if self._offsets is not None:
+            stride = self._width + 1
+            offsets = array('I')
+            for row_id in row_ids:
+                offsets.extend(self._offsets[row_id * stride:(row_id + 1) * stride])
+        return self._derive(starts, offsets)
+
+    def to_dicts(self) -> list[dict]:
+        """Materializes the rows as a list of plain dictionaries."""
+        return [dict(row) for row in self]
+
+    @property
+    def index_nbytes(self) -> int:
+        """Number of bytes held by the offset indexes."""
+        size = len(self._starts) * self._starts.itemsize
+        if self._offsets is not None:
+            size += len(self._offsets) * self._offsets.itemsize
+        return size
+
+    def close(self):
+        """Unmaps the file. Views created with `take` become unusable."""
+        self._mm.close()
@@ -0,0 +1,219 @@
+import csv
+import io
+import locale
+import os
+
+from siem_core.compressed import detect_compression
+from siem_core.stream import row_to_dict
+from siem_core.table import ColumnarTable
+
+# Files smaller than this are parsed in the calling process; starting a
+# process pool costs more than it saves.
+DEFAULT_MIN_PARALLEL_BYTES = 8 * 1024 * 1024
+
+_SCAN_BLOCK_SIZE = 4 * 1024 * 1024
+
+
+def find_record_starts(file_path: str, offsets: list[int]) -> list[int]:
+    """
+    Finds the first record boundary at or after each of the given byte offsets.
+
+    A record boundary is the position just after a newline that is not inside
+    a quoted field. Whether a position is inside quotes follows from the
+    parity of the quote characters before it, which is counted block by block
+    with `bytes.count`, so the scan runs at close to disk speed. This assumes
+    quote characters only appear as RFC 4180 quoting; `parse_parallel`
+    verifies that assumption while parsing.
+
+    Args:
+        file_path: The path to the CSV file.
+        offsets: Byte offsets in ascending order.
+
+    Returns:
+        The boundaries found, in ascending order. Offsets past the last
+        boundary of the file produce no entry.
+    """
+    starts = []
+    pending = list(offsets)
+    next_offset = 0
+    parity = 0
+    block_start = 0
+    with open(file_path, 'rb') as f:
+        while next_offset < len(pending):
+            block = f.read(_SCAN_BLOCK_SIZE)
+            if not block:
+                break
+            cursor = 0 # Position in the block up to which quotes are counted
+            while next_offset < len(pending):
+                target = pending[next_offset] - block_start
+                if starts:
+                    target = max(target, starts[-1] - block_start)
+                if target >= len(block):
+                    break
+                if target > cursor:
+                    parity ^= block.count(b'"', cursor, target) & 1
+                    cursor = target
+                boundary = -1
+                while True:
+                    newline = block.find(b'\n', cursor)
+                    if newline == -1:
+                        break
+                    parity ^= block.count(b'"', cursor, newline) & 1
+                    cursor = newline + 1
+                    if parity == 0:
+                        boundary = cursor
+                        break
+                if boundary == -1:
+                    # Keep searching from the start of the next block.
+                    pending[next_offset] = block_start + len(block)
+                    break
+                starts.append(block_start + boundary)
+                next_offset += 1
+            parity ^= block.count(b'"', cursor) & 1
+            block_start += len(block)
+    return starts
+
+
+def find_records_end(file_path: str) -> int:
+    """
+    Returns the offset just after the last complete record of a CSV file.
+
+    A file that is still being written may end with part of a record: no
+    final newline yet, or an open quoted field. Like `find_record_starts`,
+    this counts quote characters block by block to know the parity at the
+    end of the file, then walks back over the last newlines until one lies
+    outside quotes. Bytes appended while the file is scanned are ignored.
+
+    Raises:
+        FileNotFoundError: If the CSV file is not found.
+    """
+    with open(file_path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        quotes = 0
+        while block := f.read(min(_SCAN_BLOCK_SIZE, size - f.tell())):
+            quotes += block.count(b'"')
+        block_end = size
+        while block_end > 0:
+            block_start = max(0, block_end - _SCAN_BLOCK_SIZE)
+            f.seek(block_start)
+            block = f.read(block_end - block_start)
+            cursor = len(block)
+            while (newline := block.rfind(b'\n', 0, cursor)) != -1:
+                # `quotes` is now the count before `cursor`, so this newline
+                # is outside quotes if the count before it is even.
+                quotes -= block.count(b'"', newline, cursor)
+                if quotes & 1 == 0:
+                    return block_start + newline + 1
+                cursor = newline
+            quotes -= block.count(b'"', 0, cursor)
+            block_end = block_start
+    return 0
+
+
+def plan_chunks(file_path: str, chunk_count: int,
+                size: int | None = None) -> tuple[int, list[tuple[int, int]]]:
+    """
+    Splits a CSV file into byte ranges that each hold whole records.
+
+    Args:
+        file_path: The path to the CSV file.
+        chunk_count: The desired number of chunks.
+        size: Split only the first `size` bytes; None splits the whole file.
+
+    Returns:
+        A tuple of (end offset of the header record, list of (start, end)
+        ranges covering the data records in file order). The header end is
+        -1 if the file holds no complete header record.
+    """
+    if size is None:
+        size = os.path.getsize(file_path)
+    offsets = [0] + [size * i // chunk_count for i in range(1, chunk_count)]
+    starts = find_record_starts(file_path, offsets)
+    if not starts:
+        return -1, []
+    header_end = starts[0]
+    bounds = sorted(set(starts)) + [size]
+    ranges = [(start, end) for start, end in zip(bounds, bounds[1:]) if start < end]
+    return header_end, ranges
+
+
+def _parse_range(file_path: str, encoding: str, fieldnames: list[str], start: int, end: int,
+                 as_table: bool) -> list[list[str]] | ColumnarTable:
+    """Worker: parses the records in one byte range of the file."""
+    with open(file_path, 'rb') as f:
+        f.seek(start)
+        text = f.read(end - start).decode(encoding)
+    # Strict parsing makes a chunk that ends inside a quoted field fail loudly
+    # instead of silently producing different rows than a sequential parse.
+    reader = csv.reader(io.StringIO(text, newline=''), strict=True)
+    rows = [row for row in reader if row]
+    if as_table:
+        return ColumnarTable.from_rows(fieldnames, rows)
+    return rows
+
+
+def parse_parallel(file_path: str, workers: int | None = None,
+                   min_parallel_bytes: int = DEFAULT_MIN_PARALLEL_BYTES,
+                   as_table: bool = False, end: int | None = None) -> list[dict] | ColumnarTable | None:
+    """
+    Parses a CSV file in worker processes, one byte range per worker.
+
+    The results are merged in file order and are identical to what the
+    sequential loaders produce. When parallel parsing is not worthwhile or
+    not safe (small file, a single worker, a compressed file, a single
+    chunk, or a chunk that does not parse cleanly on its own), None is returned and the caller is
+    expected to load the file sequentially.
+
+    Args:
+        file_path: The path to the CSV file.
+        workers: Number of worker processes; None uses all CPUs.
+        min_parallel_bytes: Files smaller than this are not split.
+        as_table: Return a ColumnarTable instead of a list of dictionaries.
+        end: Parse only the records in the first `end` bytes; None parses
+            the whole file.
+
+    Returns:
+        The parsed rows, or None if the file should be loaded sequentially.
+
+    Raises:
+        FileNotFoundError: If the CSV file is not found.
+    """
+    workers = workers or os.cpu_count() or 1
+    size = os.path.getsize(file_path) if end is None else end
+    if workers < 2 or size < min_parallel_bytes or detect_compression(file_path):
+        return None
+
+    header_end, ranges = plan_chunks(file_path, workers, size)
+    if len(ranges) < 2:
+        return None
+
+    encoding = locale.getpreferredencoding(False)
+    with open(file_path, 'rb') as f:
+        header = f.read(header_end)
+    try:
+        fieldnames = next(csv.reader(io.StringIO(header.decode(encoding), newline='')), None)
+    except (csv.Error, UnicodeDecodeError):
+        return None
+    if not fieldnames:
+        return None
+
+    # Imported here, so callers that never parse in parallel start faster.
+    from concurrent.futures import ProcessPoolExecutor
+    with ProcessPoolExecutor(max_workers=min(workers, len(ranges))) as executor:
+        futures = [
+            executor.submit(_parse_range, file_path, encoding, fieldnames, start, end, as_table)
+            for start, end in ranges
+        ]
+        try:
+            chunks = [future.result() for future in futures]
+        except (csv.Error, UnicodeDecodeError):
+            return None
+
+    if as_table:
+        table = chunks[0]
+        for chunk in chunks[1:]:
+            table.extend(chunk)
+        return table.compact()
+
+    width = len(fieldnames)
+    return [row_to_dict(fieldnames, row, width) for rows in chunks for row in rows]
@@ -0,0 +1,326 @@
+import atexit
+import json
+import math
+import os
+import struct
+from array import array
+from multiprocessing.shared_memory import SharedMemory
+
+from siem_core import perf
+from siem_core.query_lang import table_row_test
+from siem_core.stats import merge_stats, stats
+from siem_core.table import ROW_ID_TYPECODE, ColumnarTable, DictColumn, StringColumn, TableView
+from siem_core.typed import TypedColumn, candidate_types
+
+# Scans of fewer rows run in the calling process: sending the work to the
+# pool and merging the results costs more than it saves.
+DEFAULT_PARALLEL_MIN_ROWS = 100_000
+# Each worker gets about this many row ranges per filter scan, so one slow
+# range does not leave the other workers idle. `stats` gives each worker one
+# range, as it converts every distinct value of a column once per range.
+_PARTITIONS_PER_WORKER = 4
+# Compiled filters each worker keeps for the table it has mapped.
+_CACHED_FILTERS = 32
+# Arrays in a shared segment start at multiples of this many bytes.
+_ALIGNMENT = 8
+_LENGTH = struct.Struct('<Q')
+_ROW_ID_SIZE = array(ROW_ID_TYPECODE).itemsize
+
+
+def _aligned(size: int) -> int:
+    return -(-size // _ALIGNMENT) * _ALIGNMENT
+
+
+class SharedTable:
+    """
+    A copy of a ColumnarTable's columns in one shared memory segment.
+
+    The segment starts with a JSON header describing the columns as a
+    snapshot does (dictionary values, nulls and blanks, and the typecode,
+    length and position of each array), followed by the code, string and
+    integer arrays themselves. Worker processes map the segment by `name`
+    and read the arrays in place, so no row is ever pickled. The copy does
+    not follow later changes to the table.
+    """
+
+    def __init__(self, table: ColumnarTable):
+        columns = []
+        arrays = []
+        for name in table.fieldnames:
+            column = table.columns[name]
+            if column.kind == 'dict':
+                columns.append({'name': name, 'kind': 'dict', 'values': column.values})
+                arrays.append(column.codes)
+            elif column.kind == 'typed':
+                columns.append({'name': name, 'kind': 'typed', 'type': column.ctype.spec,
+                                'blanks': sorted(column.blanks.items())})
+                arrays.append(column.values)
+            else:
+                columns.append({'name': name, 'kind': 'string', 'nulls': sorted(column.nulls)})
+                arrays.append(column.buffer)
+                arrays.append(column.offsets)
+        layout = []
+        size = 0
+        for values in arrays:
+            layout.append([getattr(values, 'typecode', 'B'), len(values), size])
+            size = _aligned(size + len(values) * getattr(values, 'itemsize', 1))
+        encoded = json.dumps({'num_rows': len(table), 'columns': columns, 'arrays': layout}).encode('utf-8')
+        start = _aligned(_LENGTH.size + len(encoded))
+        self.nbytes = start + size
+        self.segment = SharedMemory(create=True, size=self.nbytes)
+        buf = self.segment.buf
+        _LENGTH.pack_into(buf, 0, len(encoded))
+        buf[_LENGTH.size:_LENGTH.size + len(encoded)] = encoded
+        for values, (_, _, offset) in zip(arrays, layout):
+            with memoryview(values) as view, view.cast('B') as raw:
+                buf[start + offset:start + offset + len(raw)] = raw
+
+    @property
+    def name(self) -> str:
+        return self.segment.name
+
+    def close(self):
+        """Frees the segment; workers still mapping it keep their mapping until they let go."""
+        self.segment.close()
+        self.segment.unlink()
+
+
+class _SharedStringColumn(StringColumn):
+    """A string column whose buffer and offsets are memoryviews of a shared segment."""
+
+    def get(self, row_id: int):
+        if self.nulls and row_id in self.nulls:
+            return None
+        offsets = self.offsets
+        # Copying the slice out is faster than decoding a memoryview in place.
+        return self.buffer[offsets[row_id]:offsets[row_id + 1]].tobytes().decode('utf-8')
+
+
+# The table each worker process has mapped: (segment, table, {filters: compiled
+# row tests}), keyed by segment name.
+_attached = {}
+
+
+def _detach():
+    """Unmaps the table this process has mapped, if any."""
+    segments = [segment for segment, _, _ in _attached.values()]
+    # The tables hold views of their segments, which have to go first.
+    _attached.clear()
+    for segment in segments:
+        try:
+            segment.close()
+        except BufferError:
+            pass # Still read somewhere; unmapped once the last view goes
+
+
+def _attach(name: str) -> tuple:
+    """Returns (segment, table, compiled filters) of a SharedTable segment, mapping it on first use in this process."""
+    entry = _attached.get(name)
+    if entry is not None:
+        return entry
+    # Each scan runs on one table; tables shared earlier have been replaced.
+    _detach()
+    segment = SharedMemory(name=name)
+    buf = segment.buf
+    (length,) = _LENGTH.unpack_from(buf)
+    header = json.loads(bytes(buf[_LENGTH.size:_LENGTH.size + length]).decode('utf-8'))
+    start = _aligned(_LENGTH.size + length)
+    arrays = iter([buf[start + offset:start + offset + count * array(typecode).itemsize].cast(typecode)
+                   for typecode, count, offset in header['arrays']])
+
+    table = ColumnarTable([column['name'] for column in header['columns']])
+    for spec in header['columns']:
+        if spec['kind'] == 'dict':
+            column = DictColumn(spec['values'], next(arrays))
+        elif spec['kind'] == 'typed':
+            column = TypedColumn(candidate_types(spec['type'])[0], next(arrays),
+                                 {row_id: value for row_id, value in spec['blanks']})
+        else:
+            column = _SharedStringColumn()
+            column.buffer = next(arrays)
+            column.offsets = next(arrays)
+            column.nulls = set(spec['nulls'])
+        table._replace_column(spec['name'], column)
+    table._num_rows = header['num_rows']
+    entry = _attached[name] = (segment, table, {})
+    return entry
+
+
+def _slice_column(column, start: int, end: int):
+    """Returns rows `start` to `end` of a shared column as a column of their own, without copying them."""
+    if column.kind == 'dict':
+        part = DictColumn.__new__(DictColumn)
+        part.values = column.values
+        part.lookup = column.lookup
+        part.codes = column.codes[start:end]
+        return part
+    if column.kind == 'typed':
+        return TypedColumn(column.ctype, column.values[start:end],
+                           {row_id - start: blank for row_id, blank in column.blanks.items() if start <= row_id < end})
+    part = _SharedStringColumn()
+    part.buffer = column.buffer
+    part.offsets = column.offsets[start:end + 1]
+    part.nulls = {row_id - start for row_id in column.nulls if start <= row_id < end}
+    return part
+
+
+def _partition(table: ColumnarTable, start: int, end: int) -> ColumnarTable:
+    """Returns rows `start` to `end` of a shared table as a table of their own."""
+    part = ColumnarTable(table.fieldnames)
+    for name, column in table.columns.items():
+        part._replace_column(name, _slice_column(column, start, end))
+    part._num_rows = end - start
+    return part
+
+
+def _with_rows(rows_name: str | None, start: int, end: int, function):
+    """
+    Calls `function(row_ids)` with rows `start` to `end` of a scan.
+
+    The rows are table row ids in that range, or positions `start` to `end`
+    of the row ids in the shared segment `rows_name`.
+    """
+    if rows_name is None:
+        return function(range(start, end))
+    segment = SharedMemory(name=rows_name)
+    try:
+        with segment.buf[start * _ROW_ID_SIZE:end * _ROW_ID_SIZE] as raw, raw.cast(ROW_ID_TYPECODE) as row_ids:
+            return function(row_ids)
+    finally:
+        segment.close()
+
+
+def _filter_part(table_name: str, rows_name: str | None, start: int, end: int, filters) -> tuple[array, list[int]]:
+    """Runs in a worker: returns the row ids of one range passing every filter, and the rows left after each."""
+    _, table, compiled = _attach(table_name)
+    tests = compiled.get(filters)
+    if tests is None:
+        # Conditions on dictionary columns are evaluated once per distinct value; do that once per scan.
+        if len(compiled) >= _CACHED_FILTERS:
+            compiled.clear()
+        tests = compiled[filters] = [table_row_test(table, node) for node in filters]
+
+    def run(row_ids):
+        counts = []
+        for test in tests:
+            row_ids = [row_id for row_id in row_ids if test(row_id)]
+            counts.append(len(row_ids))
+        return array(ROW_ID_TYPECODE, row_ids), counts
+    return _with_rows(rows_name, start, end, run)
+
+
+def _stats_part(table_name: str, rows_name: str | None, start: int, end: int, aggregates, by) -> list[dict]:
+    """Runs in a worker: returns the `stats` of one range of rows."""
+    _, table, _ = _attach(table_name)
+    if rows_name is None:
+        # A table of the range keeps the column-at-a-time paths of `stats`.
+        return stats(_partition(table, start, end), aggregates, by)
+    return _with_rows(rows_name, start, end, lambda row_ids: stats(TableView(table, row_ids), aggregates, by))
+
+
+def _partitions(count: int, parts: int) -> list[tuple[int, int]]:
+    size = max(math.ceil(count / max(parts, 1)), 1)
+    return [(start, min(start + size, count)) for start in range(0, count, size)]
+
+
+class ScanPool:
+    """
+    A persistent pool of worker processes that run full scans over shared memory.
+
+    The first scan of a table copies its columns into a SharedTable, which
+    later scans reuse until another table is scanned or the table grows.
+    A scan splits its rows into ranges, several per worker; each worker
+    reads its range in place and returns only the row ids that passed (for
+    filters) or the partial aggregates of its rows (for `stats`). Results
+    are merged in range order, so they equal those of a serial scan,
+    whatever order the workers finish in. Scans of fewer than `min_rows`
+    rows, and `dc` aggregates (whose sketches hash values with each
+    process's own string hash), run in the calling process.
+
+    The pool's processes start on first use. `close` stops them and frees
+    the shared copy; this also happens at exit.
+    """
+
+    def __init__(self, workers: int | None = None, min_rows: int = DEFAULT_PARALLEL_MIN_ROWS):
+        self.workers = workers or os.cpu_count() or 1
+        self.min_rows = min_rows
+        self._executor = None
+        # The table shared with the workers, its copy and its length when copied.
+        self._table = None
+        self._shared = None
+        self._shared_rows = 0
+        atexit.register(self.close)
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes of shared memory held by the copy of the last table scanned."""
+        return 0 if self._shared is None else self._shared.nbytes
+
+    def _share(self, table: ColumnarTable) -> str:
+        if self._table is not table or self._shared_rows != len(table):
+            self.release()
+            self._shared = SharedTable(table)
+            self._table, self._shared_rows = table, len(table)
+        return self._shared.name
+
+    def _run(self, function, table: ColumnarTable, row_ids, parts: int, *args) -> list:
+        """Runs `function` over `parts` ranges of `row_ids` (a range from 0 or an ascending array) in the workers."""
+        from concurrent.futures import ProcessPoolExecutor
+        table_name = self._share(table)
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.workers)
+        rows = None
+        if not isinstance(row_ids, range):
+            rows = SharedMemory(create=True, size=max(len(row_ids) * _ROW_ID_SIZE, 1))
+            with memoryview(array(ROW_ID_TYPECODE, row_ids)) as view, view.cast('B') as raw:
+                rows.buf[:len(raw)] = raw
+        try:
+            rows_name = None if rows is None else rows.name
+            futures = [self._executor.submit(function, table_name, rows_name, start, end, *args)
+                       for start, end in _partitions(len(row_ids), parts)]
+            return [future.result() for future in futures]
+        finally:
+            if rows is not None:
+                rows.close()
+                rows.unlink()
+
+    def filter(self, table: ColumnarTable, row_ids, filters) -> tuple[array, list[int]]:
+        """
+        Returns the row ids passing every filter, and the number of rows left after each filter.
+
+        Args:
+            table: The table the row ids refer to.
+            row_ids: The rows to check: range(len(table)) or ascending row ids.
+            filters: Expression nodes (see query_lang) the rows must all satisfy.
+        """
+        matches = array(ROW_ID_TYPECODE)
+        counts = [0] * len(filters)
+        for part, part_counts in self._run(_filter_part, table, row_ids, self.workers * _PARTITIONS_PER_WORKER,
+                                            tuple(filters)):
+            matches.extend(part)
+            counts = [total + count for total, count in zip(counts, part_counts)]
+        return matches, counts
+
+    def stats(self, data, aggregates, by=()) -> list[dict]:
+        """Returns `stats.stats(data, aggregates, by)`, computed in the workers where that pays."""
+        if (not isinstance(data, (ColumnarTable, TableView)) or len(data) < self.min_rows
+                or any(aggregate.function == 'dc' for aggregate in aggregates)):
+            return stats(data, aggregates, by)
+        perf.count(rows_scanned=len(data))
+        row_ids = range(len(data)) if data.selection is None else data.selection
+        partials = self._run(_stats_part, data.base, row_ids, self.workers, tuple(aggregates), tuple(by))
+        return merge_stats(partials, aggregates, by)
+
+    def release(self):
+        """Frees the shared copy of the last table scanned."""
+        if self._shared is not None:
+            self._shared.close()
+        self._table, self._shared, self._shared_rows = None, None, 0
+
+    def close(self):
+        """Stops the worker processes and frees the shared copy."""
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+        self.release()
+        atexit.unregister(self.close)
@@ -0,0 +1,198 @@
+import io
+import json
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager, nullcontext
+
+# Number of finished commands the recorder keeps.
+PERF_HISTORY_LIMIT = 100
+# Number of functions `profile` reports.
+PROFILE_TOP_ENTRIES = 20
+PHASES = ('load', 'parse', 'query', 'display')
+
+# The CommandMetrics of the command each thread is recording, if any, so
+# commands run at the same time by a server's threads are kept apart.
+_state = threading.local()
+_NO_PHASE = nullcontext()
+
+
+class CommandMetrics:
+    """What one command cost."""
+
+    def __init__(self, command: str):
+        self.command = command
+        self.started = time.time()
+        self.seconds = 0.0
+        # Seconds spent in each phase the command went through.
+        self.phases = {}
+        self.rows_scanned = 0
+        # Rows in the command's result; None if it has none.
+        self.rows_returned = None
+        self.bytes_read = 0
+        # Growth and peak of traced memory in bytes; None unless memory is traced.
+        self.memory_delta = None
+        self.memory_peak = None
+        self._open_phases = set()
+
+    def to_dict(self) -> dict:
+        return {'command': self.command, 'started': self.started, 'seconds': self.seconds,
+                'phases': dict(self.phases), 'rows_scanned': self.rows_scanned,
+                'rows_returned': self.rows_returned, 'bytes_read': self.bytes_read,
+                'memory_delta': self.memory_delta, 'memory_peak': self.memory_peak}
+
+
+@contextmanager
+def _timed_phase(metrics: CommandMetrics, name: str):
+    metrics._open_phases.add(name)
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.phases[name] = metrics.phases.get(name, 0.0) + time.perf_counter() - started
+        metrics._open_phases.discard(name)
+
+
+def _current() -> CommandMetrics | None:
+    return getattr(_state, 'metrics', None)
+
+
+def phase(name: str):
+    """Returns a context manager that adds the time spent in it to phase `name` of the current command."""
+    metrics = _current()
+    if metrics is None or name in metrics._open_phases:
+        return _NO_PHASE
+    return _timed_phase(metrics, name)
+
+
+def count(rows_scanned: int = 0, bytes_read: int = 0, rows_returned: int | None = None):
+    """Adds rows scanned and bytes read to the current command, and sets the rows it returned."""
+    metrics = _current()
+    if metrics is None:
+        return
+    metrics.rows_scanned += rows_scanned
+    metrics.bytes_read += bytes_read
+    if rows_returned is not None:
+        metrics.rows_returned = rows_returned
+
+
+class PerfRecorder:
+    """
+    Records the metrics of the commands run inside `command`.
+
+    Each command's wall time is measured and, with memory tracing on, how
+    much the memory traced by tracemalloc grew and peaked while it ran. The
+    code doing the work reports what it did through the module-level `phase`
+    and `count` hooks, which apply to the command being recorded and do
+    nothing otherwise. Phases are 'load', 'parse', 'query' and 'display';
+    they may nest (a CSV file is parsed while it is loaded, and a query may
+    load the files of a multi-file dataset), and a phase entered again while
+    it is open is not counted twice. Each thread records its own command, so
+    the hooks only see the work of the thread that runs them; tracemalloc
+    however traces the whole process.
+
+    Finished commands are kept in a bounded history and can also be appended
+    to a JSON-lines log, one object per command. Memory tracing is off by
+    default, as tracemalloc slows down every allocation;
+    `set_memory_tracing(True)` starts it.
+    """
+
+    def __init__(self, history_limit: int = PERF_HISTORY_LIMIT):
+        self.history = deque(maxlen=history_limit)
+        # JSON-lines file each finished command is appended to, if any.
+        self.log_path = None
+        self.trace_memory = False
+
+    def set_memory_tracing(self, enabled: bool):
+        """Starts or stops measuring memory with tracemalloc."""
+        import tracemalloc
+        if enabled and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        elif not enabled and self.trace_memory and tracemalloc.is_tracing():
+            tracemalloc.stop()
+        self.trace_memory = enabled
+
+    def set_log(self, path: str | None):
+        """
+        Appends the metrics of later commands to a JSON-lines file; None stops logging.
+
+        Raises:
+            OSError: If the file cannot be opened for appending.
+        """
+        if path is not None:
+            open(path, 'a').close()
+        self.log_path = path
+
+    @contextmanager
+    def command(self, text: str):
+        """Records the command run inside the block; yields its CommandMetrics."""
+        metrics = CommandMetrics(text)
+        outer = _current()
+        tracing = False
+        if self.trace_memory:
+            # Imported only once memory tracing was turned on, like cProfile in `profile`.
+            import tracemalloc
+            tracing = tracemalloc.is_tracing()
+        if tracing:
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+        _state.metrics = metrics
+        started = time.perf_counter()
+        try:
+            yield metrics
+        finally:
+            metrics.seconds = time.perf_counter() - started
+            _state.metrics = outer
+            if tracing:
+                current, peak = tracemalloc.get_traced_memory()
+                metrics.memory_delta, metrics.memory_peak = current - before, peak - before
+            self.history.append(metrics)
+            if self.log_path is not None:
+                try:
+                    with open(self.log_path, 'a') as f:
+                        f.write(json.dumps(metrics.to_dict()) + '\n')
+                except OSError:
+                    pass # A missing log line never fails the command itself
+
+    def rows(self, limit: int | None = None) -> list[dict]:
+        """Returns the latest `limit` (default all) recorded commands as table rows, oldest first."""
+        recent = list(self.history)[-limit:] if limit else list(self.history)
+        return [_metrics_row(metrics) for metrics in recent]
+
+    def summary(self) -> list[dict]:
+        """Returns one table row per command name with its run count and total, mean and maximum seconds."""
+        by_name = {}
+        for metrics in self.history:
+            by_name.setdefault(metrics.command.split(maxsplit=1)[0].lower(), []).append(metrics.seconds)
+        return [{'Command': name, 'Runs': len(seconds), 'Total_s': f'{sum(seconds):.3f}',
+                 'Mean_s': f'{sum(seconds) / len(seconds):.3f}', 'Max_s': f'{max(seconds):.3f}'}
+                for name, seconds in sorted(by_name.items(), key=lambda item: -sum(item[1]))]
+
+
+def _metrics_row(metrics: CommandMetrics) -> dict:
+    row = {'Command': metrics.command, 'Seconds': f'{metrics.seconds:.3f}'}
+    for name in PHASES:
+        row[name.capitalize()] = f'{metrics.phases[name]:.3f}' if name in metrics.phases else ''
+    row.update(Scanned=metrics.rows_scanned, Returned='' if metrics.rows_returned is None else metrics.rows_returned,
+               Bytes_read=metrics.bytes_read,
+               Memory_delta='' if metrics.memory_delta is None else metrics.memory_delta,
+               Memory_peak='' if metrics.memory_peak is None else metrics.memory_peak)
+    return row
+
+
+def profile(function, *args, limit: int = PROFILE_TOP_ENTRIES, sort_by: str = 'cumulative'):
+    """
+    Runs `function(*args)` under cProfile.
+
+    Returns:
+        A tuple of (the function's result, a report of the `limit` functions
+        that took the most time, ordered by `sort_by`).
+    """
+    # Only profiled commands need these, so they are not imported at startup.
+    import cProfile
+    import pstats
+    profiler = cProfile.Profile()
+    result = profiler.runcall(function, *args)
+    report = io.StringIO()
+    pstats.Stats(profiler, stream=report).strip_dirs().sort_stats(sort_by, 'tottime').print_stats(limit)
+    return result, report.getvalue()
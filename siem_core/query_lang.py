@@ -0,0 +1,874 @@
+import ipaddress
+import re
+from array import array
+from dataclasses import dataclass
+
+from siem_core.index import SortedIndex, trigrams
+from siem_core.mmap_backend import MappedCSV
+from siem_core import perf
+from siem_core.table import PLAIN_COLUMN_RATIO, ROW_ID_TYPECODE, ColumnarTable, TableView, find_code, intersect_sorted
+from siem_core.time_index import parse_event_time
+
+# Default selectivity guesses for conditions nothing better is known about.
+_EQ_SELECTIVITY = 0.1
+_RANGE_SELECTIVITY = 0.33
+
+# A dictionary column is searched code by code (one C-level scan per code)
+# when at most this many of its distinct values satisfy a condition.
+_MAX_SCANNED_CODES = 8
+
+# Relative cost of checking one row in a C-level scan (bytes.find over a code
+# array) compared to checking it in Python.
+_C_SCAN_COST = 0.02
+
+# Sorting a typed column to build its index costs about this many row checks
+# per row.
+_SORT_BUILD_COST = 0.5
+
+# Value frequencies of dictionary and typed columns are estimated from at most
+# this many evenly spaced rows.
+_SAMPLE_ROWS = 1024
+
+_TOKEN_RE = re.compile(r'''
+    \s*(?:
+        (?P<string>"(?:[^"\\]|\\.)*"|'(?:[^'\\]|\\.)*')
+      | (?P<op>!=|==|<=|>=|=|<|>)
+      | (?P<punct>[(),])
+      | (?P<word>[^\s()=!<>,"']+)
+    )''', re.VERBOSE)
+
+
+_KEYWORDS = ('AND', 'OR', 'NOT', 'IN', 'BETWEEN', 'CIDR', 'LIKE', 'CONTAINS', 'MATCHES')
+
+# Conditions matching text patterns, written `<column> <KEYWORD> <pattern>`.
+_PATTERN_OPS = ('like', 'contains', 'matches')
+
+
+class QuerySyntaxError(ValueError):
+    """Raised when a filter expression cannot be parsed."""
+
+
+@dataclass(frozen=True)
+class Condition:
+    """A comparison of one column against a value, or membership in a list of values."""
+    column: str
+    op: str # One of =, !=, <, <=, >, >=, 'in', 'not in', 'between', 'cidr', 'like', 'contains' or 'matches'
+    value: str | tuple[str, ...] # A (low, high) tuple for 'between'
+
+    def __str__(self) -> str:
+        if self.op == 'between':
+            return f"{_quote(self.column)} BETWEEN {_quote(self.value[0])} AND {_quote(self.value[1])}"
+        if self.op == 'cidr' or self.op in _PATTERN_OPS:
+            return f"{_quote(self.column)} {self.op.upper()} {_quote(self.value)}"
+        if isinstance(self.value, tuple):
+            return f"{_quote(self.column)} {self.op.upper()} ({', '.join(_quote(v) for v in self.value)})"
+        return f"{_quote(self.column)} {self.op} {_quote(self.value)}"
+
+
+@dataclass(frozen=True)
+class And:
+    children: tuple
+
+    def __str__(self) -> str:
+        return "(" + " AND ".join(str(child) for child in self.children) + ")"
+
+
+@dataclass(frozen=True)
+class Or:
+    children: tuple
+
+    def __str__(self) -> str:
+        return "(" + " OR ".join(str(child) for child in self.children) + ")"
+
+
+@dataclass(frozen=True)
+class Not:
+    child: object
+
+    def __str__(self) -> str:
+        return f"NOT {self.child}"
+
+
+def _quote(text: str) -> str:
+    if re.fullmatch(r'[^\s()=!<>,"\']+', text) and text.upper() not in _KEYWORDS:
+        return text
+    return '"' + text.replace('\\', '\\\\').replace('"', '\\"') + '"'
+
+
+def _tokenize(text: str) -> list[tuple[str, str]]:
+    tokens = []
+    pos = 0
+    text = text.rstrip()
+    while pos < len(text):
+        match = _TOKEN_RE.match(text, pos)
+        if match is None:
+            raise QuerySyntaxError(f"Unexpected character {text[pos:].lstrip()[:1]!r} at position {pos}.")
+        pos = match.end()
+        kind = match.lastgroup
+        token = match.group(kind)
+        if kind == 'string':
+            token = re.sub(r'\\(.)', r'\1', token[1:-1])
+        elif kind == 'op' and token == '==':
+            token = '='
+        elif kind == 'word' and token.upper() in _KEYWORDS:
+            kind, token = 'keyword', token.upper()
+        tokens.append((kind, token))
+    return tokens
+
+
+class _Parser:
+    """Recursive-descent parser; NOT binds tighter than AND, which binds tighter than OR."""
+
+    def __init__(self, text: str):
+        self.tokens = _tokenize(text)
+        self.pos = 0
+
+    def peek(self) -> tuple[str, str] | None:
+        return self.tokens[self.pos] if self.pos < len(self.tokens) else None
+
+    def take(self) -> tuple[str, str]:
+        token = self.peek()
+        if token is None:
+            raise QuerySyntaxError("Unexpected end of expression.")
+        self.pos += 1
+        return token
+
+    def expect(self, kind: str, value: str):
+        token = self.take()
+        if token != (kind, value):
+            raise QuerySyntaxError(f"Expected {value!r} but found {token[1]!r}.")
+
+    def parse(self):
+        if not self.tokens:
+            raise QuerySyntaxError("Empty expression.")
+        node = self.parse_or()
+        if self.peek() is not None:
+            raise QuerySyntaxError(f"Unexpected {self.peek()[1]!r} after end of expression.")
+        return node
+
+    def parse_or(self):
+        children = [self.parse_and()]
+        while self.peek() == ('keyword', 'OR'):
+            self.take()
+            children.append(self.parse_and())
+        return children[0] if len(children) == 1 else Or(tuple(children))
+
+    def parse_and(self):
+        children = [self.parse_not()]
+        while True:
+            token = self.peek()
+            if token == ('keyword', 'AND'):
+                self.take()
+            elif token is None or token in (('keyword', 'OR'), ('punct', ')')):
+                break
+            # Adjacent conditions without an operator are combined with AND.
+            children.append(self.parse_not())
+        return children[0] if len(children) == 1 else And(tuple(children))
+
+    def parse_not(self):
+        if self.peek() == ('keyword', 'NOT'):
+            self.take()
+            return Not(self.parse_not())
+        return self.parse_atom()
+
+    def parse_atom(self):
+        kind, token = self.take()
+        if (kind, token) == ('punct', '('):
+            node = self.parse_or()
+            self.expect('punct', ')')
+            return node
+        if kind not in ('word', 'string'):
+            raise QuerySyntaxError(f"Expected a column name but found {token!r}.")
+        column = token
+        kind, token = self.take()
+        if kind == 'op':
+            return Condition(column, token, self.parse_value(token))
+        negated = (kind, token) == ('keyword', 'NOT')
+        if negated:
+            kind, token = self.take()
+        if (kind, token) == ('keyword', 'IN'):
+            return Condition(column, 'not in' if negated else 'in', self.parse_list())
+        if (kind, token) == ('keyword', 'BETWEEN'):
+            low = self.parse_value('BETWEEN')
+            self.expect('keyword', 'AND')
+            node = Condition(column, 'between', (low, self.parse_value('AND')))
+        elif (kind, token) == ('keyword', 'CIDR'):
+            network = self.parse_value('CIDR')
+            try:
+                ipaddress.ip_network(network, strict=False)
+            except ValueError:
+                raise QuerySyntaxError(f"Invalid network {network!r} after CIDR.")
+            node = Condition(column, 'cidr', network)
+        elif kind == 'keyword' and token.lower() in _PATTERN_OPS:
+            pattern = self.parse_value(token)
+            if token == 'MATCHES':
+                try:
+                    re.compile(pattern)
+                except re.error as e:
+                    raise QuerySyntaxError(f"Invalid regular expression {pattern!r} after MATCHES: {e}.")
+            node = Condition(column, token.lower(), pattern)
+        else:
+            raise QuerySyntaxError(f"Expected an operator after {column!r} but found {token!r}.")
+        return Not(node) if negated else node
+
+    def parse_value(self, after: str) -> str:
+        kind, token = self.take()
+        if kind not in ('word', 'string'):
+            raise QuerySyntaxError(f"Expected a value after {after!r} but found {token!r}.")
+        return token
+
+    def parse_list(self) -> tuple[str, ...]:
+        self.expect('punct', '(')
+        values = []
+        while True:
+            kind, token = self.take()
+            if kind not in ('word', 'string'):
+                raise QuerySyntaxError(f"Expected a value in list but found {token!r}.")
+            values.append(token)
+            kind, token = self.take()
+            if (kind, token) == ('punct', ')'):
+                return tuple(values)
+            if (kind, token) != ('punct', ','):
+                raise QuerySyntaxError(f"Expected ',' or ')' in list but found {token!r}.")
+
+
+def parse_query(text: str):
+    """
+    Parses a filter expression into a tree of Condition, And, Or and Not nodes.
+
+    Conditions are `<column> <op> <value>` with op one of `=`, `!=`, `<`,
+    `<=`, `>`, `>=`, `<column> [NOT] IN (<value>, ...)`, `<column> [NOT]
+    BETWEEN <low> AND <high>` (inclusive), `<column> [NOT] CIDR
+    <network>`, or a text pattern: `<column> [NOT] LIKE <pattern>` (the
+    whole value; `*` stands for any text and `?` for one character),
+    `<column> [NOT] CONTAINS <text>` or `<column> [NOT] MATCHES <regex>`
+    (a regular expression found anywhere in the value). They combine with
+    AND, OR, NOT and parentheses; adjacent conditions are ANDed. Values
+    containing spaces or operator characters can be quoted.
+
+    Raises:
+        QuerySyntaxError: If the expression is not valid.
+    """
+    return _Parser(text).parse()
+
+
+def _as_number(text):
+    try:
+        return float(text)
+    except (TypeError, ValueError):
+        return None
+
+
+def _as_time(text):
+    """Returns a timestamp or date as seconds since the epoch, or None; plain numbers are not times here."""
+    if not isinstance(text, str) or _as_number(text) is not None:
+        return None
+    return parse_event_time(text)
+
+
+def node_column(node) -> str | None:
+    """Returns the column every condition in `node` refers to, or None if there are several."""
+    if isinstance(node, Condition):
+        return node.column
+    children = [node.child] if isinstance(node, Not) else node.children
+    columns = {node_column(child) for child in children}
+    return columns.pop() if len(columns) == 1 else None
+
+
+def value_test(node):
+    """
+    Returns a function telling whether a field value satisfies `node`.
+
+    `node` is a Condition, or an And/Or/Not tree whose conditions all refer
+    to the same column. Missing values (None) never satisfy a condition.
+    Ordering comparisons (and BETWEEN) are numeric when the literals are
+    numbers (rows with non-numeric values do not match), chronological when
+    they are times (rows whose values are not times do not match), so that
+    they agree with timestamp-typed columns whatever layout the literal is
+    in, and lexicographic otherwise. CIDR matches IP addresses inside the network. Patterns are
+    case-sensitive.
+    """
+    if isinstance(node, Not):
+        test = value_test(node.child)
+        return lambda value: not test(value)
+    if isinstance(node, (And, Or)):
+        tests = [value_test(child) for child in node.children]
+        combine = all if isinstance(node, And) else any
+        return lambda value: combine(test(value) for test in tests)
+
+    op, target = node.op, node.value
+    if op == '=':
+        return lambda value: value == target
+    if op == '!=':
+        return lambda value: value is not None and value != target
+    if op == 'in':
+        members = frozenset(target)
+        return lambda value: value in members
+    if op == 'not in':
+        members = frozenset(target)
+        return lambda value: value is not None and value not in members
+    if op == 'cidr':
+        network = ipaddress.ip_network(target, strict=False)
+
+        def in_network(value) -> bool:
+            try:
+                return ipaddress.ip_address(value) in network
+            except ValueError:
+                return False
+        return in_network
+    if op == 'contains':
+        return lambda value: value is not None and target in value
+    if op == 'like':
+        regex = re.compile(''.join('.*' if char == '*' else '.' if char == '?' else re.escape(char)
+                                   for char in target), re.DOTALL)
+        return lambda value: value is not None and regex.fullmatch(value) is not None
+    if op == 'matches':
+        regex = re.compile(target)
+        return lambda value: value is not None and regex.search(value) is not None
+    if op == 'between':
+        for convert in (_as_number, _as_time):
+            low, high = (convert(bound) for bound in target)
+            if low is not None and high is not None:
+                def converted_between(value) -> bool:
+                    value = convert(value)
+                    return value is not None and low <= value <= high
+                return converted_between
+        low, high = target
+        return lambda value: value is not None and low <= value <= high
+
+    compare = {
+        '<': lambda a, b: a < b, '<=': lambda a, b: a <= b,
+        '>': lambda a, b: a > b, '>=': lambda a, b: a >= b,
+    }[op]
+    for convert in (_as_number, _as_time):
+        bound = convert(target)
+        if bound is not None:
+            def converted_test(value) -> bool:
+                value = convert(value)
+                return value is not None and compare(value, bound)
+            return converted_test
+    return lambda value: value is not None and compare(value, target)
+
+
+def _regex_literals(pattern: str) -> list[str]:
+    """
+    Returns runs of plain characters every match of a regular expression contains.
+
+    Only simple expressions are understood: a group, an alternative or a
+    multi-character escape gives up (an empty list), while classes, `.`,
+    anchors, class escapes like `\\d` and optional characters end a run.
+    """
+    if '|' in pattern or '(' in pattern:
+        return []
+    literals, run = [], []
+    position = 0
+    while position < len(pattern):
+        char = pattern[position]
+        position += 1
+        if char == '\\':
+            escaped = pattern[position:position + 1]
+            position += 1
+            if escaped in ('x', 'u', 'U', 'N') or escaped.isdigit():
+                return []
+            if escaped and not escaped.isalnum():
+                run.append(escaped)
+                continue
+        elif char in '*?{':
+            # The character before may be missing, or repeated with {m,n}.
+            if run:
+                run.pop()
+            if char == '{':
+                end = pattern.find('}', position)
+                if end == -1:
+                    return []
+                position = end + 1
+        elif char == '[':
+            if pattern[position:position + 1] == '^':
+                position += 1
+            if pattern[position:position + 1] == ']':
+                position += 1
+            while position < len(pattern) and pattern[position] != ']':
+                position += 2 if pattern[position] == '\\' else 1
+            position += 1
+        elif char not in '+.^$':
+            run.append(char)
+            continue
+        if run:
+            literals.append(''.join(run))
+            run = []
+    if run:
+        literals.append(''.join(run))
+    return literals
+
+
+def _pattern_literals(node) -> list[str]:
+    """Returns texts every value satisfying a LIKE, CONTAINS or MATCHES condition contains; empty if none are known."""
+    if node.op == 'contains':
+        return [node.value] if node.value else []
+    if node.op == 'like':
+        return [piece for piece in re.split(r'[*?]', node.value) if piece]
+    return _regex_literals(node.value)
+
+
+def _conjuncts(node) -> list:
+    return list(node.children) if isinstance(node, And) else [node]
+
+
+def _dict_column(table, node):
+    """Returns the dictionary column of `table` that `node` tests, if it tests exactly one."""
+    column_name = node_column(node)
+    if column_name is None or table is None:
+        return None
+    column = table.columns.get(column_name)
+    if column is None or column.kind != 'dict':
+        return None
+    return column
+
+
+def _typed_intervals(table, node):
+    """Returns (column, intervals) if `node` compares a typed column of `table` with a literal of its type."""
+    if not isinstance(node, Condition) or table is None:
+        return None
+    column = table.columns.get(node.column)
+    if column is None or column.kind != 'typed':
+        return None
+    intervals = column.ctype.intervals(node.op, node.value)
+    return None if intervals is None else (column, intervals)
+
+
+def table_row_test(table, node):
+    """
+    Compiles `node` into a function of a row id of `table` (a ColumnarTable).
+
+    Conditions on a dictionary column are evaluated once per distinct value
+    and those on a typed column compare its integers; other columns are
+    tested on their values.
+    """
+    column = _dict_column(table, node)
+    if column is not None:
+        # Evaluate the condition once per distinct value.
+        test = value_test(node)
+        passing = [test(value) for value in column.values]
+        codes = column.codes
+        return lambda i: passing[codes[i]]
+    if isinstance(node, And):
+        tests = [table_row_test(table, child) for child in node.children]
+        return lambda i: all(test(i) for test in tests)
+    if isinstance(node, Or):
+        tests = [table_row_test(table, child) for child in node.children]
+        return lambda i: any(test(i) for test in tests)
+    if isinstance(node, Not):
+        test = table_row_test(table, node.child)
+        return lambda i: not test(i)
+
+    typed = _typed_intervals(table, node)
+    if typed is not None:
+        column, intervals = typed
+        return column.row_test(intervals)
+    column = table.columns.get(node.column)
+    if column is None:
+        return lambda i: False
+    test = value_test(node)
+    get = column.get
+    return lambda i: test(get(i))
+
+
+class _Step:
+    """One step of a plan, with the number of rows it read and produced once run."""
+
+    def __init__(self, description: str):
+        self.description = description
+        self.rows_in = None
+        self.rows_out = None
+
+    def __str__(self) -> str:
+        if self.rows_in is None:
+            return self.description
+        return f"{self.description} [rows in: {self.rows_in}, rows out: {self.rows_out}]"
+
+
+class QueryPlan:
+    """
+    An execution plan for one filter expression over one data set.
+
+    The expression's top-level AND conditions are given selectivity
+    estimates (exact for indexed conditions, from a sample of the rows for
+    dictionary-encoded and typed columns, fixed guesses otherwise). At
+    most one condition is chosen as the access path that produces candidate
+    rows without a Python-level pass over the whole data set: a hash index
+    lookup, a C-level scan for a few codes of a dictionary column or for a
+    value in a packed string column, a sorted index range over a typed
+    column, a search of a mapped file, or for a text pattern on a packed
+    string column, a trigram index search or a C-level search for the
+    pattern's longest literal whose hits are then checked. The choice minimizes the estimated
+    number of row checks. The remaining conditions are applied in one filter
+    pass, most selective first, so a row is only checked against later
+    conditions if it passed the earlier ones.
+
+    On a TableView, indexes and columns of the underlying table are used and
+    the access path's row ids are intersected with the view's selection;
+    without an access path only the selected rows are checked.
+
+    With a `scan_pool` (see parallel_scan.ScanPool), the filter pass over a
+    table runs in the pool's worker processes when it checks enough rows.
+    """
+
+    def __init__(self, data, node, scan_pool=None):
+        self.data = data
+        # The ColumnarTable row ids refer to, and the rows of it `data` holds
+        # (None for all of them).
+        self.table = data.base if isinstance(data, (ColumnarTable, TableView)) else None
+        self.selection = data.selection if self.table is not None else None
+        self._base_rows = len(self.table) if self.table is not None else len(data)
+        self.node = node
+        self.scan_pool = scan_pool
+        self.steps = []
+        self._access = None
+        self._filters = []
+        self._plan()
+
+    def _plan(self):
+        total = len(self.data)
+        base_rows = self._base_rows
+        conjuncts = sorted(((self._estimate(node), i, node) for i, node in enumerate(_conjuncts(self.node))),
+                           key=lambda item: (item[0], item[1]))
+
+        def filter_cost(rows: float, filters) -> float:
+            cost = 0.0
+            for selectivity, _, _ in filters:
+                cost += rows
+                rows *= selectivity
+            return cost
+
+        best_cost = filter_cost(total, conjuncts)
+        best = None
+        for position, (selectivity, _, node) in enumerate(conjuncts):
+            access = self._access_path(node, selectivity * base_rows)
+            if access is None:
+                continue
+            rest = conjuncts[:position] + conjuncts[position + 1:]
+            cost = access[2] + self._intersect_cost(selectivity * base_rows) + filter_cost(selectivity * total, rest)
+            if cost < best_cost:
+                best_cost, best = cost, position
+
+        if best is None:
+            self.steps.append(_Step(f"full scan of {total} rows"))
+        else:
+            selectivity, _, node = conjuncts.pop(best)
+            self._access = self._access_path(node, selectivity * base_rows)
+            self.steps.append(_Step(f"{self._access[0]}: {node} (est. rows {selectivity * total:.0f})"))
+        for selectivity, _, node in conjuncts:
+            self._filters.append(node)
+            self.steps.append(_Step(f"filter: {node} (est. selectivity {selectivity:.3g})"))
+
+    def _intersect_cost(self, rows: float) -> float:
+        """Estimates the cost of narrowing `rows` access path hits to the view's selection."""
+        return 0.0 if self.selection is None else rows + len(self.selection)
+
+    def _indexes(self) -> dict:
+        if self.table is not None and self.table.indexes is not None:
+            return self.table.indexes.indexes
+        return {}
+
+    def _columns(self):
+        if isinstance(self.data, (ColumnarTable, TableView, MappedCSV)):
+            return self.data.columns
+        return None
+
+    def _dict_column(self, node):
+        """Returns the dictionary column `node` tests, if it tests exactly one."""
+        return _dict_column(self.table, node)
+
+    def _passing_codes(self, node) -> list[int] | None:
+        """Returns the codes satisfying `node` if it only tests one dictionary column."""
+        column = self._dict_column(node)
+        if column is None:
+            return None
+        test = value_test(node)
+        return [code for code, value in enumerate(column.values) if test(value)]
+
+    def _typed_intervals(self, node):
+        """Returns (column, intervals) if `node` compares a typed column with a literal of its type."""
+        return _typed_intervals(self.table, node)
+
+    def _indexed_values(self, node) -> tuple | None:
+        """Returns the values to look up if `node` is an equality or IN on an indexed column."""
+        if isinstance(node, Condition) and node.op in ('=', 'in') and node.column in self._indexes():
+            return tuple(sorted(set(node.value))) if node.op == 'in' else (node.value,)
+        return None
+
+    def _estimate(self, node) -> float:
+        """Estimates the fraction of rows satisfying `node`."""
+        columns = self._columns()
+        if isinstance(node, Condition) and columns is not None and node.column not in columns:
+            return 0.0
+        typed = self._typed_intervals(node)
+        if typed is not None:
+            column, intervals = typed
+            index = self._indexes().get(node.column)
+            if isinstance(index, SortedIndex):
+                return index.count_range(intervals) / max(self._base_rows, 1)
+            sample = range(0, len(column), max(1, len(column) // _SAMPLE_ROWS))
+            if not sample:
+                return 0.0
+            test = column.row_test(intervals)
+            return sum(1 for row_id in sample if test(row_id)) / len(sample)
+        values = self._indexed_values(node)
+        if values is not None:
+            index = self._indexes()[node.column]
+            return sum(index.count(value) for value in values) / max(self._base_rows, 1)
+        codes = self._passing_codes(node)
+        if codes is not None:
+            column = self._dict_column(node)
+            sample = column.codes[::max(1, len(column.codes) // _SAMPLE_ROWS)]
+            if not sample:
+                return 0.0
+            passing = set(codes)
+            return sum(1 for code in sample if code in passing) / len(sample)
+
+        if (isinstance(node, Condition) and node.op in ('=', '!=', 'in', 'not in')
+                and self.table is not None and self.table.columns[node.column].kind == 'string'):
+            # Columns are only stored as strings when most of their values are
+            # distinct, so any one value is rare.
+            count = len(node.value) if node.op in ('in', 'not in') else 1
+            matched = min(1.0, count / max(self._base_rows * PLAIN_COLUMN_RATIO, 1))
+            return matched if node.op in ('=', 'in') else 1.0 - matched
+        if isinstance(node, Condition) and node.op in _PATTERN_OPS and self.table is not None:
+            column = self.table.columns[node.column]
+            sample = range(0, len(column), max(1, len(column) // _SAMPLE_ROWS))
+            if not sample:
+                return 0.0
+            test = value_test(node)
+            return sum(1 for row_id in sample if test(column.get(row_id))) / len(sample)
+
+        if isinstance(node, And):
+            result = 1.0
+            for child in node.children:
+                result *= self._estimate(child)
+            return result
+        if isinstance(node, Or):
+            return min(1.0, sum(self._estimate(child) for child in node.children))
+        if isinstance(node, Not):
+            return 1.0 - self._estimate(node.child)
+        if node.op == '=':
+            return _EQ_SELECTIVITY
+        if node.op == '!=':
+            return 1.0 - _EQ_SELECTIVITY
+        if node.op == 'in':
+            return min(1.0, _EQ_SELECTIVITY * len(node.value))
+        if node.op == 'not in':
+            return max(0.0, 1.0 - _EQ_SELECTIVITY * len(node.value))
+        return _RANGE_SELECTIVITY
+
+    def _access_path(self, node, rows: float):
+        """
+        Returns (description, function producing ascending row ids, estimated
+        cost, whether every row is examined) if `node` can be answered
+        without a full Python-level scan. Row ids and `rows` refer to the
+        whole underlying table.
+        """
+        columns = self._columns()
+        if isinstance(node, Condition) and columns is not None and node.column not in columns:
+            return ('no such column', lambda: array(ROW_ID_TYPECODE), 0.0, False)
+
+        typed = self._typed_intervals(node)
+        if typed is not None and self.table.indexes is not None:
+            _, intervals = typed
+            indexes = self.table.indexes
+            # The index is built on first use and kept for later queries.
+            build_cost = 0.0 if node.column in indexes.indexes else self._base_rows * _SORT_BUILD_COST
+            return ('sorted index range', lambda: indexes.get(node.column).range(intervals),
+                    build_cost + 1.5 * rows, False)
+        if typed is not None and node.op in ('=', 'in'):
+            column = typed[0]
+            literals = sorted(set(node.value)) if node.op == 'in' else [node.value]
+
+            def scan_values():
+                return array(ROW_ID_TYPECODE, sorted(row_id for literal in literals for row_id in column.find(literal)))
+            return ('typed value scan', scan_values, self._base_rows * len(literals) * _C_SCAN_COST + rows, True)
+
+        values = self._indexed_values(node)
+        if values is not None:
+            index = self._indexes()[node.column]
+            if len(values) == 1:
+                return ('index lookup', lambda: index.lookup(values[0]), rows, False)
+            return ('index lookup', lambda: array(ROW_ID_TYPECODE, sorted(
+                row_id for value in values for row_id in index.lookup(value))), rows, False)
+
+        codes = self._passing_codes(node)
+        if codes is not None and len(codes) <= _MAX_SCANNED_CODES:
+            column_codes = self._dict_column(node).codes
+
+            def scan_codes():
+                if len(codes) == 1:
+                    return find_code(column_codes, codes[0])
+                return array(ROW_ID_TYPECODE, sorted(
+                    row_id for code in codes for row_id in find_code(column_codes, code)))
+            return ('dictionary code scan', scan_codes, self._base_rows * len(codes) * _C_SCAN_COST + rows, True)
+
+        if (isinstance(node, Condition) and node.op in ('=', 'in') and self.table is not None
+                and self.table.columns[node.column].kind == 'string'):
+            column = self.table.columns[node.column]
+            values = sorted(set(node.value)) if node.op == 'in' else [node.value]
+
+            def search_buffer():
+                if len(values) == 1:
+                    return column.find(values[0])
+                return array(ROW_ID_TYPECODE, sorted(row_id for value in values for row_id in column.find(value)))
+            # Every hit is mapped back to its row by binary search.
+            return ('string buffer search', search_buffer, self._base_rows * len(values) * _C_SCAN_COST + 2 * rows, True)
+        if (isinstance(node, Condition) and node.op in _PATTERN_OPS and self.table is not None
+                and self.table.columns[node.column].kind == 'string'):
+            return self._pattern_search(node, rows)
+
+        if isinstance(node, Or):
+            paths = [self._access_path(child, self._estimate(child) * self._base_rows) for child in node.children]
+            if not all(paths):
+                return None
+
+            def union():
+                row_ids = set()
+                for _, produce, _, _ in paths:
+                    row_ids.update(produce())
+                return array(ROW_ID_TYPECODE, sorted(row_ids))
+            kinds = ', '.join(sorted({path[0] for path in paths}))
+            return (f"union of {kinds}", union, sum(path[2] for path in paths) + rows,
+                    any(path[3] for path in paths))
+
+        if isinstance(self.data, MappedCSV) and isinstance(node, Condition) and node.op == '=':
+            # Each candidate record has to be decoded to confirm the match.
+            return ('mapped file search', lambda: self.data.find(node.column, node.value), 4 * rows, True)
+        return None
+
+    def _pattern_search(self, node, rows: float):
+        """
+        Returns the access path of a LIKE, CONTAINS or MATCHES condition on a plain string column.
+
+        If the column has a trigram index enabled, the rows holding every
+        trigram of the pattern's literals are checked against the condition;
+        otherwise the column's buffer is searched for the longest literal and
+        the rows containing it are checked. A pattern without literals (e.g.
+        a regex with alternatives) has no access path.
+        """
+        column = self.table.columns[node.column]
+        literals = _pattern_literals(node)
+        if not literals:
+            return None
+        longest = max(literals, key=len)
+        test = value_test(node)
+        get = column.get
+
+        def check(candidates) -> array:
+            return array(ROW_ID_TYPECODE, [row_id for row_id in candidates if test(get(row_id))])
+
+        indexes = self.table.indexes
+        if (indexes is not None and any(trigrams(literal) for literal in literals)
+                and indexes.trigram_allowed(node.column)):
+            built = indexes.trigram_indexes.get(node.column)
+
+            def search_trigrams():
+                # The index is built on first use and kept for later searches.
+                index = indexes.trigram_index(node.column)
+                return check(index.candidates(literals) if index is not None else column.search(longest))
+            candidates = rows if built is None else built.max_matches(literals)
+            return ('trigram index search', search_trigrams, 2 * candidates + rows, False)
+
+        def search_buffer():
+            # Rows containing the whole text of a CONTAINS need no further check.
+            hits = column.search(longest)
+            return hits if node.op == 'contains' else check(hits)
+        return ('substring buffer search', search_buffer, self._base_rows * _C_SCAN_COST + 3 * rows, True)
+
+    def _row_test(self, node):
+        """Compiles `node` into a function of a row id (of `self.table` for tables)."""
+        if self.table is not None:
+            return table_row_test(self.table, node)
+        if isinstance(node, And):
+            tests = [self._row_test(child) for child in node.children]
+            return lambda i: all(test(i) for test in tests)
+        if isinstance(node, Or):
+            tests = [self._row_test(child) for child in node.children]
+            return lambda i: any(test(i) for test in tests)
+        if isinstance(node, Not):
+            test = self._row_test(node.child)
+            return lambda i: not test(i)
+
+        data = self.data
+        test = value_test(node)
+        column_name = node.column
+        if isinstance(data, MappedCSV):
+            if column_name not in data.columns:
+                return lambda i: False
+            value = data.value
+            return lambda i: test(value(i, column_name))
+        return lambda i: column_name in data[i] and test(data[i][column_name])
+
+    def execute(self):
+        """
+        Runs the plan and records row counts on each step.
+
+        Returns:
+            The matching rows: a TableView of the underlying table for tables
+            and views, a MappedCSV view for mapped files, or a new list of
+            dictionaries.
+        """
+        step_iter = iter(self.steps)
+        if self._access is not None:
+            row_ids = self._access[1]()
+            step = next(step_iter)
+            step.rows_in = self._base_rows if self._access[3] else len(row_ids)
+            if self.selection is not None:
+                row_ids = intersect_sorted(self.selection, row_ids)
+        else:
+            row_ids = self.selection if self.selection is not None else range(len(self.data))
+            step = next(step_iter)
+            step.rows_in = len(self.data)
+        step.rows_out = len(row_ids)
+
+        pool = self.scan_pool
+        if pool is not None and self.table is not None and self._filters and len(row_ids) >= pool.min_rows:
+            rows_in = len(row_ids)
+            row_ids, counts = pool.filter(self.table, row_ids, self._filters)
+            for count in counts:
+                step = next(step_iter)
+                step.description += f" (parallel on {pool.workers} workers)"
+                step.rows_in, step.rows_out = rows_in, count
+                rows_in = count
+        else:
+            for node in self._filters:
+                step = next(step_iter)
+                step.rows_in = len(row_ids)
+                test = self._row_test(node)
+                row_ids = [i for i in row_ids if test(i)]
+                step.rows_out = len(row_ids)
+        # Later steps only check rows the first one read.
+        perf.count(rows_scanned=self.steps[0].rows_in)
+
+        if self.table is not None:
+            return TableView(self.table, row_ids)
+        if isinstance(self.data, MappedCSV):
+            return self.data.take(row_ids)
+        return [self.data[i] for i in row_ids]
+
+    def explain(self) -> str:
+        """Returns the plan's steps, one per line, with row counts if it has run."""
+        lines = [f"Plan for: {self.node}"]
+        lines.extend(f"  {number}. {step}" for number, step in enumerate(self.steps, start=1))
+        return "\n".join(lines)
+
+
+def run_query(data, expression: str):
+    """
+    Filters `data` with a filter expression (see `parse_query`).
+
+    Args:
+        data: A list of dictionaries, a ColumnarTable, a TableView or a MappedCSV.
+        expression: The filter expression.
+
+    Returns:
+        The matching rows, in the same form `query_data` returns them.
+
+    Raises:
+        QuerySyntaxError: If the expression is not valid.
+    """
+    return QueryPlan(data, parse_query(expression)).execute()
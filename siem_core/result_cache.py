@@ -0,0 +1,88 @@
+import sys
+from collections import OrderedDict
+
+from siem_core.table import TableView
+
+# Default memory budget for the cached results of one session.
+DEFAULT_RESULT_CACHE_BUDGET = 64 * 1024 * 1024
+
+
+def result_nbytes(result) -> int:
+    """Returns the approximate number of bytes a query result holds beyond the loaded data."""
+    if isinstance(result, TableView):
+        return result.nbytes
+    from siem_core.mmap_backend import MappedCSV
+    if isinstance(result, MappedCSV):
+        return result.index_nbytes
+    return sys.getsizeof(result)
+
+
+class ResultCache:
+    """
+    Query results kept for reuse, evicted least recently used first.
+
+    Results are TableViews (or MappedCSV views), so an entry costs one array
+    of row ids (or record offsets) and the rows themselves are shared with
+    the loaded data. When the entries together exceed `memory_budget` bytes,
+    the least recently used ones are dropped until the rest fit again; a
+    result larger than the whole budget is not kept. `hits` and `misses`
+    count lookups.
+    """
+
+    def __init__(self, memory_budget: int = DEFAULT_RESULT_CACHE_BUDGET):
+        self.memory_budget = memory_budget
+        self.hits = 0
+        self.misses = 0
+        self.nbytes = 0
+        self._entries = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key):
+        """Returns the result cached under `key`, or None."""
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[0]
+
+    def put(self, key, result, nbytes: int | None = None):
+        """Caches `result` under `key`; `nbytes` overrides its estimated size."""
+        size = result_nbytes(result) if nbytes is None else nbytes
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self.nbytes -= old[1]
+        if size > self.memory_budget:
+            return
+        self._entries[key] = (result, size)
+        self.nbytes += size
+        self._evict()
+
+    def refresh(self, update):
+        """Replaces every cached result with `update(key, result)`, keeping the LRU order."""
+        for key, (result, size) in list(self._entries.items()):
+            result = update(key, result)
+            self._entries[key] = (result, result_nbytes(result))
+            self.nbytes += self._entries[key][1] - size
+        self._evict()
+
+    def set_budget(self, memory_budget: int):
+        self.memory_budget = memory_budget
+        self._evict()
+
+    def clear(self):
+        """Drops all entries. The hit and miss counters are kept."""
+        self._entries.clear()
+        self.nbytes = 0
+
+    def _evict(self):
+        while self.nbytes > self.memory_budget:
+            _, (_, size) = self._entries.popitem(last=False)
+            self.nbytes -= size
+
+    def stats(self) -> dict[str, int]:
+        return {'entries': len(self._entries), 'bytes': self.nbytes, 'budget': self.memory_budget,
+                'hits': self.hits, 'misses': self.misses}
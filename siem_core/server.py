@@ -0,0 +1,281 @@
+import asyncio
+import io
+import json
+import os
+import socket
+import sys
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager, suppress
+
+from siem_core.dataset import expand_paths, is_multi_file
+from siem_core.perf import PerfRecorder
+from siem_core.session import Session
+from siem_core.sidecar import source_signature
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+# Clients connected at once; more are turned away.
+DEFAULT_MAX_CLIENTS = 32
+# Commands run at once; later ones wait for a free slot.
+DEFAULT_MAX_CONCURRENT = 4
+# Datasets kept for sharing, least recently loaded dropped first.
+DEFAULT_SHARED_DATASETS = 8
+# Longest request line a client may send.
+_MAX_REQUEST_BYTES = 1024 * 1024
+
+
+def _source_state(path: str) -> tuple:
+    """Returns what a loaded dataset depends on: the paths, sizes and modification times of its files."""
+    paths = expand_paths(path) if is_multi_file(path) else [path]
+    return tuple((name, tuple(sorted(source_signature(name).items()))) for name in paths)
+
+
+class SharedTables:
+    """
+    Datasets loaded by the clients of a server, shared by all of them.
+
+    A dataset is kept under its path and load options while its files are
+    unchanged, so the next client that loads it gets the same object
+    without reading anything. Clients loading the same dataset at the same
+    time wait for a single load. At most `limit` datasets are kept; a
+    dropped one lives on in the sessions still using it.
+    """
+
+    def __init__(self, limit: int = DEFAULT_SHARED_DATASETS):
+        self.limit = limit
+        self._entries = OrderedDict()
+        # One lock per dataset key, so different datasets load in parallel.
+        self._key_locks = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def load(self, path: str, options, loader):
+        """
+        Returns the dataset loaded from `path` with hashable `options`, calling `loader()` if it is not kept.
+
+        Returns:
+            A tuple of (what `loader` returned, whether it was shared rather
+            than loaded now).
+
+        Raises:
+            FileNotFoundError: If the files are not found.
+            Whatever `loader` raises.
+        """
+        key = (os.path.abspath(path), options)
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+        with key_lock:
+            state = _source_state(path)
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None and entry[0] == state:
+                    self._entries.move_to_end(key)
+                    return entry[1], True
+            loaded = loader()
+            with self._lock:
+                self._entries[key] = (state, loaded)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.limit:
+                    self._entries.popitem(last=False)
+            return loaded, False
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class _ThreadOutput(io.TextIOBase):
+    """
+    A stand-in for sys.stdout that keeps what each command prints apart.
+
+    A thread inside `capture` writes to its own buffer; other threads write
+    to `fallback`.
+    """
+
+    def __init__(self, fallback):
+        self.fallback = fallback
+        self._local = threading.local()
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, text: str) -> int:
+        buffer = getattr(self._local, 'buffer', None)
+        return (self.fallback if buffer is None else buffer).write(text)
+
+    def flush(self):
+        if getattr(self._local, 'buffer', None) is None:
+            self.fallback.flush()
+
+    @contextmanager
+    def capture(self):
+        """Collects what the current thread writes inside the block; yields the StringIO."""
+        self._local.buffer = buffer = io.StringIO()
+        try:
+            yield buffer
+        finally:
+            self._local.buffer = None
+
+
+async def _send(writer: asyncio.StreamWriter, output: str, running: bool):
+    writer.write(json.dumps({'output': output, 'running': running}).encode('utf-8') + b'\n')
+    await writer.drain()
+
+
+class QueryServer:
+    """
+    Serves CLI commands to many clients from one process over a local TCP socket.
+
+    Every client gets its own Session (its current data, undo history and
+    caches) and PerfRecorder, while the datasets they load are shared
+    through one SharedTables. Each request is a JSON line `{"command":
+    "<command line>"}`, answered by a JSON line `{"output": "<what the
+    command printed>", "running": <false once the client exited>}`.
+
+    The event loop only moves requests and replies. Commands run through
+    `run_line(line, session, recorder)` on a pool of `max_concurrent`
+    threads, so a slow scan for one client does not hold up the others, and
+    at most that many commands run at once while the rest wait their turn.
+    A client's own commands run one after the other. At most `max_clients`
+    clients may be connected; more are told so and disconnected.
+    """
+
+    def __init__(self, run_line, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT,
+                 max_clients: int = DEFAULT_MAX_CLIENTS, max_concurrent: int = DEFAULT_MAX_CONCURRENT,
+                 tables: SharedTables | None = None):
+        self.run_line = run_line
+        self.host = host
+        self.port = port
+        self.max_clients = max_clients
+        self.max_concurrent = max_concurrent
+        self.tables = tables if tables is not None else SharedTables()
+        self.clients = 0
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrent, thread_name_prefix='siem-command')
+        self._slots = asyncio.Semaphore(max_concurrent)
+        self._output = None
+        self._server = None
+        self._client_tasks = set()
+
+    async def start(self):
+        """
+        Starts listening; with port 0 a free port is chosen and stored in `port`.
+
+        Raises:
+            OSError: If the address cannot be bound.
+        """
+        self._server = await asyncio.start_server(self._serve_client, self.host, self.port,
+                                                  limit=_MAX_REQUEST_BYTES)
+        self.port = self._server.sockets[0].getsockname()[1]
+        self._output = _ThreadOutput(sys.stdout)
+        sys.stdout = self._output
+
+    async def serve_forever(self):
+        await self._server.serve_forever()
+
+    async def close(self):
+        """Stops accepting clients, disconnects the connected ones and waits for running commands to finish."""
+        self._server.close()
+        tasks = list(self._client_tasks)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await self._server.wait_closed()
+        self._executor.shutdown(wait=True)
+        if sys.stdout is self._output:
+            sys.stdout = self._output.fallback
+
+    def _run(self, line: str, session: Session, recorder: PerfRecorder) -> tuple[str, bool]:
+        with self._output.capture() as output:
+            try:
+                running = self.run_line(line, session, recorder)
+            except Exception as e:
+                print(f"An unexpected error occurred: {e}")
+                running = True
+        return output.getvalue(), running
+
+    async def _serve_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        loop = asyncio.get_running_loop()
+        if self.clients >= self.max_clients:
+            # The refusal answers the first request, so the client reads it like any reply.
+            with suppress(ConnectionError, ValueError):
+                await reader.readline()
+                await _send(writer, f"Error: The server already has {self.max_clients} clients. "
+                                    f"Try again later.\n", False)
+            writer.close()
+            return
+        self.clients += 1
+        task = asyncio.current_task()
+        self._client_tasks.add(task)
+        session = Session()
+        session.shared_tables = self.tables
+        recorder = PerfRecorder()
+        running = True
+        try:
+            while running:
+                request = await reader.readline()
+                if not request:
+                    break
+                try:
+                    line = json.loads(request)['command'].strip()
+                except (ValueError, KeyError, TypeError, AttributeError):
+                    await _send(writer, 'Error: Requests must be JSON objects with a "command" string.\n', True)
+                    continue
+                if not line:
+                    await _send(writer, '', True)
+                    continue
+                async with self._slots:
+                    output, running = await loop.run_in_executor(self._executor, self._run, line,
+                                                                 session, recorder)
+                await _send(writer, output, running)
+        except (ConnectionError, ValueError):
+            pass # The client went away, or sent a line longer than the limit
+        finally:
+            self.clients -= 1
+            self._client_tasks.discard(task)
+            try:
+                if running:
+                    # 'exit' closes the session itself.
+                    await loop.run_in_executor(self._executor, session.close)
+            finally:
+                writer.close()
+                with suppress(ConnectionError):
+                    await writer.wait_closed()
+
+
+class ServerClient:
+    """A connection to a QueryServer, whose commands run in one session there."""
+
+    def __init__(self, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, timeout: float | None = None):
+        """
+        Raises:
+            OSError: If the server cannot be reached.
+        """
+        self._socket = socket.create_connection((host, port), timeout)
+        self._file = self._socket.makefile('rwb')
+
+    def run(self, line: str) -> tuple[str, bool]:
+        """
+        Runs one command line on the server.
+
+        Returns:
+            A tuple of (what the command printed, False if the session ended).
+
+        Raises:
+            ConnectionError: If the server closed the connection.
+            OSError: If the connection failed.
+        """
+        self._file.write(json.dumps({'command': line}).encode('utf-8') + b'\n')
+        self._file.flush()
+        reply = self._file.readline()
+        if not reply:
+            raise ConnectionError('The server closed the connection.')
+        reply = json.loads(reply)
+        return reply['output'], reply['running']
+
+    def close(self):
+        self._file.close()
+        self._socket.close()
@@ -0,0 +1,250 @@
+from collections import deque
+
+from siem_core.result_cache import DEFAULT_RESULT_CACHE_BUDGET, ResultCache
+from siem_core.table import TableView
+from siem_core.time_index import DEFAULT_TIME_COLUMN
+
+# Number of earlier results 'undo' can go back to.
+UNDO_LIMIT = 32
+
+
+class Session:
+    """
+    The data one CLI session works on.
+
+    `original_data` is the loaded ColumnarTable (a MappedCSV with --mmap, or
+    a FileSet for a glob or directory) and `current_data` the result of the
+    latest filter on it. Filters on a table return TableViews, so a result
+    costs one array of row ids and the loaded rows are never copied. Earlier
+    results are kept on an undo stack of at most `undo_limit` entries; `undo`
+    and `reset` only switch which result is current.
+
+    Results of `filter` are also kept in a ResultCache of `cache_budget`
+    bytes, so running the same filters again (e.g. after a `reset`) reuses
+    the earlier result. Loading data clears the cache. Hash tables built by
+    `lookup` are kept in a second ResultCache, `lookups`, which loading keeps.
+
+    A loaded table can grow: `follow` reads the records appended to its file
+    since it was loaded and `ingest` adds them. The current result, the undo
+    history and the cached results are brought up to date by running their
+    filters on the new rows only, and the standing queries registered with
+    `add_watch` are run on them to report new matches.
+
+    The sessions of a server's clients load data through `shared_tables`
+    (see server.SharedTables), so a dataset is held once however many
+    clients load it; each session keeps its own current data, history and
+    caches. Shared tables are never followed, as other clients read them.
+
+    In a batch run `output` is a batch.BatchOutput, which the data commands
+    write their results to instead of displaying them. With a `scan_pool`
+    (see parallel_scan.ScanPool), large filters and summaries run in its
+    worker processes; `close` stops them when the session ends.
+    """
+
+    def __init__(self, undo_limit: int = UNDO_LIMIT, cache_budget: int = DEFAULT_RESULT_CACHE_BUDGET):
+        self.original_data = []
+        self.current_data = []
+        # The filters current_data is the result of (see `filter`), or None if
+        # it was set some other way and cannot be cached.
+        self.filters = frozenset()
+        self.history = deque(maxlen=undo_limit)
+        self.results = ResultCache(cache_budget)
+        # Built lookup tables (see `lookups`), created by the first lookup.
+        self._lookups = None
+        # Incremented on every load, so results of earlier data never match.
+        self.version = 0
+        # Where original_data was loaded from, the snapshot directory it uses
+        # (None if snapshots are disabled) and its column types, so indexes
+        # built during the session can be saved.
+        self.loaded_path = None
+        self.cache_dir = None
+        self.column_types = None
+        # The column 'window' filters on; set with 'load --time=<col>'.
+        self.time_column = DEFAULT_TIME_COLUMN
+        # Reads what is appended to the loaded file (None for mapped files and
+        # multi-file datasets).
+        self.follower = None
+        # Standing queries: (expression, parsed expression).
+        self.watches = []
+        # Datasets shared with the other clients of a server, or None.
+        self.shared_tables = None
+        # Where results are written in a batch run, or None to display them.
+        self.output = None
+        # Worker processes large scans run in, or None to run them here.
+        self.scan_pool = None
+        # How to run each filter key used since the last load, so results can
+        # be extended when rows are appended.
+        self._filter_runs = {}
+
+    def set_loaded(self, data, path: str, cache_dir: str | None = None, column_types=None,
+                   time_column: str | None = None, follower: 'CSVFollower | None' = None):
+        """Makes freshly loaded data both the original and the current data, with no undo history."""
+        self.original_data = self.current_data = data
+        self.filters = frozenset()
+        self.history.clear()
+        self.version += 1
+        self.results.clear()
+        self._filter_runs.clear()
+        self.loaded_path, self.cache_dir, self.column_types = path, cache_dir, column_types
+        self.time_column = time_column or DEFAULT_TIME_COLUMN
+        self.follower = follower
+        if self.scan_pool is not None:
+            self.scan_pool.release() # Its copy of the earlier data is no longer needed
+
+    @property
+    def lookups(self) -> ResultCache:
+        """Built lookup tables (see lookup.enrich), kept across loads."""
+        if self._lookups is None:
+            from siem_core.lookup import DEFAULT_LOOKUP_BUDGET
+            self._lookups = ResultCache(DEFAULT_LOOKUP_BUDGET)
+        return self._lookups
+
+    def apply(self, result, filters: frozenset | None = None):
+        """
+        Makes `result` the current data, keeping the previous one for `undo`.
+
+        `filters` are the filters `result` is the result of; with None, later
+        filters are not cached until the next `reset`.
+        """
+        self.history.append((self.current_data, self.filters))
+        self.current_data = result
+        self.filters = filters
+
+    def filter(self, key, run) -> bool:
+        """
+        Makes `run(current_data)` the current data, reusing a cached result if possible.
+
+        `key` is a hashable, normalized form of the filter, such as
+        `('where', 'Port = 80')`. Chained filters only narrow the rows down,
+        so a result depends just on the set of filters applied since the data
+        was loaded or reset: that set is the cache key, and the same filters
+        chained in any order share one entry.
+
+        Returns:
+            True if the result came from the cache.
+        """
+        self._filter_runs[key] = run
+        filters = None if self.filters is None else self.filters | {key}
+        result = None if filters is None else self.results.get((self.version, filters))
+        cached = result is not None
+        if not cached:
+            result = run(self.current_data)
+            if filters is not None:
+                self.results.put((self.version, filters), result)
+        self.apply(result, filters)
+        return cached
+
+    def reset(self):
+        """Goes back to the loaded data. This can be undone like a filter."""
+        if self.current_data is not self.original_data:
+            self.apply(self.original_data, frozenset())
+
+    def undo(self) -> bool:
+        """Restores the data before the last filter or reset. Returns False if there is nothing to undo."""
+        if not self.history:
+            return False
+        self.current_data, self.filters = self.history.pop()
+        return True
+
+    def follow(self) -> TableView:
+        """
+        Ingests the complete records appended to the loaded file since it was loaded or last followed.
+
+        Returns:
+            A view of the new rows.
+
+        Raises:
+            ValueError: If the loaded data cannot grow (a mapped file), or
+                the file shrank or holds invalid records.
+            FileNotFoundError: If the file no longer exists.
+        """
+        if self.follower is None:
+            raise ValueError("Only single uncompressed files loaded without '--mmap' can be followed.")
+        new_rows = self.ingest(self.follower.read_new())
+        self.original_data.source_end = self.follower.offset
+        return new_rows
+
+    def ingest(self, rows) -> TableView:
+        """
+        Appends records (lists of fields) to the loaded table and brings all results up to date.
+
+        Results whose filters are unknown (see `apply`) are left as they are.
+
+        Returns:
+            A view of the new rows.
+        """
+        # Following, watches and snapshots are imported when first used, so sessions start quickly.
+        from siem_core.follow import append_rows
+        table = self.original_data
+        new_rows = table.select(append_rows(table, rows))
+        if not len(new_rows):
+            return new_rows
+        new_matches = {}
+
+        def extend(result, filters):
+            if not filters:
+                # The table itself, or a result that cannot be recomputed.
+                return result
+            matches = new_matches.get(filters)
+            if matches is None:
+                matches = new_rows
+                for key in filters:
+                    matches = self._filter_runs[key](matches)
+                matches = new_matches[filters] = matches.selection
+            return TableView(table, result.selection + matches)
+
+        self.current_data = extend(self.current_data, self.filters)
+        self.history = deque(((extend(data, filters), filters) for data, filters in self.history),
+                             maxlen=self.history.maxlen)
+        self.results.refresh(lambda key, result: extend(result, key[1]))
+        return new_rows
+
+    def add_watch(self, expression: str):
+        """
+        Registers a standing query that `check_watches` runs on new rows.
+
+        Raises:
+            QuerySyntaxError: If the expression is not valid.
+        """
+        from siem_core.query_lang import parse_query
+        self.watches.append((expression, parse_query(expression)))
+
+    def remove_watch(self, number: int) -> bool:
+        """Removes the standing query with the given 1-based number. Returns False if there is none."""
+        if not 1 <= number <= len(self.watches):
+            return False
+        del self.watches[number - 1]
+        return True
+
+    def check_watches(self, rows) -> list[tuple[str, TableView]]:
+        """Returns (expression, matching rows) for every standing query that matches some of `rows`."""
+        from siem_core.query_lang import QueryPlan
+        matches = []
+        for expression, node in self.watches:
+            result = QueryPlan(rows, node).execute()
+            if len(result):
+                matches.append((expression, result))
+        return matches
+
+    def set_scan_pool(self, pool):
+        """Makes large scans run in `pool` (None runs them in this process), stopping the previous pool."""
+        if self.scan_pool is not None:
+            self.scan_pool.close()
+        self.scan_pool = pool
+
+    def close(self):
+        """Ends the session: saves its indexes and stops its scan pool."""
+        self.save_indexes()
+        self.set_scan_pool(None)
+
+    def save_indexes(self):
+        """Adds indexes built since the last load to the loaded file's snapshot."""
+        if self.cache_dir is None or not hasattr(self.original_data, "indexes"):
+            return
+        if self.follower is not None and not self.follower.caught_up():
+            return # The table does not hold the file's current contents
+        from siem_core.snapshot import update_snapshot
+        try:
+            update_snapshot(self.original_data, self.loaded_path, self.cache_dir, column_types=self.column_types)
+        except OSError:
+            pass # The source file moved or the cache is not writable; nothing to keep
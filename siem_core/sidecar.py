@@ -0,0 +1,115 @@
+import hashlib
+import json
+import os
+import struct
+import tempfile
+from array import array
+
+from siem_core import perf
+
+# Cache files live here unless a directory is passed explicitly.
+DEFAULT_CACHE_DIR = os.environ.get('SIEM_CACHE_DIR') or os.path.join(
+    os.path.expanduser('~'), '.cache', 'siem_core'
+)
+
+_MAGIC = b'SIEMSIDE'
+_FORMAT_VERSION = 1
+_LENGTH = struct.Struct('<Q')
+
+
+def source_signature(file_path: str) -> dict:
+    """
+    Returns what identifies the current contents of a source file.
+
+    A sidecar is valid only while the source keeps the same absolute path,
+    size and modification time.
+
+    Raises:
+        FileNotFoundError: If the file does not exist.
+    """
+    stat = os.stat(file_path)
+    return {'path': os.path.abspath(file_path), 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+
+def sidecar_path(file_path: str, cache_dir: str, suffix: str) -> str:
+    """Returns the path of the sidecar with the given suffix for a source file."""
+    absolute = os.path.abspath(file_path)
+    digest = hashlib.sha1(absolute.encode('utf-8')).hexdigest()[:16]
+    return os.path.join(cache_dir, f"{os.path.basename(absolute)}.{digest}{suffix}")
+
+
+def write_sidecar(path: str, header: dict, arrays: list[array]):
+    """
+    Writes a sidecar file: a JSON header followed by raw array buffers.
+
+    The header records each array's typecode and length so `read_sidecar`
+    can restore them without parsing. The file is written to a temporary
+    name first and moved into place, so readers never see a partial file.
+    """
+    header = dict(header, format_version=_FORMAT_VERSION,
+                  arrays=[[values.typecode, len(values)] for values in arrays])
+    encoded = json.dumps(header).encode('utf-8')
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or '.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(_MAGIC)
+            f.write(_LENGTH.pack(len(encoded)))
+            f.write(encoded)
+            for values in arrays:
+                values.tofile(f)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def _read_header(f) -> dict | None:
+    if f.read(len(_MAGIC)) != _MAGIC:
+        return None
+    (length,) = _LENGTH.unpack(f.read(_LENGTH.size))
+    header = json.loads(f.read(length).decode('utf-8'))
+    if header.get('format_version') != _FORMAT_VERSION:
+        return None
+    return header
+
+
+def read_sidecar_header(path: str) -> dict | None:
+    """Reads only the JSON header of a sidecar, or returns None if it cannot be read."""
+    try:
+        with open(path, 'rb') as f:
+            return _read_header(f)
+    except (OSError, ValueError, struct.error):
+        return None
+
+
+def read_sidecar(path: str, signature: dict | None = None) -> tuple[dict, list[array]] | None:
+    """
+    Reads a sidecar written by `write_sidecar`.
+
+    Args:
+        path: The sidecar path.
+        signature: If given, the sidecar is only returned when it was
+            written for a source with exactly this signature.
+
+    Returns:
+        A tuple of (header, arrays), or None if the sidecar is missing,
+        stale, unreadable or from another format version.
+    """
+    try:
+        with open(path, 'rb') as f:
+            header = _read_header(f)
+            if header is None:
+                return None
+            if signature is not None and header.get('signature') != signature:
+                return None
+            arrays = []
+            for typecode, count in header['arrays']:
+                values = array(typecode)
+                values.fromfile(f, count)
+                arrays.append(values)
+            perf.count(bytes_read=f.tell())
+            return header, arrays
+    except (OSError, EOFError, ValueError, KeyError, struct.error):
+        return None
@@ -0,0 +1,175 @@
+from array import array
+
+from siem_core.index import DEFAULT_INDEX_BUDGET, HashIndex, IndexManager, SortedIndex
+from siem_core.sidecar import read_sidecar, read_sidecar_header, sidecar_path, source_signature, write_sidecar
+from siem_core.table import ROW_ID_TYPECODE, ColumnarTable, DictColumn, StringColumn
+from siem_core.time_index import TimeIndex
+from siem_core.typed import TypedColumn, candidate_types
+
+SNAPSHOT_SUFFIX = '.snapshot'
+
+
+def snapshot_path(file_path: str, cache_dir: str) -> str:
+    """Returns where the snapshot of a CSV file is kept in `cache_dir`."""
+    return sidecar_path(file_path, cache_dir, SNAPSHOT_SUFFIX)
+
+
+def save_snapshot(table: ColumnarTable, file_path: str, cache_dir: str, column_types=None):
+    """
+    Writes a binary snapshot of a table loaded from `file_path`.
+
+    The snapshot holds every column in its encoded form (code arrays and
+    value dictionaries, packed string buffers, or integer arrays) plus the
+    indexes the table has built so far. It is tied to the CSV file's current
+    path, size and modification time, and to the `column_types` the table was
+    loaded with. The table's `source_end` is kept as well.
+
+    Raises:
+        OSError: If the snapshot cannot be written.
+    """
+    columns = []
+    arrays = []
+    for name in table.fieldnames:
+        column = table.columns[name]
+        if column.kind == 'dict':
+            columns.append({'name': name, 'kind': 'dict', 'values': column.values})
+            arrays.append(column.codes)
+        elif column.kind == 'typed':
+            columns.append({'name': name, 'kind': 'typed', 'type': column.ctype.spec,
+                            'blanks': sorted(column.blanks.items())})
+            arrays.append(column.values)
+        else:
+            columns.append({'name': name, 'kind': 'string', 'nulls': sorted(column.nulls)})
+            arrays.append(array('B', column.buffer))
+            arrays.append(column.offsets)
+
+    # Other threads may build or evict indexes meanwhile; save the ones built now.
+    built, built_time = table.indexes.built() if table.indexes is not None else ({}, {})
+    indexes = []
+    for name, index in built.items():
+        if isinstance(index, SortedIndex):
+            indexes.append({'column': name, 'kind': 'sorted'})
+            arrays.append(index.order)
+            continue
+        keys = list(index.postings)
+        indexes.append({'column': name, 'keys': keys})
+        arrays.append(array(ROW_ID_TYPECODE, [len(index.postings[key]) for key in keys]))
+        row_ids = array(ROW_ID_TYPECODE)
+        for key in keys:
+            row_ids.extend(index.postings[key])
+        arrays.append(row_ids)
+    time_indexes = []
+    for name, index in built_time.items():
+        time_indexes.append({'column': name, 'sorted': index.is_sorted, 'ordered': index.order is not None})
+        arrays.append(index.times)
+        if index.order is not None:
+            arrays.append(index.order)
+
+    header = {
+        'signature': source_signature(file_path),
+        'num_rows': len(table),
+        'source_end': table.source_end,
+        'column_types': column_types,
+        'columns': columns,
+        'indexes': indexes,
+        'time_indexes': time_indexes,
+    }
+    write_sidecar(snapshot_path(file_path, cache_dir), header, arrays)
+
+
+def load_snapshot(file_path: str, cache_dir: str, index_budget: int = DEFAULT_INDEX_BUDGET,
+                  column_types=None, complete_records_only: bool = False) -> ColumnarTable | None:
+    """
+    Restores a table from its snapshot, if the snapshot is still valid.
+
+    Args:
+        file_path: The CSV file the snapshot was taken from.
+        cache_dir: The directory holding snapshots.
+        index_budget: Memory budget in bytes for the restored indexes.
+        column_types: The column types requested for the table; snapshots
+            taken with other column types are not used.
+        complete_records_only: Use only a snapshot of a table that was
+            loaded with complete records only (see
+            `csv_handler.load_csv_to_table`), and restore its `source_end`.
+
+    Returns:
+        The restored table, with its saved indexes installed, or None if there
+        is no snapshot, the CSV file changed since it was taken, it was taken
+        with other column types, or it holds other records than requested.
+    """
+    try:
+        signature = source_signature(file_path)
+    except FileNotFoundError:
+        return None
+    restored = read_sidecar(snapshot_path(file_path, cache_dir), signature)
+    if restored is None:
+        return None
+    header, arrays = restored
+    if header.get('column_types') != column_types:
+        return None
+    source_end = header.get('source_end')
+    if complete_records_only and source_end is None:
+        return None
+    if not complete_records_only and source_end not in (None, signature['size']):
+        return None # It lacks the last record, which was still being written
+    arrays = iter(arrays)
+
+    table = ColumnarTable([column['name'] for column in header['columns']])
+    for spec in header['columns']:
+        if spec['kind'] == 'dict':
+            column = DictColumn(spec['values'], next(arrays))
+        elif spec['kind'] == 'typed':
+            ctype = candidate_types(spec['type'])[0]
+            column = TypedColumn(ctype, next(arrays), {row_id: value for row_id, value in spec['blanks']})
+        else:
+            column = StringColumn()
+            column.buffer = bytearray(next(arrays))
+            column.offsets = next(arrays)
+            column.nulls = set(spec['nulls'])
+        table._replace_column(spec['name'], column)
+    table._num_rows = header['num_rows']
+    table.source_end = source_end
+
+    table.indexes = IndexManager(table, memory_budget=index_budget)
+    for spec in header['indexes']:
+        if spec.get('kind') == 'sorted':
+            column_name = spec['column']
+            table.indexes.add(column_name, SortedIndex(table.columns[column_name], next(arrays)))
+            continue
+        counts = next(arrays)
+        row_ids = next(arrays)
+        postings = {}
+        pos = 0
+        for key, count in zip(spec['keys'], counts):
+            postings[key] = row_ids[pos:pos + count]
+            pos += count
+        table.indexes.add(spec['column'], HashIndex.from_postings(postings))
+    for spec in header.get('time_indexes', []):
+        times = next(arrays)
+        order = next(arrays) if spec['ordered'] else None
+        table.indexes.time_indexes[spec['column']] = TimeIndex.from_arrays(times, order, spec['sorted'])
+    return table
+
+
+def update_snapshot(table: ColumnarTable, file_path: str, cache_dir: str, column_types=None) -> bool:
+    """
+    Rewrites a table's snapshot if it has built indexes (or time indexes) the snapshot lacks.
+
+    Returns:
+        True if the snapshot was written.
+    """
+    if table.indexes is None:
+        return False
+    built, built_time = table.indexes.built()
+    if not (built or built_time):
+        return False
+    header = read_sidecar_header(snapshot_path(file_path, cache_dir))
+    if (header is not None and header.get('signature') == source_signature(file_path)
+            and header.get('column_types') == column_types
+            and header.get('source_end') == table.source_end):
+        saved = {spec['column'] for spec in header.get('indexes', [])}
+        saved_time = {spec['column'] for spec in header.get('time_indexes', [])}
+        if set(built) <= saved and set(built_time) <= saved_time:
+            return False
+    save_snapshot(table, file_path, cache_dir, column_types=column_types)
+    return True
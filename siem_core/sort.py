@@ -0,0 +1,224 @@
+import heapq
+import math
+import os
+import tempfile
+from array import array
+from itertools import islice
+
+from siem_core import perf
+from siem_core.index import DEFAULT_INDEX_BUDGET, IndexManager
+from siem_core.table import ROW_ID_TYPECODE, ColumnarTable, TableView
+
+# Memory budget for the keys of one sort or dedup.
+DEFAULT_SORT_BUDGET = 256 * 1024 * 1024
+# Sorting in memory takes about this many bytes per row: a row id and its
+# key in Python lists, and the key object itself.
+_SORT_BYTES_PER_ROW = 100
+# A dedup keeps about this many bytes per distinct key in its hash set.
+_DEDUP_BYTES_PER_KEY = 120
+# Limits of at most this fraction of the rows are taken with a heap instead of a full sort.
+_TOP_K_RATIO = 8
+# Row ids read back from each sorted run at a time while merging.
+_MERGE_BLOCK_ROWS = 65536
+# A dedup spills row ids to at most this many partition files.
+_MAX_PARTITIONS = 256
+
+
+def _base_rows(data):
+    """Returns a table holding the rows of `data` and the ids of those rows in it, in order."""
+    if isinstance(data, TableView):
+        return data.base, data.selection
+    if isinstance(data, ColumnarTable):
+        return data, range(len(data))
+    table = ColumnarTable.from_dicts(data)
+    return table, range(len(table))
+
+
+def _sort_key(column, descending: bool):
+    """
+    Returns a function giving each row id its sort key, and the row ids without a value.
+
+    Dictionary columns are keyed by the rank of each row's value among the
+    column's distinct values, so rows compare as small integers, and rows
+    without a value are ranked last in either direction. Typed columns are
+    keyed by their integers; plain columns by their text.
+    """
+    if column.kind == 'dict':
+        values = column.values
+        rank = array('l', [0]) * len(values)
+        present = sorted((code for code, value in enumerate(values) if value is not None), key=values.__getitem__)
+        for position, code in enumerate(present):
+            rank[code] = position
+        missing = column.code_of(None)
+        if missing is not None:
+            rank[missing] = -1 if descending else len(values)
+        codes = column.codes
+        return (lambda row_id: rank[codes[row_id]]), ()
+    if column.kind == 'typed':
+        return column.values.__getitem__, column.blanks
+    return column.get, column.nulls
+
+
+def _read_run(path: str, length: int):
+    """Yields the row ids of a sorted run file, reading them a block at a time."""
+    with open(path, 'rb') as f:
+        while length:
+            block = array(ROW_ID_TYPECODE)
+            block.fromfile(f, min(length, _MERGE_BLOCK_ROWS))
+            length -= len(block)
+            yield from block
+
+
+def sort_rows(data, column_name: str, descending: bool = False, limit: int | None = None,
+              memory_budget: int = DEFAULT_SORT_BUDGET, index_budget: int = DEFAULT_INDEX_BUDGET):
+    """
+    Returns the rows of `data` sorted on one column.
+
+    Rows with equal values keep their order, and rows without a value (or
+    with a blank typed value) come last. Typed columns sort by their
+    numbers or times, all other columns by their text.
+
+    A `limit` that is small next to the number of rows is taken with a heap
+    of that many rows. Otherwise the rows are sorted in memory if their keys
+    fit `memory_budget`; if not, runs of as many rows as fit are sorted and
+    spilled to temporary files as row ids, and the runs are merged, reading
+    each back a block at a time (an external merge sort). The sorted rows
+    are then copied into a new table.
+
+    Args:
+        data: The rows to sort: a ColumnarTable, TableView, MappedCSV or list of dictionaries.
+        column_name: The column to sort on.
+        descending: Sort from the largest value down.
+        limit: Keep only this many rows from the top; None keeps all.
+        memory_budget: Bytes the sort keys may take in memory.
+        index_budget: Memory budget in bytes for the indexes of the result.
+
+    Returns:
+        A tuple of (a new table with the sorted rows, how they were sorted:
+        'top-k', 'memory' or 'external', and the number of sorted runs).
+
+    Raises:
+        ValueError: If the column does not exist.
+    """
+    table, row_ids = _base_rows(data)
+    if column_name not in table.columns:
+        raise ValueError(f"Column '{column_name}' not found in the current data.")
+    key, missing = _sort_key(table.columns[column_name], descending)
+    perf.count(rows_scanned=len(row_ids))
+    last = []
+    if missing:
+        last = [row_id for row_id in row_ids if row_id in missing]
+        if last:
+            row_ids = [row_id for row_id in row_ids if row_id not in missing]
+    run_rows = max(memory_budget // _SORT_BYTES_PER_ROW, 1)
+    runs = 1
+
+    if limit is not None and limit * _TOP_K_RATIO <= len(row_ids) and limit <= run_rows:
+        pick = heapq.nlargest if descending else heapq.nsmallest
+        order = array(ROW_ID_TYPECODE, pick(limit, row_ids, key=key))
+        strategy = 'top-k'
+    elif len(row_ids) <= run_rows:
+        ordered = sorted(row_ids, key=key, reverse=descending)
+        order = array(ROW_ID_TYPECODE, ordered if limit is None else ordered[:limit])
+        strategy = 'memory'
+    else:
+        strategy = 'external'
+        runs = math.ceil(len(row_ids) / run_rows)
+        with tempfile.TemporaryDirectory(prefix='siem-sort-') as spill_dir:
+            lengths = []
+            for number in range(runs):
+                run = array(ROW_ID_TYPECODE, sorted(row_ids[number * run_rows:(number + 1) * run_rows],
+                                                    key=key, reverse=descending))
+                with open(os.path.join(spill_dir, f'{number}.run'), 'wb') as f:
+                    run.tofile(f)
+                lengths.append(len(run))
+                del run
+            readers = [_read_run(os.path.join(spill_dir, f'{number}.run'), length)
+                       for number, length in enumerate(lengths)]
+            merged = heapq.merge(*readers, key=key, reverse=descending)
+            order = array(ROW_ID_TYPECODE, islice(merged, limit))
+            perf.count(bytes_read=sum(lengths) * order.itemsize)
+    if last and (limit is None or len(order) < limit):
+        order.extend(array(ROW_ID_TYPECODE, last if limit is None else last[:limit - len(order)]))
+
+    result = table.take(order)
+    result.indexes = IndexManager(result, memory_budget=index_budget)
+    return result, strategy, runs
+
+
+def dedup_rows(data, column_names: list[str], memory_budget: int = DEFAULT_SORT_BUDGET):
+    """
+    Keeps the first row of each distinct combination of values in the given columns.
+
+    The rows keep their order. The distinct keys are kept in a hash set if
+    they fit `memory_budget` (estimated as if every row were distinct);
+    otherwise the row ids are first split by key hash into partitions
+    spilled to temporary files, and each partition is deduplicated on its
+    own, as rows with the same key always share a partition.
+
+    Args:
+        data: The rows to deduplicate: a ColumnarTable, TableView, MappedCSV or list of dictionaries.
+        column_names: The columns whose values identify a duplicate.
+        memory_budget: Bytes the distinct keys may take in memory.
+
+    Returns:
+        A tuple of (a view of the rows kept, the number of partitions used).
+
+    Raises:
+        ValueError: If a column does not exist.
+    """
+    table, row_ids = _base_rows(data)
+    missing = [name for name in column_names if name not in table.columns]
+    if missing:
+        raise ValueError(f"Column(s) {', '.join(missing)} not found in the current data.")
+    # Dictionary codes stand for their values, and are cheaper to hash and keep.
+    getters = [column.codes.__getitem__ if column.kind == 'dict' else column.get
+               for column in (table.columns[name] for name in column_names)]
+    if len(getters) == 1:
+        key = getters[0]
+    else:
+        key = lambda row_id: tuple(get(row_id) for get in getters)
+    perf.count(rows_scanned=len(row_ids))
+
+    def first_rows(ids) -> array:
+        seen = set()
+        kept = array(ROW_ID_TYPECODE)
+        for row_id in ids:
+            row_key = key(row_id)
+            if row_key not in seen:
+                seen.add(row_key)
+                kept.append(row_id)
+        return kept
+
+    estimate = len(row_ids) * _DEDUP_BYTES_PER_KEY
+    if estimate <= memory_budget:
+        return TableView(table, first_rows(row_ids)), 1
+
+    # Twice as many partitions as needed, so uneven ones still fit.
+    partition_count = min(2 * math.ceil(estimate / memory_budget), _MAX_PARTITIONS)
+    with tempfile.TemporaryDirectory(prefix='siem-dedup-') as spill_dir:
+        paths = [os.path.join(spill_dir, f'{number}.part') for number in range(partition_count)]
+        files = [open(path, 'wb') for path in paths]
+        try:
+            buffers = [array(ROW_ID_TYPECODE) for _ in paths]
+            for row_id in row_ids:
+                number = hash(key(row_id)) % partition_count
+                buffer = buffers[number]
+                buffer.append(row_id)
+                if len(buffer) >= _MERGE_BLOCK_ROWS:
+                    buffer.tofile(files[number])
+                    del buffer[:]
+            for buffer, f in zip(buffers, files):
+                buffer.tofile(f)
+        finally:
+            for f in files:
+                f.close()
+        kept_parts = []
+        for path in paths:
+            ids = array(ROW_ID_TYPECODE)
+            with open(path, 'rb') as f:
+                ids.frombytes(f.read())
+            perf.count(bytes_read=len(ids) * ids.itemsize)
+            kept_parts.append(first_rows(ids))
+    # Each partition kept its rows in ascending order; merging restores the order of `data`.
+    return TableView(table, array(ROW_ID_TYPECODE, heapq.merge(*kept_parts))), partition_count
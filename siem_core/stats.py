@@ -0,0 +1,424 @@
+import heapq
+import math
+import re
+from collections import Counter
+from dataclasses import dataclass
+from typing import NamedTuple
+from itertools import repeat
+from operator import itemgetter
+
+from siem_core import perf
+from siem_core.mmap_backend import MappedCSV
+from siem_core.table import ColumnarTable, TableView
+from siem_core.typed import IntegerType
+
+# Aggregate functions `stats` accepts, and the ones that need a column.
+AGGREGATE_FUNCTIONS = ('count', 'sum', 'min', 'max', 'dc')
+_COLUMN_FUNCTIONS = ('sum', 'min', 'max', 'dc')
+
+# Distinct values are counted exactly in a set up to this many values per
+# group; beyond it the set is replaced by a HyperLogLog.
+_EXACT_DISTINCT_LIMIT = 1024
+
+_MASK64 = (1 << 64) - 1
+_INVERSE_POWERS = [2.0 ** -rank for rank in range(66)]
+
+_AGGREGATE_RE = re.compile(r'(\w+)(?:\(\s*([^()\s]+)\s*\))?')
+_BY_RE = re.compile(r'\s+by\s+|^by\s+', re.IGNORECASE)
+
+
+class StatsSyntaxError(ValueError):
+    """Raised when a `stats` specification cannot be parsed."""
+
+
+@dataclass(frozen=True)
+class Aggregate:
+    """One aggregate of a `stats` command, e.g. `sum(Bytes)`; `column` is None for `count`."""
+    function: str
+    column: str | None = None
+
+    def __str__(self) -> str:
+        return self.function if self.column is None else f"{self.function}({self.column})"
+
+
+def parse_stats(text: str) -> tuple[tuple[Aggregate, ...], tuple[str, ...]]:
+    """
+    Parses a stats specification such as `count, dc(Source_IP) by Protocol,Port`.
+
+    Aggregates and group-by columns are separated by commas or spaces.
+
+    Returns:
+        A tuple of (aggregates, group-by columns).
+
+    Raises:
+        StatsSyntaxError: If the specification is not valid.
+    """
+    aggregate_text, _, by_text = (part.strip() for part in _partition_by(text.strip()))
+    aggregates = []
+    pos = 0
+    while pos < len(aggregate_text):
+        if aggregate_text[pos] in ', ':
+            pos += 1
+            continue
+        match = _AGGREGATE_RE.match(aggregate_text, pos)
+        if match is None:
+            raise StatsSyntaxError(f"Unexpected '{aggregate_text[pos:]}' in stats specification.")
+        function, column = match.group(1).lower(), match.group(2)
+        if function not in AGGREGATE_FUNCTIONS:
+            raise StatsSyntaxError(f"Unknown aggregate function '{match.group(1)}'; "
+                                   f"use one of {', '.join(AGGREGATE_FUNCTIONS)}.")
+        if (function in _COLUMN_FUNCTIONS) != (column is not None):
+            usage = f"{function}(<column>)" if function in _COLUMN_FUNCTIONS else function
+            raise StatsSyntaxError(f"Write '{usage}' in stats specification.")
+        aggregates.append(Aggregate(function, column))
+        pos = match.end()
+    if not aggregates:
+        raise StatsSyntaxError("Expected at least one aggregate, e.g. 'count'.")
+    by = tuple(column for column in re.split(r'[,\s]+', by_text) if column)
+    if _ and not by:
+        raise StatsSyntaxError("Expected columns after 'by'.")
+    return tuple(aggregates), by
+
+
+def _partition_by(text: str) -> tuple[str, str, str]:
+    match = _BY_RE.search(text)
+    if match is None:
+        return text, '', ''
+    return text[:match.start()], match.group(), text[match.end():]
+
+
+def _hash64(value) -> int:
+    """Spreads Python's hash of `value` over 64 bits (small ints hash to themselves)."""
+    h = hash(value) & _MASK64
+    h = ((h ^ (h >> 30)) * 0xbf58476d1ce4e5b9) & _MASK64
+    h = ((h ^ (h >> 27)) * 0x94d049bb133111eb) & _MASK64
+    return h ^ (h >> 31)
+
+
+class HyperLogLog:
+    """
+    An approximate distinct count in `2 ** precision` bytes.
+
+    The relative standard error is about `1.04 / sqrt(2 ** precision)`, 0.8%
+    at the default precision. Values are hashed with Python's `hash`, so
+    sketches can only be merged within one process.
+    """
+
+    def __init__(self, precision: int = 14):
+        if not 4 <= precision <= 18:
+            raise ValueError("HyperLogLog precision must be between 4 and 18.")
+        self.precision = precision
+        self.registers = bytearray(1 << precision)
+
+    def add(self, value):
+        h = _hash64(value)
+        index = h >> (64 - self.precision)
+        rest_bits = 64 - self.precision
+        rank = rest_bits - (h & ((1 << rest_bits) - 1)).bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def update(self, values):
+        for value in values:
+            self.add(value)
+
+    def merge(self, other: 'HyperLogLog'):
+        if other.precision != self.precision:
+            raise ValueError("Cannot merge HyperLogLogs of different precision.")
+        self.registers = bytearray(map(max, self.registers, other.registers))
+
+    def __len__(self) -> int:
+        registers = self.registers
+        size = len(registers)
+        alpha = 0.7213 / (1 + 1.079 / size)
+        estimate = alpha * size * size / sum(map(_INVERSE_POWERS.__getitem__, registers))
+        zeros = registers.count(0)
+        if estimate <= 2.5 * size and zeros:
+            # Small cardinalities are estimated better by linear counting.
+            estimate = size * math.log(size / zeros)
+        return round(estimate)
+
+
+class _DistinctCounter:
+    """Counts distinct values exactly while there are few, then approximately in bounded memory."""
+
+    __slots__ = ('values', 'sketch')
+
+    def __init__(self):
+        self.values = set()
+        self.sketch = None
+
+    def add(self, value):
+        if self.sketch is not None:
+            self.sketch.add(value)
+            return
+        self.values.add(value)
+        if len(self.values) > _EXACT_DISTINCT_LIMIT:
+            self.sketch = HyperLogLog()
+            self.sketch.update(self.values)
+            self.values = None
+
+    def __len__(self) -> int:
+        return len(self.values) if self.sketch is None else len(self.sketch)
+
+
+def _to_number(text):
+    if isinstance(text, int):
+        return text
+    try:
+        return int(text)
+    except (TypeError, ValueError):
+        try:
+            number = float(text)
+        except (TypeError, ValueError):
+            return None
+        return number if math.isfinite(number) else None
+
+
+class _ColumnKeys(NamedTuple):
+    """
+    One column of the rows being aggregated.
+
+    `keys` yields a hashable key per row (dictionary codes or the integers
+    of typed columns where possible), `decode` turns a key back into the
+    field value and `numbers` turns it into a number (or None). `encoded`
+    tells whether the keys are dictionary codes, of which there are no more
+    than the column already stores.
+    """
+    keys: object
+    decode: object
+    numbers: object
+    encoded: bool = False
+
+
+def _column_keys(data, column_name: str) -> _ColumnKeys:
+    if isinstance(data, (ColumnarTable, TableView)):
+        column = data.base.columns.get(column_name)
+        if column is None:
+            return _ColumnKeys(repeat(None, len(data)), _identity, _no_number)
+        selection = data.selection
+        if column.kind == 'dict' or (column.kind == 'typed' and not column.blanks):
+            stored = column.codes if column.kind == 'dict' else column.values
+            keys = stored if selection is None else map(stored.__getitem__, selection)
+            if column.kind == 'dict':
+                values = column.values
+                numbers = [_to_number(value) for value in values]
+                return _ColumnKeys(keys, values.__getitem__, numbers.__getitem__, encoded=True)
+            if isinstance(column.ctype, IntegerType):
+                return _ColumnKeys(keys, column.ctype.format, _identity)
+            return _ColumnKeys(keys, column.ctype.format, _no_number)
+        row_ids = range(len(column)) if selection is None else selection
+        return _ColumnKeys(map(column.get, row_ids), _identity, _to_number)
+    if isinstance(data, MappedCSV):
+        if column_name not in data.columns:
+            return _ColumnKeys(repeat(None, len(data)), _identity, _no_number)
+        return _ColumnKeys((data.value(row_id, column_name) for row_id in range(len(data))), _identity, _to_number)
+    return _ColumnKeys((row.get(column_name) for row in data), _identity, _to_number)
+
+
+def _identity(value):
+    return value
+
+
+def _no_number(value):
+    return None
+
+
+def _group_keys(data, columns) -> tuple:
+    """
+    Returns (keys, decode) for grouping the rows of `data` by `columns`.
+
+    `keys` yields one hashable key per row and `decode` turns a key into the
+    tuple of field values it stands for.
+    """
+    readers = [_column_keys(data, column) for column in columns]
+    if len(readers) == 1:
+        decode = readers[0].decode
+        return readers[0].keys, lambda key: (decode(key),)
+    decoders = [reader.decode for reader in readers]
+    return zip(*(reader.keys for reader in readers)), lambda key: tuple(map(_call, decoders, key))
+
+
+def _call(function, value):
+    return function(value)
+
+
+def _sort_key(values: tuple):
+    return tuple((0, number, '') if (number := _to_number(value)) is not None else (1, 0, str(value or ''))
+                 for value in values)
+
+
+def _aggregate(function: str, column: _ColumnKeys, group_ids, group_count: int) -> list:
+    """Computes one aggregate for every group in one pass over the rows."""
+    keys, decode, numbers = column.keys, column.decode, column.numbers
+    if function == 'dc':
+        blank = {}
+
+        def is_blank(key) -> bool:
+            result = blank.get(key)
+            if result is None:
+                result = blank[key] = decode(key) in (None, '')
+            return result
+
+        if group_count == 1 and column.encoded:
+            # A set of dictionary codes is no larger than the column's dictionary.
+            return [sum(1 for key in set(keys) if not is_blank(key))]
+        counters = [_DistinctCounter() for _ in range(group_count)]
+        for group_id, key in zip(group_ids, keys):
+            if not is_blank(key):
+                counters[group_id].add(key)
+        return [len(counter) for counter in counters]
+
+    results = [None] * group_count
+    if function == 'sum':
+        for group_id, key in zip(group_ids, keys):
+            number = numbers(key)
+            if number is not None:
+                total = results[group_id]
+                results[group_id] = number if total is None else total + number
+        return results
+    better = min if function == 'min' else max
+    best_keys = [None] * group_count
+    for group_id, key in zip(group_ids, keys):
+        number = numbers(key)
+        if number is not None:
+            best = results[group_id]
+            if best is None or better(best, number) != best:
+                results[group_id] = number
+                best_keys[group_id] = key
+    return [None if key is None else decode(key) for key in best_keys]
+
+
+def stats(data, aggregates, by=()) -> list[dict]:
+    """
+    Summarizes `data`, optionally per group of rows with the same `by` values.
+
+    Rows are grouped by hashing their `by` values (dictionary codes for
+    encoded columns) to dense group ids, then each aggregate is computed in
+    one pass over the rows. `count` counts rows; `sum`, `min` and `max` use
+    the values of a column that are numbers; `dc` counts distinct non-empty
+    values, exactly up to 1024 per group and with a HyperLogLog (about 0.8%
+    error) beyond that, so memory stays bounded on high-cardinality columns.
+
+    Args:
+        data: A list of dictionaries, a ColumnarTable, a TableView or a MappedCSV.
+        aggregates: Aggregate objects (see `parse_stats`).
+        by: Names of the columns to group by.
+
+    Returns:
+        One dictionary per group, ordered by the group values (numbers
+        numerically), holding the `by` values and one entry per aggregate
+        named like `str(aggregate)`. Without `by` there is a single row.
+    """
+    by = tuple(by)
+    perf.count(rows_scanned=len(data))
+    counts = None
+    if not by:
+        group_ids, groups, counts = repeat(0), [()], [len(data)]
+    else:
+        keys, decode_group = _group_keys(data, by)
+        if all(aggregate.function == 'count' for aggregate in aggregates):
+            # Counting alone needs no group ids: one C-level pass over the keys.
+            counter = Counter(keys)
+            group_ids, counts = None, list(counter.values())
+            groups = [decode_group(key) for key in counter]
+        else:
+            ids = {}
+            group_ids = [ids.setdefault(key, len(ids)) for key in keys]
+            groups = [decode_group(key) for key in ids]
+        if not groups:
+            return []
+
+    results = {}
+    for aggregate in aggregates:
+        name = str(aggregate)
+        if name in results:
+            continue
+        if aggregate.function == 'count':
+            if counts is None:
+                counter = Counter(group_ids)
+                counts = [counter[group_id] for group_id in range(len(groups))]
+            results[name] = counts
+            continue
+        results[name] = _aggregate(aggregate.function, _column_keys(data, aggregate.column), group_ids, len(groups))
+
+    order = sorted(range(len(groups)), key=lambda group_id: _sort_key(groups[group_id]))
+    rows = []
+    for group_id in order:
+        row = dict(zip(by, groups[group_id]))
+        for name, values in results.items():
+            row[name] = '' if values[group_id] is None else values[group_id]
+        rows.append(row)
+    return rows
+
+
+def merge_stats(partials, aggregates, by=()) -> list[dict]:
+    """
+    Combines the `stats` of consecutive parts of some rows into the `stats` of all of them.
+
+    Counts and sums are added up; `min` and `max` are compared as numbers,
+    an earlier part winning ties as in a single pass over the rows. `dc`
+    cannot be combined from the counts of the parts.
+
+    Args:
+        partials: The results of `stats` for each part, in row order.
+        aggregates: The Aggregate objects each part was summarized with.
+        by: Names of the columns each part was grouped by.
+
+    Returns:
+        The rows `stats` returns for all the parts together.
+
+    Raises:
+        ValueError: If an aggregate is `dc`.
+    """
+    by = tuple(by)
+    functions = {str(aggregate): aggregate.function for aggregate in aggregates}
+    if 'dc' in functions.values():
+        raise ValueError("Distinct counts of parts cannot be merged.")
+    groups = {}
+    for rows in partials:
+        for row in rows:
+            key = tuple(row[column] for column in by)
+            merged = groups.get(key)
+            if merged is None:
+                groups[key] = dict(row)
+                continue
+            for name, function in functions.items():
+                value, current = row[name], merged[name]
+                if value == '':
+                    continue
+                if current == '':
+                    merged[name] = value
+                elif function in ('count', 'sum'):
+                    merged[name] = current + value
+                else:
+                    better = min if function == 'min' else max
+                    best = _to_number(current)
+                    if better(best, _to_number(value)) != best:
+                        merged[name] = value
+    return [groups[key] for key in sorted(groups, key=_sort_key)]
+
+
+def top_values(data, columns, limit: int = 10) -> list[dict]:
+    """
+    Returns the `limit` most common value combinations of `columns`.
+
+    Counts are gathered by hash aggregation and the largest are picked with
+    a heap, so only `limit` groups are ever sorted.
+
+    Returns:
+        One dictionary per combination, most common first, with the column
+        values, `count` and `percent` (of all rows of `data`).
+    """
+    columns = tuple(columns)
+    perf.count(rows_scanned=len(data))
+    keys, decode_group = _group_keys(data, columns)
+    counts = Counter(keys)
+    total = len(data)
+    rows = []
+    for key, count in heapq.nlargest(limit, counts.items(), key=itemgetter(1)):
+        row = dict(zip(columns, decode_group(key)))
+        row['count'] = count
+        row['percent'] = f"{100 * count / total:.2f}"
+        rows.append(row)
+    return rows
@@ -0,0 +1,170 @@
+import csv
+import os
+from collections.abc import Callable, Iterable, Iterator
+
+from siem_core import perf
+from siem_core.compressed import DecompressionError, open_csv
+
+Predicate = Callable[[dict], bool]
+
+
+def iter_csv_rows(file_path: str) -> Iterator[dict]:
+    """
+    Reads a CSV file lazily, one row dictionary at a time.
+
+    The file is opened (and its header read) before this function returns, so
+    a missing or empty file is reported immediately rather than on the first
+    iteration. Only one row is held in memory at a time.
+
+    Args:
+        file_path: The path to the CSV file.
+
+    Returns:
+        An iterator of row dictionaries, as produced by csv.DictReader.
+
+    Raises:
+        FileNotFoundError: If the CSV file is not found.
+        ValueError: If the CSV file is empty or has no headers.
+    """
+    csvfile, reader, fieldnames = _open_reader(file_path)
+    return _iter_dicts(csvfile, reader, fieldnames, file_path)
+
+
+def column_equals(column_name: str, value: str) -> Predicate:
+    """Returns a predicate matching rows where `column_name` equals `value`."""
+    def predicate(row: dict) -> bool:
+        return column_name in row and row[column_name] == value
+    return predicate
+
+
+def filter_rows(rows: Iterable[dict], predicates: Iterable[Predicate]) -> Iterator[dict]:
+    """Yields the rows for which every predicate is true."""
+    predicates = list(predicates)
+    for row in rows:
+        if all(predicate(row) for predicate in predicates):
+            yield row
+
+
+def stream_query(file_path: str, conditions: list[tuple[str, str]]) -> Iterator[dict]:
+    """
+    Streams the rows of a CSV file that match all equality conditions.
+
+    Conditions are resolved to column positions once, so rows are compared as
+    plain lists and only matching rows are turned into dictionaries. Memory
+    use stays constant regardless of the file size.
+
+    Args:
+        file_path: The path to the CSV file.
+        conditions: (column name, value) pairs that must all match. A
+            condition on a column the file does not have matches nothing.
+
+    Returns:
+        An iterator of the matching row dictionaries, in file order.
+
+    Raises:
+        FileNotFoundError: If the CSV file is not found.
+        ValueError: If the CSV file is empty or has no headers.
+    """
+    csvfile, reader, fieldnames = _open_reader(file_path)
+    return _iter_matches(csvfile, reader, fieldnames, file_path, conditions)
+
+
+def stream_count(file_path: str, conditions: list[tuple[str, str]]) -> int:
+    """
+    Counts the rows of a CSV file that match all equality conditions.
+
+    No row dictionaries are built, and memory use stays constant.
+
+    Raises:
+        FileNotFoundError: If the CSV file is not found.
+        ValueError: If the CSV file is invalid or improperly formatted.
+    """
+    csvfile, reader, fieldnames = _open_reader(file_path)
+    with csvfile:
+        checks = _compile(fieldnames, conditions)
+        if checks is None:
+            return 0
+        try:
+            matched = sum(1 for row in reader if row and _matches(row, checks))
+        except (csv.Error, UnicodeDecodeError, DecompressionError) as e:
+            raise ValueError(f"Error parsing CSV file at {file_path}: {e}")
+        _count_read(csvfile, reader)
+        return matched
+
+
+def _open_reader(file_path: str):
+    try:
+        csvfile = open_csv(file_path)
+    except FileNotFoundError:
+        raise FileNotFoundError(f"CSV file not found at {file_path}")
+    try:
+        reader = csv.reader(csvfile)
+        fieldnames = next(reader, None)
+    except Exception as e: # Catch undecodable or otherwise broken headers
+        csvfile.close()
+        raise ValueError(f"Error parsing CSV file at {file_path}: {e}")
+    if fieldnames is None:
+        csvfile.close()
+        raise ValueError(f"CSV file at {file_path} is empty or has no headers.")
+    return csvfile, reader, fieldnames
+
+
+def _iter_dicts(csvfile, reader, fieldnames, file_path) -> Iterator[dict]:
+    with csvfile:
+        width = len(fieldnames)
+        try:
+            for row in reader:
+                if row: # Blank lines are skipped, as csv.DictReader does.
+                    yield row_to_dict(fieldnames, row, width)
+        except (csv.Error, UnicodeDecodeError, DecompressionError) as e:
+            raise ValueError(f"Error parsing CSV file at {file_path}: {e}")
+
+
+def _compile(fieldnames: list[str], conditions: list[tuple[str, str]]) -> list[tuple[int, str]] | None:
+    """Maps conditions to (position, value) pairs; None if one can never match."""
+    # The last duplicate header wins, as in csv.DictReader.
+    positions = {name: pos for pos, name in enumerate(fieldnames)}
+    checks = []
+    for column_name, value in conditions:
+        if column_name not in positions:
+            return None
+        checks.append((positions[column_name], value))
+    return checks
+
+
+def _matches(row: list[str], checks: list[tuple[int, str]]) -> bool:
+    for pos, value in checks:
+        if pos >= len(row) or row[pos] != value:
+            return False
+    return True
+
+
+def _iter_matches(csvfile, reader, fieldnames, file_path, conditions) -> Iterator[dict]:
+    with csvfile:
+        checks = _compile(fieldnames, conditions)
+        if checks is None:
+            return
+        width = len(fieldnames)
+        try:
+            for row in reader:
+                if row and _matches(row, checks):
+                    yield row_to_dict(fieldnames, row, width)
+        except (csv.Error, UnicodeDecodeError, DecompressionError) as e:
+            raise ValueError(f"Error parsing CSV file at {file_path}: {e}")
+        _count_read(csvfile, reader)
+
+
+def _count_read(csvfile, reader):
+    """Reports a file read to its end; records are counted as lines, so quoted line breaks count extra."""
+    perf.count(rows_scanned=max(reader.line_num - 1, 0), bytes_read=os.fstat(csvfile.fileno()).st_size)
+
+
+def row_to_dict(fieldnames: list[str], row: list[str], width: int) -> dict:
+    """Builds the same dictionary csv.DictReader would for `row`."""
+    record = dict(zip(fieldnames, row))
+    if len(row) > width:
+        record[None] = row[width:]
+    elif len(row) < width:
+        for name in fieldnames[len(row):]:
+            record[name] = None
+    return record
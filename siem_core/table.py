@@ -0,0 +1,532 @@
+import sys
+from array import array
+from bisect import bisect_left, bisect_right
+from collections.abc import Mapping
+
+# Code arrays start as narrow as possible and are widened when the number of
+# distinct values outgrows the current typecode.
+_CODE_TYPECODES = ('B', 'H', 'I')
+_CODE_LIMITS = {'B': 0xFF, 'H': 0xFFFF, 'I': 0xFFFFFFFF}
+
+# Row ids are stored as unsigned 32-bit integers everywhere.
+ROW_ID_TYPECODE = 'I'
+
+# Columns whose distinct values exceed this fraction of their rows are not
+# worth dictionary-encoding and are stored as a plain string column instead.
+PLAIN_COLUMN_RATIO = 0.5
+PLAIN_COLUMN_MIN_ROWS = 64
+
+# intersect_sorted() binary-searches the shorter side once the longer one is
+# this many times its length; otherwise it makes one pass over both.
+_BISECT_RATIO = 16
+
+
+def _widen(codes: array, limit: int) -> array:
+    """Returns `codes` converted to the narrowest typecode that can hold `limit`."""
+    for typecode in _CODE_TYPECODES:
+        if _CODE_LIMITS[typecode] >= limit:
+            if typecode == codes.typecode:
+                return codes
+            return array(typecode, codes)
+    raise OverflowError("Too many distinct values for a dictionary-encoded column.")
+
+
+def find_code(codes: array, code: int) -> array:
+    """
+    Returns the positions in `codes` holding `code`.
+
+    The search runs over the raw bytes of the array with `bytes.find`, so only
+    the matches are visited in Python. Hits that are not aligned to an item
+    boundary (possible for multi-byte codes) are skipped.
+    """
+    matches = array(ROW_ID_TYPECODE)
+    itemsize = codes.itemsize
+    raw = codes.tobytes()
+    needle = array(codes.typecode, [code]).tobytes()
+    pos = raw.find(needle)
+    while pos != -1:
+        if pos % itemsize == 0:
+            matches.append(pos // itemsize)
+            pos = raw.find(needle, pos + itemsize)
+        else:
+            pos = raw.find(needle, pos + 1)
+    return matches
+
+
+class DictColumn:
+    """
+    A dictionary-encoded column.
+
+    Each distinct value is stored once in `values`; rows hold an integer code
+    into that list in the compact `codes` array.
+    """
+
+    kind = 'dict'
+
+    def __init__(self, values: list | None = None, codes: array | None = None):
+        self.values = values if values is not None else []
+        self.lookup = {value: code for code, value in enumerate(self.values)}
+        self.codes = codes if codes is not None else _widen(array('B'), len(self.values))
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def append(self, value):
+        code = self.lookup.get(value)
+        if code is None:
+            code = len(self.values)
+            if code > _CODE_LIMITS[self.codes.typecode]:
+                self.codes = _widen(self.codes, code)
+            self.lookup[value] = code
+            self.values.append(value)
+        self.codes.append(code)
+
+    def extend(self, other):
+        """Appends all rows of `other`, re-mapping its codes onto this dictionary."""
+        if other.kind != 'dict':
+            for row_id in range(len(other)):
+                self.append(other.get(row_id))
+            return
+        remap = []
+        for value in other.values:
+            code = self.lookup.get(value)
+            if code is None:
+                code = self.lookup[value] = len(self.values)
+                self.values.append(value)
+            remap.append(code)
+        self.codes = _widen(self.codes, max(len(self.values) - 1, 0))
+        self.codes.extend(map(remap.__getitem__, other.codes))
+
+    def get(self, row_id: int):
+        return self.values[self.codes[row_id]]
+
+    def code_of(self, value) -> int | None:
+        """Returns the code for `value`, or None if it never occurs in the column."""
+        return self.lookup.get(value)
+
+    def find(self, value) -> array:
+        """Returns the row ids whose value equals `value`."""
+        code = self.lookup.get(value)
+        if code is None:
+            return array(ROW_ID_TYPECODE)
+        return find_code(self.codes, code)
+
+    def take(self, row_ids) -> 'DictColumn':
+        """Returns a new column with the given rows; the value dictionary is shared."""
+        codes = self.codes
+        column = DictColumn.__new__(DictColumn)
+        column.values = self.values
+        column.lookup = self.lookup
+        column.codes = array(codes.typecode, [codes[i] for i in row_ids])
+        return column
+
+    @property
+    def cardinality(self) -> int:
+        return len(self.values)
+
+    @property
+    def nbytes(self) -> int:
+        """Approximate number of bytes held by the column, including its dictionary."""
+        size = sys.getsizeof(self.codes)
+        size += sys.getsizeof(self.values) + sys.getsizeof(self.lookup)
+        size += sum(sys.getsizeof(value) for value in self.values)
+        return size
+
+
+class StringColumn:
+    """
+    A plain string column for high-cardinality data.
+
+    All values are concatenated as UTF-8 into one buffer and located through an
+    offsets array, which costs a few bytes per row instead of a Python object.
+    Missing values (None) are tracked in a sparse set of row ids.
+    """
+
+    kind = 'string'
+
+    def __init__(self):
+        self.buffer = bytearray()
+        self.offsets = array(ROW_ID_TYPECODE, [0])
+        self.nulls = set()
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def append(self, value):
+        if value is None:
+            self.nulls.add(len(self))
+        else:
+            self.buffer += value.encode('utf-8')
+        end = len(self.buffer)
+        self._fit_offsets(end)
+        self.offsets.append(end)
+
+    def extend(self, other):
+        if other.kind != 'string':
+            for row_id in range(len(other)):
+                self.append(other.get(row_id))
+            return
+        shift = len(self.buffer)
+        start = len(self)
+        self.nulls.update(start + row_id for row_id in other.nulls)
+        self.buffer += other.buffer
+        self._fit_offsets(len(self.buffer))
+        self.offsets.extend(array(self.offsets.typecode, [shift + offset for offset in other.offsets[1:]]))
+
+    def _fit_offsets(self, end: int):
+        """Widens the offsets to 64 bits once the buffer outgrows 4 GiB; they never narrow again."""
+        if self.offsets.typecode != 'Q' and end > _CODE_LIMITS[self.offsets.typecode]:
+            self.offsets = array('Q', self.offsets)
+
+    def get(self, row_id: int):
+        if self.nulls and row_id in self.nulls:
+            return None
+        offsets = self.offsets
+        return self.buffer[offsets[row_id]:offsets[row_id + 1]].decode('utf-8')
+
+    def find(self, value) -> array:
+        """
+        Returns the row ids whose value equals `value`.
+
+        Occurrences of the encoded value are located with `bytearray.find` and
+        mapped back to rows by binary search over the offsets, so only
+        candidate positions are visited in Python.
+        """
+        matches = array(ROW_ID_TYPECODE)
+        if value is None:
+            matches.extend(sorted(self.nulls))
+            return matches
+        offsets = self.offsets
+        needle = value.encode('utf-8')
+        if not needle:
+            for row_id in range(len(self)):
+                if offsets[row_id] == offsets[row_id + 1] and row_id not in self.nulls:
+                    matches.append(row_id)
+            return matches
+        buffer = self.buffer
+        pos = buffer.find(needle)
+        while pos != -1:
+            row_id = bisect_right(offsets, pos) - 1
+            # Several empty rows can share an offset; step to the last of them.
+            if offsets[row_id] == pos and offsets[row_id + 1] - pos == len(needle):
+                matches.append(row_id)
+                pos = buffer.find(needle, pos + len(needle))
+            else:
+                pos = buffer.find(needle, pos + 1)
+        return matches
+
+    def search(self, text: str) -> array:
+        """
+        Returns the row ids whose value contains `text`.
+
+        As in `find`, the whole buffer is searched with `bytearray.find`. A
+        hit counts if it lies inside one value, and the search then resumes
+        at the next value, so each row is reported once.
+        """
+        matches = array(ROW_ID_TYPECODE)
+        offsets = self.offsets
+        needle = text.encode('utf-8')
+        if not needle:
+            matches.extend(row_id for row_id in range(len(self)) if row_id not in self.nulls)
+            return matches
+        buffer = self.buffer
+        pos = buffer.find(needle)
+        while pos != -1:
+            row_id = bisect_right(offsets, pos) - 1
+            end = offsets[row_id + 1]
+            if pos + len(needle) <= end:
+                matches.append(row_id)
+                pos = buffer.find(needle, end)
+            else:
+                pos = buffer.find(needle, pos + 1)
+        return matches
+
+    def take(self, row_ids) -> 'StringColumn':
+        column = StringColumn()
+        for row_id in row_ids:
+            column.append(self.get(row_id))
+        return column
+
+    @property
+    def cardinality(self) -> int:
+        return len(set(self.get(i) for i in range(len(self))))
+
+    @property
+    def nbytes(self) -> int:
+        return sys.getsizeof(self.buffer) + sys.getsizeof(self.offsets) + sys.getsizeof(self.nulls)
+
+    @classmethod
+    def from_column(cls, column) -> 'StringColumn':
+        plain = cls()
+        for row_id in range(len(column)):
+            plain.append(column.get(row_id))
+        return plain
+
+
+class Row(Mapping):
+    """
+    A read-only, dict-like view of one row of a table.
+
+    Values are decoded from the table only when they are accessed, so code
+    written against `list[dict]` (`row[col]`, `row.get(col)`, `col in row`,
+    `row.keys()`) keeps working without materializing the row.
+    """
+
+    __slots__ = ('_table', '_row_id')
+
+    def __init__(self, table, row_id: int):
+        self._table = table
+        self._row_id = row_id
+
+    def __getitem__(self, key):
+        if key not in self._table.columns:
+            raise KeyError(key)
+        return self._table.value(self._row_id, key)
+
+    def __contains__(self, key) -> bool:
+        return key in self._table.columns
+
+    def __iter__(self):
+        return iter(self._table.fieldnames)
+
+    def __len__(self) -> int:
+        return len(self._table.fieldnames)
+
+    def __repr__(self) -> str:
+        return repr(dict(self))
+
+
+class ColumnarTable:
+    """
+    A table stored column by column.
+
+    Columns are dictionary-encoded (`DictColumn`) while they are being built;
+    `compact()` turns high-cardinality columns into `StringColumn`s. Iterating
+    over the table or indexing it yields `Row` views, so the table can be
+    passed wherever a `list[dict]` was used before.
+
+    `select()` returns a `TableView` of some of the rows without copying them.
+    """
+
+    # A table is its own base and has no selection; see TableView.
+    selection = None
+
+    def __init__(self, fieldnames):
+        # Duplicate headers behave like csv.DictReader: the last one wins.
+        positions = {name: pos for pos, name in enumerate(fieldnames)}
+        self.fieldnames = list(positions)
+        self.columns = {name: DictColumn() for name in self.fieldnames}
+        self._width = len(fieldnames)
+        self._slots = [(pos, self.columns[name]) for name, pos in positions.items()]
+        self._num_rows = 0
+        # Loaders attach an index.IndexManager here; derived tables have none.
+        self.indexes = None
+        # Offset just after the last source record the table holds, when the
+        # loader parsed complete records only; see csv_handler.load_csv_to_table.
+        self.source_end = None
+
+    @classmethod
+    def from_rows(cls, fieldnames, rows) -> 'ColumnarTable':
+        """
+        Builds a table from an iterable of value sequences in `fieldnames` order.
+
+        Short rows are padded with None; values beyond the header are dropped.
+        """
+        table = cls(fieldnames)
+        for values in rows:
+            table.append_row(values)
+        return table
+
+    @classmethod
+    def from_dicts(cls, data) -> 'ColumnarTable':
+        """
+        Builds a compacted table from rows held as mappings: a list of dicts or a MappedCSV.
+
+        The columns are the data's `fieldnames` if it has them, otherwise the
+        keys of its first row; missing keys become None.
+        """
+        fieldnames = list(data.fieldnames) if hasattr(data, 'fieldnames') else list(data[0].keys()) if data else []
+        return cls.from_rows(fieldnames, ([row.get(name) for name in fieldnames] for row in data)).compact()
+
+    def append_row(self, values):
+        if len(values) < self._width:
+            values = list(values) + [None] * (self._width - len(values))
+        for pos, column in self._slots:
+            column.append(values[pos])
+        self._num_rows += 1
+
+    def extend(self, other: 'ColumnarTable'):
+        """
+        Appends all rows of a table with the same columns.
+
+        Raises:
+            ValueError: If the other table has different columns.
+        """
+        if other.fieldnames != self.fieldnames:
+            raise ValueError("Cannot extend a table with rows of a different schema.")
+        for name, column in self.columns.items():
+            column.extend(other.columns[name])
+        self._num_rows += len(other)
+
+    def compact(self) -> 'ColumnarTable':
+        """Re-encodes columns that hardly repeat any values as plain string columns."""
+        if self._num_rows < PLAIN_COLUMN_MIN_ROWS:
+            return self
+        for name, column in list(self.columns.items()):
+            if column.kind == 'dict' and column.cardinality > self._num_rows * PLAIN_COLUMN_RATIO:
+                self._replace_column(name, StringColumn.from_column(column))
+        return self
+
+    def add_column(self, name: str, column):
+        """
+        Adds a column with a value for every row, replacing any column of the same name.
+
+        Raises:
+            ValueError: If the column's length differs from the table's.
+        """
+        if len(column) != self._num_rows:
+            raise ValueError(f"Column '{name}' has {len(column)} rows, the table {self._num_rows}.")
+        if name in self.columns:
+            self._replace_column(name, column)
+            return
+        self.fieldnames.append(name)
+        self.columns[name] = column
+        self._slots.append((self._width, column))
+        self._width += 1
+
+    def _replace_column(self, name: str, column):
+        old = self.columns[name]
+        self.columns[name] = column
+        self._slots = [(pos, column if slot is old else slot) for pos, slot in self._slots]
+
+    def __len__(self) -> int:
+        return self._num_rows
+
+    def __getitem__(self, row_id: int) -> Row:
+        if row_id < 0:
+            row_id += self._num_rows
+        if not 0 <= row_id < self._num_rows:
+            raise IndexError("table row index out of range")
+        return Row(self, row_id)
+
+    def __iter__(self):
+        for row_id in range(self._num_rows):
+            yield Row(self, row_id)
+
+    def value(self, row_id: int, column_name: str):
+        return self.columns[column_name].get(row_id)
+
+    @property
+    def base(self) -> 'ColumnarTable':
+        return self
+
+    def select(self, row_ids) -> 'TableView':
+        """Returns a view of the rows with the given ascending row ids."""
+        return TableView(self, row_ids)
+
+    def take(self, row_ids) -> 'ColumnarTable':
+        """Returns a new table holding only the given rows, in the given order."""
+        if not isinstance(row_ids, (array, list, range)):
+            # Each column reads the ids once; an array holds them in 4 bytes each.
+            row_ids = array(ROW_ID_TYPECODE, row_ids)
+        table = ColumnarTable(self.fieldnames)
+        for name, column in self.columns.items():
+            table._replace_column(name, column.take(row_ids))
+        table._num_rows = len(row_ids)
+        return table
+
+    def to_dicts(self) -> list[dict]:
+        """Materializes the table as a list of plain dictionaries."""
+        return [dict(row) for row in self]
+
+    def memory_usage(self) -> dict[str, int]:
+        """Returns the approximate number of bytes used by each column."""
+        return {name: column.nbytes for name, column in self.columns.items()}
+
+
+def intersect_sorted(a, b) -> array:
+    """
+    Returns the row ids found in both ascending sequences `a` and `b`, in ascending order.
+
+    When one side is much shorter, each of its ids is binary-searched in the
+    other, so narrowing a large selection by a few index hits stays cheap.
+    """
+    if len(a) > len(b):
+        a, b = b, a
+    if not a:
+        return array(ROW_ID_TYPECODE)
+    if len(a) * _BISECT_RATIO < len(b):
+        matches = array(ROW_ID_TYPECODE)
+        start = 0
+        for row_id in a:
+            start = bisect_left(b, row_id, start)
+            if start == len(b):
+                break
+            if b[start] == row_id:
+                matches.append(row_id)
+        return matches
+    members = set(a)
+    return array(ROW_ID_TYPECODE, [row_id for row_id in b if row_id in members])
+
+
+class TableView:
+    """
+    Some rows of a ColumnarTable, kept as an ascending array of its row ids.
+
+    Filters on a loaded table return views, so chaining them only narrows
+    this selection vector; no row is copied, and going back to an earlier
+    result means keeping a reference to its view. Views behave like tables
+    (`len`, iteration, `Row` items, `value`, `take`, `to_dicts`), with row
+    positions counted within the view. `base` is the underlying table and
+    `selection` the base row ids; filters work on those.
+    """
+
+    def __init__(self, base: ColumnarTable, selection):
+        self.base = base
+        self.selection = selection if isinstance(selection, array) else array(ROW_ID_TYPECODE, selection)
+
+    @property
+    def columns(self) -> dict:
+        return self.base.columns
+
+    @property
+    def fieldnames(self) -> list:
+        return self.base.fieldnames
+
+    @property
+    def indexes(self):
+        return self.base.indexes
+
+    def __len__(self) -> int:
+        return len(self.selection)
+
+    def __getitem__(self, position: int) -> Row:
+        return Row(self.base, self.selection[position])
+
+    def __iter__(self):
+        base = self.base
+        for row_id in self.selection:
+            yield Row(base, row_id)
+
+    def value(self, position: int, column_name: str):
+        return self.base.value(self.selection[position], column_name)
+
+    def select(self, row_ids) -> 'TableView':
+        """Returns a view of the rows of this view that have one of the given ascending base row ids."""
+        return TableView(self.base, intersect_sorted(self.selection, row_ids))
+
+    def take(self, positions) -> ColumnarTable:
+        """Copies the rows at the given positions of the view into a new table."""
+        selection = self.selection
+        return self.base.take(selection[position] for position in positions)
+
+    def materialize(self) -> ColumnarTable:
+        """Copies the rows of the view into a new table."""
+        return self.base.take(self.selection)
+
+    def to_dicts(self) -> list[dict]:
+        return [dict(row) for row in self]
+
+    @property
+    def nbytes(self) -> int:
+        return sys.getsizeof(self.selection)
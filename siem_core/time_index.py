@@ -0,0 +1,238 @@
+import re
+import sys
+import time
+from array import array
+from bisect import bisect_left
+from datetime import datetime, timezone
+from itertools import islice
+from operator import le
+
+from siem_core import perf
+from siem_core.table import ROW_ID_TYPECODE, ColumnarTable, TableView
+
+DEFAULT_TIME_COLUMN = 'Timestamp'
+
+_RELATIVE_TIME = re.compile(r'([+-])(\d+)([smhdw])')
+_UNIT_SECONDS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400, 'w': 604800}
+
+
+def parse_event_time(text) -> float | None:
+    """
+    Returns an event time in seconds since the epoch, or None if `text` is not one.
+
+    ISO 8601 timestamps (with or without a UTC offset, which defaults to UTC)
+    and plain epoch seconds are accepted.
+    """
+    if not text:
+        return None
+    try:
+        moment = datetime.fromisoformat(text)
+    except (TypeError, ValueError):
+        try:
+            return float(text)
+        except ValueError:
+            return None
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return moment.timestamp()
+
+
+def parse_time(text: str, now: float | None = None) -> float:
+    """
+    Parses an `earliest=`/`latest=` time.
+
+    Besides the event time forms accepted by `parse_event_time`, 'now' and
+    times relative to now such as '-24h' or '-7d' (units s, m, h, d and w)
+    are accepted.
+
+    Raises:
+        ValueError: If the text is not a time.
+    """
+    now = time.time() if now is None else now
+    if text == 'now':
+        return now
+    match = _RELATIVE_TIME.fullmatch(text)
+    if match is not None:
+        sign, amount, unit = match.groups()
+        offset = int(amount) * _UNIT_SECONDS[unit]
+        return now - offset if sign == '-' else now + offset
+    moment = parse_event_time(text)
+    if moment is None:
+        raise ValueError(f"Invalid time '{text}'.")
+    return moment
+
+
+class TimeIndex:
+    """
+    The event times of one column in ascending order.
+
+    `times` holds the times and `order` the row ids they belong to, so the
+    rows of a time window are found with two binary searches. When the rows
+    are already in time order (the usual case for logs) nothing is sorted:
+    `order` is None, or just the ascending ids of the rows that have a time,
+    and building the index costs one pass to read the times. For a typed
+    timestamp column without blanks the column's own integer array is used
+    as `times`.
+
+    Rows without a parsable time are not in the index and never fall inside
+    a window. `is_sorted` tells whether the rows were already in time order.
+    """
+
+    def __init__(self, column):
+        times, row_ids = self._read_times(column)
+        self.is_sorted = all(map(le, times, islice(times, 1, None)))
+        if self.is_sorted:
+            self.times = times
+            self.order = row_ids
+        else:
+            row_ids = row_ids if row_ids is not None else range(len(times))
+            order = sorted(range(len(times)), key=times.__getitem__)
+            self.times = array('d', [times[i] for i in order])
+            self.order = array(ROW_ID_TYPECODE, [row_ids[i] for i in order])
+
+    @classmethod
+    def from_arrays(cls, times: array, order: array | None, is_sorted: bool) -> 'TimeIndex':
+        """Restores an index from its `times` and `order` arrays."""
+        index = cls.__new__(cls)
+        index.times = times
+        index.order = order
+        index.is_sorted = is_sorted
+        return index
+
+    @staticmethod
+    def _read_times(column, start: int = 0) -> tuple[array, array | None]:
+        """Returns (times, row ids) of the rows from `start` on that have a time; row ids is None if all have."""
+        if column.kind == 'typed' and column.ctype.name == 'timestamp':
+            if not column.blanks:
+                return (column.values if start == 0 else column.values[start:]), None
+            row_ids = array(ROW_ID_TYPECODE, [row_id for row_id in range(start, len(column))
+                                              if row_id not in column.blanks])
+            return array(column.values.typecode, [column.values[row_id] for row_id in row_ids]), row_ids
+        if column.kind == 'dict':
+            by_code = [parse_event_time(value) for value in column.values]
+            times = [by_code[code] for code in islice(column.codes, start, None)]
+        else:
+            times = [parse_event_time(column.get(row_id)) for row_id in range(start, len(column))]
+        if None not in times:
+            return array('d', times), None
+        row_ids = array(ROW_ID_TYPECODE, [start + pos for pos, moment in enumerate(times) if moment is not None])
+        return array('d', [moment for moment in times if moment is not None]), row_ids
+
+    def extend(self, column, start: int):
+        """
+        Adds the rows from `start` on, which were appended to `column` after the index was built.
+
+        Times that continue the index in order (the usual case for logs) are
+        added to the end. Otherwise the new entries are merged in with one
+        sort of two sorted runs, and `is_sorted` becomes False.
+        """
+        aliased = self.times is getattr(column, 'values', None)
+        times, row_ids = self._read_times(column, start)
+        if not len(times):
+            return
+        count = start if self.order is None else len(self.order)
+        old_times = self.times if len(self.times) == count else self.times[:count]
+        in_order = (all(map(le, times, islice(times, 1, None)))
+                    and (count == 0 or old_times[-1] <= times[0]))
+        if in_order and aliased and self.order is None and row_ids is None:
+            # The index is the typed column's own array, which already grew.
+            return
+        if old_times.typecode != times.typecode:
+            old_times, times = array('d', old_times), array('d', times)
+        if self.order is None and row_ids is None and in_order:
+            self.times = old_times + times
+            return
+        old_order = self.order if self.order is not None else array(ROW_ID_TYPECODE, range(count))
+        new_order = row_ids if row_ids is not None else array(ROW_ID_TYPECODE, range(start, start + len(times)))
+        all_times, all_order = old_times + times, old_order + new_order
+        if in_order:
+            self.times, self.order = all_times, all_order
+            return
+        positions = sorted(range(len(all_times)), key=all_times.__getitem__)
+        self.times = array(all_times.typecode, [all_times[pos] for pos in positions])
+        self.order = array(ROW_ID_TYPECODE, [all_order[pos] for pos in positions])
+        self.is_sorted = False
+
+    def _bounds(self, earliest: float | None, latest: float | None) -> tuple[int, int]:
+        start = 0 if earliest is None else bisect_left(self.times, earliest)
+        end = len(self.times) if latest is None else bisect_left(self.times, latest)
+        return start, max(start, end)
+
+    def window(self, earliest: float | None = None, latest: float | None = None) -> array:
+        """
+        Returns the ascending ids of the rows with `earliest <= time < latest`.
+
+        Either bound may be None. On time-ordered rows this costs
+        O(log N + matches); otherwise the matching row ids also have to be
+        sorted back into row order.
+        """
+        start, end = self._bounds(earliest, latest)
+        if self.order is None:
+            return array(ROW_ID_TYPECODE, range(start, end))
+        row_ids = self.order[start:end]
+        if not self.is_sorted:
+            row_ids = array(ROW_ID_TYPECODE, sorted(row_ids))
+        return row_ids
+
+    def count(self, earliest: float | None = None, latest: float | None = None) -> int:
+        start, end = self._bounds(earliest, latest)
+        return end - start
+
+    @property
+    def nbytes(self) -> int:
+        return sys.getsizeof(self.times) + (sys.getsizeof(self.order) if self.order is not None else 0)
+
+
+def time_window(data, earliest=None, latest=None, column: str = DEFAULT_TIME_COLUMN):
+    """
+    Returns the rows whose time in `column` is at or after `earliest` and before `latest`.
+
+    Loaded tables (and views of them) answer the window from the time index
+    their IndexManager keeps for the column (built on first use); other
+    tables build a temporary index, and lists and mapped files are scanned.
+
+    Args:
+        data: A list of dictionaries, a ColumnarTable, a TableView or a MappedCSV.
+        earliest: The start of the window (inclusive), as seconds since the
+            epoch or a time string (see `parse_time`); None for no limit.
+        latest: The end of the window (exclusive), likewise.
+        column: The column holding the event times.
+
+    Returns:
+        The matching rows, in the same form `query_data` returns them.
+
+    Raises:
+        ValueError: If `earliest` or `latest` is not a valid time.
+    """
+    now = time.time()
+    if isinstance(earliest, str):
+        earliest = parse_time(earliest, now)
+    if isinstance(latest, str):
+        latest = parse_time(latest, now)
+
+    if isinstance(data, (ColumnarTable, TableView)):
+        table = data.base
+        if column not in table.columns:
+            return table.select([])
+        # Building the index reads the whole column; a built one only the rows in the window.
+        built = table.indexes is not None and column in table.indexes.time_indexes
+        if table.indexes is not None:
+            index = table.indexes.time_index(column)
+        else:
+            index = TimeIndex(table.columns[column])
+        row_ids = index.window(earliest, latest)
+        perf.count(rows_scanned=len(row_ids) if built else len(table))
+        return data.select(row_ids)
+
+    def in_window(value) -> bool:
+        moment = parse_event_time(value)
+        return (moment is not None and (earliest is None or moment >= earliest)
+                and (latest is None or moment < latest))
+
+    perf.count(rows_scanned=len(data))
+    from siem_core.mmap_backend import MappedCSV
+    if isinstance(data, MappedCSV):
+        if column not in data.columns:
+            return data.take([])
+        return data.take([row_id for row_id in range(len(data)) if in_window(data.value(row_id, column))])
+    return [row for row in data if in_window(row.get(column))]
@@ -0,0 +1,466 @@
+import calendar
+import ipaddress
+import math
+import re
+import socket
+import sys
+import time
+from abc import ABC, abstractmethod
+from array import array
+from datetime import datetime
+
+from siem_core.table import ROW_ID_TYPECODE, ColumnarTable, find_code
+
+# Integer arrays start as narrow as possible; the first value that does not fit
+# widens them to a signed 64-bit array.
+_INT_TYPECODES = (('B', 0, 0xFF), ('H', 0, 0xFFFF), ('I', 0, 0xFFFFFFFF), ('b', -0x80, 0x7F),
+                  ('h', -0x8000, 0x7FFF), ('i', -0x80000000, 0x7FFFFFFF))
+_INT_MIN = -(1 << 63)
+_INT_MAX = (1 << 63) - 1
+
+DEFAULT_TIMESTAMP_LAYOUT = '%Y-%m-%dT%H:%M:%SZ'
+_TIMESTAMP_LAYOUTS = {
+    '%Y-%m-%dT%H:%M:%SZ': re.compile(r'(\d{4})-(\d\d)-(\d\d)T(\d\d):(\d\d):(\d\d)Z'),
+    '%Y-%m-%dT%H:%M:%S': re.compile(r'(\d{4})-(\d\d)-(\d\d)T(\d\d):(\d\d):(\d\d)'),
+    '%Y-%m-%d %H:%M:%S': re.compile(r'(\d{4})-(\d\d)-(\d\d) (\d\d):(\d\d):(\d\d)'),
+}
+_DATE_PATTERN = re.compile(r'(\d{4})-(\d\d)-(\d\d)')
+
+
+def _int_typecode(low: int, high: int) -> str:
+    for typecode, lowest, highest in _INT_TYPECODES:
+        if lowest <= low and high <= highest:
+            return typecode
+    return 'q'
+
+
+def _lower(bound, inclusive: bool) -> int:
+    return math.ceil(bound) if inclusive else math.floor(bound) + 1
+
+
+def _upper(bound, inclusive: bool) -> int:
+    return math.floor(bound) if inclusive else math.ceil(bound) - 1
+
+
+class ColumnType(ABC):
+    """
+    How the values of a typed column are stored as integers.
+
+    `parse` only accepts text that `format` reproduces exactly, so a typed
+    column always reads back the strings it was loaded from.
+    """
+
+    name = None
+    min_value = _INT_MIN
+    max_value = _INT_MAX
+
+    @property
+    def spec(self) -> str:
+        """The name the type is declared and saved with."""
+        return self.name
+
+    @abstractmethod
+    def parse(self, text) -> int | None:
+        """Returns the integer for a canonical value, or None if `text` is not one."""
+
+    @abstractmethod
+    def format(self, number: int) -> str:
+        """Returns the canonical text of a stored integer."""
+
+    def parse_bound(self, text):
+        """Returns the number a comparison literal stands for, or None if it has none."""
+        return self.parse(text)
+
+    def intervals(self, op: str, value) -> list[tuple[int, int]] | None:
+        """
+        Translates a query condition into inclusive ranges of stored integers.
+
+        Returns:
+            The ranges a value must fall in to satisfy the condition, or None
+            if the condition has to be checked against the formatted values
+            (it involves empty values, or a literal of another type).
+        """
+        if op in ('=', 'in'):
+            literals = value if op == 'in' else (value,)
+            if '' in literals:
+                return None
+            # Non-canonical literals (e.g. '0443') never equal a stored value.
+            numbers = {self.parse(literal) for literal in literals} - {None}
+            return [(number, number) for number in sorted(numbers)]
+        if op == 'between':
+            low, high = self.parse_bound(value[0]), self.parse_bound(value[1])
+            if low is None or high is None:
+                return None
+            low, high = max(_lower(low, True), self.min_value), min(_upper(high, True), self.max_value)
+            return [(low, high)] if low <= high else []
+        if op in ('<', '<=', '>', '>='):
+            bound = self.parse_bound(value)
+            if bound is None:
+                return None
+            if op in ('<', '<='):
+                high = min(_upper(bound, op == '<='), self.max_value)
+                return [(self.min_value, high)] if high >= self.min_value else []
+            low = max(_lower(bound, op == '>='), self.min_value)
+            return [(low, self.max_value)] if low <= self.max_value else []
+        return None
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, ColumnType) and self.spec == other.spec
+
+    def __hash__(self) -> int:
+        return hash(self.spec)
+
+    def __repr__(self) -> str:
+        return f"<column type {self.spec}>"
+
+
+class IntegerType(ColumnType):
+    """Decimal integers that fit in 64 bits, e.g. ports."""
+
+    name = 'int'
+
+    def parse(self, text) -> int | None:
+        try:
+            number = int(text)
+        except (TypeError, ValueError):
+            return None
+        if str(number) != text or not _INT_MIN <= number <= _INT_MAX:
+            return None
+        return number
+
+    def format(self, number: int) -> str:
+        return str(number)
+
+    def parse_bound(self, text):
+        try:
+            bound = float(text)
+        except (TypeError, ValueError):
+            return None
+        return bound if math.isfinite(bound) else None
+
+
+class IPv4Type(ColumnType):
+    """Dotted-quad IPv4 addresses, stored as unsigned 32-bit integers."""
+
+    name = 'ipv4'
+    min_value = 0
+    max_value = 0xFFFFFFFF
+
+    def parse(self, text) -> int | None:
+        try:
+            packed = socket.inet_aton(text)
+        except (OSError, TypeError, ValueError):
+            return None
+        if socket.inet_ntoa(packed) != text:
+            return None
+        return int.from_bytes(packed, 'big')
+
+    def format(self, number: int) -> str:
+        return socket.inet_ntoa(number.to_bytes(4, 'big'))
+
+    def intervals(self, op: str, value) -> list[tuple[int, int]] | None:
+        if op != 'cidr':
+            return super().intervals(op, value)
+        network = ipaddress.ip_network(value, strict=False)
+        if network.version != 4:
+            return None
+        return [(int(network.network_address), int(network.broadcast_address))]
+
+
+class TimestampType(ColumnType):
+    """
+    UTC timestamps in one fixed layout, stored as seconds since the epoch.
+
+    Comparison literals may use any supported layout, or be a plain date.
+    """
+
+    name = 'timestamp'
+
+    def __init__(self, layout: str = DEFAULT_TIMESTAMP_LAYOUT):
+        if layout not in _TIMESTAMP_LAYOUTS:
+            raise ValueError(f"Unsupported timestamp layout '{layout}'.")
+        self.layout = layout
+        self._pattern = _TIMESTAMP_LAYOUTS[layout]
+
+    @property
+    def spec(self) -> str:
+        if self.layout == DEFAULT_TIMESTAMP_LAYOUT:
+            return self.name
+        return f"{self.name}:{self.layout}"
+
+    def parse(self, text) -> int | None:
+        match = self._pattern.fullmatch(text) if isinstance(text, str) else None
+        if match is None:
+            return None
+        number = calendar.timegm(tuple(int(field) for field in match.groups()))
+        # Out-of-range fields (e.g. February 30) are normalized by timegm and
+        # fail the round trip.
+        return number if self.format(number) == text else None
+
+    def format(self, number: int) -> str:
+        return time.strftime(self.layout, time.gmtime(number))
+
+    def parse_bound(self, text):
+        if not isinstance(text, str):
+            return None
+        for pattern in (*_TIMESTAMP_LAYOUTS.values(), _DATE_PATTERN):
+            match = pattern.fullmatch(text)
+            if match is not None:
+                fields = tuple(int(field) for field in match.groups())
+                try:
+                    datetime(*fields)
+                except ValueError:
+                    return None
+                return calendar.timegm(fields + (0,) * (6 - len(fields)))
+        return None
+
+
+INTEGER = IntegerType()
+IPV4 = IPv4Type()
+TYPE_NAMES = ('int', 'ipv4', 'timestamp')
+
+
+def candidate_types(spec: str) -> list[ColumnType]:
+    """
+    Returns the column types a declared type name may stand for.
+
+    A bare 'timestamp' matches any supported layout; 'timestamp:<layout>'
+    pins one.
+
+    Raises:
+        ValueError: If the name is not a known type.
+    """
+    name, _, layout = spec.partition(':')
+    if name == 'int' and not layout:
+        return [INTEGER]
+    if name == 'ipv4' and not layout:
+        return [IPV4]
+    if name == 'timestamp':
+        if layout:
+            return [TimestampType(layout)]
+        return [TimestampType(layout) for layout in _TIMESTAMP_LAYOUTS]
+    raise ValueError(f"Unknown column type '{spec}'. Expected one of: {', '.join(TYPE_NAMES)}.")
+
+
+class TypedColumn:
+    """
+    A column of integers standing for typed values (ports, IPs, timestamps).
+
+    Values are kept in one compact integer array, so range and network
+    conditions compare integers instead of parsing strings. Empty and missing
+    values are tracked in a sparse mapping of row id to '' or None; their
+    slots in the array hold 0. `get` formats values back to the exact strings
+    they were loaded from.
+    """
+
+    kind = 'typed'
+
+    def __init__(self, ctype: ColumnType, values: array | None = None, blanks: dict | None = None):
+        self.ctype = ctype
+        self.values = values if values is not None else array('B')
+        self.blanks = blanks if blanks is not None else {}
+
+    @classmethod
+    def from_column(cls, column, ctype: ColumnType) -> 'TypedColumn':
+        """
+        Converts a dictionary or string column.
+
+        Raises:
+            ValueError: If a value is neither empty nor a canonical value of `ctype`.
+        """
+        def convert(value):
+            if value is None or value == '':
+                return None
+            number = ctype.parse(value)
+            if number is None:
+                raise ValueError(f"Value '{value}' cannot be stored as {ctype.name}.")
+            return number
+
+        if column.kind == 'dict':
+            by_code = [convert(value) for value in column.values]
+            numbers = [by_code[code] for code in column.codes]
+        else:
+            numbers = [convert(column.get(row_id)) for row_id in range(len(column))]
+        blanks = {row_id: column.get(row_id) for row_id, number in enumerate(numbers) if number is None}
+        if blanks:
+            numbers = [0 if number is None else number for number in numbers]
+        typecode = _int_typecode(min(numbers), max(numbers)) if numbers else 'B'
+        return cls(ctype, array(typecode, numbers), blanks)
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def append(self, value):
+        """
+        Raises:
+            ValueError: If `value` is neither empty nor a canonical value of the column's type.
+        """
+        if value is None or value == '':
+            self.blanks[len(self.values)] = value
+            number = 0
+        else:
+            number = self.ctype.parse(value)
+            if number is None:
+                raise ValueError(f"Value '{value}' cannot be stored as {self.ctype.name}.")
+        try:
+            self.values.append(number)
+        except OverflowError:
+            self.values = array('q', self.values)
+            self.values.append(number)
+
+    def extend(self, other):
+        if other.kind != 'typed' or other.ctype != self.ctype:
+            for row_id in range(len(other)):
+                self.append(other.get(row_id))
+            return
+        offset = len(self.values)
+        self.blanks.update((offset + row_id, blank) for row_id, blank in other.blanks.items())
+        try:
+            self.values.extend(array(self.values.typecode, other.values))
+        except OverflowError:
+            self.values = array('q', self.values)
+            self.values.extend(array('q', other.values))
+
+    def get(self, row_id: int):
+        if self.blanks and row_id in self.blanks:
+            return self.blanks[row_id]
+        return self.ctype.format(self.values[row_id])
+
+    def find(self, value) -> array:
+        """Returns the row ids whose value equals `value`."""
+        if value is None or value == '':
+            return array(ROW_ID_TYPECODE, sorted(row_id for row_id, blank in self.blanks.items() if blank == value))
+        number = self.ctype.parse(value)
+        if number is None:
+            return array(ROW_ID_TYPECODE)
+        try:
+            matches = find_code(self.values, number)
+        except OverflowError:
+            return array(ROW_ID_TYPECODE)
+        if number == 0 and self.blanks:
+            matches = array(ROW_ID_TYPECODE, [row_id for row_id in matches if row_id not in self.blanks])
+        return matches
+
+    def take(self, row_ids) -> 'TypedColumn':
+        values = self.values
+        blanks = self.blanks
+        taken = {}
+        if blanks:
+            taken = {new: blanks[old] for new, old in enumerate(row_ids) if old in blanks}
+        return TypedColumn(self.ctype, array(values.typecode, [values[row_id] for row_id in row_ids]), taken)
+
+    def row_test(self, intervals: list[tuple[int, int]]):
+        """Returns a function telling whether a row's value lies in one of `intervals`."""
+        values = self.values
+        blanks = self.blanks
+        if len(intervals) == 1:
+            low, high = intervals[0]
+            if blanks and low <= 0 <= high:
+                return lambda i: low <= values[i] <= high and i not in blanks
+            return lambda i: low <= values[i] <= high
+        if blanks:
+            return lambda i: i not in blanks and any(low <= values[i] <= high for low, high in intervals)
+        return lambda i: any(low <= values[i] <= high for low, high in intervals)
+
+    @property
+    def cardinality(self) -> int:
+        return len(set(self.values)) + len(set(self.blanks.values()))
+
+    @property
+    def nbytes(self) -> int:
+        return sys.getsizeof(self.values) + sys.getsizeof(self.blanks)
+
+
+def infer_column(column) -> TypedColumn | None:
+    """
+    Returns `column` stored as the first type all its non-empty values have.
+
+    Returns None if there is no such type, the column has no values, or the
+    column is dictionary-encoded and would take more memory as integers (a
+    dictionary column with few distinct values already answers range
+    conditions by testing each distinct value once).
+    """
+    if column.kind == 'dict':
+        first = next((value for value in column.values if value), None)
+    else:
+        first = next((value for value in map(column.get, range(len(column))) if value), None)
+    if first is None:
+        return None
+    for ctype in [INTEGER, IPV4] + candidate_types('timestamp'):
+        if ctype.parse(first) is None:
+            continue
+        try:
+            typed = TypedColumn.from_column(column, ctype)
+        except ValueError:
+            continue
+        if column.kind == 'dict' and typed.nbytes > column.nbytes:
+            return None
+        return typed
+    return None
+
+
+def apply_types(table: ColumnarTable, column_types) -> ColumnarTable:
+    """
+    Stores columns of `table` as typed columns, in place.
+
+    Args:
+        table: A table whose columns are dictionary or string columns.
+        column_types: 'infer' to type the columns `infer_column` finds a type
+            for, or a {column name: type name} mapping (see `candidate_types`)
+            of columns that must be typed.
+
+    Returns:
+        The same table.
+
+    Raises:
+        ValueError: If a declared column does not exist, a type name is not
+            known, or a declared column holds values of another type.
+    """
+    if column_types == 'infer':
+        for name, column in list(table.columns.items()):
+            typed = infer_column(column) if column.kind != 'typed' else None
+            if typed is not None:
+                table._replace_column(name, typed)
+        return table
+
+    for name, spec in column_types.items():
+        if name not in table.columns:
+            raise ValueError(f"Cannot type unknown column '{name}'.")
+        column = table.columns[name]
+        candidates = candidate_types(spec)
+        if column.kind == 'typed':
+            if column.ctype in candidates:
+                continue
+            raise ValueError(f"Column '{name}' is already stored as {column.ctype.spec}.")
+        errors = []
+        for ctype in candidates:
+            try:
+                table._replace_column(name, TypedColumn.from_column(column, ctype))
+                break
+            except ValueError as e:
+                errors.append(e)
+        else:
+            raise ValueError(f"Column '{name}' cannot be stored as {spec}: {errors[0]}")
+    return table
+
+
+def column_types_spec(table: ColumnarTable) -> dict[str, str]:
+    """Returns the {column name: type spec} of the typed columns of a table."""
+    return {name: column.ctype.spec for name, column in table.columns.items() if column.kind == 'typed'}
+
+
+def parse_column_types(text: str) -> dict[str, str]:
+    """
+    Parses a `column:type,...` declaration.
+
+    Raises:
+        ValueError: If an entry has no type or the type is not known.
+    """
+    column_types = {}
+    for entry in text.split(','):
+        name, sep, spec = entry.partition(':')
+        if not sep or not name or not spec:
+            raise ValueError(f"Expected <column>:<type> but found '{entry}'.")
+        candidate_types(spec)
+        column_types[name] = spec
+    return column_types
@@ -0,0 +1,122 @@
+import unittest
+import json
+import os
+import subprocess
+import tempfile
+from io import StringIO
+from unittest import mock
+
+# Add project root to sys.path to allow direct import of siem_core
+import sys
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, project_root)
+
+import app
+from siem_core.batch import BatchOutput, read_script, run_batch, split_pipeline
+from siem_core.session import Session
+
+SAMPLE_PATH = os.path.join(project_root, 'data', 'sample.csv')
+
+
+class TestBatch(unittest.TestCase):
+
+    def run_commands(self, commands, output_format='csv'):
+        out, messages = StringIO(), StringIO()
+        session = Session()
+        # Every run ends by closing the session, including runs that fail or exit early.
+        with mock.patch.object(session, 'close', wraps=session.close) as close:
+            status = run_batch(commands, app.run_line, session, output_format, out, messages)
+        close.assert_called()
+        self.assertIsNone(session.output)
+        return status, out.getvalue(), messages.getvalue()
+
+    def test_split_pipeline(self):
+        self.assertEqual(split_pipeline('load x.csv | query Protocol TCP|stats count by Source_IP'),
+                         ['load x.csv', 'query Protocol TCP', 'stats count by Source_IP'])
+        self.assertEqual(split_pipeline("where URL MATCHES 'a|b' | head 1"), ["where URL MATCHES 'a|b'", 'head 1'])
+        self.assertEqual(split_pipeline(r'where A = "x\"|y"'), [r'where A = "x\"|y"'])
+        for text in ('load x.csv || head', 'load x.csv |', "where A = 'x"):
+            with self.assertRaises(ValueError):
+                split_pipeline(text)
+
+    def test_outputs_what_commands_display(self):
+        status, out, messages = self.run_commands(
+            [f'load {SAMPLE_PATH} --no-cache', 'query Protocol TCP', 'stats count by Source_IP'])
+        self.assertEqual(status, 0)
+        self.assertEqual(out, 'Source_IP,count\n10.20.30.40,1\n192.168.1.10,2\n')
+        self.assertIn('Query executed. 3 rows match the criteria.', messages)
+
+        status, out, _ = self.run_commands([f'load {SAMPLE_PATH} --no-cache', 'where Protocol = TCP', 'head 2'], 'jsonl')
+        rows = [json.loads(line) for line in out.splitlines()]
+        self.assertEqual([(row['Protocol'], row['Port']) for row in rows], [('TCP', '443'), ('TCP', '80')])
+
+    def test_perf_and_stream_results_are_written(self):
+        status, out, _ = self.run_commands([f'load {SAMPLE_PATH} --no-cache', 'perf summary'])
+        self.assertEqual((status, out.splitlines()[0]), (0, 'Command,Runs,Total_s,Mean_s,Max_s'))
+        self.assertIn('load', [line.split(',')[0] for line in out.splitlines()[1:]])
+        with mock.patch.object(app, 'STREAM_BLOCK_ROWS', 2):
+            status, out, messages = self.run_commands([f'stream {SAMPLE_PATH} Protocol TCP'])
+        lines = out.splitlines()
+        self.assertEqual(lines[0], 'Source_IP,Destination_IP,Protocol,Port,Timestamp')
+        self.assertEqual([line.split(',')[3] for line in lines[1:]], ['443', '80', '443'])
+        self.assertIn('3 rows match', messages)
+        status, out, _ = self.run_commands([f'load {SAMPLE_PATH} --no-cache', f'stream {SAMPLE_PATH} Protocol XX'])
+        self.assertEqual((status, out), (0, ''))
+
+    def test_current_data_is_written_if_nothing_else_was(self):
+        status, out, _ = self.run_commands([f'load {SAMPLE_PATH} --no-cache', 'where Port = 443'])
+        self.assertEqual(status, 0)
+        lines = out.splitlines()
+        self.assertEqual(lines[0], 'Source_IP,Destination_IP,Protocol,Port,Timestamp')
+        self.assertTrue(lines[1:])
+        self.assertTrue(all(',443,' in line for line in lines[1:]))
+
+    def test_stops_at_the_first_failure(self):
+        status, out, messages = self.run_commands(['load missing.csv', 'stats count'])
+        self.assertEqual((status, out), (1, ''))
+        self.assertIn("Error: File not found at 'missing.csv'.", messages)
+        self.assertNotIn('No data loaded', messages)
+        status, out, _ = self.run_commands([f'load {SAMPLE_PATH} --no-cache', 'exit', 'stats count'])
+        self.assertEqual((status, out), (0, ''))
+        with self.assertRaises(ValueError):
+            BatchOutput(StringIO(), 'xml')
+
+    def test_read_script(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'job.siem')
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(f'# Hourly TCP summary\nload {SAMPLE_PATH} --no-cache\n\nwhere Protocol = TCP | top 1 Port\n')
+            self.assertEqual(read_script(path), [f'load {SAMPLE_PATH} --no-cache', 'where Protocol = TCP', 'top 1 Port'])
+            status, out, _ = self.run_commands(read_script(path))
+            self.assertEqual((status, out.splitlines()[0]), (0, 'Port,count,percent'))
+            with open(path, 'a', encoding='utf-8') as f:
+                f.write('head |\n')
+            with self.assertRaisesRegex(ValueError, 'line 5'):
+                read_script(path)
+
+    def test_modules_are_imported_by_the_commands_using_them(self):
+        code = ("import sys, app; app.run_line('perf clear'); "
+                "print(' '.join(name for name in sys.modules if name.startswith('siem_core.')))")
+        result = subprocess.run([sys.executable, '-c', code], cwd=project_root, capture_output=True, text=True,
+                                timeout=60)
+        loaded = set(result.stdout.splitlines()[-1].split())
+        self.assertIn('siem_core.session', loaded)
+        for name in ('csv_handler', 'dataset', 'index', 'lookup', 'mmap_backend', 'query_lang', 'sort', 'stats',
+                     'stream', 'typed'):
+            self.assertNotIn(f'siem_core.{name}', loaded)
+
+    def test_command_line(self):
+        result = subprocess.run(
+            [sys.executable, os.path.join(project_root, 'app.py'), '--format', 'jsonl',
+             '--batch', f'load {SAMPLE_PATH} --no-cache | stats count by Protocol'],
+            capture_output=True, text=True, timeout=60)
+        self.assertEqual(result.returncode, 0, result.stderr)
+        self.assertNotIn('Commands:', result.stdout + result.stderr)
+        self.assertEqual({row['Protocol'] for row in map(json.loads, result.stdout.splitlines())}, {'TCP', 'UDP', 'ICMP'})
+        result = subprocess.run([sys.executable, os.path.join(project_root, 'app.py'), '--batch', 'stats count'],
+                                capture_output=True, text=True, timeout=60)
+        self.assertEqual((result.returncode, result.stdout), (1, ''))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,68 @@
+import unittest
+import os
+import tempfile
+
+# Add project root to sys.path to allow direct import of siem_core
+import sys
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, project_root)
+
+from benchmarks.generate_logs import NARROW_FIELDS, WIDE_FIELDS, LogGenerator, write_logs
+from benchmarks.run_benchmarks import compare, percentile
+from siem_core.csv_handler import load_csv_to_memory, load_csv_to_table
+from siem_core.stats import top_values
+
+class TestGenerateLogs(unittest.TestCase):
+
+    def test_deterministic(self):
+        rows = list(LogGenerator(seed=7, rows=500).rows(500))
+        self.assertEqual(rows, list(LogGenerator(seed=7, rows=500).rows(500)))
+        self.assertNotEqual(rows, list(LogGenerator(seed=8, rows=500).rows(500)))
+
+    def test_schemas(self):
+        self.assertTrue(all(len(row) == len(NARROW_FIELDS) for row in LogGenerator('narrow').rows(100)))
+        self.assertTrue(all(len(row) == len(WIDE_FIELDS) for row in LogGenerator('wide').rows(100)))
+        with self.assertRaises(ValueError):
+            LogGenerator('medium')
+
+    def test_written_file_loads(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, 'wide.csv')
+            write_logs(path, 2000, schema='wide', seed=1, start='2024-01-01T00:00:00Z', span_seconds=3600)
+            table = load_csv_to_table(path, cache_dir=None)
+            self.assertEqual(table.fieldnames, list(WIDE_FIELDS))
+            self.assertEqual(table.to_dicts(), load_csv_to_memory(path))
+        self.assertEqual(len(table), 2000)
+        self.assertTrue(table[0]['Timestamp'].startswith('2024-01-01T00:00'))
+        self.assertTrue(all(row['Port'] == '' for row in table if row['Protocol'] == 'ICMP'))
+        # Traffic is skewed: the busiest source sends far more than an even share.
+        busiest = top_values(table, ['Source_IP'], 1)[0]['count']
+        self.assertGreater(busiest, 2000 / len({row['Source_IP'] for row in table}) * 10)
+
+
+class TestRunBenchmarks(unittest.TestCase):
+
+    def test_percentile(self):
+        samples = list(range(1, 101))
+        self.assertEqual(percentile(samples, 50), 50)
+        self.assertEqual(percentile(samples, 99), 99)
+        self.assertEqual(percentile([3.0], 95), 3.0)
+
+    def test_compare(self):
+        baseline = {'metrics': {
+            'load.rows_per_s': {'value': 1000.0, 'unit': 'rows/s', 'better': 'higher'},
+            'query.p50_ms': {'value': 10.0, 'unit': 'ms', 'better': 'lower'},
+            'tiny.p50_ms': {'value': 0.01, 'unit': 'ms', 'better': 'lower'},
+        }}
+        results = {'metrics': {
+            'load.rows_per_s': {'value': 700.0, 'unit': 'rows/s', 'better': 'higher'},
+            'query.p50_ms': {'value': 11.0, 'unit': 'ms', 'better': 'lower'},
+            'tiny.p50_ms': {'value': 0.05, 'unit': 'ms', 'better': 'lower'},
+            'new.p50_ms': {'value': 1.0, 'unit': 'ms', 'better': 'lower'},
+        }}
+        flagged = {entry['name']: entry['regression'] for entry in compare(results, baseline, tolerance=0.2)}
+        self.assertEqual(flagged, {'load.rows_per_s': True, 'query.p50_ms': False, 'tiny.p50_ms': False})
+
+
+if __name__ == '__main__':
+    unittest.main()
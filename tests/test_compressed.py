@@ -0,0 +1,128 @@
+import unittest
+import bz2
+import gzip
+import lzma
+import os
+import shutil
+import tempfile
+
+# Add project root to sys.path to allow direct import of siem_core
+import sys
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, project_root)
+
+from siem_core import compressed
+from siem_core.compressed import DecompressionError, detect_compression, open_csv
+from siem_core.csv_handler import load_csv_mapped, load_csv_to_memory, load_csv_to_table
+from siem_core.dataset import expand_paths
+from siem_core.lookup import build_lookup
+from siem_core.parallel_loader import parse_parallel
+from siem_core.stream import stream_count
+
+
+class TestCompressed(unittest.TestCase):
+
+    def setUp(self):
+        self.sample_csv_path = os.path.join(project_root, 'data', 'sample.csv')
+        with open(self.sample_csv_path, 'rb') as f:
+            self.raw = f.read()
+        self.tmp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def write(self, name: str, data: bytes) -> str:
+        path = os.path.join(self.tmp_dir, name)
+        with open(path, 'wb') as f:
+            f.write(data)
+        return path
+
+    def test_detect_compression(self):
+        self.assertIsNone(detect_compression(self.sample_csv_path))
+        # Detection goes by content, not by file name.
+        self.assertEqual(detect_compression(self.write('a.csv', gzip.compress(self.raw))), 'gzip')
+        self.assertEqual(detect_compression(self.write('b.csv', bz2.compress(self.raw))), 'bz2')
+        self.assertEqual(detect_compression(self.write('c.csv', lzma.compress(self.raw))), 'xz')
+        with self.assertRaises(FileNotFoundError):
+            detect_compression(os.path.join(self.tmp_dir, 'missing.csv'))
+
+    def test_loaders_read_compressed_files(self):
+        expected = load_csv_to_table(self.sample_csv_path)
+        for name, compress in (('a.csv.gz', gzip.compress), ('a.csv.bz2', bz2.compress),
+                               ('a.csv.xz', lzma.compress)):
+            path = self.write(name, compress(self.raw))
+            table = load_csv_to_table(path, cache_dir=None)
+            self.assertEqual(table.to_dicts(), expected.to_dicts(), name)
+            self.assertEqual(load_csv_to_memory(path), load_csv_to_memory(self.sample_csv_path))
+
+    def test_large_file_in_small_blocks(self):
+        body = b''.join(b'10.0.0.%d,%d\n' % (i % 256, i) for i in range(50000))
+        path = self.write('big.csv.gz', gzip.compress(b'ip,n\n' + body))
+        original = compressed._READ_BYTES
+        compressed._READ_BYTES = 1024
+        try:
+            table = load_csv_to_table(path, cache_dir=None)
+        finally:
+            compressed._READ_BYTES = original
+        self.assertEqual(len(table), 50000)
+        self.assertEqual(table[49999]['n'], '49999')
+
+    def test_concatenated_streams(self):
+        header, _, rest = self.raw.partition(b'\n')
+        path = self.write('joined.csv.gz', gzip.compress(header + b'\n') + gzip.compress(rest))
+        with open_csv(path) as f:
+            self.assertEqual(f.read(), self.raw.decode())
+
+    def test_zero_padded_gzip(self):
+        header, _, rest = self.raw.partition(b'\n')
+        padded = gzip.compress(header + b'\n') + b'\x00' * 16 + gzip.compress(rest) + b'\x00' * 16
+        self.assertEqual(gzip.decompress(padded), self.raw)
+        original = compressed._READ_BYTES
+        # Small blocks also split the padding between reads.
+        compressed._READ_BYTES = 7
+        try:
+            with open_csv(self.write('padded.csv.gz', padded)) as f:
+                self.assertEqual(f.read(), self.raw.decode())
+        finally:
+            compressed._READ_BYTES = original
+
+    def test_corrupt_and_truncated_files(self):
+        data = gzip.compress(self.raw)
+        truncated = self.write('cut.csv.gz', data[:len(data) // 2])
+        with open_csv(truncated) as f, self.assertRaises(DecompressionError):
+            f.read()
+        with self.assertRaises(ValueError):
+            load_csv_to_table(truncated, cache_dir=None)
+        corrupt = self.write('bad.csv.xz', lzma.compress(self.raw)[:20] + b'\x00' * 200)
+        with self.assertRaises(ValueError):
+            stream_count(corrupt, [])
+
+    def test_closing_early_stops_the_thread(self):
+        body = b''.join(b'%d\n' % i for i in range(200000))
+        path = self.write('early.csv.gz', gzip.compress(b'n\n' + body))
+        f = open_csv(path)
+        f.readline()
+        raw = f.buffer.raw
+        f.close()
+        self.assertFalse(raw._thread.is_alive())
+
+    def test_other_readers(self):
+        path = self.write('sample.csv.bz2', bz2.compress(self.raw))
+        self.assertEqual(stream_count(path, [('Protocol', 'TCP')]),
+                         stream_count(self.sample_csv_path, [('Protocol', 'TCP')]))
+        lookup = build_lookup(path, 'Source_IP', ['Protocol'])
+        self.assertEqual(lookup.partition(0)['192.168.1.10'], ('TCP',))
+        self.assertIsNone(parse_parallel(path, workers=2, min_parallel_bytes=0))
+        with self.assertRaises(ValueError):
+            load_csv_mapped(path)
+
+    def test_directories_include_compressed_files(self):
+        self.write('a.csv', self.raw)
+        self.write('b.csv.gz', gzip.compress(self.raw))
+        self.write('c.txt.gz', gzip.compress(self.raw))
+        names = [os.path.basename(path) for path in expand_paths(self.tmp_dir)]
+        self.assertEqual(names, ['a.csv', 'b.csv.gz'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -10,7 +10,8 @@ import sys
 project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
 sys.path.insert(0, project_root)
 
-from siem_core.csv_handler import load_csv_to_memory, query_data, display_data
+from siem_core.csv_handler import load_csv_to_memory, query_data, display_data, export_data
+from siem_core.table import ColumnarTable, TableView
 
 class TestCSVHandler(unittest.TestCase):
 
@@ -118,6 +119,20 @@ class TestCSVHandler(unittest.TestCase):
         self.assertIn("val3\tval4", output) # Check second row
         self.assertNotIn("No data to display.", output)
 
+    def test_display_data_page(self):
+        test_data = [{'col1': f'val{i}', 'col2': 'x' * (60 if i == 3 else 1)} for i in range(5)]
+        string_io = StringIO()
+        with redirect_stdout(string_io):
+            display_data(test_data, offset=1, limit=3)
+        lines = string_io.getvalue().splitlines()
+        self.assertEqual(lines[0], "col1\tcol2")
+        self.assertEqual(lines[2:], ["val1\tx", "val2\tx", "val3\t" + "x" * 37 + "...", "(rows 2-4 of 5)"])
+
+        string_io = StringIO()
+        with redirect_stdout(string_io):
+            display_data(test_data, offset=5)
+        self.assertIn("No rows to display at offset 5", string_io.getvalue())
+
     def test_display_data_empty(self):
         string_io = StringIO()
         with redirect_stdout(string_io):
@@ -125,5 +140,24 @@ class TestCSVHandler(unittest.TestCase):
         output = string_io.getvalue()
         self.assertIn("No data to display.", output)
 
+    def test_export_data(self):
+        table = ColumnarTable.from_rows(['a', 'b'], [['1', 'x,y'], ['2'], ['3', 'z']])
+        view = TableView(table, [0, 1, 2])
+        for data in (table, view, table.to_dicts()):
+            out = StringIO()
+            self.assertEqual(export_data(data, out, 'csv', offset=1), 2)
+            self.assertEqual(out.getvalue(), "a,b\n2,\n3,z\n")
+        out = StringIO()
+        export_data(view, out, 'jsonl', limit=2)
+        self.assertEqual(out.getvalue(), '{"a": "1", "b": "x,y"}\n{"a": "2", "b": null}\n')
+        out = StringIO()
+        self.assertEqual(export_data([], out), 0)
+        self.assertEqual(out.getvalue(), "")
+        out = StringIO()
+        export_data(TableView(table, []), out)
+        self.assertEqual(out.getvalue(), "a,b\n")
+        with self.assertRaises(ValueError):
+            export_data(table, StringIO(), 'xml')
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,169 @@
+import unittest
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+# Add project root to sys.path to allow direct import of siem_core
+import sys
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, project_root)
+
+from siem_core.csv_handler import load_csv_to_table, query_data
+from siem_core import dataset
+from siem_core.dataset import (BloomFilter, FileMetadata, LayeredBloomFilter, collect_metadata, concat_tables,
+                               expand_paths, load_csv_files, narrow)
+from siem_core.query_lang import QueryPlan, parse_query, run_query
+from siem_core.table import ColumnarTable
+from siem_core.time_index import parse_time, time_window
+from siem_core.typed import apply_types
+
+HEADER = 'Source_IP,Destination_IP,Protocol,Port,Timestamp\n'
+
+
+def hourly_rows(hour: int, count: int) -> str:
+    return ''.join(f'10.{hour}.0.{i},10.1.0.{i % 3},{"TCP" if i % 2 else "UDP"},{80 + i % 2},'
+                   f'2023-10-26T{hour:02d}:{i % 60:02d}:00Z\n' for i in range(count))
+
+
+class TestDataset(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.cache_dir = os.path.join(self.temp_dir, 'cache')
+        self.log_dir = os.path.join(self.temp_dir, 'logs')
+        os.makedirs(self.log_dir)
+        # 100 distinct source IPs per file get a Bloom filter; Protocol keeps an exact set.
+        for hour in range(3):
+            self.write(f'h{hour:02d}.csv', HEADER + hourly_rows(hour, 100))
+        self.write('notes.txt', 'not a csv\n')
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def write(self, name, text):
+        path = os.path.join(self.log_dir, name)
+        with open(path, 'w', newline='') as f:
+            f.write(text)
+        return path
+
+    def test_expand_paths(self):
+        names = [os.path.basename(path) for path in expand_paths(self.log_dir)]
+        self.assertEqual(names, ['h00.csv', 'h01.csv', 'h02.csv'])
+        self.assertEqual(len(expand_paths(os.path.join(self.log_dir, 'h0[12].csv'))), 2)
+        with self.assertRaises(FileNotFoundError):
+            expand_paths(os.path.join(self.log_dir, '*.json'))
+
+    def test_scan(self):
+        meta = FileMetadata.scan(os.path.join(self.log_dir, 'h01.csv'))
+        self.assertEqual(meta.rows, 100)
+        self.assertEqual(meta.time_range, (parse_time('2023-10-26T01:00:00Z'), parse_time('2023-10-26T01:59:00Z')))
+        self.assertEqual(meta.sketches['Protocol'], frozenset({'TCP', 'UDP'}))
+        self.assertIsInstance(meta.sketches['Source_IP'], LayeredBloomFilter)
+        self.assertTrue(all(meta.may_contain('Source_IP', f'10.1.0.{i}') for i in range(100)))
+        self.assertFalse(meta.may_contain('Protocol', 'ICMP'))
+
+    def test_bloom_filter(self):
+        bloom = BloomFilter.from_values(f'value {i}' for i in range(1000))
+        self.assertTrue(all(f'value {i}' in bloom for i in range(1000)))
+        false_positives = sum(f'other {i}' in bloom for i in range(1000))
+        self.assertLess(false_positives, 50)
+
+    def test_scan_grows_bloom_filters_batch_by_batch(self):
+        path = self.write('big.csv', HEADER + ''.join(
+            f'10.9.{i // 256}.{i % 256},10.1.0.1,TCP,{i},2023-10-{1 + i % 28:02d}T00:00:00Z\n' for i in range(10000)))
+        with mock.patch.object(dataset, '_SCAN_BATCH_ROWS', 1000), \
+                mock.patch.object(dataset, '_BLOOM_FIRST_CAPACITY', 4096):
+            meta = FileMetadata.scan(path)
+        self.assertEqual(meta.time_range, (parse_time('2023-10-01T00:00:00Z'), parse_time('2023-10-28T00:00:00Z')))
+        self.assertEqual(meta.sketches['Destination_IP'], frozenset({'10.1.0.1'}))
+        bloom = meta.sketches['Port']
+        self.assertEqual(len(bloom.layers), 2)
+        self.assertTrue(all(str(i) in bloom for i in range(10000)))
+        self.assertLess(sum(str(i) in bloom for i in range(10000, 20000)), 200)
+        meta.save(self.cache_dir)
+        restored = FileMetadata.load(path, self.cache_dir)
+        self.assertEqual([layer.bits for layer in restored.sketches['Port'].layers],
+                         [layer.bits for layer in bloom.layers])
+
+    def test_metadata_is_saved(self):
+        paths = expand_paths(self.log_dir)
+        files, scanned = collect_metadata(paths, cache_dir=self.cache_dir)
+        self.assertEqual(scanned, 3)
+        restored, scanned = collect_metadata(paths, cache_dir=self.cache_dir)
+        self.assertEqual(scanned, 0)
+        self.assertEqual([meta.rows for meta in restored], [100, 100, 100])
+        self.assertEqual(restored[1].time_range, files[1].time_range)
+        self.assertTrue(restored[1].may_contain('Source_IP', '10.1.0.7'))
+        self.assertEqual(restored[1].sketches['Protocol'], files[1].sketches['Protocol'])
+        # Changed files and another time column are scanned again.
+        self.write('h02.csv', HEADER + hourly_rows(2, 10))
+        _, scanned = collect_metadata(paths, cache_dir=self.cache_dir)
+        self.assertEqual(scanned, 1)
+        _, scanned = collect_metadata(paths, time_column='Port', cache_dir=self.cache_dir)
+        self.assertEqual(scanned, 3)
+
+    def test_candidates(self):
+        dataset, _ = load_csv_files(self.log_dir, cache_dir=None)
+        self.assertEqual(len(dataset), 300)
+        names = lambda files: [os.path.basename(meta.path) for meta in files]
+        self.assertEqual(names(dataset.candidates(parse_query('Source_IP = 10.1.0.5'))), ['h01.csv'])
+        self.assertEqual(names(dataset.candidates(parse_query('Source_IP IN (10.0.0.1, 10.2.0.1)'))),
+                         ['h00.csv', 'h02.csv'])
+        self.assertEqual(names(dataset.candidates(parse_query('Protocol = TCP AND Source_IP = 10.2.0.5'))),
+                         ['h02.csv'])
+        self.assertEqual(len(dataset.candidates(parse_query('Source_IP = 10.1.0.5 OR Port = 80'))), 3)
+        self.assertEqual(len(dataset.candidates(parse_query('Port > 80'))), 3)
+        self.assertEqual(dataset.candidates(parse_query('Protocol = ICMP')), [])
+        window = dataset.candidates(time_column='Timestamp', earliest=parse_time('2023-10-26T01:30:00Z'),
+                                    latest=parse_time('2023-10-26T02:00:00Z'))
+        self.assertEqual(names(window), ['h01.csv'])
+
+    def test_narrow_matches_a_single_table(self):
+        dataset, _ = load_csv_files(os.path.join(self.log_dir, '*.csv'), cache_dir=self.cache_dir,
+                                    column_types={'Port': 'int'})
+        everything = load_csv_to_table(os.path.join(self.log_dir, 'h00.csv'), cache_dir=None,
+                                       column_types={'Port': 'int'})
+        for name in ('h01.csv', 'h02.csv'):
+            everything.extend(load_csv_to_table(os.path.join(self.log_dir, name), cache_dir=None,
+                                                column_types={'Port': 'int'}))
+        for expression in ('Protocol = TCP AND Port = 81', 'Source_IP = 10.2.0.5', 'Port IN (80)'):
+            node = parse_query(expression)
+            result = QueryPlan(narrow(dataset, node), node).execute()
+            self.assertEqual([dict(row) for row in result], [dict(row) for row in run_query(everything, expression)])
+        earliest, latest = parse_time('2023-10-26T00:59:00Z'), parse_time('2023-10-26T01:01:00Z')
+        result = time_window(narrow(dataset, time_column='Timestamp', earliest=earliest, latest=latest),
+                             earliest, latest)
+        self.assertEqual(len(result), len(time_window(everything, earliest, latest)))
+        self.assertEqual(len(query_data(narrow(dataset), 'Protocol', 'UDP')), 150)
+        self.assertEqual(narrow(dataset).columns['Port'].kind, 'typed')
+
+    def test_rows_by_position(self):
+        self.write('h01.csv', HEADER)
+        dataset, _ = load_csv_files(self.log_dir, cache_dir=None)
+        self.assertEqual(len(dataset), 200)
+        self.assertEqual(dataset[0]['Source_IP'], '10.0.0.0')
+        self.assertEqual(dataset[100]['Source_IP'], '10.2.0.0')
+        self.assertEqual(dataset[-1]['Source_IP'], '10.2.0.99')
+        self.assertEqual(sum(1 for _ in dataset), 200)
+        with self.assertRaises(IndexError):
+            dataset[200]
+
+    def test_different_headers(self):
+        self.write('h03.csv', 'Source_IP,Port\n10.0.0.1,80\n')
+        with self.assertRaises(ValueError):
+            load_csv_files(self.log_dir, cache_dir=None)
+
+    def test_concat_tables(self):
+        first = ColumnarTable.from_rows(['IP', 'Port'], [['10.0.0.1', '80'], ['10.0.0.2', '443']])
+        second = ColumnarTable.from_rows(['IP', 'Port'], [['10.0.0.3', 'ssh']])
+        apply_types(first, {'IP': 'ipv4', 'Port': 'int'})
+        apply_types(second, {'IP': 'ipv4'})
+        combined = concat_tables([first, second])
+        self.assertEqual(combined.columns['IP'].kind, 'typed')
+        self.assertNotEqual(combined.columns['Port'].kind, 'typed')
+        self.assertEqual([dict(row) for row in combined], [dict(row) for row in first] + [dict(row) for row in second])
+
+
+if __name__ == '__main__':
+    unittest.main()
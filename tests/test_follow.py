@@ -0,0 +1,182 @@
+import unittest
+import os
+import shutil
+import tempfile
+
+# Add project root to sys.path to allow direct import of siem_core
+import sys
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, project_root)
+
+from siem_core.csv_handler import load_csv_to_table, query_data
+from siem_core.follow import CSVFollower, append_rows
+from siem_core.query_lang import QueryPlan, parse_query, run_query
+from siem_core.session import Session
+from siem_core.time_index import time_window
+
+HEADER = 'Source_IP,Destination_IP,Protocol,Port,Timestamp\n'
+ROWS = ('192.168.1.10,10.0.0.5,TCP,443,2023-10-26T10:00:00Z\n'
+        '192.168.1.12,10.0.0.8,UDP,53,2023-10-26T10:05:00Z\n'
+        '192.168.1.10,10.0.0.5,TCP,80,2023-10-26T10:10:00Z\n')
+
+
+class TestCSVFollower(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.temp_dir, 'live.csv')
+        self.write(HEADER + ROWS, mode='w')
+        self.follower = CSVFollower.at_end(self.path)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def write(self, text, mode='a'):
+        with open(self.path, mode, newline='') as f:
+            f.write(text)
+
+    def test_nothing_appended(self):
+        self.assertEqual(self.follower.read_new(), [])
+        self.assertTrue(self.follower.caught_up())
+
+    def test_partial_record_is_left_for_later(self):
+        self.write('10.0.0.1,10.0.0.2,TCP,22,2023-10-26T11:00:00Z\n10.0.0.3,10.0')
+        self.assertEqual(self.follower.read_new(), [['10.0.0.1', '10.0.0.2', 'TCP', '22', '2023-10-26T11:00:00Z']])
+        self.assertFalse(self.follower.caught_up())
+        self.write('.0.4,UDP,53,2023-10-26T11:01:00Z\n')
+        self.assertEqual(self.follower.read_new(), [['10.0.0.3', '10.0.0.4', 'UDP', '53', '2023-10-26T11:01:00Z']])
+        self.assertTrue(self.follower.caught_up())
+
+    def test_newline_inside_quotes_does_not_end_a_record(self):
+        self.write('10.0.0.1,10.0.0.2,"TCP\n')
+        self.assertEqual(self.follower.read_new(), [])
+        self.write('over IP",22,2023-10-26T11:00:00Z\n')
+        self.assertEqual(self.follower.read_new(), [['10.0.0.1', '10.0.0.2', 'TCP\nover IP', '22', '2023-10-26T11:00:00Z']])
+
+    def test_truncated_file_is_an_error(self):
+        self.write(HEADER, mode='w')
+        with self.assertRaises(ValueError):
+            self.follower.read_new()
+
+
+class TestAppendRows(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        path = os.path.join(self.temp_dir, 'live.csv')
+        with open(path, 'w', newline='') as f:
+            f.write(HEADER + ROWS)
+        self.table = load_csv_to_table(path, cache_dir=None, column_types={'Port': 'int'},
+                                       index_columns=['Protocol', 'Port'])
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_indexes_cover_new_rows(self):
+        tcp = query_data(self.table, 'Protocol', 'TCP')
+        new_ids = append_rows(self.table, [['10.0.0.1', '10.0.0.2', 'TCP', '22', '2023-10-26T11:00:00Z'],
+                                           ['10.0.0.3', '10.0.0.4', 'ICMP', '', '2023-10-26T11:01:00Z']])
+        self.assertEqual(new_ids, range(3, 5))
+        self.assertEqual(list(self.table.indexes.lookup('Protocol', 'TCP')), [0, 2, 3])
+        self.assertEqual(list(self.table.indexes.lookup('Protocol', 'ICMP')), [4])
+        self.assertEqual(list(self.table.indexes.get('Port').range([(0, 100)])), [1, 2, 3])
+        # Results taken before the rows were appended stay as they were.
+        self.assertEqual(len(tcp), 2)
+        self.assertEqual(len(run_query(self.table, 'Port < 100')), 3)
+
+    def test_typed_column_falls_back_for_unparsable_values(self):
+        append_rows(self.table, [['10.0.0.1', '10.0.0.2', 'TCP', 'ssh', '2023-10-26T11:00:00Z']])
+        self.assertNotEqual(self.table.columns['Port'].kind, 'typed')
+        self.assertEqual(self.table[3]['Port'], 'ssh')
+        self.assertEqual(self.table[0]['Port'], '443')
+        self.assertEqual(len(query_data(self.table, 'Port', 'ssh')), 1)
+
+    def test_time_index_covers_new_rows(self):
+        self.assertEqual(len(time_window(self.table, '2023-10-26T10:05:00Z')), 2)
+        append_rows(self.table, [['10.0.0.1', '10.0.0.2', 'TCP', '22', '2023-10-26T11:00:00Z'],
+                                 ['10.0.0.3', '10.0.0.4', 'UDP', '53', '2023-10-26T09:00:00Z']])
+        self.assertEqual(len(time_window(self.table, '2023-10-26T10:05:00Z')), 3)
+        self.assertEqual([row['Port'] for row in time_window(self.table, latest='2023-10-26T10:00:00Z')], ['53'])
+
+
+class TestSessionIngest(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.temp_dir, 'live.csv')
+        with open(self.path, 'w', newline='') as f:
+            f.write(HEADER + ROWS)
+        self.table = load_csv_to_table(self.path, cache_dir=None)
+        self.session = Session()
+        self.session.set_loaded(self.table, self.path, follower=CSVFollower.at_end(self.path))
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def where(self, expression):
+        node = parse_query(expression)
+        return self.session.filter(('where', str(node)), lambda data: QueryPlan(data, node).execute())
+
+    def append(self, text):
+        with open(self.path, 'a', newline='') as f:
+            f.write(text)
+
+    def test_results_are_extended(self):
+        self.where('Protocol = TCP')
+        self.where('Port = 80')
+        self.append('10.0.0.1,10.0.0.2,TCP,80,2023-10-26T11:00:00Z\n'
+                    '10.0.0.3,10.0.0.4,UDP,80,2023-10-26T11:01:00Z\n')
+        new_rows = self.session.follow()
+        self.assertEqual(len(new_rows), 2)
+        self.assertEqual(len(self.session.original_data), 5)
+        self.assertEqual(len(self.session.current_data), len(run_query(self.table, 'Protocol = TCP AND Port = 80')))
+        self.assertTrue(self.session.undo())
+        self.assertEqual(len(self.session.current_data), 3)
+        # A cached result includes the new rows too.
+        self.session.reset()
+        self.assertTrue(self.where('Protocol = TCP'))
+        self.assertEqual(len(self.session.current_data), 3)
+        self.assertTrue(self.where('Port = 80'))
+        self.assertEqual([row['Source_IP'] for row in self.session.current_data], ['192.168.1.10', '10.0.0.1'])
+
+    def test_watches_report_new_matches(self):
+        self.session.add_watch('Protocol = UDP')
+        self.session.add_watch('Port = 8080')
+        self.append('10.0.0.1,10.0.0.2,TCP,80,2023-10-26T11:00:00Z\n'
+                    '10.0.0.3,10.0.0.4,UDP,53,2023-10-26T11:01:00Z\n')
+        matches = self.session.check_watches(self.session.follow())
+        self.assertEqual([(expression, len(rows)) for expression, rows in matches], [('Protocol = UDP', 1)])
+        self.assertEqual(matches[0][1][0]['Source_IP'], '10.0.0.3')
+        self.assertTrue(self.session.remove_watch(1))
+        self.assertFalse(self.session.remove_watch(5))
+
+    def test_partially_written_last_record_is_left_for_follow(self):
+        self.append('10.0.0.1,10.0.0.2,TCP,22,2023-10-26T11:0')
+        table = load_csv_to_table(self.path, cache_dir=None, complete_records_only=True)
+        self.assertEqual(len(table), 3)
+        self.assertEqual(table.source_end, len(HEADER + ROWS))
+        self.session.set_loaded(table, self.path, follower=CSVFollower(self.path, table.source_end))
+        self.append('0:00Z\n10.0.0.3,10.0.0.4,UDP,53,2023-10-26T11:01:00Z\n')
+        new_rows = self.session.follow()
+        self.assertEqual([row['Timestamp'] for row in new_rows], ['2023-10-26T11:00:00Z', '2023-10-26T11:01:00Z'])
+        self.assertEqual(len(self.session.original_data), 5)
+        self.assertEqual(table.source_end, os.path.getsize(self.path))
+
+    def test_snapshot_keeps_where_complete_records_end(self):
+        cache_dir = os.path.join(self.temp_dir, 'cache')
+        self.append('10.0.0.1,10.0.0.2,"TCP\n')
+        table = load_csv_to_table(self.path, cache_dir=cache_dir, complete_records_only=True)
+        restored = load_csv_to_table(self.path, cache_dir=cache_dir, complete_records_only=True)
+        self.assertEqual((len(restored), restored.source_end), (len(table), table.source_end))
+        self.assertEqual(len(table), 3)
+        # Without complete_records_only the partial record is parsed, not taken from the snapshot.
+        self.assertEqual(len(load_csv_to_table(self.path, cache_dir=cache_dir)), 4)
+
+    def test_follow_needs_a_follower(self):
+        self.session.set_loaded(self.table, self.path)
+        with self.assertRaises(ValueError):
+            self.session.follow()
+
+
+if __name__ == '__main__':
+    unittest.main()
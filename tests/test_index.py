@@ -0,0 +1,128 @@
+import unittest
+import os
+
+# Add project root to sys.path to allow direct import of siem_core
+import sys
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, project_root)
+
+from siem_core.csv_handler import load_csv_to_table, query_data
+from siem_core.index import HashIndex, IndexManager, SortedIndex, TrigramIndex
+from siem_core.table import ColumnarTable, StringColumn
+from siem_core.typed import apply_types
+
+class TestIndexes(unittest.TestCase):
+
+    def setUp(self):
+        self.sample_csv_path = os.path.join(project_root, 'data', 'sample.csv')
+        self.table = load_csv_to_table(self.sample_csv_path)
+
+    def test_index_built_lazily_on_first_query(self):
+        self.assertEqual(self.table.indexes.indexes, {})
+        results = query_data(self.table, 'Source_IP', '192.168.1.10')
+        self.assertEqual(len(results), 2)
+        self.assertIn('Source_IP', self.table.indexes.indexes)
+        self.assertNotIn('Protocol', self.table.indexes.indexes)
+
+    def test_indexed_query_matches_scan(self):
+        unindexed = load_csv_to_table(self.sample_csv_path)
+        unindexed.indexes = None
+        for column, value in [('Protocol', 'TCP'), ('Port', ''), ('Source_IP', '1.2.3.4')]:
+            self.assertEqual(query_data(self.table, column, value).to_dicts(),
+                             query_data(unindexed, column, value).to_dicts())
+
+    def test_prebuilt_index_columns(self):
+        table = load_csv_to_table(self.sample_csv_path, index_columns=['Protocol', 'Port'])
+        self.assertEqual(set(table.indexes.indexes), {'Protocol', 'Port'})
+
+    def test_prebuilt_unknown_column(self):
+        with self.assertRaisesRegex(ValueError, "unknown column"):
+            load_csv_to_table(self.sample_csv_path, index_columns=['NonExistentColumn'])
+
+    def test_unknown_column_lookup(self):
+        self.assertIsNone(self.table.indexes.lookup('NonExistentColumn', 'x'))
+
+    def test_high_cardinality_index(self):
+        rows = [[str(i % 100), str(i)] for i in range(1000)]
+        table = ColumnarTable.from_rows(['a', 'b'], rows).compact()
+        self.assertEqual(list(HashIndex(table.columns['a']).lookup('7')), list(range(7, 1000, 100)))
+        self.assertEqual(list(HashIndex(table.columns['b']).lookup('7')), [7])
+
+    def test_budget_evicts_least_used_index(self):
+        manager = IndexManager(self.table)
+        manager.get('Protocol')
+        manager.get('Protocol')
+        manager.get('Port')
+        source_ip_size = HashIndex(self.table.columns['Source_IP']).nbytes
+        manager.memory_budget = manager.indexes['Protocol'].nbytes + source_ip_size
+        manager.get('Source_IP')
+        self.assertIn('Protocol', manager.indexes)
+        self.assertIn('Source_IP', manager.indexes)
+        self.assertNotIn('Port', manager.indexes)
+        self.assertEqual(set(manager.memory_usage()), {'Protocol', 'Source_IP'})
+
+    def test_sorted_index_for_typed_columns(self):
+        table = load_csv_to_table(self.sample_csv_path, column_types={'Port': 'int', 'Source_IP': 'ipv4'})
+        index = table.indexes.get('Port')
+        self.assertIsInstance(index, SortedIndex)
+        self.assertEqual(list(index.range([(50, 100)])), [1, 2])
+        self.assertEqual(list(index.range([(443, 443), (53, 80)])), [0, 1, 2, 3])
+        self.assertEqual(index.count_range([(0, 65535)]), 4)
+        self.assertEqual(list(index.lookup('443')), [0, 3])
+        self.assertEqual(list(index.lookup('')), [4])
+        self.assertEqual(index.count('0443'), 0)
+        self.assertEqual(list(query_data(table, 'Source_IP', '192.168.1.10').to_dicts()),
+                         [row for row in load_csv_to_table(self.sample_csv_path) if row['Source_IP'] == '192.168.1.10'])
+
+    def test_sorted_index_ignores_blanks(self):
+        table = ColumnarTable.from_rows(['n'], [['5'], [''], ['0'], [None], ['-3']])
+        apply_types(table, {'n': 'int'})
+        index = SortedIndex(table.columns['n'])
+        self.assertEqual(list(index.order), [4, 2, 0])
+        self.assertEqual(list(index.range([(-10, 0)])), [2, 4])
+    def test_trigram_index(self):
+        urls = ['http://evil.com/a', 'https://good.org', None, 'evil.co', 'ab', 'http://evil.com.example/b']
+        column = StringColumn()
+        for url in urls * 40:
+            column.append(url)
+        index = TrigramIndex(column)
+        evil = [row_id for row_id in range(len(column)) if urls[row_id % 6] and 'evil.com' in urls[row_id % 6]]
+        self.assertEqual(list(index.candidates(['evil.com'])), evil)
+        self.assertEqual(list(index.candidates(['http', 'example'])), list(range(5, len(column), 6)))
+        self.assertEqual(index.max_matches(['evil.com', 'good']), 40)
+        self.assertEqual(list(index.candidates(['zzz'])), [])
+        with self.assertRaises(ValueError):
+            index.candidates(['ab'])
+        earlier = index.candidates(['good'])
+        column.append('http://good.net')
+        index.extend(column, len(column) - 1)
+        self.assertEqual(len(earlier), 40)
+        self.assertEqual(index.candidates(['good'])[-1], len(column) - 1)
+
+    def test_trigram_indexes_are_enabled_per_column_and_evicted(self):
+        table = ColumnarTable.from_rows(['url', 'proto'], [[f'http://host{i}.example/{i}', 'TCP' if i % 2 else 'UDP']
+                                                            for i in range(200)]).compact()
+        manager = IndexManager(table)
+        self.assertIsNone(manager.trigram_index('url'))
+        manager.enable_trigrams(['url', 'proto'])
+        with self.assertRaises(KeyError):
+            manager.enable_trigrams(['NonExistentColumn'])
+        # Dictionary columns are searched by distinct value instead.
+        self.assertFalse(manager.trigram_allowed('proto'))
+        index = manager.trigram_index('url')
+        self.assertIsInstance(index, TrigramIndex)
+        self.assertIs(manager.trigram_index('url'), index)
+        self.assertIn('url (trigram)', manager.memory_usage())
+        # Trigram indexes are evicted like the other indexes.
+        manager.memory_budget = index.nbytes + 1
+        manager.get('proto')
+        self.assertEqual(set(manager.memory_usage()), {'proto'})
+        manager.trigram_index('url')
+        manager.drop('url')
+        self.assertEqual(manager.trigram_indexes, {})
+        # An index that cannot fit the budget is not built.
+        manager.memory_budget = 10
+        self.assertIsNone(manager.trigram_index('url'))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,128 @@
+import unittest
+import os
+import shutil
+import tempfile
+
+# Add project root to sys.path to allow direct import of siem_core
+import sys
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, project_root)
+
+from siem_core.csv_handler import load_csv_to_memory, load_csv_to_table, query_data
+from siem_core.lookup import build_lookup, enrich, join_lookup
+from siem_core.result_cache import ResultCache
+
+ASSETS = ('Source_IP,Owner,Zone\n'
+          '192.168.1.10,alice,lan\n'
+          '10.0.0.5,bob,dmz\n'
+          '192.168.1.10,duplicate,wan\n'
+          '192.168.1.15,carol\n')
+
+
+class TestLookup(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.sample_csv_path = os.path.join(project_root, 'data', 'sample.csv')
+        cls.table = load_csv_to_table(cls.sample_csv_path, cache_dir=None)
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.assets_path = os.path.join(self.temp_dir, 'assets.csv')
+        with open(self.assets_path, 'w', newline='') as f:
+            f.write(ASSETS)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def expected(self, rows, column='Source_IP', output=('Owner', 'Zone')):
+        assets = {'192.168.1.10': ('alice', 'lan'), '10.0.0.5': ('bob', 'dmz'), '192.168.1.15': ('carol', None)}
+        positions = {'Owner': 0, 'Zone': 1}
+        return [{**row, **{name: assets[row[column]][positions[name]] if row[column] in assets else None
+                           for name in output}} for row in rows]
+
+    def test_enrich_table(self):
+        enriched, lookup, matched, cached = enrich(self.table, self.assets_path, 'Source_IP')
+        self.assertEqual(lookup.output, ['Owner', 'Zone'])
+        self.assertEqual((matched, cached, lookup.spilled), (3, False, False))
+        self.assertEqual(enriched.to_dicts(), self.expected(self.table.to_dicts()))
+        # The loaded table is left as it was, and the result can be queried.
+        self.assertEqual(self.table.fieldnames, ['Source_IP', 'Destination_IP', 'Protocol', 'Port', 'Timestamp'])
+        self.assertEqual(len(query_data(enriched, 'Owner', 'alice')), 2)
+
+    def test_enrich_view_list_and_other_column(self):
+        view = self.table.select([1, 4])
+        enriched, _, matched, _ = enrich(view, self.assets_path, 'Source_IP', output=['Zone'])
+        self.assertEqual(matched, 1)
+        self.assertEqual(enriched.to_dicts(), self.expected(view.to_dicts(), output=('Zone',)))
+        rows = load_csv_to_memory(self.sample_csv_path)
+        enriched, _, matched, _ = enrich(rows, self.assets_path, 'Source_IP', column='Destination_IP')
+        self.assertEqual(matched, 3)
+        self.assertEqual(enriched.to_dicts(), self.expected(rows, column='Destination_IP'))
+
+    def test_existing_columns_keep_unmatched_values(self):
+        first, _, _, _ = enrich(self.table, self.assets_path, 'Source_IP', output=['Zone'])
+        second, _, _, _ = enrich(first, self.assets_path, 'Source_IP', column='Destination_IP', output=['Zone'])
+        self.assertEqual([row['Zone'] for row in second], ['dmz', None, 'dmz', None, 'dmz'])
+        self.assertEqual([row['Zone'] for row in first], ['lan', None, 'lan', None, None])
+
+    def test_cache(self):
+        cache = ResultCache()
+        _, lookup, _, cached = enrich(self.table, self.assets_path, 'Source_IP', cache=cache)
+        self.assertFalse(cached)
+        _, reused, _, cached = enrich(self.table.select([0]), self.assets_path, 'Source_IP', cache=cache)
+        self.assertTrue(cached)
+        self.assertIs(reused, lookup)
+        # A changed file is read again.
+        with open(self.assets_path, 'a', newline='') as f:
+            f.write('192.168.1.12,dave,lan\n')
+        enriched, rebuilt, matched, cached = enrich(self.table, self.assets_path, 'Source_IP', cache=cache)
+        self.assertFalse(cached)
+        self.assertIsNot(rebuilt, lookup)
+        self.assertEqual(enriched[1]['Owner'], 'dave')
+
+    def test_partitioned_join_matches_in_memory_join(self):
+        path = os.path.join(self.temp_dir, 'big.csv')
+        with open(path, 'w', newline='') as f:
+            f.write('Source_IP,Owner\n')
+            f.write(''.join(f'10.9.{i >> 8}.{i & 255},owner{i}\n' for i in range(5000)))
+            f.write('192.168.1.10,alice\n192.168.1.10,late\n')
+        in_memory, _, _, _ = enrich(self.table, path, 'Source_IP')
+        lookup = build_lookup(path, 'Source_IP', memory_budget=50000)
+        self.assertTrue(lookup.spilled)
+        self.assertGreater(len(lookup.partitions), 1)
+        spilled = self.table.take(range(len(self.table)))
+        self.assertEqual(join_lookup(spilled, 'Source_IP', lookup), 2)
+        self.assertEqual(spilled.to_dicts(), in_memory.to_dicts())
+        self.assertEqual(spilled[0]['Owner'], 'alice')
+        # The spill files go away with the table.
+        spill_dir = lookup._spill_dir.name
+        self.assertTrue(os.path.isdir(spill_dir))
+        del lookup
+        self.assertFalse(os.path.isdir(spill_dir))
+
+    def test_hash_table_on_the_smaller_side(self):
+        path = os.path.join(self.temp_dir, 'big.csv')
+        with open(path, 'w', newline='') as f:
+            f.write('Source_IP,Owner\n')
+            f.write(''.join(f'10.9.{i >> 8}.{i & 255},owner{i}\n' for i in range(5000)))
+            f.write('192.168.1.10,alice\n')
+        lookup = build_lookup(path, 'Source_IP', memory_budget=50000, keys=['192.168.1.10', '10.0.0.1'])
+        self.assertTrue(lookup.restricted)
+        self.assertFalse(lookup.spilled)
+        self.assertEqual(lookup.partition(0), {'192.168.1.10': ('alice',)})
+        self.assertEqual(len(build_lookup(path, 'Source_IP').partition(0)), 5001)
+
+    def test_errors(self):
+        with self.assertRaises(FileNotFoundError):
+            enrich(self.table, os.path.join(self.temp_dir, 'missing.csv'), 'Source_IP')
+        with self.assertRaisesRegex(ValueError, "'Host' not found"):
+            enrich(self.table, self.assets_path, 'Host')
+        with self.assertRaisesRegex(ValueError, "Country"):
+            enrich(self.table, self.assets_path, 'Source_IP', output=['Country'])
+        with self.assertRaisesRegex(ValueError, "current data"):
+            enrich(self.table, self.assets_path, 'Source_IP', column='Host')
+
+
+if __name__ == '__main__':
+    unittest.main()
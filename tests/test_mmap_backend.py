@@ -0,0 +1,97 @@
+import unittest
+import os
+import csv
+import tempfile
+from io import StringIO
+from contextlib import redirect_stdout
+
+# Add project root to sys.path to allow direct import of siem_core
+import sys
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, project_root)
+
+from siem_core.csv_handler import display_data, load_csv_mapped, load_csv_to_memory, query_data
+from siem_core.mmap_backend import MappedCSV
+
+class TestMappedCSV(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.sample_csv_path = os.path.join(project_root, 'data', 'sample.csv')
+        cls.loaded_data = load_csv_to_memory(cls.sample_csv_path)
+        cls.tmp_dir = tempfile.TemporaryDirectory()
+        cls.quoted_csv_path = os.path.join(cls.tmp_dir.name, 'quoted.csv')
+        with open(cls.quoted_csv_path, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['id', 'msg', 'host'])
+            writer.writerow(['1', 'multi\nline', 'a.example'])
+            writer.writerow(['2', 'say "hi"', 'b.example'])
+            f.write('\r\n')
+            writer.writerow(['3', 'a, b', 'a.example'])
+            writer.writerow(['4', 'short'])
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmp_dir.cleanup()
+
+    def test_rows_match_dict_loader(self):
+        for field_offsets in (False, True):
+            mapped = load_csv_mapped(self.sample_csv_path, field_offsets=field_offsets)
+            self.assertEqual(len(mapped), len(self.loaded_data))
+            self.assertEqual(mapped.to_dicts(), self.loaded_data)
+            mapped.close()
+
+    def test_quoted_records(self):
+        expected = load_csv_to_memory(self.quoted_csv_path)
+        for field_offsets in (False, True):
+            mapped = MappedCSV(self.quoted_csv_path, field_offsets=field_offsets)
+            self.assertEqual(mapped.to_dicts(), expected)
+            self.assertEqual(mapped[1]['msg'], 'say "hi"')
+            self.assertIsNone(mapped[-1]['host'])
+
+    def test_query_mapped(self):
+        mapped = load_csv_mapped(self.sample_csv_path)
+        for column, value in [('Source_IP', '192.168.1.10'), ('Protocol', 'TCP'), ('Port', ''),
+                              ('Destination_IP', '1.2.3.4'), ('NonExistentColumn', 'x')]:
+            results = query_data(mapped, column, value)
+            self.assertIsInstance(results, MappedCSV)
+            self.assertEqual(results.to_dicts(), query_data(self.loaded_data, column, value))
+        chained = query_data(query_data(mapped, 'Protocol', 'TCP'), 'Port', '443')
+        self.assertEqual(len(chained), 2)
+
+    def test_find_checks_field_boundaries(self):
+        mapped = MappedCSV(self.quoted_csv_path)
+        self.assertEqual(list(mapped.find('host', 'a.example')), [0, 2])
+        self.assertEqual(list(mapped.find('msg', 'say "hi"')), [1])
+        self.assertEqual(list(mapped.find('msg', 'example')), [])
+        self.assertEqual(list(mapped.find('id', '2')), [1])
+
+    def test_display_mapped(self):
+        string_io = StringIO()
+        with redirect_stdout(string_io):
+            display_data(load_csv_mapped(self.sample_csv_path))
+        self.assertIn("192.168.1.15\t10.0.0.5\tICMP\t\t", string_io.getvalue())
+
+    def test_cached_index_reused_until_file_changes(self):
+        cache_dir = os.path.join(self.tmp_dir.name, 'cache')
+        csv_path = os.path.join(self.tmp_dir.name, 'cached.csv')
+        with open(csv_path, 'w') as f:
+            f.write("a,b\n1,2\n")
+        first = MappedCSV(csv_path, field_offsets=True, cache_dir=cache_dir)
+        self.assertEqual(len(os.listdir(cache_dir)), 1)
+        second = MappedCSV(csv_path, field_offsets=True, cache_dir=cache_dir)
+        self.assertEqual(second.to_dicts(), first.to_dicts())
+        with open(csv_path, 'a') as f:
+            f.write("3,4\n")
+        self.assertEqual(len(MappedCSV(csv_path, cache_dir=cache_dir)), 2)
+
+    def test_errors(self):
+        with self.assertRaises(FileNotFoundError):
+            load_csv_mapped(os.path.join(project_root, 'data', 'non_existent.csv'))
+        empty_csv_path = os.path.join(self.tmp_dir.name, 'empty.csv')
+        open(empty_csv_path, 'w').close()
+        with self.assertRaisesRegex(ValueError, "empty or has no headers"):
+            load_csv_mapped(empty_csv_path)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,96 @@
+import unittest
+import os
+import csv
+import tempfile
+from unittest import mock
+
+# Add project root to sys.path to allow direct import of siem_core
+import sys
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, project_root)
+
+from siem_core.csv_handler import load_csv_to_memory, load_csv_to_table
+from siem_core import parallel_loader
+from siem_core.parallel_loader import find_record_starts, find_records_end, parse_parallel, plan_chunks
+
+class TestParallelLoader(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp_dir = tempfile.TemporaryDirectory()
+        cls.quoted_csv_path = os.path.join(cls.tmp_dir.name, 'quoted.csv')
+        messages = ['plain', 'multi\nline', 'say "hi"', 'a, b', '\n"\n', '']
+        with open(cls.quoted_csv_path, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['id', 'proto', 'msg'])
+            for i in range(2000):
+                writer.writerow([i, 'TCP' if i % 3 else 'UDP', messages[i % len(messages)]])
+            f.write('\n1,short\n')
+        cls.expected = load_csv_to_memory(cls.quoted_csv_path)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmp_dir.cleanup()
+
+    def test_record_starts_skip_quoted_newlines(self):
+        with open(self.quoted_csv_path, 'rb') as f:
+            content = f.read()
+        starts = find_record_starts(self.quoted_csv_path, range(0, len(content), 997))
+        self.assertEqual(starts, sorted(starts))
+        for start in starts:
+            self.assertEqual(content[start - 1:start], b'\n')
+            self.assertEqual(content[:start].count(b'"') % 2, 0)
+
+    def test_records_end_skips_a_partial_last_record(self):
+        with open(self.quoted_csv_path, 'rb') as f:
+            content = f.read()
+        self.assertEqual(find_records_end(self.quoted_csv_path), len(content))
+        partial_path = os.path.join(self.tmp_dir.name, 'partial.csv')
+        with mock.patch.object(parallel_loader, '_SCAN_BLOCK_SIZE', 64):
+            for tail in (b'7,TCP,unfinished', b'7,TCP,"open\nquoted\n'):
+                with open(partial_path, 'wb') as f:
+                    f.write(content + tail)
+                self.assertEqual(find_records_end(partial_path), len(content))
+        with open(partial_path, 'wb') as f:
+            f.write(b'id,proto')
+        self.assertEqual(find_records_end(partial_path), 0)
+
+    def test_plan_chunks_cover_data(self):
+        header_end, ranges = plan_chunks(self.quoted_csv_path, 5)
+        self.assertEqual(header_end, len(b'id,proto,msg\r\n'))
+        self.assertEqual(ranges[0][0], header_end)
+        self.assertEqual(ranges[-1][1], os.path.getsize(self.quoted_csv_path))
+        for (_, end), (start, _) in zip(ranges, ranges[1:]):
+            self.assertEqual(end, start)
+
+    def test_parallel_dicts_identical_to_sequential(self):
+        for workers in (2, 3, 7):
+            self.assertEqual(parse_parallel(self.quoted_csv_path, workers=workers, min_parallel_bytes=0),
+                             self.expected)
+
+    def test_parallel_table_identical_to_sequential(self):
+        table = parse_parallel(self.quoted_csv_path, workers=3, min_parallel_bytes=0, as_table=True)
+        self.assertEqual(table.to_dicts(), self.expected)
+        self.assertEqual(table.to_dicts(), load_csv_to_table(self.quoted_csv_path).to_dicts())
+
+    def test_parallel_parse_stops_at_end(self):
+        end = find_records_end(self.quoted_csv_path) - len(b'1,short\n')
+        table = parse_parallel(self.quoted_csv_path, workers=3, min_parallel_bytes=0, as_table=True, end=end)
+        self.assertEqual(table.to_dicts(), self.expected[:-1])
+
+    def test_small_file_falls_back(self):
+        sample_csv_path = os.path.join(project_root, 'data', 'sample.csv')
+        self.assertIsNone(parse_parallel(sample_csv_path, workers=4))
+        self.assertIsNone(parse_parallel(sample_csv_path, workers=1, min_parallel_bytes=0))
+        self.assertEqual(load_csv_to_memory(sample_csv_path, workers=4), load_csv_to_memory(sample_csv_path))
+
+    def test_loader_errors_with_workers(self):
+        with self.assertRaises(FileNotFoundError):
+            load_csv_to_memory(os.path.join(project_root, 'data', 'non_existent.csv'), workers=4)
+        empty_csv_path = os.path.join(self.tmp_dir.name, 'empty.csv')
+        open(empty_csv_path, 'w').close()
+        with self.assertRaisesRegex(ValueError, "empty or has no headers"):
+            load_csv_to_table(empty_csv_path, workers=4)
+
+if __name__ == '__main__':
+    unittest.main()
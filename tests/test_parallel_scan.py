@@ -0,0 +1,123 @@
+import unittest
+import os
+import random
+
+# Add project root to sys.path to allow direct import of siem_core
+import sys
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, project_root)
+
+import app
+from siem_core import parallel_scan
+from siem_core.parallel_scan import ScanPool, SharedTable
+from siem_core.query_lang import QueryPlan, parse_query
+from siem_core.session import Session
+from siem_core.stats import parse_stats, stats
+from siem_core.table import ColumnarTable
+from siem_core.typed import apply_types
+
+
+def make_table(rows: int = 3000) -> ColumnarTable:
+    generator = random.Random(11)
+
+    def row(i):
+        return [f'10.0.{generator.randrange(4)}.{generator.randrange(40)}',
+                '' if i % 97 == 0 else str(generator.randrange(1, 70000)),
+                None if i % 89 == 0 else f'https://host{generator.randrange(10 ** 6)}.example/p?q={i}',
+                generator.choice(['TCP', 'UDP', 'ICMP']),
+                f'2023-10-{1 + i % 28:02d}T{generator.randrange(24):02d}:00:00Z']
+    table = ColumnarTable.from_rows(['ip', 'port', 'url', 'proto', 'time'], (row(i) for i in range(rows))).compact()
+    apply_types(table, {'port': 'int', 'time': 'timestamp'})
+    return table
+
+
+class TestParallelScan(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.table = make_table()
+        cls.pool = ScanPool(workers=2, min_rows=1)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.pool.close()
+
+    def test_shared_table_reads_back_every_value(self):
+        self.assertEqual({name: column.kind for name, column in self.table.columns.items()},
+                         {'ip': 'dict', 'port': 'typed', 'url': 'string', 'proto': 'dict', 'time': 'typed'})
+        shared = SharedTable(self.table)
+        try:
+            _, table, _ = parallel_scan._attach(shared.name)
+            self.assertEqual(table.to_dicts(), self.table.to_dicts())
+            part = parallel_scan._partition(table, 100, 250)
+            self.assertEqual(part.to_dicts(), self.table.to_dicts()[100:250])
+            del table, part
+        finally:
+            # Unmap the test process's own view of the segment before it is freed.
+            parallel_scan._detach()
+            shared.close()
+
+    def test_filters_match_a_serial_scan(self):
+        view = self.table.select(range(0, len(self.table), 3))
+        for expression in ['url MATCHES "host1.*7|host2"', 'port > 30000 AND proto != UDP',
+                           'NOT time BETWEEN 2023-10-05 AND 2023-10-20 OR ip CIDR 10.0.1.0/24',
+                           'proto = TCP AND url LIKE *9*', 'port = ""', 'missing = 1 OR port < 10']:
+            node = parse_query(expression)
+            for data in (self.table, view):
+                serial = QueryPlan(data, node)
+                parallel = QueryPlan(data, node, self.pool)
+                self.assertEqual(list(parallel.execute().selection), list(serial.execute().selection), expression)
+                self.assertEqual([(step.rows_in, step.rows_out) for step in parallel.steps],
+                                 [(step.rows_in, step.rows_out) for step in serial.steps])
+        plan = QueryPlan(self.table, parse_query('url CONTAINS host AND port > 5'), self.pool)
+        plan.execute()
+        self.assertIn('(parallel on 2 workers)', plan.explain())
+        self.assertGreater(self.pool.nbytes, 0)
+
+    def test_stats_match_a_serial_pass(self):
+        view = self.table.select(range(1, len(self.table), 2))
+        for spec in ['count by proto', 'count sum(port) min(port) max(port) min(time) by proto,ip',
+                     'count max(url) sum(port)', 'dc(ip) by proto']:
+            aggregates, by = parse_stats(spec)
+            for data in (self.table, view, self.table.to_dicts()):
+                self.assertEqual(self.pool.stats(data, aggregates, by), stats(data, aggregates, by), spec)
+
+    def test_small_scans_and_grown_tables(self):
+        table = make_table(500)
+        pool = ScanPool(workers=1, min_rows=400)
+        try:
+            node = parse_query('port > 1000 AND url CONTAINS 5')
+            expected = list(QueryPlan(table, node).execute().selection)
+            plan = QueryPlan(table.select(range(300)), node, pool)
+            self.assertEqual(list(plan.execute().selection), [row_id for row_id in expected if row_id < 300])
+            self.assertEqual(pool.nbytes, 0)
+            self.assertEqual(list(QueryPlan(table, node, pool).execute().selection), expected)
+            shared = pool.nbytes
+            table.extend(make_table(500))
+            self.assertEqual(list(QueryPlan(table, node, pool).execute().selection),
+                             list(QueryPlan(table, node).execute().selection))
+            self.assertGreater(pool.nbytes, shared)
+        finally:
+            pool.close()
+        self.assertEqual(pool.nbytes, 0)
+
+    def test_parallel_command(self):
+        session = Session()
+        self.assertTrue(app.run_line('parallel 2', session))
+        self.assertEqual(session.scan_pool.workers, 2)
+        session.scan_pool.min_rows = 1
+        app.run_line(f"load {os.path.join(project_root, 'data', 'sample.csv')} --no-cache", session)
+        app.run_line('where Port > 50 AND Protocol != ICMP', session)
+        self.assertEqual([row['Port'] for row in session.current_data], ['443', '53', '80', '443'])
+        self.assertGreater(session.scan_pool.nbytes, 0)
+        for arguments in ('0', 'two', 'on off'):
+            self.assertIsNotNone(session.scan_pool)
+            app.run_line(f'parallel {arguments}', session)
+        pool = session.scan_pool
+        app.run_line('parallel off', session)
+        self.assertIsNone(session.scan_pool)
+        self.assertIsNone(pool._executor)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,141 @@
+import unittest
+import json
+import os
+import tempfile
+import threading
+from io import StringIO
+from contextlib import redirect_stdout
+
+# Add project root to sys.path to allow direct import of siem_core
+import sys
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, project_root)
+
+from siem_core import perf
+from siem_core.csv_handler import display_data, load_csv_to_table, query_data
+from siem_core.perf import PerfRecorder
+from siem_core.query_lang import run_query
+from siem_core.stream import stream_count
+
+
+class TestPerf(unittest.TestCase):
+
+    def setUp(self):
+        self.sample_csv_path = os.path.join(project_root, 'data', 'sample.csv')
+        self.recorder = PerfRecorder()
+
+    def tearDown(self):
+        self.recorder.set_memory_tracing(False)
+
+    def test_hooks_do_nothing_outside_a_command(self):
+        with perf.phase('query'):
+            perf.count(rows_scanned=10)
+        self.assertEqual(len(self.recorder.history), 0)
+
+    def test_load_reports_parse_rows_and_bytes(self):
+        with self.recorder.command('load sample') as metrics:
+            with perf.phase('load'):
+                table = load_csv_to_table(self.sample_csv_path, cache_dir=None)
+        self.assertEqual(metrics.rows_scanned, len(table))
+        self.assertEqual(metrics.bytes_read, os.path.getsize(self.sample_csv_path))
+        self.assertEqual(set(metrics.phases), {'load', 'parse'})
+        self.assertGreaterEqual(metrics.phases['load'], metrics.phases['parse'])
+        self.assertGreaterEqual(metrics.seconds, metrics.phases['load'])
+        self.assertIsNone(metrics.memory_delta)
+        self.assertEqual(list(self.recorder.history), [metrics])
+
+    def test_queries_report_rows_scanned(self):
+        table = load_csv_to_table(self.sample_csv_path, cache_dir=None)
+        with self.recorder.command('query') as metrics:
+            query_data(table, 'Source_IP', '192.168.1.10')
+        # The first lookup builds the index over the whole column, later ones read only matches.
+        self.assertEqual(metrics.rows_scanned, len(table))
+        with self.recorder.command('query') as metrics:
+            query_data(table, 'Source_IP', '192.168.1.10')
+        self.assertEqual(metrics.rows_scanned, 2)
+        with self.recorder.command('where') as metrics:
+            run_query(table.select([0, 1, 2]), 'Protocol = TCP')
+        self.assertEqual(metrics.rows_scanned, 3)
+
+    def test_stream_and_display(self):
+        with self.recorder.command('stream') as metrics:
+            stream_count(self.sample_csv_path, [('Protocol', 'TCP')])
+        self.assertEqual(metrics.bytes_read, os.path.getsize(self.sample_csv_path))
+        self.assertGreater(metrics.rows_scanned, 0)
+        with self.recorder.command('display') as metrics, redirect_stdout(StringIO()):
+            display_data([{'a': '1'}, {'a': '2'}, {'a': '3'}], 1)
+        self.assertEqual(metrics.rows_scanned, 2)
+        self.assertIn('display', metrics.phases)
+
+    def test_nested_phase_counts_once(self):
+        with self.recorder.command('nested') as metrics:
+            with perf.phase('load'):
+                with perf.phase('load'):
+                    pass
+                outer = perf.phase('load')
+        self.assertIs(outer, perf._NO_PHASE)
+        self.assertEqual(list(metrics.phases), ['load'])
+
+    def test_failed_command_is_recorded(self):
+        with self.assertRaises(ValueError):
+            with self.recorder.command('broken'):
+                raise ValueError('boom')
+        self.assertEqual(self.recorder.history[-1].command, 'broken')
+        self.assertIsNone(perf._current())
+
+    def test_threads_record_their_own_commands(self):
+        other_recorder = PerfRecorder()
+
+        def other_command():
+            with other_recorder.command('other'):
+                perf.count(rows_scanned=7)
+
+        with self.recorder.command('mine') as metrics:
+            thread = threading.Thread(target=other_command)
+            thread.start()
+            thread.join()
+            perf.count(rows_scanned=1)
+        self.assertEqual(metrics.rows_scanned, 1)
+        self.assertEqual(other_recorder.history[-1].rows_scanned, 7)
+
+    def test_memory_tracing(self):
+        self.recorder.set_memory_tracing(True)
+        with self.recorder.command('allocate') as metrics:
+            kept = [str(i) for i in range(10000)]
+        self.assertGreater(metrics.memory_delta, 0)
+        self.assertGreaterEqual(metrics.memory_peak, metrics.memory_delta)
+        self.assertEqual(len(kept), 10000)
+
+    def test_metrics_log(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            log_path = os.path.join(tmp_dir, 'metrics.jsonl')
+            self.recorder.set_log(log_path)
+            for name in ('first', 'second'):
+                with self.recorder.command(name):
+                    perf.count(rows_scanned=5, rows_returned=1)
+            with open(log_path) as f:
+                entries = [json.loads(line) for line in f]
+            with self.assertRaises(OSError):
+                self.recorder.set_log(os.path.join(tmp_dir, 'missing', 'metrics.jsonl'))
+        self.assertEqual([entry['command'] for entry in entries], ['first', 'second'])
+        self.assertEqual((entries[0]['rows_scanned'], entries[0]['rows_returned']), (5, 1))
+
+    def test_rows_and_summary(self):
+        for name in ('where a = 1', 'where b = 2', 'load x'):
+            with self.recorder.command(name):
+                pass
+        rows = self.recorder.rows(2)
+        self.assertEqual([row['Command'] for row in rows], ['where b = 2', 'load x'])
+        self.assertEqual(rows[0]['Load'], '')
+        summary = {row['Command']: row['Runs'] for row in self.recorder.summary()}
+        self.assertEqual(summary, {'where': 2, 'load': 1})
+
+    def test_profile(self):
+        result, report = perf.profile(sorted, range(1000, 0, -1), limit=5)
+        self.assertEqual(result, list(range(1, 1001)))
+        self.assertIn('cumulative', report)
+        self.assertIn('sorted', report)
+
+
+if __name__ == '__main__':
+    unittest.main()
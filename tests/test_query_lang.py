@@ -0,0 +1,252 @@
+import unittest
+import os
+import csv
+import tempfile
+
+# Add project root to sys.path to allow direct import of siem_core
+import sys
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, project_root)
+
+from siem_core.csv_handler import load_csv_mapped, load_csv_to_memory, load_csv_to_table
+from siem_core.query_lang import (And, Condition, Not, Or, QueryPlan, QuerySyntaxError, _regex_literals, parse_query,
+                                  run_query)
+
+class TestQueryLanguage(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp_dir = tempfile.TemporaryDirectory()
+        cls.events_csv_path = os.path.join(cls.tmp_dir.name, 'events.csv')
+        with open(cls.events_csv_path, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['Source_IP', 'Protocol', 'Port', 'Action'])
+            for i in range(600):
+                writer.writerow([f"10.0.{i % 7}.{i % 50}", ['TCP', 'UDP', 'ICMP'][i % 3],
+                                 [22, 53, 80, 443, 8080, ''][i % 6], 'deny' if i % 11 == 0 else 'allow'])
+            f.write('10.9.9.9,TCP\n')
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmp_dir.cleanup()
+
+    def test_parse_precedence(self):
+        node = parse_query('Protocol = TCP OR NOT Port = 22 AND Action = deny')
+        self.assertEqual(node, Or((Condition('Protocol', '=', 'TCP'),
+                                   And((Not(Condition('Port', '=', '22')), Condition('Action', '=', 'deny'))))))
+
+    def test_parse_in_quotes_and_implicit_and(self):
+        node = parse_query('(Port IN (80, "443")) Source_IP != \'10.0.0.1\' Protocol NOT IN (UDP)')
+        self.assertEqual(node, And((Condition('Port', 'in', ('80', '443')),
+                                    Condition('Source_IP', '!=', '10.0.0.1'),
+                                    Condition('Protocol', 'not in', ('UDP',)))))
+        self.assertEqual(parse_query(str(node)), node)
+        self.assertEqual(parse_query('Msg = "a b \\" c"'), Condition('Msg', '=', 'a b " c'))
+
+    def test_parse_between_and_cidr(self):
+        node = parse_query('Port BETWEEN 1 AND 1024 AND Source_IP NOT CIDR 10.0.0.0/8')
+        self.assertEqual(node, And((Condition('Port', 'between', ('1', '1024')),
+                                    Not(Condition('Source_IP', 'cidr', '10.0.0.0/8')))))
+        self.assertEqual(parse_query(str(node)), node)
+
+    def test_parse_patterns(self):
+        node = parse_query('URL LIKE "*evil.com*" AND Agent NOT MATCHES curl/\\d+ OR Host CONTAINS "like"')
+        self.assertEqual(node, Or((And((Condition('URL', 'like', '*evil.com*'),
+                                        Not(Condition('Agent', 'matches', 'curl/\\d+')))),
+                                   Condition('Host', 'contains', 'like'))))
+        self.assertEqual(parse_query(str(node)), node)
+        with self.assertRaises(QuerySyntaxError):
+            parse_query('Agent MATCHES "curl/("')
+
+    def test_regex_literals(self):
+        self.assertEqual(_regex_literals(r'^evil\.com/(a|b)'), [])
+        self.assertEqual(_regex_literals(r'^evil\.com/login'), ['evil.com/login'])
+        self.assertEqual(_regex_literals(r'curl/\d+\.\d+ bot'), ['curl/', '.', ' bot'])
+        self.assertEqual(_regex_literals(r'admins?[0-9]{2,3}x+y*z'), ['admin', 'x', 'z'])
+        self.assertEqual(_regex_literals(r'[]a]bc.?def'), ['bc', 'def'])
+        self.assertEqual(_regex_literals(r'\x41BC'), [])
+
+    def test_parse_errors(self):
+        for text in ['', 'Port', 'Port =', 'Port = 80 AND', '(Port = 80', 'Port IN 80', 'Port IN (80', '= 80',
+                     'Port = 80)', 'Port BETWEEN 1', 'Port BETWEEN 1 OR 2', 'Source_IP CIDR 10.0.0.0/33']:
+            with self.assertRaises(QuerySyntaxError, msg=text):
+                parse_query(text)
+        self.assertTrue(issubclass(QuerySyntaxError, ValueError))
+
+    def test_same_results_for_every_backend(self):
+        rows = load_csv_to_memory(self.events_csv_path)
+        table = load_csv_to_table(self.events_csv_path)
+        indexed = load_csv_to_table(self.events_csv_path, index_columns=['Protocol', 'Source_IP'])
+        mapped = load_csv_mapped(self.events_csv_path)
+        port = lambda row: float(row['Port']) if row['Port'] else None
+        expressions = {
+            'Protocol = TCP AND Port IN (80, 443)': lambda r: r['Protocol'] == 'TCP' and r['Port'] in ('80', '443'),
+            'Protocol = UDP OR Action = deny': lambda r: r['Protocol'] == 'UDP' or r['Action'] == 'deny',
+            'NOT Protocol = TCP AND Port >= 443': lambda r: r['Protocol'] != 'TCP' and (port(r) or 0) >= 443,
+            'Port < 80 Source_IP != 10.0.1.1': lambda r: port(r) is not None and port(r) < 80
+                                                         and r['Source_IP'] != '10.0.1.1',
+            'Port = ""': lambda r: r['Port'] == '',
+            'Action = deny AND (Port = 22 OR Port = 8080)': lambda r: r['Action'] == 'deny'
+                                                                      and r['Port'] in ('22', '8080'),
+            'Source_IP = 10.9.9.9': lambda r: r['Source_IP'] == '10.9.9.9',
+            'Port != 22 AND Port NOT IN (53, 80)': lambda r: r['Port'] is not None
+                                                             and r['Port'] not in ('22', '53', '80'),
+            'Missing = x OR Protocol = ICMP': lambda r: r['Protocol'] == 'ICMP',
+            'Source_IP > 10.0.6 AND Protocol IN (TCP, UDP)': lambda r: r['Source_IP'] > '10.0.6'
+                                                                       and r['Protocol'] in ('TCP', 'UDP'),
+            'Port BETWEEN 50 AND 443': lambda r: port(r) is not None and 50 <= port(r) <= 443,
+            'Source_IP CIDR 10.0.2.0/27 OR Port < 30': lambda r: (r['Source_IP'].startswith('10.0.2.')
+                                                                  and int(r['Source_IP'].split('.')[3]) < 32)
+                                                                 or (port(r) is not None and port(r) < 30),
+        }
+        for expression, matches in expressions.items():
+            expected = [row for row in rows if matches(row)]
+            self.assertEqual(run_query(rows, expression), expected, expression)
+            self.assertEqual(run_query(table, expression).to_dicts(), expected, expression)
+            self.assertEqual(run_query(indexed, expression).to_dicts(), expected, expression)
+            self.assertEqual(run_query(mapped, expression).to_dicts(), expected, expression)
+        mapped.close()
+
+    def test_plan_uses_index_and_counts_rows(self):
+        table = load_csv_to_table(self.events_csv_path, index_columns=['Source_IP'])
+        plan = QueryPlan(table, parse_query('Protocol = TCP AND Source_IP = 10.0.3.10'))
+        self.assertTrue(plan.steps[0].description.startswith('index lookup: Source_IP = 10.0.3.10'))
+        self.assertIsNone(plan.steps[0].rows_in)
+        result = plan.execute()
+        self.assertEqual(len(result), 1)
+        self.assertEqual((plan.steps[0].rows_in, plan.steps[0].rows_out), (2, 2))
+        self.assertEqual((plan.steps[1].rows_in, plan.steps[1].rows_out), (2, 1))
+        explained = plan.explain()
+        self.assertIn('1. index lookup', explained)
+        self.assertIn('2. filter: Protocol = TCP', explained)
+        self.assertIn('[rows in: 2, rows out: 1]', explained)
+
+    def test_plan_orders_filters_by_selectivity(self):
+        table = load_csv_to_table(self.events_csv_path)
+        plan = QueryPlan(table, parse_query('Action != deny AND Source_IP != 10.0.0.0 AND Port > 1'))
+        self.assertEqual([step.description.split(':')[0] for step in plan.steps],
+                         ['dictionary code scan', 'filter', 'filter'])
+        self.assertIn('Port > 1', plan.steps[0].description)
+        self.assertIn('Action != deny', plan.steps[1].description)
+        self.assertIn('Source_IP != 10.0.0.0', plan.steps[2].description)
+
+    def test_plan_without_access_path_scans_everything(self):
+        table = load_csv_to_table(self.events_csv_path)
+        plan = QueryPlan(table, parse_query('Source_IP != 10.0.0.0 AND (Port = 22 OR Source_IP > 10.0.5)'))
+        self.assertEqual([step.description.split(':')[0] for step in plan.steps],
+                         ['full scan of 601 rows', 'filter', 'filter'])
+
+    def test_plan_searches_string_column(self):
+        table = load_csv_to_table(self.events_csv_path)
+        self.assertEqual(table.columns['Source_IP'].kind, 'string')
+        plan = QueryPlan(table, parse_query('Action != deny AND Source_IP = 10.0.0.0'))
+        self.assertTrue(plan.steps[0].description.startswith('string buffer search: Source_IP = 10.0.0.0'))
+        self.assertEqual(len(plan.execute()), 1)
+
+    def test_patterns_match_for_every_backend(self):
+        rows = load_csv_to_memory(self.events_csv_path)
+        table = load_csv_to_table(self.events_csv_path, cache_dir=None)
+        trigram = load_csv_to_table(self.events_csv_path, cache_dir=None, trigram_columns=['Source_IP', 'Action'])
+        typed = load_csv_to_table(self.events_csv_path, cache_dir=None, column_types={'Port': 'int'})
+        mapped = load_csv_mapped(self.events_csv_path)
+        expressions = {
+            'Source_IP LIKE "10.0.3.1?"': lambda r: r['Source_IP'].startswith('10.0.3.1') and len(r['Source_IP']) == 9,
+            'Source_IP LIKE *.4* AND Protocol LIKE ?CP': lambda r: '.4' in r['Source_IP'] and r['Protocol'] == 'TCP',
+            'Source_IP CONTAINS 0.2.1': lambda r: '0.2.1' in r['Source_IP'],
+            'Source_IP MATCHES \\.0\\.[56]\\.4[0-5]$': lambda r: r['Source_IP'][:6] in ('10.0.5', '10.0.6')
+                                                                 and r['Source_IP'][6:] in [f'.{n}' for n in range(40, 46)],
+            'Source_IP MATCHES "(1|9)\\\\.1$"': lambda r: r['Source_IP'].endswith(('1.1', '9.1')),
+            'Source_IP NOT CONTAINS .3. AND Action LIKE de*': lambda r: '.3.' not in r['Source_IP']
+                                                                       and r['Action'] == 'deny',
+            'Port LIKE 8* OR Port CONTAINS 44': lambda r: r['Port'] is not None and (r['Port'].startswith('8')
+                                                                                    or '44' in r['Port']),
+            'Action CONTAINS "" AND Port LIKE ""': lambda r: r['Port'] == '',
+        }
+        for expression, matches in expressions.items():
+            expected = [row for row in rows if matches(row)]
+            self.assertEqual(run_query(rows, expression), expected, expression)
+            for data in (table, trigram, typed, mapped):
+                self.assertEqual(run_query(data, expression).to_dicts(), expected, expression)
+        mapped.close()
+
+    def test_plan_searches_patterns(self):
+        table = load_csv_to_table(self.events_csv_path, cache_dir=None)
+        plan = QueryPlan(table, parse_query('Protocol = TCP AND Source_IP LIKE "*0.6.4*"'))
+        self.assertTrue(plan.steps[0].description.startswith('substring buffer search: Source_IP LIKE *0.6.4*'))
+        rows = load_csv_to_memory(self.events_csv_path)
+        self.assertEqual(len(plan.execute()), sum(1 for row in rows if '0.6.4' in row['Source_IP'] and row['Protocol'] == 'TCP'))
+        plan = QueryPlan(table, parse_query('Source_IP MATCHES "^10|x"'))
+        self.assertTrue(plan.steps[0].description.startswith('full scan'))
+
+        indexed = load_csv_to_table(self.events_csv_path, cache_dir=None, trigram_columns=['Source_IP'])
+        plan = QueryPlan(indexed, parse_query('Source_IP LIKE "*0.6.4*"'))
+        self.assertTrue(plan.steps[0].description.startswith('trigram index search'))
+        self.assertEqual(indexed.indexes.trigram_indexes, {})
+        self.assertEqual(len(plan.execute()), sum(1 for row in rows if '0.6.4' in row['Source_IP']))
+        self.assertIn('Source_IP', indexed.indexes.trigram_indexes)
+        # Literals shorter than a trigram are searched in the buffer.
+        plan = QueryPlan(indexed, parse_query('Source_IP LIKE "*.4?"'))
+        self.assertTrue(plan.steps[0].description.startswith('substring buffer search'))
+
+    def test_plan_scans_codes_of_rare_values(self):
+        table = load_csv_to_table(self.events_csv_path)
+        plan = QueryPlan(table, parse_query('Port > 1 AND Action = deny'))
+        self.assertTrue(plan.steps[0].description.startswith('dictionary code scan: Action = deny'))
+        result = plan.execute()
+        self.assertEqual((plan.steps[0].rows_in, plan.steps[0].rows_out), (len(table), 55))
+        self.assertEqual(len(result), sum(1 for i in range(600) if i % 11 == 0 and i % 6 != 5))
+
+    def test_plan_full_scan_for_lists(self):
+        rows = load_csv_to_memory(self.events_csv_path)
+        plan = QueryPlan(rows, parse_query('Protocol = TCP OR Port = 22'))
+        self.assertTrue(plan.steps[0].description.startswith('full scan'))
+        result = plan.execute()
+        self.assertEqual((plan.steps[0].rows_in, plan.steps[1].rows_in, plan.steps[1].rows_out),
+                         (len(rows), len(rows), len(result)))
+
+    def test_typed_columns_match_string_semantics(self):
+        rows = load_csv_to_memory(self.events_csv_path)
+        typed = load_csv_to_table(self.events_csv_path, column_types={'Port': 'int', 'Source_IP': 'ipv4'})
+        unindexed = load_csv_to_table(self.events_csv_path, column_types={'Port': 'int', 'Source_IP': 'ipv4'})
+        unindexed.indexes = None
+        for expression in ['Port BETWEEN 22 AND 80', 'Port > 79.5', 'Port <= 53 AND Port != 22', 'Port = ""',
+                           'Port IN (22, 0022, 443)', 'Source_IP CIDR 10.0.3.0/28', 'NOT Source_IP CIDR 10.0.0.0/16',
+                           'Source_IP = 10.0.1.1 OR Port = 8080', 'Port NOT IN (22)', 'Port >= x']:
+            expected = run_query(rows, expression)
+            self.assertEqual(run_query(typed, expression).to_dicts(), expected, expression)
+            self.assertEqual(run_query(unindexed, expression).to_dicts(), expected, expression)
+
+    def test_plan_uses_sorted_index_for_ranges(self):
+        table = load_csv_to_table(self.events_csv_path, column_types={'Source_IP': 'ipv4'})
+        plan = QueryPlan(table, parse_query('Protocol = TCP AND Source_IP CIDR 10.0.4.0/28'))
+        self.assertTrue(plan.steps[0].description.startswith('sorted index range: Source_IP CIDR 10.0.4.0/28'))
+        result = plan.execute()
+        self.assertIn('Source_IP', table.indexes.indexes)
+        self.assertEqual(len(result), sum(1 for i in range(600) if i % 7 == 4 and i % 50 < 16 and i % 3 == 0))
+
+    def test_unknown_column_matches_nothing(self):
+        table = load_csv_to_table(self.events_csv_path)
+        plan = QueryPlan(table, parse_query('Protocol = TCP AND Missing = x'))
+        self.assertEqual(len(plan.execute()), 0)
+        self.assertTrue(plan.steps[0].description.startswith('no such column'))
+        self.assertEqual(len(run_query(table, 'NOT Missing = x')), len(table))
+
+    def test_chained_filters_narrow_row_ids(self):
+        rows = load_csv_to_memory(self.events_csv_path)
+        table = load_csv_to_table(self.events_csv_path, column_types={'Port': 'int'}, index_columns=['Action'])
+        view = run_query(table, 'Protocol = TCP')
+        self.assertIs(view.base, table)
+        for expression in ['Action = deny', 'Port BETWEEN 22 AND 80', 'Source_IP = 10.0.3.10 OR Port = 443',
+                           'NOT Action = allow', 'Missing = x']:
+            expected = [row for row in run_query(rows, expression) if row['Protocol'] == 'TCP']
+            chained = run_query(view, expression)
+            self.assertIs(chained.base, table)
+            self.assertEqual(chained.to_dicts(), expected, expression)
+        # Without an access path only the rows of the view are checked.
+        plan = QueryPlan(view, parse_query('Action = deny'))
+        plan.execute()
+        self.assertEqual(plan.steps[0].description, f"full scan of {len(view)} rows")
+        self.assertEqual(plan.steps[1].rows_in, len(view))
+
+if __name__ == '__main__':
+    unittest.main()
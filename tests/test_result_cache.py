@@ -0,0 +1,54 @@
+import unittest
+import os
+
+# Add project root to sys.path to allow direct import of siem_core
+import sys
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, project_root)
+
+from siem_core.csv_handler import load_csv_to_table
+from siem_core.result_cache import ResultCache, result_nbytes
+
+class TestResultCache(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.table = load_csv_to_table(os.path.join(project_root, 'data', 'sample.csv'), cache_dir=None)
+
+    def test_hits_and_misses(self):
+        cache = ResultCache()
+        view = self.table.select([0, 2])
+        self.assertIsNone(cache.get('a'))
+        cache.put('a', view)
+        self.assertIs(cache.get('a'), view)
+        self.assertEqual(cache.stats(), {'entries': 1, 'bytes': result_nbytes(view), 'budget': cache.memory_budget,
+                                         'hits': 1, 'misses': 1})
+
+    def test_least_recently_used_is_evicted(self):
+        views = [self.table.select([i]) for i in range(3)]
+        cache = ResultCache(memory_budget=2 * result_nbytes(views[0]))
+        cache.put('a', views[0])
+        cache.put('b', views[1])
+        cache.get('a')
+        cache.put('c', views[2])
+        self.assertIsNone(cache.get('b'))
+        self.assertIs(cache.get('a'), views[0])
+        self.assertIs(cache.get('c'), views[2])
+        self.assertEqual(cache.nbytes, 2 * result_nbytes(views[0]))
+
+        cache.set_budget(0)
+        self.assertEqual((len(cache), cache.nbytes), (0, 0))
+        cache.put('d', views[0])
+        self.assertEqual(len(cache), 0)
+
+    def test_replace_and_clear(self):
+        cache = ResultCache()
+        cache.put('a', self.table.select([0]))
+        cache.put('a', self.table.select(range(5)))
+        self.assertEqual(len(cache.get('a')), 5)
+        self.assertEqual(cache.nbytes, result_nbytes(self.table.select(range(5))))
+        cache.clear()
+        self.assertEqual((len(cache), cache.nbytes, cache.hits), (0, 0, 1))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,169 @@
+import unittest
+import asyncio
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+# Add project root to sys.path to allow direct import of siem_core
+import sys
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, project_root)
+
+import app
+from siem_core.perf import PerfRecorder
+from siem_core.server import QueryServer, ServerClient, SharedTables, _ThreadOutput
+from siem_core.session import Session
+
+
+def echo_line(line: str, session: Session, recorder: PerfRecorder) -> bool:
+    """Stands in for app.run_line: 'sleep <s>' blocks, 'set <x>' and 'get' use the session."""
+    command, _, argument = line.partition(' ')
+    if command == 'sleep':
+        time.sleep(float(argument))
+    elif command == 'set':
+        session.current_data = argument
+    elif command == 'get':
+        print(session.current_data)
+    elif command == 'fail':
+        raise RuntimeError('boom')
+    print(f'done {line}')
+    return command != 'exit'
+
+
+class TestServer(unittest.TestCase):
+
+    def setUp(self):
+        self.sample_csv_path = os.path.join(project_root, 'data', 'sample.csv')
+        self.tmp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def start_server(self, run_line=echo_line, **options) -> QueryServer:
+        """Runs a server on a free port in a background event loop until the test ends."""
+        loop = asyncio.new_event_loop()
+        server = QueryServer(run_line, port=0, **options)
+        loop.run_until_complete(server.start())
+        thread = threading.Thread(target=loop.run_forever, daemon=True)
+        thread.start()
+
+        def stop():
+            asyncio.run_coroutine_threadsafe(server.close(), loop).result(timeout=10)
+            loop.call_soon_threadsafe(loop.stop)
+            thread.join()
+            loop.close()
+
+        self.addCleanup(stop)
+        return server
+
+    def connect(self, server: QueryServer) -> ServerClient:
+        client = ServerClient(port=server.port, timeout=10)
+        self.addCleanup(client.close)
+        return client
+
+    def test_sessions_are_separate(self):
+        server = self.start_server()
+        first, second = self.connect(server), self.connect(server)
+        first.run('set a')
+        second.run('set b')
+        self.assertEqual(first.run('get'), ('a\ndone get\n', True))
+        self.assertEqual(second.run('get'), ('b\ndone get\n', True))
+        self.assertEqual(first.run('exit'), ('done exit\n', False))
+        self.assertEqual(second.run('get')[0], 'b\ndone get\n')
+
+    def test_slow_command_does_not_block_other_clients(self):
+        server = self.start_server(max_concurrent=2)
+        slow, fast = self.connect(server), self.connect(server)
+        replies = []
+        worker = threading.Thread(target=lambda: replies.append(slow.run('sleep 0.5')))
+        worker.start()
+        time.sleep(0.1)
+        started = time.perf_counter()
+        self.assertEqual(fast.run('ping'), ('done ping\n', True))
+        self.assertLess(time.perf_counter() - started, 0.3)
+        worker.join()
+        self.assertEqual(replies, [('done sleep 0.5\n', True)])
+
+    def test_concurrency_limit(self):
+        server = self.start_server(max_concurrent=1)
+        slow, waiting = self.connect(server), self.connect(server)
+        worker = threading.Thread(target=slow.run, args=('sleep 0.3',))
+        worker.start()
+        time.sleep(0.1)
+        started = time.perf_counter()
+        waiting.run('ping')
+        # The only command slot was taken until the slow command finished.
+        self.assertGreater(time.perf_counter() - started, 0.1)
+        worker.join()
+
+    def test_client_limit_and_errors(self):
+        server = self.start_server(max_clients=1)
+        first = self.connect(server)
+        first.run('ping')
+        output, running = self.connect(server).run('ping')
+        self.assertIn('already has 1 clients', output)
+        self.assertFalse(running)
+        self.assertEqual(first.run('fail'), ('An unexpected error occurred: boom\n', True))
+
+    def test_thread_output(self):
+        fallback = tempfile.TemporaryFile('w+')
+        output = _ThreadOutput(fallback)
+        with output.capture() as captured:
+            output.write('mine')
+            other = threading.Thread(target=output.write, args=('other',))
+            other.start()
+            other.join()
+        output.write('after')
+        fallback.seek(0)
+        self.assertEqual(captured.getvalue(), 'mine')
+        self.assertEqual(fallback.read(), 'otherafter')
+        fallback.close()
+
+    def test_shared_tables(self):
+        path = os.path.join(self.tmp_dir, 'data.csv')
+        shutil.copy(self.sample_csv_path, path)
+        tables = SharedTables(limit=1)
+        loads = []
+
+        def loader():
+            loads.append(path)
+            return object()
+
+        first, shared = tables.load(path, (), loader)
+        self.assertFalse(shared)
+        self.assertEqual(tables.load(path, (), loader), (first, True))
+        # Other options load again, and the limit drops the older dataset.
+        self.assertFalse(tables.load(path, (('index', 'Port'),), loader)[1])
+        self.assertEqual(len(tables), 1)
+        self.assertFalse(tables.load(path, (), loader)[1])
+        # A changed file is loaded again.
+        with open(path, 'a') as f:
+            f.write('10.0.0.1,10.0.0.2,TCP,22,2023-10-26T11:00:00Z\n')
+        self.assertFalse(tables.load(path, (), loader)[1])
+        self.assertEqual(len(loads), 4)
+        with self.assertRaises(FileNotFoundError):
+            tables.load(os.path.join(self.tmp_dir, 'missing.csv'), (), loader)
+
+    def test_cli_commands_over_the_server(self):
+        server = self.start_server(app.run_line)
+        first, second = self.connect(server), self.connect(server)
+        output, _ = first.run(f'load {self.sample_csv_path} --no-cache')
+        self.assertIn('Successfully loaded', output)
+        output, _ = second.run(f'load {self.sample_csv_path} --no-cache')
+        self.assertIn('already loaded on the server', output)
+        self.assertEqual(len(server.tables), 1)
+        output, _ = first.run('where Protocol = UDP')
+        self.assertIn('rows match the criteria', output)
+        first_rows = first.run('display')[0]
+        second_rows = second.run('display')[0]
+        self.assertNotIn('TCP', first_rows)
+        self.assertIn('TCP', second_rows)
+        self.assertIn("not available on a server", second.run('follow --once')[0])
+        self.assertIn('where Protocol = UDP', first.run('perf')[0])
+        self.assertNotIn('where', second.run('perf')[0])
+
+
+if __name__ == '__main__':
+    unittest.main()
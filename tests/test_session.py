@@ -0,0 +1,91 @@
+import unittest
+import os
+
+# Add project root to sys.path to allow direct import of siem_core
+import sys
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, project_root)
+
+from siem_core.csv_handler import load_csv_to_table, query_data
+from siem_core.query_lang import run_query
+from siem_core.session import Session
+
+class TestSession(unittest.TestCase):
+
+    def setUp(self):
+        self.table = load_csv_to_table(os.path.join(project_root, 'data', 'sample.csv'), cache_dir=None)
+        self.session = Session(undo_limit=3)
+        self.session.set_loaded(self.table, 'sample.csv', time_column='Time')
+
+    def test_set_loaded(self):
+        self.assertIs(self.session.original_data, self.table)
+        self.assertIs(self.session.current_data, self.table)
+        self.assertEqual(self.session.time_column, 'Time')
+        self.assertFalse(self.session.undo())
+
+    def test_undo_and_reset(self):
+        tcp = query_data(self.table, 'Protocol', 'TCP')
+        self.session.apply(tcp)
+        self.session.apply(run_query(tcp, 'Port = 80'))
+        self.session.reset()
+        self.assertIs(self.session.current_data, self.table)
+        self.assertTrue(self.session.undo())
+        self.assertEqual(len(self.session.current_data), len(run_query(self.table, 'Protocol = TCP AND Port = 80')))
+        self.assertTrue(self.session.undo())
+        self.assertIs(self.session.current_data, tcp)
+        self.assertTrue(self.session.undo())
+        self.assertIs(self.session.current_data, self.table)
+        self.assertFalse(self.session.undo())
+
+    def test_reset_without_filters_is_not_recorded(self):
+        self.session.reset()
+        self.assertFalse(self.session.undo())
+
+    def test_undo_history_is_bounded(self):
+        for _ in range(5):
+            self.session.apply(query_data(self.session.current_data, 'Protocol', 'TCP'))
+        undone = 0
+        while self.session.undo():
+            undone += 1
+        self.assertEqual(undone, 3)
+
+    def test_loading_clears_history(self):
+        self.session.apply(query_data(self.table, 'Protocol', 'TCP'))
+        self.session.set_loaded(self.table, 'sample.csv')
+        self.assertFalse(self.session.undo())
+
+    def test_filter_results_are_cached(self):
+        calls = []
+
+        def run(key):
+            def filter_data(data):
+                calls.append(key)
+                return run_query(data, key)
+            return filter_data
+
+        self.session.filter(('where', 'Protocol = TCP'), run('Protocol = TCP'))
+        self.session.filter(('where', 'Port = 80'), run('Port = 80'))
+        expected = self.session.current_data.to_dicts()
+        self.session.reset()
+        self.assertFalse(self.session.filter(('where', 'Port = 80'), run('Port = 80')))
+        self.assertTrue(self.session.filter(('where', 'Protocol = TCP'), run('Protocol = TCP')))
+        self.assertEqual(self.session.current_data.to_dicts(), expected)
+        self.assertEqual(calls, ['Protocol = TCP', 'Port = 80', 'Port = 80'])
+        self.assertEqual((self.session.results.hits, self.session.results.misses), (1, 3))
+
+        self.session.undo()
+        self.assertTrue(self.session.filter(('where', 'Protocol = TCP'), run('Protocol = TCP')))
+        self.session.set_loaded(self.table, 'sample.csv')
+        self.assertEqual(len(self.session.results), 0)
+        self.assertFalse(self.session.filter(('where', 'Protocol = TCP'), run('Protocol = TCP')))
+
+    def test_results_applied_directly_are_not_cached(self):
+        self.session.apply(query_data(self.table, 'Protocol', 'TCP'))
+        self.session.filter(('where', 'Port = 80'), lambda data: run_query(data, 'Port = 80'))
+        self.assertEqual(len(self.session.results), 0)
+        self.session.reset()
+        self.session.filter(('where', 'Port = 80'), lambda data: run_query(data, 'Port = 80'))
+        self.assertEqual(len(self.session.results), 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,53 @@
+import unittest
+import os
+import tempfile
+from array import array
+
+# Add project root to sys.path to allow direct import of siem_core
+import sys
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, project_root)
+
+from siem_core.sidecar import read_sidecar, sidecar_path, source_signature, write_sidecar
+
+class TestSidecar(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.source_path = os.path.join(self.tmp_dir.name, 'source.csv')
+        with open(self.source_path, 'w') as f:
+            f.write("a,b\n1,2\n")
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_round_trip(self):
+        path = sidecar_path(self.source_path, self.tmp_dir.name, '.test')
+        signature = source_signature(self.source_path)
+        arrays = [array('Q', [1, 2, 3]), array('B', b'xyz')]
+        write_sidecar(path, {'signature': signature, 'extra': [1, None]}, arrays)
+        header, restored = read_sidecar(path, signature)
+        self.assertEqual(restored, arrays)
+        self.assertEqual(header['extra'], [1, None])
+
+    def test_stale_or_missing_sidecar(self):
+        path = sidecar_path(self.source_path, self.tmp_dir.name, '.test')
+        self.assertIsNone(read_sidecar(path))
+        write_sidecar(path, {'signature': source_signature(self.source_path)}, [])
+        with open(self.source_path, 'a') as f:
+            f.write("3,4\n")
+        self.assertIsNone(read_sidecar(path, source_signature(self.source_path)))
+
+    def test_corrupt_sidecar(self):
+        path = sidecar_path(self.source_path, self.tmp_dir.name, '.test')
+        write_sidecar(path, {}, [array('Q', [1, 2, 3])])
+        with open(path, 'r+b') as f:
+            f.truncate(os.path.getsize(path) - 4)
+        self.assertIsNone(read_sidecar(path))
+
+    def test_sidecar_paths_differ_per_source(self):
+        other_path = os.path.join(self.tmp_dir.name, 'sub', 'source.csv')
+        self.assertNotEqual(sidecar_path(self.source_path, 'cache', '.x'), sidecar_path(other_path, 'cache', '.x'))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,111 @@
+import unittest
+import os
+import tempfile
+import threading
+
+# Add project root to sys.path to allow direct import of siem_core
+import sys
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, project_root)
+
+from siem_core.csv_handler import load_csv_to_table, query_data
+from siem_core.snapshot import load_snapshot, save_snapshot, snapshot_path, update_snapshot
+
+class TestSnapshot(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.cache_dir = os.path.join(self.tmp_dir.name, 'cache')
+        self.csv_path = os.path.join(self.tmp_dir.name, 'events.csv')
+        with open(self.csv_path, 'w') as f:
+            f.write("id,proto,note\n")
+            for i in range(200):
+                f.write(f"{i},{'TCP' if i % 3 else 'UDP'},{'' if i % 7 else 'flagged'}\n")
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_snapshot_written_and_reused(self):
+        table = load_csv_to_table(self.csv_path, cache_dir=self.cache_dir)
+        self.assertTrue(os.path.exists(snapshot_path(self.csv_path, self.cache_dir)))
+        restored = load_snapshot(self.csv_path, self.cache_dir)
+        self.assertIsNotNone(restored)
+        self.assertEqual(restored.to_dicts(), table.to_dicts())
+        self.assertEqual([column.kind for column in restored.columns.values()],
+                         [column.kind for column in table.columns.values()])
+        self.assertEqual(len(query_data(restored, 'proto', 'UDP')), 67)
+
+    def test_string_column_nulls_survive(self):
+        csv_path = os.path.join(self.tmp_dir.name, 'short_rows.csv')
+        with open(csv_path, 'w') as f:
+            f.write("proto,id\n")
+            for i in range(100):
+                f.write(f"TCP,{i}\n")
+            f.write("UDP\n")
+        table = load_csv_to_table(csv_path, cache_dir=self.cache_dir)
+        self.assertEqual(table.columns['id'].kind, 'string')
+        restored = load_snapshot(csv_path, self.cache_dir)
+        self.assertEqual(restored.to_dicts(), table.to_dicts())
+        self.assertIsNone(restored[100]['id'])
+
+    def test_indexes_are_saved(self):
+        load_csv_to_table(self.csv_path, index_columns=['proto'], cache_dir=self.cache_dir)
+        restored = load_csv_to_table(self.csv_path, cache_dir=self.cache_dir)
+        self.assertEqual(list(restored.indexes.indexes), ['proto'])
+        self.assertEqual(list(restored.indexes.lookup('proto', 'UDP')), list(range(0, 200, 3)))
+
+    def test_update_snapshot_adds_lazy_indexes(self):
+        table = load_csv_to_table(self.csv_path, cache_dir=self.cache_dir)
+        self.assertFalse(update_snapshot(table, self.csv_path, self.cache_dir))
+        query_data(table, 'note', 'flagged')
+        self.assertTrue(update_snapshot(table, self.csv_path, self.cache_dir))
+        self.assertFalse(update_snapshot(table, self.csv_path, self.cache_dir))
+        self.assertIn('note', load_snapshot(self.csv_path, self.cache_dir).indexes.indexes)
+
+    def test_typed_columns_and_sorted_indexes_are_saved(self):
+        column_types = {'id': 'int'}
+        table = load_csv_to_table(self.csv_path, index_columns=['id'], cache_dir=self.cache_dir,
+                                  column_types=column_types)
+        restored = load_snapshot(self.csv_path, self.cache_dir, column_types=column_types)
+        self.assertEqual(restored.columns['id'].kind, 'typed')
+        self.assertEqual(restored.to_dicts(), table.to_dicts())
+        self.assertEqual(list(restored.indexes.get('id').range([(10, 12)])), [10, 11, 12])
+        self.assertIsNone(load_snapshot(self.csv_path, self.cache_dir))
+        self.assertEqual(load_csv_to_table(self.csv_path, cache_dir=self.cache_dir).columns['id'].kind, 'string')
+
+    def test_stale_snapshot_is_rebuilt(self):
+        load_csv_to_table(self.csv_path, cache_dir=self.cache_dir)
+        with open(self.csv_path, 'a') as f:
+            f.write("999,ICMP,late\n")
+        self.assertIsNone(load_snapshot(self.csv_path, self.cache_dir))
+        table = load_csv_to_table(self.csv_path, cache_dir=self.cache_dir)
+        self.assertEqual(len(table), 201)
+        self.assertEqual(len(load_snapshot(self.csv_path, self.cache_dir)), 201)
+
+    def test_save_while_another_thread_builds_indexes(self):
+        table = load_csv_to_table(self.csv_path, index_columns=['proto'])
+        index = table.indexes.indexes['proto']
+
+        class BuildWhileSaved(dict):
+            def __iter__(self):
+                # Another client of a server queries the shared table while its indexes are saved.
+                builder = threading.Thread(target=table.indexes.get, args=('note',))
+                builder.start()
+                builder.join()
+                return super().__iter__()
+
+        index.postings = BuildWhileSaved(index.postings)
+        save_snapshot(table, self.csv_path, self.cache_dir)
+        self.assertEqual(list(table.indexes.indexes), ['proto', 'note'])
+        restored = load_snapshot(self.csv_path, self.cache_dir)
+        self.assertEqual(list(restored.indexes.indexes), ['proto'])
+        self.assertEqual(list(restored.indexes.lookup('proto', 'UDP')), list(range(0, 200, 3)))
+
+    def test_missing_source(self):
+        self.assertIsNone(load_snapshot(os.path.join(self.tmp_dir.name, 'missing.csv'), self.cache_dir))
+        table = load_csv_to_table(self.csv_path)
+        with self.assertRaises(FileNotFoundError):
+            save_snapshot(table, os.path.join(self.tmp_dir.name, 'missing.csv'), self.cache_dir)
+
+if __name__ == '__main__':
+    unittest.main()
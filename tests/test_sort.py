@@ -0,0 +1,103 @@
+import unittest
+import os
+import random
+
+# Add project root to sys.path to allow direct import of siem_core
+import sys
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, project_root)
+
+from siem_core.csv_handler import load_csv_to_table
+from siem_core.sort import dedup_rows, sort_rows
+from siem_core.table import ColumnarTable, TableView
+from siem_core.typed import apply_types
+
+
+def make_table(rows: int = 2000) -> ColumnarTable:
+    generator = random.Random(7)
+    table = ColumnarTable.from_rows(
+        ['ip', 'port', 'time'],
+        ([f'10.0.0.{generator.randrange(20)}', str(generator.randrange(1, 1000)),
+          f'2023-10-26T{generator.randrange(24):02d}:{generator.randrange(60):02d}:00Z']
+         for _ in range(rows))).compact()
+    return table
+
+
+class TestSort(unittest.TestCase):
+
+    def setUp(self):
+        self.table = make_table()
+
+    def expected(self, data, column, descending=False):
+        rows = data.to_dicts()
+        return sorted(rows, key=lambda row: row[column], reverse=descending)
+
+    def test_strategies_agree(self):
+        expected = self.expected(self.table, 'time')
+        in_memory, strategy, runs = sort_rows(self.table, 'time')
+        self.assertEqual((strategy, runs), ('memory', 1))
+        self.assertEqual(in_memory.to_dicts(), expected)
+        # A budget of 300 rows spills 7 sorted runs.
+        external, strategy, runs = sort_rows(self.table, 'time', memory_budget=30000)
+        self.assertEqual((strategy, runs), ('external', 7))
+        self.assertEqual(external.to_dicts(), expected)
+        top, strategy, _ = sort_rows(self.table, 'time', limit=5)
+        self.assertEqual(strategy, 'top-k')
+        self.assertEqual(top.to_dicts(), expected[:5])
+        self.assertIsNotNone(top.indexes)
+
+    def test_descending_is_stable(self):
+        expected = self.expected(self.table, 'ip', descending=True)
+        for budget in (10 ** 8, 20000):
+            result, _, _ = sort_rows(self.table, 'ip', descending=True, memory_budget=budget)
+            self.assertEqual(result.to_dicts(), expected)
+        result, _, _ = sort_rows(self.table, 'ip', descending=True, limit=100, memory_budget=20000)
+        self.assertEqual(result.to_dicts(), expected[:100])
+
+    def test_views_and_typed_columns(self):
+        view = TableView(self.table, range(0, len(self.table), 3))
+        apply_types(self.table, {'port': 'int'})
+        result, _, _ = sort_rows(view, 'port', descending=True, limit=10)
+        ports = [int(row['port']) for row in result]
+        self.assertEqual(ports, sorted((int(row['port']) for row in view), reverse=True)[:10])
+
+    def test_missing_values_come_last(self):
+        table = ColumnarTable.from_rows(['a', 'b'], [['3', 'x'], ['1'], ['2', 'y'], ['4']])
+        for descending in (False, True):
+            result, _, _ = sort_rows(table, 'b', descending=descending)
+            self.assertEqual([row['a'] for row in result], ['2', '3', '1', '4'] if descending else ['3', '2', '1', '4'])
+        result, _, _ = sort_rows(table, 'b', limit=3)
+        self.assertEqual([row['a'] for row in result], ['3', '2', '1'])
+
+    def test_lists_and_unknown_columns(self):
+        rows = [{'n': '2'}, {'n': '10'}, {'n': '1'}]
+        result, _, _ = sort_rows(rows, 'n')
+        self.assertEqual([row['n'] for row in result], ['1', '10', '2'])
+        with self.assertRaises(ValueError):
+            sort_rows(self.table, 'missing')
+
+    def test_dedup(self):
+        seen = set()
+        expected = []
+        for row_id, row in enumerate(self.table):
+            if (row['ip'], row['port']) not in seen:
+                seen.add((row['ip'], row['port']))
+                expected.append(row_id)
+        result, partitions = dedup_rows(self.table, ['ip', 'port'])
+        self.assertIsInstance(result, TableView)
+        self.assertEqual((list(result.selection), partitions), (expected, 1))
+        spilled, partitions = dedup_rows(self.table, ['ip', 'port'], memory_budget=50000)
+        self.assertGreater(partitions, 1)
+        self.assertEqual(list(spilled.selection), expected)
+        with self.assertRaises(ValueError):
+            dedup_rows(self.table, ['ip', 'missing'])
+
+    def test_dedup_of_sample(self):
+        table = load_csv_to_table(os.path.join(project_root, 'data', 'sample.csv'))
+        result, _ = dedup_rows(table.select(range(1, len(table))), ['Protocol'])
+        self.assertEqual(len(result), len({row['Protocol'] for row in table.select(range(1, len(table)))}))
+        self.assertEqual(result.selection[0], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
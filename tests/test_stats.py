@@ -0,0 +1,111 @@
+import unittest
+import os
+import csv
+import tempfile
+
+# Add project root to sys.path to allow direct import of siem_core
+import sys
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, project_root)
+
+from siem_core.csv_handler import load_csv_mapped, load_csv_to_memory, load_csv_to_table
+from siem_core.query_lang import run_query
+from siem_core.stats import Aggregate, HyperLogLog, StatsSyntaxError, merge_stats, parse_stats, stats, top_values
+
+class TestStats(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp_dir = tempfile.TemporaryDirectory()
+        cls.events_csv_path = os.path.join(cls.tmp_dir.name, 'events.csv')
+        with open(cls.events_csv_path, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['Source_IP', 'Protocol', 'Port', 'Bytes'])
+            for i in range(600):
+                writer.writerow([f"10.0.{i % 7}.{i % 50}", ['TCP', 'UDP', 'ICMP'][i % 3],
+                                 [22, 53, 80, 443, 8080, ''][i % 6], i * 10 if i % 5 else 'n/a'])
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmp_dir.cleanup()
+
+    def test_parse_stats(self):
+        self.assertEqual(parse_stats('count, SUM(Bytes) dc( Source_IP ) by Protocol,Port'),
+                         ((Aggregate('count'), Aggregate('sum', 'Bytes'), Aggregate('dc', 'Source_IP')),
+                          ('Protocol', 'Port')))
+        self.assertEqual(parse_stats('count'), ((Aggregate('count'),), ()))
+        for text in ['', 'avg(Bytes)', 'sum', 'count(Port)', 'count by', 'count by ,', 'count ?']:
+            with self.assertRaises(StatsSyntaxError, msg=text):
+                parse_stats(text)
+
+    def test_stats_by_group_matches_python(self):
+        rows = load_csv_to_memory(self.events_csv_path)
+        expected = {}
+        for row in rows:
+            group = expected.setdefault(row['Protocol'], {'count': 0, 'sum': 0, 'ports': [], 'ips': set()})
+            group['count'] += 1
+            if row['Bytes'] != 'n/a':
+                group['sum'] += int(row['Bytes'])
+            if row['Port']:
+                group['ports'].append(int(row['Port']))
+            group['ips'].add(row['Source_IP'])
+        expected = [{'Protocol': protocol, 'count': group['count'], 'sum(Bytes)': group['sum'],
+                     'min(Port)': str(min(group['ports'])), 'max(Port)': str(max(group['ports'])),
+                     'dc(Source_IP)': len(group['ips'])}
+                    for protocol, group in sorted(expected.items())]
+        aggregates, by = parse_stats('count sum(Bytes) min(Port) max(Port) dc(Source_IP) by Protocol')
+        typed = load_csv_to_table(self.events_csv_path, column_types={'Port': 'int'})
+        mapped = load_csv_mapped(self.events_csv_path)
+        for data in [rows, load_csv_to_table(self.events_csv_path), typed, mapped]:
+            self.assertEqual(stats(data, aggregates, by), expected)
+        mapped.close()
+
+    def test_stats_on_views_and_without_groups(self):
+        table = load_csv_to_table(self.events_csv_path)
+        view = run_query(table, 'Protocol = TCP')
+        rows = run_query(load_csv_to_memory(self.events_csv_path), 'Protocol = TCP')
+        aggregates, by = parse_stats('count dc(Port) dc(Source_IP) max(Bytes) sum(Missing)')
+        expected = stats(rows, aggregates, by)
+        self.assertEqual(stats(view, aggregates, by), expected)
+        self.assertEqual(expected, [{'count': 200, 'dc(Port)': 2, 'dc(Source_IP)': len({r['Source_IP'] for r in rows}),
+                                     'max(Bytes)': '5970', 'sum(Missing)': ''}])
+        aggregates, by = parse_stats('count by Port Protocol')
+        self.assertEqual(stats(view, aggregates, by), stats(rows, aggregates, by))
+        self.assertEqual(stats(view, aggregates, by)[0], {'Port': '22', 'Protocol': 'TCP', 'count': 100})
+        self.assertEqual(stats(run_query(table, 'Protocol = none'), aggregates, by), [])
+
+    def test_top_values(self):
+        table = load_csv_to_table(self.events_csv_path)
+        self.assertEqual(top_values(table, ['Port'], 2),
+                         [{'Port': '22', 'count': 100, 'percent': '16.67'},
+                          {'Port': '53', 'count': 100, 'percent': '16.67'}])
+        top = top_values(run_query(table, 'Port = 22'), ['Protocol', 'Port'])
+        self.assertEqual(top, [{'Protocol': 'TCP', 'Port': '22', 'count': 100, 'percent': '100.00'}])
+
+    def test_merge_stats_of_parts(self):
+        rows = load_csv_to_memory(self.events_csv_path)
+        for spec in ['count sum(Bytes) min(Port) max(Port) max(Source_IP) by Protocol', 'count min(Bytes) sum(Port)',
+                     'count by Port,Source_IP', 'sum(Missing) by Missing']:
+            aggregates, by = parse_stats(spec)
+            partials = [stats(rows[start:start + 170], aggregates, by) for start in range(0, len(rows), 170)]
+            self.assertEqual(merge_stats(partials, aggregates, by), stats(rows, aggregates, by), spec)
+        aggregates, by = parse_stats('count by Protocol')
+        self.assertEqual(merge_stats([[], []], aggregates, by), [])
+        with self.assertRaises(ValueError):
+            merge_stats([], *parse_stats('dc(Port)'))
+
+    def test_distinct_count_switches_to_hyperloglog(self):
+        rows = [{'ip': f"10.{i >> 16}.{(i >> 8) & 255}.{i & 255}", 'g': str(i % 2)} for i in range(20000)]
+        result = stats(rows, *parse_stats('dc(ip) by g'))
+        for row in result:
+            self.assertAlmostEqual(row['dc(ip)'], 10000, delta=300)
+        sketch = HyperLogLog(precision=10)
+        sketch.update(range(50))
+        self.assertEqual(len(sketch), 50)
+        other = HyperLogLog(precision=10)
+        other.update(range(25, 100))
+        sketch.merge(other)
+        self.assertAlmostEqual(len(sketch), 100, delta=5)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+import unittest
+import os
+import tempfile
+
+# Add project root to sys.path to allow direct import of siem_core
+import sys
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, project_root)
+
+from siem_core.csv_handler import load_csv_to_memory, query_data
+from siem_core.stream import column_equals, filter_rows, iter_csv_rows, stream_count, stream_query
+
+class TestStream(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.sample_csv_path = os.path.join(project_root, 'data', 'sample.csv')
+        cls.malformed_csv_path = os.path.join(project_root, 'data', 'malformed.csv')
+        cls.non_existent_csv_path = os.path.join(project_root, 'data', 'non_existent.csv')
+        cls.loaded_data = load_csv_to_memory(cls.sample_csv_path)
+
+    def test_iter_csv_rows_matches_loader(self):
+        self.assertEqual(list(iter_csv_rows(self.sample_csv_path)), self.loaded_data)
+        self.assertEqual(list(iter_csv_rows(self.malformed_csv_path)), load_csv_to_memory(self.malformed_csv_path))
+
+    def test_iter_csv_rows_is_lazy(self):
+        rows = iter_csv_rows(self.sample_csv_path)
+        self.assertEqual(next(rows), self.loaded_data[0])
+        rows.close()
+
+    def test_filter_rows_with_predicates(self):
+        predicates = [column_equals('Protocol', 'TCP'), column_equals('Port', '443')]
+        results = list(filter_rows(iter_csv_rows(self.sample_csv_path), predicates))
+        expected = query_data(query_data(self.loaded_data, 'Protocol', 'TCP'), 'Port', '443')
+        self.assertEqual(results, expected)
+
+    def test_stream_query(self):
+        results = list(stream_query(self.sample_csv_path, [('Source_IP', '192.168.1.10')]))
+        self.assertEqual(results, query_data(self.loaded_data, 'Source_IP', '192.168.1.10'))
+        self.assertEqual(list(stream_query(self.sample_csv_path, [('NonExistentColumn', 'x')])), [])
+        self.assertEqual(list(stream_query(self.sample_csv_path, [])), self.loaded_data)
+
+    def test_stream_query_short_and_long_rows(self):
+        results = list(stream_query(self.malformed_csv_path, []))
+        self.assertEqual(results, load_csv_to_memory(self.malformed_csv_path))
+        self.assertEqual(list(stream_query(self.malformed_csv_path, [('Header3', 'x')])), [])
+
+    def test_stream_count(self):
+        self.assertEqual(stream_count(self.sample_csv_path, [('Protocol', 'TCP')]), 3)
+        self.assertEqual(stream_count(self.sample_csv_path, [('Protocol', 'TCP'), ('Port', '80')]), 1)
+        self.assertEqual(stream_count(self.sample_csv_path, [('NonExistentColumn', 'x')]), 0)
+
+    def test_errors_raised_before_iteration(self):
+        with self.assertRaises(FileNotFoundError):
+            stream_query(self.non_existent_csv_path, [])
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            empty_csv_path = os.path.join(tmp_dir, 'empty.csv')
+            open(empty_csv_path, 'w').close()
+            with self.assertRaisesRegex(ValueError, "empty or has no headers"):
+                iter_csv_rows(empty_csv_path)
+            with self.assertRaisesRegex(ValueError, "empty or has no headers"):
+                stream_count(empty_csv_path, [])
+
+if __name__ == '__main__':
+    unittest.main()
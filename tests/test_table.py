@@ -0,0 +1,194 @@
+import unittest
+import os
+import tempfile
+from io import StringIO
+from contextlib import redirect_stdout
+from unittest import mock
+
+# Add project root to sys.path to allow direct import of siem_core
+import sys
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, project_root)
+
+from siem_core.csv_handler import load_csv_to_memory, load_csv_to_table, query_data, display_data
+from siem_core import table as table_module
+from siem_core.table import ColumnarTable, DictColumn, StringColumn, TableView, intersect_sorted
+
+class TestColumnarTable(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.sample_csv_path = os.path.join(project_root, 'data', 'sample.csv')
+        cls.table = load_csv_to_table(cls.sample_csv_path)
+
+    # --- Test load_csv_to_table ---
+    def test_load_matches_dict_loader(self):
+        self.assertEqual(self.table.to_dicts(), load_csv_to_memory(self.sample_csv_path))
+
+    def test_load_empty_file(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            empty_csv_path = os.path.join(tmp_dir, 'empty.csv')
+            open(empty_csv_path, 'w').close()
+            with self.assertRaisesRegex(ValueError, "empty or has no headers"):
+                load_csv_to_table(empty_csv_path)
+
+    def test_load_file_not_found(self):
+        with self.assertRaises(FileNotFoundError):
+            load_csv_to_table(os.path.join(project_root, 'data', 'non_existent.csv'))
+
+    def test_short_rows_are_padded(self):
+        table = ColumnarTable.from_rows(['a', 'b', 'c'], [['1', '2'], ['3', '4', '5', '6']])
+        self.assertEqual(table.to_dicts(), [{'a': '1', 'b': '2', 'c': None}, {'a': '3', 'b': '4', 'c': '5'}])
+
+    # --- Test row view ---
+    def test_row_view_behaves_like_dict(self):
+        row = self.table[0]
+        self.assertIn('Source_IP', row)
+        self.assertNotIn('Missing', row)
+        self.assertEqual(row['Protocol'], 'TCP')
+        self.assertEqual(row.get('Missing', 'x'), 'x')
+        self.assertEqual(list(row.keys()), self.table.fieldnames)
+        self.assertEqual(self.table[-1]['Protocol'], 'ICMP')
+        with self.assertRaises(IndexError):
+            self.table[len(self.table)]
+
+    # --- Test encoding ---
+    def test_dict_column_widens_codes(self):
+        column = DictColumn()
+        for i in range(300):
+            column.append(str(i))
+        self.assertEqual(column.codes.typecode, 'H')
+        self.assertEqual(column.get(299), '299')
+        self.assertEqual(list(column.find('256')), [256])
+
+    def test_compact_uses_plain_strings_for_unique_values(self):
+        rows = [[str(i), 'TCP' if i % 2 else 'UDP'] for i in range(1000)]
+        table = ColumnarTable.from_rows(['id', 'proto'], rows).compact()
+        self.assertIsInstance(table.columns['id'], StringColumn)
+        self.assertIsInstance(table.columns['proto'], DictColumn)
+        self.assertEqual(list(table.columns['id'].find('42')), [42])
+        self.assertEqual(list(table.columns['id'].find('4')), [4])
+
+    def test_string_column_nulls_and_empty_values(self):
+        column = StringColumn()
+        for value in ['', 'a', None, '', 'ab']:
+            column.append(value)
+        self.assertEqual([column.get(i) for i in range(5)], ['', 'a', None, '', 'ab'])
+        self.assertEqual(list(column.find('')), [0, 3])
+        self.assertEqual(list(column.find(None)), [2])
+        self.assertEqual(list(column.find('b')), [])
+
+    def test_string_column_search(self):
+        column = StringColumn()
+        for value in ['abcab', None, 'ca', 'b', '', 'xab']:
+            column.append(value)
+        self.assertEqual(list(column.search('ab')), [0, 5])
+        # 'c' + 'a' spans two values but is found inside row 2.
+        self.assertEqual(list(column.search('ca')), [0, 2])
+        self.assertEqual(list(column.search('bx')), [])
+        self.assertEqual(list(column.search('')), [0, 2, 3, 4, 5])
+
+    def test_string_column_extend(self):
+        column, other = StringColumn(), StringColumn()
+        for value in ['a', None]:
+            column.append(value)
+        for value in ['bc', None, '']:
+            other.append(value)
+        column.extend(other)
+        codes = DictColumn()
+        codes.append('d')
+        column.extend(codes)
+        self.assertEqual([column.get(i) for i in range(len(column))], ['a', None, 'bc', None, '', 'd'])
+        self.assertEqual(list(column.find(None)), [1, 3])
+
+    def test_string_column_offsets_widen_past_the_limit(self):
+        # Lower the 32-bit limit so the widening happens after a few bytes, not 4 GiB.
+        with mock.patch.dict(table_module._CODE_LIMITS, {'I': 4}):
+            column, other = StringColumn(), StringColumn()
+            for value in ['abc', 'de']:
+                column.append(value)
+            self.assertEqual(column.offsets.typecode, 'Q')
+            column.append('fgh')
+            column.append(None)
+            for value in ['ij', None]:
+                other.append(value)
+            column.extend(other)
+            column.extend(other)
+        self.assertEqual(column.offsets.typecode, 'Q')
+        self.assertEqual([column.get(i) for i in range(len(column))],
+                         ['abc', 'de', 'fgh', None, 'ij', None, 'ij', None])
+
+    def test_from_dicts(self):
+        rows = [{'a': '1', 'b': 'x'}, {'a': '2'}]
+        table = ColumnarTable.from_dicts(rows)
+        self.assertEqual(table.fieldnames, ['a', 'b'])
+        self.assertEqual(table.to_dicts(), [{'a': '1', 'b': 'x'}, {'a': '2', 'b': None}])
+        self.assertEqual(ColumnarTable.from_dicts(self.table.to_dicts()).to_dicts(), self.table.to_dicts())
+        self.assertEqual(len(ColumnarTable.from_dicts([])), 0)
+
+    def test_add_column(self):
+        table = ColumnarTable.from_rows(['a'], [['1'], ['2']])
+        column = DictColumn()
+        for value in ['x', None]:
+            column.append(value)
+        table.add_column('b', column)
+        self.assertEqual(table.to_dicts(), [{'a': '1', 'b': 'x'}, {'a': '2', 'b': None}])
+        table.append_row(['3', 'y'])
+        self.assertEqual(dict(table[2]), {'a': '3', 'b': 'y'})
+        with self.assertRaises(ValueError):
+            table.add_column('c', DictColumn())
+
+    def test_memory_usage_per_column(self):
+        usage = self.table.memory_usage()
+        self.assertEqual(set(usage), set(self.table.fieldnames))
+        self.assertTrue(all(size > 0 for size in usage.values()))
+
+    # --- Test query_data / display_data on tables ---
+    def test_query_table(self):
+        results = query_data(self.table, 'Source_IP', '192.168.1.10')
+        self.assertIsInstance(results, TableView)
+        self.assertEqual(len(results), 2)
+        chained = query_data(results, 'Port', '80')
+        self.assertEqual(chained.to_dicts(), [self.table.to_dicts()[2]])
+        self.assertEqual(len(query_data(self.table, 'NonExistentColumn', 'x')), 0)
+
+    def test_query_views_share_the_loaded_rows(self):
+        view = query_data(self.table, 'Protocol', 'TCP')
+        self.assertIs(view.base, self.table)
+        chained = query_data(view, 'Source_IP', '192.168.1.10')
+        self.assertIs(chained.base, self.table)
+        expected = [row for row in self.table.to_dicts()
+                    if row['Protocol'] == 'TCP' and row['Source_IP'] == '192.168.1.10']
+        self.assertEqual(chained.to_dicts(), expected)
+        self.assertEqual(chained.materialize().to_dicts(), expected)
+        self.assertEqual(dict(chained[0]), expected[0])
+        self.assertEqual(chained.value(0, 'Port'), expected[0]['Port'])
+        self.assertEqual(len(query_data(view, 'Missing', 'x')), 0)
+
+    def test_view_select_and_take(self):
+        view = self.table.select([1, 3, 4, 6])
+        self.assertIsInstance(view, TableView)
+        self.assertEqual(list(view.select([0, 3, 6, 7]).selection), [3, 6])
+        self.assertEqual(view.take([2, 0]).to_dicts(), [self.table.to_dicts()[4], self.table.to_dicts()[1]])
+
+    def test_display_view_page(self):
+        string_io = StringIO()
+        with redirect_stdout(string_io):
+            display_data(self.table.select([0, 2, 4]), offset=2, limit=10)
+        lines = string_io.getvalue().splitlines()
+        self.assertEqual(lines[2:], ["192.168.1.15\t10.0.0.5\tICMP\t\t2023-10-26T10:20:00Z", "(rows 3-3 of 3)"])
+
+    def test_intersect_sorted(self):
+        self.assertEqual(list(intersect_sorted([1, 4, 5, 9], [0, 4, 9, 10])), [4, 9])
+        self.assertEqual(list(intersect_sorted([7, 500], range(0, 1000, 2))), [500])
+        self.assertEqual(list(intersect_sorted([], range(10))), [])
+
+    def test_display_table(self):
+        string_io = StringIO()
+        with redirect_stdout(string_io):
+            display_data(self.table)
+        self.assertIn("Source_IP\tDestination_IP", string_io.getvalue())
+        self.assertIn("192.168.1.15\t10.0.0.5\tICMP\t\t", string_io.getvalue())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,88 @@
+import unittest
+import os
+import tempfile
+
+# Add project root to sys.path to allow direct import of siem_core
+import sys
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, project_root)
+
+from siem_core.csv_handler import load_csv_mapped, load_csv_to_memory, load_csv_to_table
+from siem_core.table import ColumnarTable
+from siem_core.time_index import TimeIndex, parse_event_time, parse_time, time_window
+
+class TestTimeIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.sample_csv_path = os.path.join(project_root, 'data', 'sample.csv')
+        self.tmp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_parse_times(self):
+        self.assertEqual(parse_event_time('1970-01-01T00:01:00Z'), 60)
+        self.assertEqual(parse_event_time('1970-01-01 00:01:00'), 60)
+        self.assertEqual(parse_event_time('1970-01-01T01:01:00+01:00'), 60)
+        self.assertEqual(parse_event_time('60.5'), 60.5)
+        self.assertIsNone(parse_event_time(''))
+        self.assertIsNone(parse_event_time(None))
+        self.assertIsNone(parse_event_time('soon'))
+        self.assertEqual(parse_time('-2h', now=10000), 2800)
+        self.assertEqual(parse_time('+1d', now=0), 86400)
+        self.assertEqual(parse_time('now', now=5), 5)
+        with self.assertRaisesRegex(ValueError, "Invalid time"):
+            parse_time('yesterday')
+
+    def test_sorted_column_needs_no_sort(self):
+        table = load_csv_to_table(self.sample_csv_path)
+        index = table.indexes.time_index('Timestamp')
+        self.assertTrue(index.is_sorted)
+        self.assertIsNone(index.order)
+        self.assertEqual(list(index.window(parse_time('2023-10-26T10:05:00Z'), parse_time('2023-10-26T10:15:00Z'))),
+                         [1, 2])
+        self.assertEqual(index.count(), 5)
+        typed = load_csv_to_table(self.sample_csv_path, column_types={'Timestamp': 'timestamp'})
+        self.assertIs(TimeIndex(typed.columns['Timestamp']).times, typed.columns['Timestamp'].values)
+
+    def test_unsorted_and_missing_times(self):
+        rows = [['3'], ['bad'], ['1'], [''], ['2'], ['1']]
+        table = ColumnarTable.from_rows(['t'], rows)
+        index = TimeIndex(table.columns['t'])
+        self.assertFalse(index.is_sorted)
+        self.assertEqual(list(index.times), [1, 1, 2, 3])
+        self.assertEqual(list(index.window(1, 3)), [2, 4, 5])
+        self.assertEqual(list(index.window(earliest=2)), [0, 4])
+        self.assertEqual(list(index.window(latest=0)), [])
+        sorted_gaps = TimeIndex(ColumnarTable.from_rows(['t'], [['1'], [''], ['2']]).columns['t'])
+        self.assertTrue(sorted_gaps.is_sorted)
+        self.assertEqual(list(sorted_gaps.window(1, 3)), [0, 2])
+
+    def test_time_window_for_every_backend(self):
+        expected = load_csv_to_memory(self.sample_csv_path)[1:4]
+        earliest, latest = '2023-10-26T10:05:00Z', '2023-10-26 10:20:00'
+        self.assertEqual(time_window(load_csv_to_memory(self.sample_csv_path), earliest, latest), expected)
+        table = load_csv_to_table(self.sample_csv_path)
+        self.assertEqual(time_window(table, earliest, latest).to_dicts(), expected)
+        self.assertIn('Timestamp', table.indexes.time_indexes)
+        self.assertEqual(time_window(table.take(range(5)), earliest, latest).to_dicts(), expected)
+        self.assertEqual(time_window(table.select([0, 2, 3]), earliest, latest).to_dicts(), expected[1:])
+        mapped = load_csv_mapped(self.sample_csv_path)
+        self.assertEqual(time_window(mapped, earliest, latest).to_dicts(), expected)
+        mapped.close()
+        self.assertEqual(len(time_window(table, earliest=latest, latest=earliest)), 0)
+        self.assertEqual(len(time_window(table, earliest, column='Missing')), 0)
+
+    def test_time_index_built_at_load_and_saved(self):
+        cache_dir = os.path.join(self.tmp_dir.name, 'cache')
+        table = load_csv_to_table(self.sample_csv_path, time_column='Timestamp', cache_dir=cache_dir)
+        self.assertIn('Timestamp', table.indexes.time_indexes)
+        self.assertIn('Timestamp (time)', table.indexes.memory_usage())
+        restored = load_csv_to_table(self.sample_csv_path, cache_dir=cache_dir)
+        self.assertIn('Timestamp', restored.indexes.time_indexes)
+        self.assertEqual(len(time_window(restored, latest='2023-10-26T10:10:00Z')), 2)
+        with self.assertRaisesRegex(ValueError, "unknown column"):
+            load_csv_to_table(self.sample_csv_path, time_column='Missing')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,130 @@
+import unittest
+import os
+import tempfile
+
+# Add project root to sys.path to allow direct import of siem_core
+import sys
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, project_root)
+
+from siem_core.csv_handler import load_csv_to_memory, load_csv_to_table, query_data
+from siem_core.query_lang import run_query
+from siem_core.table import ColumnarTable
+from siem_core.typed import (INTEGER, IPV4, ColumnType, TimestampType, TypedColumn, apply_types, candidate_types,
+                             column_types_spec, parse_column_types)
+
+class TestTypedColumns(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp_dir = tempfile.TemporaryDirectory()
+        cls.csv_path = os.path.join(cls.tmp_dir.name, 'flows.csv')
+        with open(cls.csv_path, 'w') as f:
+            f.write("Source_IP,Port,Timestamp,Protocol\n")
+            for i in range(300):
+                port = '' if i % 10 == 0 else [0, 22, 443, 65535, 8080][i % 5]
+                f.write(f"10.{i % 3}.{i // 256}.{i % 256},{port},2023-10-26T{i % 24:02d}:{i % 60:02d}:00Z,TCP\n")
+            f.write("192.168.0.1,53\n")
+        cls.sample_csv_path = os.path.join(project_root, 'data', 'sample.csv')
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmp_dir.cleanup()
+
+    def test_types_round_trip_canonical_values_only(self):
+        self.assertEqual(INTEGER.parse('443'), 443)
+        self.assertEqual(INTEGER.parse('-5'), -5)
+        for text in ['0443', '+1', ' 1', '1.0', '', None, str(1 << 64)]:
+            self.assertIsNone(INTEGER.parse(text), text)
+        self.assertEqual(IPV4.parse('10.0.0.1'), 0x0A000001)
+        self.assertEqual(IPV4.format(0x0A000001), '10.0.0.1')
+        for text in ['10.0.0.01', '10.1', '256.0.0.1', '::1', '']:
+            self.assertIsNone(IPV4.parse(text), text)
+        timestamp = TimestampType()
+        self.assertEqual(timestamp.parse('1970-01-02T00:00:00Z'), 86400)
+        self.assertEqual(timestamp.format(86400), '1970-01-02T00:00:00Z')
+        for text in ['2023-02-30T00:00:00Z', '2023-10-26 10:00:00', '2023-10-26T10:00:00']:
+            self.assertIsNone(timestamp.parse(text), text)
+        self.assertEqual(TimestampType('%Y-%m-%d %H:%M:%S').parse('1970-01-01 00:01:00'), 60)
+        self.assertEqual(timestamp.parse_bound('1970-01-02'), 86400)
+
+    def test_types_must_parse_and_format(self):
+        class ParseOnly(ColumnType):
+            name = 'parse-only'
+
+            def parse(self, text):
+                return None
+
+        with self.assertRaises(TypeError):
+            ParseOnly()
+
+    def test_intervals(self):
+        self.assertEqual(INTEGER.intervals('>', '1.5'), [(2, (1 << 63) - 1)])
+        self.assertEqual(INTEGER.intervals('<', '2'), [(-(1 << 63), 1)])
+        self.assertEqual(INTEGER.intervals('between', ('1', '1024')), [(1, 1024)])
+        self.assertEqual(INTEGER.intervals('between', ('5', '1')), [])
+        self.assertEqual(INTEGER.intervals('in', ('80', '0080', '22')), [(22, 22), (80, 80)])
+        self.assertIsNone(INTEGER.intervals('=', ''))
+        self.assertIsNone(INTEGER.intervals('>', 'abc'))
+        self.assertEqual(IPV4.intervals('cidr', '10.0.0.0/8'), [(0x0A000000, 0x0AFFFFFF)])
+        self.assertIsNone(IPV4.intervals('cidr', '::/0'))
+        self.assertIsNone(INTEGER.intervals('cidr', '10.0.0.0/8'))
+
+    def test_inferred_table_reads_back_identically(self):
+        table = load_csv_to_table(self.csv_path, column_types='infer')
+        self.assertEqual(column_types_spec(table), {'Source_IP': 'ipv4', 'Timestamp': 'timestamp'})
+        self.assertEqual(table.to_dicts(), load_csv_to_memory(self.csv_path))
+        self.assertLess(table.columns['Source_IP'].nbytes, load_csv_to_table(self.csv_path).columns['Source_IP'].nbytes)
+
+    def test_declared_types(self):
+        table = load_csv_to_table(self.csv_path, column_types={'Port': 'int', 'Timestamp': 'timestamp'})
+        port = table.columns['Port']
+        self.assertEqual(port.kind, 'typed')
+        self.assertEqual(port.values.typecode, 'H')
+        self.assertEqual(table.to_dicts(), load_csv_to_memory(self.csv_path))
+        self.assertEqual(list(port.find('')), list(range(0, 300, 10)))
+        self.assertEqual(list(table.columns['Timestamp'].find(None)), [300])
+        self.assertEqual(list(table.columns['Timestamp'].find('')), [])
+        self.assertEqual(len(port.find('0')), 30)
+        self.assertEqual(len(port.find('00')), 0)
+        self.assertEqual(len(query_data(table, 'Port', '65535')), 60)
+
+    def test_time_ranges_match_with_and_without_types(self):
+        typed = load_csv_to_table(self.csv_path, column_types={'Timestamp': 'timestamp'})
+        untyped = load_csv_to_table(self.csv_path)
+        rows = load_csv_to_memory(self.csv_path)
+        for expression in ['Timestamp BETWEEN 2023-10-26T01:00:00 AND 2023-10-26T02:00:00',
+                           'Timestamp < "2023-10-26 02:00:00"', 'Timestamp <= 2023-10-26T02:00:00',
+                           'Timestamp >= 2023-10-26', 'Timestamp > 2023-10-26T22:59:00Z',
+                           'NOT Timestamp BETWEEN 2023-10-26 AND 2023-10-26T12:00:00']:
+            expected = [dict(row) for row in run_query(typed, expression)]
+            self.assertTrue(expected, expression)
+            self.assertEqual([dict(row) for row in run_query(untyped, expression)], expected, expression)
+            self.assertEqual(run_query(rows, expression), expected, expression)
+
+    def test_declared_type_errors(self):
+        with self.assertRaisesRegex(ValueError, "cannot be stored as ipv4"):
+            load_csv_to_table(self.csv_path, column_types={'Port': 'ipv4'})
+        with self.assertRaisesRegex(ValueError, "unknown column"):
+            load_csv_to_table(self.csv_path, column_types={'Missing': 'int'})
+        with self.assertRaisesRegex(ValueError, "Unknown column type"):
+            candidate_types('float')
+        with self.assertRaises(ValueError):
+            parse_column_types('Port')
+        self.assertEqual(parse_column_types('Port:int,Timestamp:timestamp'), {'Port': 'int', 'Timestamp': 'timestamp'})
+
+    def test_typed_column_append_take_and_widen(self):
+        table = ColumnarTable.from_rows(['n'], [['1'], [''], ['200']])
+        apply_types(table, {'n': 'int'})
+        column = table.columns['n']
+        self.assertEqual(column.values.typecode, 'B')
+        column.append('-70000')
+        self.assertEqual(column.get(3), '-70000')
+        with self.assertRaisesRegex(ValueError, "cannot be stored as int"):
+            column.append('x')
+        taken = column.take([3, 1, 0])
+        self.assertEqual([taken.get(i) for i in range(3)], ['-70000', '', '1'])
+        self.assertEqual(len(TypedColumn(INTEGER)), 0)
+
+if __name__ == '__main__':
+    unittest.main()